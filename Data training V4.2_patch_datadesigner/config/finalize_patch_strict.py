@@ -4,8 +4,12 @@ import hashlib
 import pandas as pd
 from collections import Counter
 import re
+import sys
 from datetime import datetime
 
+sys.path.append(os.getcwd())
+from finetune.dataset_audit import PatternSet
+
 OUTPUT_DIR = "Data training V4.2_patch_datadesigner/release_chat_patch"
 FILE_NAME = "v4_2_patch.jsonl"
 MANIFEST_NAME = "manifest_patch.json"
@@ -33,6 +37,7 @@ LEAKAGE = [
     "Mixed/English",
     r":contentReference\[oaicite:\d+\]\{index=\d+\}" # Catches :contentReference[oaicite:2]{index=2}
 ]
+LEAKAGE_SET = PatternSet(LEAKAGE, re.IGNORECASE)
 
 def calculate_sha256(filepath):
     sha256_hash = hashlib.sha256()
@@ -42,11 +47,8 @@ def calculate_sha256(filepath):
     return sha256_hash.hexdigest()
 
 def check_leakage(text):
-    found = []
-    for pat in LEAKAGE:
-        if re.search(pat, text, re.IGNORECASE):
-            found.append(pat)
-    return found
+    # One combined scan; the per-pattern pass only runs on hits
+    return LEAKAGE_SET.all_matches(text)
 
 def main():
     filepath = os.path.join(OUTPUT_DIR, FILE_NAME)
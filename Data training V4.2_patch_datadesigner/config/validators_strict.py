@@ -1,6 +1,11 @@
+import os
 import re
+import sys
 import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from finetune.dataset_audit import PatternSet
+
 # Strict Regex Patterns (Leakage)
 LEAKAGE_PATTERNS = [
     r"GPT-4o returned", 
@@ -16,64 +21,41 @@ LEAKAGE_PATTERNS = [
     r"OpenAI"
 ]
 
+LEAKAGE = PatternSet(LEAKAGE_PATTERNS, re.IGNORECASE)
+NUMERIC_SCORE = r"\d+/\d+|\d+%"
+REFUSAL_CUES = r"لا (?:أستطيع|أملك|أعرف)|غير متأكد"
+
 def strict_validation(df: pd.DataFrame) -> pd.DataFrame:
     """
     Validates generated chat records.
+
+    Column-wise: texts are assembled once, then leakage and bucket rules run
+    as vectorized string ops (one combined regex for all leakage patterns).
+    Reasons keep the per-row priority: format, leakage, bucket rule.
     """
-    results = []
-    
-    for idx, row in df.iterrows():
-        is_valid = True
-        reason = ""
-        
-        # Parse content
-        # Assuming Data Designer outputs a structured object or we construct it
-        # For this function, let's assume 'chat_record' column contains the JSON/Dict
-        record = row.get("chat_record")
-        
-        if not record or not isinstance(record, dict):
-             results.append({"is_valid": False, "validation_reason": "Invalid Format"})
-             continue
-             
-        messages = record.get("messages", [])
-        bucket = row.get("bucket", "unknown")
-        
-        full_text = ""
-        assist_text = ""
-        
-        for m in messages:
-            content = m.get("content", "")
-            full_text += content + "\n"
-            if m.get("role") == "assistant": assist_text += content
-            
-        # 1. Leakage
-        for pat in LEAKAGE_PATTERNS:
-            if re.search(pat, full_text, re.IGNORECASE):
-                is_valid = False
-                reason = f"Leakage: {pat}"
-                break
-        
-        if not is_valid:
-            results.append({"is_valid": False, "validation_reason": reason})
-            continue
-            
-        # 2. Bucket Specifics
-        if bucket == "numeric_discipline":
-            if not (re.search(r"\d+/\d+", assist_text) or re.search(r"\d+%", assist_text)):
-                is_valid = False
-                reason = "Numeric Discipline: Missing score"
-                
-        elif bucket == "refuse_to_guess_source_needed":
-             if not (re.search(r"لا (أستطيع|أملك|أعرف)", assist_text) or "غير متأكد" in assist_text):
-                 is_valid = False
-                 reason = "Refusal: Missing refusal cue"
-                 
-        elif bucket == "error_correction_dialogues":
-            # Must have multiple turns (System, User, Assistant, User, Assistant) -> 5
-            if len(messages) < 5:
-                is_valid = False
-                reason = "Error Correction: Too few turns"
+    # Assuming Data Designer outputs a structured object or we construct it
+    # 'chat_record' column contains the JSON/Dict
+    records = df["chat_record"] if "chat_record" in df else pd.Series([None] * len(df), index=df.index)
+    valid_format = records.map(lambda r: isinstance(r, dict) and bool(r))
+    messages = records.map(lambda r: r.get("messages", []) if isinstance(r, dict) else [])
+    bucket = df["bucket"] if "bucket" in df else pd.Series("unknown", index=df.index)
+
+    full_text = messages.map(lambda ms: "".join(m.get("content", "") + "\n" for m in ms))
+    assist_text = messages.map(lambda ms: "".join(m.get("content", "") for m in ms if m.get("role") == "assistant"))
+
+    # 1. Leakage
+    leak = LEAKAGE.first_matches(full_text)
 
-        results.append({"is_valid": is_valid, "validation_reason": reason})
+    # 2. Bucket Specifics
+    reason = pd.Series("", index=df.index, dtype=object)
+    # Must have multiple turns (System, User, Assistant, User, Assistant) -> 5
+    reason = reason.mask((bucket == "error_correction_dialogues") & (messages.map(len) < 5),
+                         "Error Correction: Too few turns")
+    reason = reason.mask((bucket == "refuse_to_guess_source_needed") & ~assist_text.str.contains(REFUSAL_CUES),
+                         "Refusal: Missing refusal cue")
+    reason = reason.mask((bucket == "numeric_discipline") & ~assist_text.str.contains(NUMERIC_SCORE),
+                         "Numeric Discipline: Missing score")
+    reason = reason.mask(leak.notna(), "Leakage: " + leak.fillna(""))
+    reason = reason.mask(~valid_format, "Invalid Format")
 
-    return pd.DataFrame(results, index=df.index)
+    return pd.DataFrame({"is_valid": reason == "", "validation_reason": reason}, index=df.index)
@@ -1,7 +1,12 @@
+import os
 import re
+import sys
 import pandas as pd
 from typing import List, Dict
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from finetune.dataset_audit import PatternSet
+
 # Regex Patterns for Leakage (From V4.1 rules)
 LEAKAGE_PATTERNS = [
     r"GPT-4o returned", 
@@ -17,60 +22,35 @@ LEAKAGE_PATTERNS = [
     r"OpenAI"
 ]
 
+LEAKAGE = PatternSet(LEAKAGE_PATTERNS, re.IGNORECASE)
+NUMERIC_SCORE = r"\d+/\d+|\d+%"  # X/10 or %
+REFUSAL_CUES = r"لا (?:أستطيع|أملك|أعرف)|غير متأكد|لا يمكنني"
+
 def validate_chat_records(df: pd.DataFrame) -> pd.DataFrame:
     """
     Validates a DataFrame of ChatRecords.
     Input df columns expected: ['messages', 'bucket', 'tags', 'expected_check']
     Output df columns: ['is_valid', 'validation_reason']
+
+    Rules run column-wise (vectorized string ops, one combined leakage regex).
     """
-    
-    results = []
-    
-    for idx, row in df.iterrows():
-        is_valid = True
-        reason = ""
-        
-        messages = row.get("messages", [])
-        if not messages:
-            is_valid = False
-            reason = "Empty messages"
-            
-        full_text = ""
-        user_text = ""
-        assist_text = ""
-        
-        for m in messages:
-            content = m.get("content", "")
-            full_text += content + "\n"
-            if m.get("role") == "user": user_text += content + "\n"
-            if m.get("role") == "assistant": assist_text += content + "\n"
+    messages = df["messages"].map(lambda ms: ms if isinstance(ms, list) else []) if "messages" in df \
+        else pd.Series([[]] * len(df), index=df.index)
+    bucket = df["bucket"] if "bucket" in df else pd.Series("unknown", index=df.index)
+
+    full_text = messages.map(lambda ms: "".join(m.get("content", "") + "\n" for m in ms))
+    assist_text = messages.map(lambda ms: "".join(m.get("content", "") + "\n" for m in ms if m.get("role") == "assistant"))
 
-        # 1. Leakage Check
-        for pat in LEAKAGE_PATTERNS:
-            if re.search(pat, full_text, re.IGNORECASE):
-                is_valid = False
-                reason = f"Leakage found: {pat}"
-                break
-        
-        if not is_valid:
-            results.append({"is_valid": False, "validation_reason": reason})
-            continue
+    # 1. Leakage Check
+    leak = LEAKAGE.first_matches(full_text)
 
-        # 2. Bucket Specific Checks
-        bucket = row.get("bucket", "unknown")
-        
-        if bucket == "numeric_discipline":
-            # Must contain X/10 or %
-            if not (re.search(r"\d+/\d+", assist_text) or re.search(r"\d+%", assist_text)):
-                is_valid = False
-                reason = "Numeric Discipline: Missing score/percentage"
-        
-        elif bucket == "refuse_to_guess_source_needed":
-            # Must contain refusal cues
-            if not (re.search(r"لا (أستطيع|أملك|أعرف)", assist_text) or "غير متأكد" in assist_text or "لا يمكنني" in assist_text):
-                 is_valid = False
-                 reason = "Refuse to Guess: Missing refusal phrases"
-                 
-        results.append({"is_valid": is_valid, "validation_reason": reason})
+    # 2. Bucket Specific Checks
+    reason = pd.Series("", index=df.index, dtype=object)
+    reason = reason.mask((bucket == "refuse_to_guess_source_needed") & ~assist_text.str.contains(REFUSAL_CUES),
+                         "Refuse to Guess: Missing refusal phrases")
+    reason = reason.mask((bucket == "numeric_discipline") & ~assist_text.str.contains(NUMERIC_SCORE),
+                         "Numeric Discipline: Missing score/percentage")
+    reason = reason.mask(leak.notna(), "Leakage found: " + leak.fillna(""))
+    reason = reason.mask(messages.map(len) == 0, "Empty messages")
 
-    return pd.DataFrame(results, index=df.index)
+    return pd.DataFrame({"is_valid": reason == "", "validation_reason": reason}, index=df.index)
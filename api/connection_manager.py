@@ -1,27 +1,174 @@
 from fastapi import WebSocket
-from typing import List
+from typing import List, Dict, Any, Optional, Tuple
+from collections import deque
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger("ConnectionManager")
 
+
+class _Outbound:
+    """One queued frame; `key` is set for coalescable events"""
+    __slots__ = ("key", "kind", "text")
+
+    def __init__(self, key: Optional[Tuple], kind: str, text: str):
+        self.key = key
+        self.kind = kind
+        self.text = text
+
+
+class _Client:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: deque = deque()
+        self.pending: Dict[Tuple, _Outbound] = {}   # Unsent coalescable frames by key
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+
+
 class ConnectionManager:
+    """
+    WebSocket fan-out to the frontend
+
+    Each connection has a bounded outbound queue drained by its own writer
+    task, so broadcasting never waits on a client. Messages are serialized
+    once and the same text is queued for every client. High-frequency
+    progress events are coalesced (an unsent update for the same file is
+    replaced) and dropped first when a queue is full; a client that still
+    cannot keep up, or whose send fails, is disconnected.
+    """
+
+    QUEUE_SIZE = 256
+    SEND_TIMEOUT = 5.0
+    # Events that may be dropped under backpressure
+    DROPPABLE = {"task_progress", "log", "llm_start", "llm_end"}
+
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self._clients: Dict[WebSocket, _Client] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
+        self._loop = asyncio.get_running_loop()
+        client = _Client(websocket)
+        client.writer = asyncio.create_task(self._write_loop(client))
+        self._clients[websocket] = client
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        client = self._clients.pop(websocket, None)
+        if client and client.writer and client.writer is not _current_task():
+            client.writer.cancel()
+
+    # ==================== Sending ====================
+
+    @staticmethod
+    def _coalesce_key(message: Dict[str, Any]) -> Optional[Tuple]:
+        if message.get("type") == "task_progress":
+            return ("task_progress", message.get("task"), message.get("file"))
+        return None
+
+    def publish(self, message: dict):
+        """
+        Queue a message for every client and return immediately (fire-and-forget)
+
+        Safe to call from hot paths and from worker threads.
+        """
+        if not self._clients:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is not None and running is not self._loop:
+            self._loop.call_soon_threadsafe(self.publish, message)
+            return
+
+        # Same encoding as WebSocket.send_json, done once for all clients
+        text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        key = self._coalesce_key(message)
+        kind = message.get("type", "")
+        for client in list(self._clients.values()):
+            self._enqueue(client, _Outbound(key, kind, text))
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message: {e}")
-                # We might want to remove dead connections here
+        """Awaitable alias of publish(); never waits on a client"""
+        self.publish(message)
+
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Send to one client through its queue (keeps frames ordered with broadcasts)"""
+        client = self._clients.get(websocket)
+        if client:
+            text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+            self._enqueue(client, _Outbound(None, message.get("type", ""), text))
+
+    def _enqueue(self, client: _Client, item: _Outbound):
+        if item.key is not None:
+            queued = client.pending.get(item.key)
+            if queued is not None:
+                queued.text = item.text  # Latest state wins, keeps its place in line
+                return
+        if len(client.queue) >= self.QUEUE_SIZE and not self._make_room(client):
+            logger.warning("WebSocket client too slow, disconnecting")
+            self._close(client)
+            return
+        client.queue.append(item)
+        if item.key is not None:
+            client.pending[item.key] = item
+        client.ready.set()
+
+    def _make_room(self, client: _Client) -> bool:
+        """Drop the oldest droppable frame; False if there is none"""
+        for index, queued in enumerate(client.queue):
+            if queued.kind in self.DROPPABLE:
+                del client.queue[index]
+                if queued.key is not None and client.pending.get(queued.key) is queued:
+                    del client.pending[queued.key]
+                return True
+        return False
+
+    async def _write_loop(self, client: _Client):
+        websocket = client.websocket
+        try:
+            while True:
+                if not client.queue:
+                    client.ready.clear()
+                    await client.ready.wait()
+                    continue
+                item = client.queue.popleft()
+                if item.key is not None and client.pending.get(item.key) is item:
+                    del client.pending[item.key]
+                await asyncio.wait_for(websocket.send_text(item.text), self.SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Pruning WebSocket connection: {type(e).__name__}: {e}")
+            self._close(client)
+
+    def _close(self, client: _Client):
+        self.disconnect(client.websocket)
+        try:
+            asyncio.get_running_loop().create_task(self._safe_close(client.websocket))
+        except RuntimeError:
+            pass
+
+    @staticmethod
+    async def _safe_close(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
 
 manager = ConnectionManager()
@@ -44,6 +44,16 @@ async def startup_event():
     guardian = SystemGuardian()
     asyncio.create_task(guardian.start_monitoring())
     logger.info("Guardian Initialized")
+    
+    # Pre-compute the morning briefing before the usual wake time
+    from haitham_voice_agent.tools.secretary import get_secretary
+    asyncio.create_task(get_secretary().run_briefing_scheduler())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Persist buffered token usage events
+    from haitham_voice_agent.token_tracker import get_tracker
+    await get_tracker().flush()
 
 
 
@@ -58,7 +68,7 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             data = await websocket.receive_json()
             if data.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send_personal(websocket, {"type": "pong"})
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from haitham_voice_agent.dispatcher import get_dispatcher
+from haitham_voice_agent.dispatcher import get_dispatcher, primary_result
 from haitham_voice_agent.intent_router import route_command
 from haitham_voice_agent.llm_router import get_router as get_llm_router
 from haitham_voice_agent.ollama_orchestrator import get_orchestrator
+from api.sse import sse_reply, sse_response
 import logging
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -16,9 +17,39 @@ class ChatRequest(BaseModel):
     command: Optional[str] = None
     params: Optional[Dict[str, Any]] = None
 
+async def _direct_chat(llm_router, text: str, stream: bool = False, **extra) -> Dict[str, Any]:
+    """Plain GPT answer; with stream=True the reply is an LLMStream under "stream" """
+    if stream:
+        llm_stream = llm_router.stream_with_gpt(text)
+        return {"stream": llm_stream, "model": llm_stream.model, **extra}
+    response_data = await llm_router.generate_with_gpt(text)
+    return {"response": response_data["content"], "model": response_data["model"], **extra}
+
 @router.post("/")
 async def chat(request: ChatRequest):
     """Process text chat message or direct command"""
+    return await process_chat(request)
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    SSE variant of POST /chat/
+
+    Direct LLM answers stream delta/sentence events while generating;
+    tool results arrive as one reply. The final "done" event carries the
+    same payload as POST /chat/ (plus token usage for streamed answers).
+    """
+    result = await process_chat(request, stream=True)
+    llm_stream = result.pop("stream", None)
+    if llm_stream is None:
+        return sse_response(sse_reply(str(result.get("response", "")), result))
+    return sse_response(sse_reply(
+        llm_stream,
+        lambda text: {**result, "response": text, "usage": llm_stream.usage}
+    ))
+
+async def process_chat(request: ChatRequest, stream: bool = False):
+    """Route a chat message; stream=True returns direct LLM answers unconsumed (see _direct_chat)"""
     try:
         text = request.message
         command = request.command
@@ -403,16 +434,15 @@ async def chat(request: ChatRequest):
         if not results:
              # Fallback to direct chat if no plan steps
              logger.info("No plan steps, falling back to direct chat")
-             response_data = await llm_router.generate_with_gpt(text)
-             return {"response": response_data["content"], "model": response_data["model"]}
+             return await _direct_chat(llm_router, text, stream)
              
-        last_result = results[-1]
+        # First failed step, else the last step
+        last_result = primary_result(results)
         
         # Check for "Tool not found" error
         if last_result.get("error") and "Tool not found" in last_result.get("message", ""):
              logger.info("Tool not found, falling back to direct chat")
-             response_data = await llm_router.generate_with_gpt(text)
-             return {"response": response_data["content"], "type": "text", "model": response_data["model"]}
+             return await _direct_chat(llm_router, text, stream, type="text")
 
         # Return full result for rich rendering
         # Return full result for rich rendering
@@ -105,11 +105,26 @@ async def list_checkpoints(limit: int = 10):
     return await cm.get_checkpoints(limit)
 
 @router.get("/tree")
-async def get_file_tree(path: str = "~", depth: int = 2):
-    """Get file system tree structure"""
+async def get_file_tree(path: str = "~", depth: int = 2, limit: Optional[int] = None):
+    """Get file system tree structure (unexpanded folders load via /tree/children)"""
     from haitham_voice_agent.tools.files import FileTools
     ft = FileTools()
-    return await ft.get_file_tree(path, depth)
+    return await ft.get_file_tree(path, depth, limit=limit)
+
+@router.get("/tree/children")
+async def get_tree_children(path: str = "~", limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Expand one folder of the tree, a page at a time"""
+    from haitham_voice_agent.tools.files import FileTools
+    ft = FileTools()
+    return await ft.list_children(path, limit=limit, cursor=cursor)
+
+@router.get("/list")
+async def list_files(path: str = "~", sort_by: str = "name", pattern: Optional[str] = None,
+                     recursive: bool = False, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Paginated directory listing (pass next_cursor back as cursor)"""
+    from haitham_voice_agent.tools.files import FileTools
+    ft = FileTools()
+    return await ft.list_files(path, pattern=pattern, recursive=recursive, sort_by=sort_by, limit=limit, cursor=cursor)
 
 class OpenFileRequest(BaseModel):
     path: str
@@ -9,6 +9,7 @@ from pydantic import BaseModel
 
 from haitham_voice_agent.config import Config
 from haitham_voice_agent.llm_router import get_router, LLMType
+from api.sse import sse_reply, sse_response
 
 logger = logging.getLogger(__name__)
 
@@ -161,13 +162,8 @@ async def compare_models(request: ComparisonRequest):
         logger.error(f"Comparison failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/tutor-chat")
-async def tutor_chat(request: ChatRequest):
-    """
-    Educational chat with pure AI context about fine-tuning.
-    """
-    llm_router = get_router()
-    
+async def _tutor_prompts(request: ChatRequest):
+    """(system_prompt, full_prompt) for the tutor chat"""
     # 1. Build System Prompt with Context
     # We could fetch real status here to inject into prompt
     status = await get_finetune_status()
@@ -216,6 +212,15 @@ Important constraints:
         history_text += "\n(End of History)\n"
     
     full_prompt = f"{history_text}\nUser's Question: {last_user_msg}"
+    return system_prompt, full_prompt
+
+@router.post("/tutor-chat")
+async def tutor_chat(request: ChatRequest):
+    """
+    Educational chat with pure AI context about fine-tuning.
+    """
+    llm_router = get_router()
+    system_prompt, full_prompt = await _tutor_prompts(request)
     
     response = {"content": "", "model": ""}
     
@@ -240,6 +245,36 @@ Important constraints:
             {"role": "assistant", "content": response["content"]}
         ]
     }
+
+@router.post("/tutor-chat/stream")
+async def tutor_chat_stream(request: ChatRequest):
+    """
+    SSE variant of /tutor-chat (delta/sentence events, then done).
+    """
+    llm_router = get_router()
+    system_prompt, full_prompt = await _tutor_prompts(request)
+    
+    if request.model_provider.lower() == "gemini":
+        stream = llm_router.stream_with_gemini(
+            prompt=full_prompt,
+            system_instruction=system_prompt,
+            temperature=0.7,
+            logical_model="logical.gemini.flash"
+        )
+    else:
+        stream = llm_router.stream_with_gpt(
+            prompt=full_prompt,
+            system_instruction=system_prompt,
+            temperature=0.7,
+            logical_model="logical.mini"
+        )
+    
+    return sse_response(sse_reply(stream, lambda text: {
+        "messages": [{"role": "assistant", "content": text}],
+        "model": stream.model,
+        "usage": stream.usage
+    }))
+
 @router.post("/style-compare")
 async def style_compare(request: StyleCompareRequest):
     """
@@ -316,6 +351,28 @@ async def experiment_chat(request: ExperimentChatRequest):
         logger.error(f"Experiment chat failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/experiment/chat/stream")
+async def experiment_chat_stream(request: ExperimentChatRequest):
+    """
+    SSE variant of /experiment/chat: tokens are streamed from the shared
+    generation scheduler; the done event has the /experiment/chat payload.
+    """
+    from finetune.haithm_style.infer_haithm_style_core import submit_chat, chat_result
+    from haitham_voice_agent.streaming import iterate_in_thread
+    import asyncio
+
+    try:
+        # May load the model on first use
+        generation = await asyncio.to_thread(submit_chat, request.messages, request.mode)
+    except Exception as e:
+        logger.error(f"Experiment chat failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return sse_response(sse_reply(
+        iterate_in_thread(generation.stream()),
+        lambda text: chat_result(generation, request.mode)
+    ))
+
 @router.post("/experiment/save")
 async def save_experiment_session(request: ExperimentChatRequest):
     """
@@ -1,5 +1,10 @@
+import logging
+
 from fastapi import APIRouter, HTTPException
 from haitham_voice_agent.dispatcher import get_dispatcher
+from haitham_voice_agent.tools.gmail.llm_helper import get_email_llm_helpers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/gmail", tags=["gmail"])
 
@@ -20,17 +25,24 @@ async def get_unread_emails():
         
         if result.get("error"):
             return result
+        
+        # Analyze the unread list in the background so opening an email is instant
+        emails = result.get("emails", [])
+        try:
+            get_email_llm_helpers().schedule_prefetch(emails, loader=gmail_tool.get_email_by_id)
+        except Exception as e:
+            logger.warning(f"Unread email prefetch failed: {e}")
             
         return {
             "count": result.get("count", 0),
-            "messages": result.get("emails", [])
+            "messages": emails
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/summarize/{message_id}")
 async def summarize_email(message_id: str):
-    """Summarize an email using LLM"""
+    """Summarize an email: summary, action items and sentiment in one cached LLM call"""
     dispatcher = get_dispatcher()
     gmail_tool = dispatcher.tools.get("gmail")
     
@@ -38,46 +50,23 @@ async def summarize_email(message_id: str):
         raise HTTPException(status_code=503, detail="Gmail tool not available")
         
     try:
-        # 1. Get email content
         email = await gmail_tool.get_email_by_id(message_id)
         if email.get("error"):
             raise HTTPException(status_code=404, detail="Email not found")
-            
-        # 2. Prepare content for LLM
-        subject = email.get("subject", "")
-        body = email.get("body_text", "") or email.get("snippet", "")
-        
-        # 3. Call LLM (using Gemini for summarization)
-        from haitham_voice_agent.llm_router import get_router
-        
-        router = get_router()
-        
-        # summary_result is {"content": "...", "model": "..."}
-        summary_result = await router.summarize_with_gemini(
-            text=f"Subject: {subject}\n\nBody: {body}",
-            summary_type="brief"
-        )
-        
-        # Translate to Arabic if needed (or ensure prompt asks for Arabic)
-        # Actually summarize_with_gemini prompt is English by default.
-        # Let's use generate_with_gemini directly for Arabic control.
-        
-        prompt = f"""
-        قم بتحليل هذه الرسالة وتلخيصها بشكل احترافي باللغة العربية.
-        الموضوع: {subject}
-        المحتوى: {body[:2000]}
-        
-        الصيغة المطلوبة:
-        - **الفكرة الرئيسية**: سطر واحد.
-        - **النقاط الهامة**: قائمة نقطية (تواريخ، أرقام، أسماء).
-        - **الإجراء المطلوب**: إذا وجد.
-        """
         
-        result = await router.generate_with_gemini(prompt, temperature=0.3)
-        summary = result.get("content", "تعذر التلخيص")
+        result = await get_email_llm_helpers().summarize_email(email)
+        if result.get("error"):
+            return {"id": message_id, "summary": "تعذر التلخيص", "error": True}
         
-        return {"id": message_id, "summary": summary}
+        return {
+            "id": message_id,
+            "summary": result["summary"],
+            "analysis": result["analysis"],
+            "cached": result["cached"]
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
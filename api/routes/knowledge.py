@@ -84,7 +84,7 @@ async def build_knowledge_tree(req: KnowledgeRequest):
             # We need content.
             # Assuming file is on disk
             from haitham_voice_agent.intelligence.content_extractor import content_extractor
-            content = content_extractor.extract_text(req.path)
+            content = await content_extractor.extract_text_async(req.path)
             
             if content:
                 await knowledge_graph_builder.build_document_tree(req.path, content, req.path.split('/')[-1])
@@ -110,7 +110,7 @@ async def generate_podcast(req: PodcastRequest):
     try:
         # Get Content
         from haitham_voice_agent.intelligence.content_extractor import content_extractor
-        content = content_extractor.extract_text(req.path)
+        content = await content_extractor.extract_text_async(req.path)
         
         if not content:
             raise HTTPException(status_code=404, detail="File content not found")
@@ -133,7 +133,7 @@ async def recursive_summary(req: KnowledgeRequest):
     try:
         # Get Content
         from haitham_voice_agent.intelligence.content_extractor import content_extractor
-        content = content_extractor.extract_text(req.path)
+        content = await content_extractor.extract_text_async(req.path)
         
         if not content:
             raise HTTPException(status_code=404, detail="File content not found")
@@ -3,6 +3,9 @@ from typing import Dict, Any, Optional, List
 import logging
 
 from haitham_voice_agent.tools.memory.memory_system import memory_system
+from haitham_voice_agent.token_tracker import get_tracker
+from haitham_voice_agent.routing_telemetry import get_telemetry
+from haitham_voice_agent.config import Config
 
 router = APIRouter(prefix="/usage", tags=["usage"])
 logger = logging.getLogger(__name__)
@@ -16,6 +19,8 @@ async def get_usage_stats(days: int = Query(30, description="Number of days to l
         if not memory_system.sqlite_store:
             raise HTTPException(status_code=503, detail="Database not initialized")
             
+        # Write any buffered events first so the rollups are current
+        await get_tracker().flush()
         stats = await memory_system.sqlite_store.get_token_usage_stats(days=days)
         return stats
     except Exception as e:
@@ -31,8 +36,23 @@ async def get_usage_logs(limit: int = Query(50, description="Number of logs to f
         if not memory_system.sqlite_store:
             raise HTTPException(status_code=503, detail="Database not initialized")
             
+        await get_tracker().flush()
         logs = await memory_system.sqlite_store.get_token_usage_logs(limit=limit)
         return logs
     except Exception as e:
         logger.error(f"Error fetching usage logs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/routing")
+async def get_routing_stats(window: Optional[int] = Query(None, description="Only calls in the last N seconds")) -> Dict[str, Any]:
+    """
+    Per-model/provider/task-type latency (p50/p95/p99), TTFT, error rate,
+    tokens and cost of recent routed LLM calls.
+    """
+    try:
+        stats = get_telemetry().summary(window_seconds=window)
+        stats["adaptive_routing"] = Config.ADAPTIVE_ROUTING
+        return stats
+    except Exception as e:
+        logger.error(f"Error fetching routing stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
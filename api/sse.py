@@ -0,0 +1,66 @@
+"""
+Server-Sent Events helpers for the streaming chat endpoints
+
+Event stream for one reply:
+    event: delta     data: {"text": "..."}      every generated chunk (chat UI)
+    event: sentence  data: {"text": "..."}      each complete sentence (TTS)
+    event: done      data: {...final payload}    same shape as the non-streaming route
+    event: error     data: {"message": "..."}
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Union
+
+from fastapi.responses import StreamingResponse
+
+from haitham_voice_agent.streaming import SentenceChunker
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def sse_reply(
+    deltas: Union[AsyncIterator[str], str],
+    done: Union[Dict[str, Any], Callable[[str], Dict[str, Any]]]
+) -> AsyncIterator[str]:
+    """
+    Encode a reply as SSE events
+
+    Args:
+        deltas: async iterator of text deltas, or an already complete reply
+        done: final payload, or a callable building it from the full text
+              (called after the stream ends, so usage is available)
+    """
+    if isinstance(deltas, str):
+        deltas = _once(deltas)
+    chunker = SentenceChunker()
+    text = ""
+    try:
+        async for delta in deltas:
+            text += delta
+            yield sse_event("delta", {"text": delta})
+            for sentence in chunker.feed(delta):
+                yield sse_event("sentence", {"text": sentence})
+        tail = chunker.flush()
+        if tail:
+            yield sse_event("sentence", {"text": tail})
+        yield sse_event("done", done(text) if callable(done) else done)
+    except Exception as e:
+        logger.error(f"Streaming reply failed: {e}")
+        yield sse_event("error", {"message": str(e)})
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,333 @@
+"""
+Training Data Audit
+
+Validation engine for the V3/V4/V4.x datasets:
+- PatternSet: a list of regexes compiled into one combined pattern. One
+  scan answers "does anything match"; the per-pattern loop only runs on
+  the (rare) hits to report which pattern it was. Works per string or on
+  a whole pandas Series.
+- MinHash signatures (numpy-vectorized when available) + banded LSH for
+  near-duplicate detection within and across splits.
+- audit_splits(): streams JSONL splits through chunked worker processes
+  and returns a JSON-serializable audit (leakage, exact and near
+  duplicates, train/eval overlap).
+"""
+
+import re
+import json
+import zlib
+import random
+import hashlib
+from array import array
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Union of the V4.1 validator list and the strict finalize list
+LEAKAGE_PATTERNS = [
+    r"GPT-4o returned",
+    r"DALL[·-]E",
+    r"turn\d+file",
+    r"file_search",
+    r"web\.run",
+    r"python_user_visible",
+    r"image_gen",
+    r"\[STATE:",
+    r"As an AI",
+    r"I am an AI",
+    r"OpenAI",
+    r"Mixed/English",
+    r":contentReference\[oaicite:\d+\]\{index=\d+\}",
+]
+
+EVAL_SPLIT_HINTS = ("val", "eval", "test")
+
+
+class PatternSet:
+    """Regexes compiled once, individually and as one alternation"""
+
+    def __init__(self, patterns: List[str], flags: int = 0):
+        self.patterns = list(patterns)
+        self.compiled = [re.compile(p, flags) for p in self.patterns]
+        self.combined = re.compile("|".join(self._scoped(p) for p in self.patterns), flags)
+
+    @staticmethod
+    def _scoped(pattern: str) -> str:
+        # Leading global flags like "(?i)" are only legal at the start; turn them into a scoped group
+        match = re.match(r"\(\?([aiLmsux]+)\)", pattern)
+        if match:
+            return f"(?{match.group(1)}:{pattern[match.end():]})"
+        return f"(?:{pattern})"
+
+    def search(self, text: str) -> bool:
+        return self.combined.search(text) is not None
+
+    def first_match(self, text: str) -> Optional[str]:
+        """First pattern (in list order) found in text"""
+        if not self.combined.search(text):
+            return None
+        return next(p for p, rx in zip(self.patterns, self.compiled) if rx.search(text))
+
+    def all_matches(self, text: str) -> List[str]:
+        if not self.combined.search(text):
+            return []
+        return [p for p, rx in zip(self.patterns, self.compiled) if rx.search(text)]
+
+    def first_matches(self, texts):
+        """pandas Series -> Series of the first matching pattern (None where clean)"""
+        hits = texts.str.contains(self.combined, regex=True, na=False)
+        result = texts.astype(object).where(hits, None)
+        result[hits] = texts[hits].map(self.first_match)
+        return result
+
+
+LEAKAGE = PatternSet(LEAKAGE_PATTERNS, re.IGNORECASE)
+
+# ==================== Records ====================
+
+def record_texts(record: Dict[str, Any]) -> Tuple[str, str]:
+    """(full text, assistant text) for chat records ({"messages": [...]}) and instruction records"""
+    messages = record.get("messages")
+    if isinstance(messages, list):
+        contents = [(m.get("role"), m.get("content") or "") for m in messages if isinstance(m, dict)]
+        return "\n".join(c for _, c in contents), "\n".join(c for r, c in contents if r == "assistant")
+    output = str(record.get("output") or "")
+    parts = [str(record.get("instruction") or ""), str(record.get("input") or ""), output]
+    return "\n".join(p for p in parts if p), output
+
+# ==================== MinHash / LSH ====================
+
+_MERSENNE = (1 << 61) - 1
+_DIACRITICS = re.compile(r"[\u064B-\u0652\u0640]")  # Tashkeel + tatweel
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    text = _DIACRITICS.sub("", text.lower())
+    text = text.translate(str.maketrans("أإآىة", "ااايه"))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingles(text: str, k: int = 3) -> List[int]:
+    """crc32 of word k-grams of the normalized text (stable across processes)"""
+    words = normalize(text).split()
+    if len(words) <= k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return list({zlib.crc32(g.encode("utf-8")) for g in grams})
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = [rng.randrange(1, 1 << 32) for _ in range(num_perm)]
+        self.b = [rng.randrange(0, 1 << 32) for _ in range(num_perm)]
+        if np is not None:
+            self._a = np.array(self.a, dtype=np.uint64)[:, None]
+            self._b = np.array(self.b, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes: List[int]) -> bytes:
+        """num_perm uint32 minimums, packed"""
+        if not hashes:
+            return array("I", [0xFFFFFFFF] * self.num_perm).tobytes()
+        if np is not None:
+            values = np.array(hashes, dtype=np.uint64)[None, :]
+            permuted = ((self._a * values + self._b) % _MERSENNE) & 0xFFFFFFFF
+            return permuted.min(axis=1).astype(np.uint32).tobytes()
+        return array("I", [
+            min(((a * h + b) % _MERSENNE) & 0xFFFFFFFF for h in hashes) for a, b in zip(self.a, self.b)
+        ]).tobytes()
+
+
+def similarity(sig_a: bytes, sig_b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    a, b = array("I", sig_a), array("I", sig_b)
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def near_duplicate_clusters(signatures: List[bytes], threshold: float = 0.8, bands: int = 16) -> List[List[int]]:
+    """
+    Groups of indices whose signatures are near-duplicates
+
+    Banded LSH, one band at a time: each record is compared only with the
+    first record that shared its band bucket, and linked if the estimated
+    similarity reaches the threshold. Memory is one dict per band.
+    """
+    if not signatures:
+        return []
+    width = len(signatures[0]) // bands
+    uf = _UnionFind(len(signatures))
+    for band in range(bands):
+        first: Dict[bytes, int] = {}
+        for i, sig in enumerate(signatures):
+            key = sig[band * width:(band + 1) * width]
+            j = first.setdefault(key, i)
+            if j != i and uf.find(i) != uf.find(j) and similarity(sig, signatures[j]) >= threshold:
+                uf.union(i, j)
+    groups = defaultdict(list)
+    for i in range(len(signatures)):
+        groups[uf.find(i)].append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+# ==================== Audit ====================
+
+def _scan_chunk(lines: List[str], num_perm: int, seed: int):
+    """Worker: (leakage pattern, exact hash, signature) per line, None for unparseable lines"""
+    hasher = MinHasher(num_perm, seed)
+    out = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            out.append(None)
+            continue
+        if not isinstance(record, dict):
+            out.append(None)
+            continue
+        full_text, _ = record_texts(record)
+        exact = hashlib.blake2b(normalize(full_text).encode("utf-8"), digest_size=8).digest()
+        out.append((LEAKAGE.first_match(full_text), exact, hasher.signature(shingles(full_text))))
+    return out
+
+
+def _chunks(path: Path, size: int) -> Iterator[List[str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+def _scan(path: Path, num_perm: int, seed: int, workers: int, chunk_size: int) -> Iterator[Optional[tuple]]:
+    if workers <= 0:
+        for chunk in _chunks(path, chunk_size):
+            yield from _scan_chunk(chunk, num_perm, seed)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(path, chunk_size):
+            pending.append(pool.submit(_scan_chunk, chunk, num_perm, seed))
+            if len(pending) >= workers * 2:  # Bounded read-ahead, results stay in file order
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def is_eval_split(name: str) -> bool:
+    return any(hint in name.lower() for hint in EVAL_SPLIT_HINTS)
+
+
+def audit_splits(splits: Dict[str, Any], threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 workers: int = 0, chunk_size: int = 2000, max_examples: int = 20, seed: int = 1) -> Dict[str, Any]:
+    """
+    Audit JSONL splits for leakage patterns, duplicates and train/eval overlap
+
+    Args:
+        splits: name -> JSONL path (names containing val/eval/test are eval splits)
+        threshold: estimated Jaccard similarity for near-duplicates
+        workers: worker processes for parsing/hashing (0 = inline)
+
+    Returns:
+        dict: JSON-serializable audit
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm must be a multiple of bands")
+
+    owners: List[Tuple[str, int]] = []  # record index -> (split, line number)
+    signatures: List[bytes] = []
+    report: Dict[str, Any] = {}
+    for name, path in splits.items():
+        stats = {"path": str(path), "records": 0, "bad_lines": 0, "leakage": Counter(), "leakage_examples": [],
+                 "exact_duplicates": 0, "near_duplicates": 0}
+        seen_exact = set()
+        for line_no, result in enumerate(_scan(Path(path), num_perm, seed, workers, chunk_size), 1):
+            if result is None:
+                stats["bad_lines"] += 1
+                continue
+            pattern, exact, signature = result
+            stats["records"] += 1
+            if pattern:
+                stats["leakage"][pattern] += 1
+                if len(stats["leakage_examples"]) < max_examples:
+                    stats["leakage_examples"].append({"line": line_no, "pattern": pattern})
+            if exact in seen_exact:
+                stats["exact_duplicates"] += 1
+            seen_exact.add(exact)
+            owners.append((name, line_no))
+            signatures.append(signature)
+        stats["leakage"] = dict(stats["leakage"])
+        report[name] = stats
+
+    cross: Dict[str, Dict[str, Any]] = {}
+    leaked: Dict[str, Dict[str, Any]] = {
+        name: {"records": 0, "examples": []} for name in splits if is_eval_split(name)
+    }
+    clusters = near_duplicate_clusters(signatures, threshold, bands)
+    for cluster in clusters:
+        members = defaultdict(list)
+        for i in cluster:
+            split, line_no = owners[i]
+            members[split].append(line_no)
+        for split, lines in members.items():
+            report[split]["near_duplicates"] += len(lines) - 1  # Redundant copies (exact ones included)
+        names = sorted(members)
+        for x, a in enumerate(names):
+            for b in names[x + 1:]:
+                entry = cross.setdefault(f"{a} <> {b}", {"clusters": 0, "examples": []})
+                entry["clusters"] += 1
+                if len(entry["examples"]) < max_examples:
+                    entry["examples"].append({a: members[a][:3], b: members[b][:3]})
+        train = {s: lines for s, lines in members.items() if not is_eval_split(s)}
+        for split in leaked:
+            if split in members and train:
+                leaked[split]["records"] += len(members[split])
+                if len(leaked[split]["examples"]) < max_examples:
+                    leaked[split]["examples"].append({"lines": members[split][:3], "train": {s: l[:3] for s, l in train.items()}})
+
+    for split, entry in leaked.items():
+        entry["ratio"] = round(entry["records"] / report[split]["records"], 4) if report[split]["records"] else 0.0
+
+    clean = (
+        not any(s["leakage"] for s in report.values())
+        and not any(e["records"] for e in leaked.values())
+    )
+    return {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "params": {"threshold": threshold, "num_perm": num_perm, "bands": bands, "shingle_words": 3,
+                   "vectorized": np is not None},
+        "clean": clean,
+        "splits": report,
+        "cross_split": cross,
+        "train_eval_leakage": leaked,
+        "near_duplicate_clusters": len(clusters)
+    }
@@ -0,0 +1,424 @@
+"""
+Evaluation Harness
+
+One engine for the scripts/evaluate_*.py suites:
+- Left-padded batched generation, grouped by sampling parameters and
+  sorted by prompt length to keep padding small.
+- Resumable result cache (JSONL) keyed by (model hash, prompt, sampling
+  params); cached prompts are not generated again, only re-scored.
+- Pluggable checks registered with @register_check (repetition, identity
+  hallucination, generic persona, JSON validity, expected tool).
+- JSONL + Markdown report with pass rates, tokens/s and memory.
+
+A suite is a list of EvalCase; scripts/evaluate_suite.py runs every suite
+with a single model load.
+"""
+
+import re
+import json
+import time
+import hashlib
+import argparse
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from haitham_voice_agent.config import Config
+
+BASE_MODEL_NAME = "Qwen/Qwen2.5-3B-Instruct"
+DEFAULT_CACHE = Config.CACHE_DIR / "eval_cache.jsonl"
+BACKENDS = ("peft", "base", "int8", "int8-base", "gguf")
+
+
+@dataclass(frozen=True)
+class Sampling:
+    max_new_tokens: int = 256
+    temperature: float = 0.7
+    top_p: float = 0.9
+    do_sample: bool = True
+
+
+@dataclass
+class EvalCase:
+    id: str
+    prompt: str
+    sampling: Sampling = Sampling()
+    checks: Tuple[str, ...] = ()
+    group: str = "persona"
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+# ==================== Checks ====================
+
+CHECKS: Dict[str, Callable[[EvalCase, str], Dict[str, Any]]] = {}
+
+
+def register_check(name: str):
+    """Register fn(case, response) -> {"passed": bool, "issue": str, ...}"""
+    def decorator(fn):
+        CHECKS[name] = fn
+        return fn
+    return decorator
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """Parse the JSON object in a completion (after "Output:" if echoed), None if there is none"""
+    if "Output:" in text:
+        text = text.split("Output:")[-1]
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+
+@register_check("repetition")
+def check_repetition(case: EvalCase, response: str) -> Dict[str, Any]:
+    # Prompt echoed at the start of the response (punctuation-insensitive)
+    p_norm = re.sub(r"[^\w\s]", "", case.prompt).strip()
+    r_norm = re.sub(r"[^\w\s]", "", response).strip()
+    repeated = bool(p_norm) and p_norm in r_norm[:len(p_norm) + 20]
+    return {"passed": not repeated, "issue": "Repetition"}
+
+
+@register_check("identity")
+def check_identity(case: EvalCase, response: str) -> Dict[str, Any]:
+    lowered = response.lower()
+    return {"passed": "chatgpt" not in lowered and "openai" not in lowered, "issue": "Identity_Hallucination"}
+
+
+@register_check("generic_persona")
+def check_generic_persona(case: EvalCase, response: str) -> Dict[str, Any]:
+    generic = "مساعد" in response or "assistant" in response.lower()
+    return {"passed": not generic, "issue": "Generic_Persona"}
+
+
+@register_check("json_valid")
+def check_json_valid(case: EvalCase, response: str) -> Dict[str, Any]:
+    parsed = extract_json(response)
+    return {"passed": parsed is not None, "issue": "Invalid_JSON", "parsed": parsed}
+
+
+@register_check("expected_tool")
+def check_expected_tool(case: EvalCase, response: str) -> Dict[str, Any]:
+    expected = str(case.meta.get("expect", "")).lower()
+    parsed = extract_json(response)
+    ok = parsed is not None and expected in str(parsed).lower()
+    return {"passed": ok, "issue": f"Logic_Diff ({expected})"}
+
+# ==================== Cache ====================
+
+def model_fingerprint(backend: str, base_model: str = BASE_MODEL_NAME, adapter_path=None) -> str:
+    from finetune.haithm_style.quantized_backend import adapter_fingerprint
+
+    adapter = adapter_fingerprint(adapter_path) if adapter_path and backend in ("peft", "int8", "gguf") else None
+    return hashlib.sha256(json.dumps([backend, base_model, adapter]).encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """Append-only JSONL of generations; the last record for a key wins"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+                    except (ValueError, KeyError):
+                        continue  # Torn line from an interrupted run
+
+    @staticmethod
+    def key(model_hash: str, prompt: str, sampling: Sampling) -> str:
+        payload = json.dumps([model_hash, prompt, asdict(sampling)], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(key)
+
+    def put_many(self, records: List[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                self.records[record["key"]] = record
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+# ==================== Generation ====================
+
+def load_model(backend: str = "peft", base_model: str = BASE_MODEL_NAME, adapter_path=None):
+    """Returns (model, tokenizer, device); model is an Ollama model name for the gguf backend"""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from finetune.haithm_style import quantized_backend
+
+    adapter_path = adapter_path or Config.HAITHM_STYLE_MODEL_PATH
+    tokenizer = AutoTokenizer.from_pretrained(base_model, trust_remote_code=True)
+    if backend in ("int8", "int8-base"):
+        print(f"🔹 Loading int8 export ({backend})...")
+        return quantized_backend.load_int8_variant("base" if backend == "int8-base" else "haithm_v2"), tokenizer, "cpu"
+    if backend == "gguf":
+        manifest = quantized_backend.load_manifest()
+        if not manifest or manifest["format"] != "gguf":
+            raise RuntimeError("No GGUF export found (run finetune/haithm_style/quantized_backend.py --format gguf)")
+        return manifest["variants"]["haithm_v2"]["ollama_model"], tokenizer, "cpu"
+
+    device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
+    print(f"🔹 Loading {base_model} on {device}...")
+    model = AutoModelForCausalLM.from_pretrained(
+        base_model,
+        torch_dtype=torch.float16 if device != "cpu" else torch.float32,
+        device_map=device,
+        trust_remote_code=True
+    )
+    if backend == "peft":
+        from peft import PeftModel
+
+        print(f"🔸 Loading Adapter from: {adapter_path}")
+        model = PeftModel.from_pretrained(model, str(adapter_path))
+    model.eval()
+    return model, tokenizer, device
+
+
+def generate_batch(model, tokenizer, prompts: List[str], sampling: Sampling, device: str) -> List[Tuple[str, int]]:
+    """(completion, new_tokens) per prompt from one left-padded generate()"""
+    if isinstance(model, str):  # Ollama (gguf backend): the server batches concurrent requests
+        from concurrent.futures import ThreadPoolExecutor
+        from finetune.haithm_style.quantized_backend import ollama_generate
+
+        temperature = sampling.temperature if sampling.do_sample else 0.0
+        with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+            results = list(pool.map(
+                lambda p: ollama_generate(model, p, sampling.max_new_tokens, temperature, sampling.top_p), prompts
+            ))
+        return [(r["text"], r["new_tokens"]) for r in results]
+
+    import torch
+
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(device)
+    kwargs = {"temperature": sampling.temperature, "top_p": sampling.top_p} if sampling.do_sample else {}
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=sampling.max_new_tokens,
+            do_sample=sampling.do_sample,
+            pad_token_id=tokenizer.eos_token_id,
+            **kwargs
+        )
+    completions = outputs[:, inputs.input_ids.shape[1]:]
+    results = []
+    for row in completions:
+        tokens = row.tolist()
+        # Finished rows are padded with EOS up to the longest completion
+        new_tokens = next((i + 1 for i, t in enumerate(tokens) if t == tokenizer.eos_token_id), len(tokens))
+        results.append((tokenizer.decode(row, skip_special_tokens=True), new_tokens))
+    return results
+
+# ==================== Runner ====================
+
+class EvalRunner:
+    def __init__(self, model, tokenizer, device: str, model_hash: str, cache: Optional[ResultCache] = None,
+                 batch_size: int = 8, generate_fn: Callable = generate_batch):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.model_hash = model_hash
+        self.cache = cache
+        self.batch_size = batch_size
+        self.generate_fn = generate_fn
+        self.generated_tokens = 0
+        self.generation_seconds = 0.0
+
+    def _pending_batches(self, cases: List[EvalCase]) -> List[Tuple[Sampling, List[EvalCase]]]:
+        groups: Dict[Sampling, List[EvalCase]] = {}
+        seen = set()
+        for case in cases:
+            key = ResultCache.key(self.model_hash, case.prompt, case.sampling)
+            if key in seen or (self.cache and self.cache.get(key)):
+                continue
+            seen.add(key)
+            groups.setdefault(case.sampling, []).append(case)
+        batches = []
+        for sampling, group in groups.items():
+            group.sort(key=lambda c: len(c.prompt))  # Similar lengths share a batch
+            for i in range(0, len(group), self.batch_size):
+                batches.append((sampling, group[i:i + self.batch_size]))
+        return batches
+
+    def run(self, cases: List[EvalCase]) -> List[Dict[str, Any]]:
+        fresh: Dict[str, Dict[str, Any]] = {}
+        batches = self._pending_batches(cases)
+        skipped = len(cases) - sum(len(b) for _, b in batches)
+        print(f"🔹 {len(cases)} cases: {skipped} cached, {len(batches)} batches to generate")
+
+        for index, (sampling, batch) in enumerate(batches, 1):
+            start = time.time()
+            outputs = self.generate_fn(self.model, self.tokenizer, [c.prompt for c in batch], sampling, self.device)
+            seconds = time.time() - start
+            tokens = sum(n for _, n in outputs)
+            self.generated_tokens += tokens
+            self.generation_seconds += seconds
+
+            records = []
+            for case, (response, new_tokens) in zip(batch, outputs):
+                key = ResultCache.key(self.model_hash, case.prompt, case.sampling)
+                records.append({
+                    "key": key,
+                    "model_hash": self.model_hash,
+                    "prompt": case.prompt,
+                    "sampling": asdict(case.sampling),
+                    "response": response,
+                    "new_tokens": new_tokens,
+                    "seconds": seconds / len(batch)
+                })
+            if self.cache:
+                self.cache.put_many(records)  # Saved per batch: an interrupted run resumes here
+            fresh.update((r["key"], r) for r in records)
+            print(f"   [{index}/{len(batches)}] {len(batch)} prompts, {tokens} tokens, {tokens / seconds:.1f} tok/s")
+
+        results = []
+        for case in cases:
+            key = ResultCache.key(self.model_hash, case.prompt, case.sampling)
+            record = fresh.get(key)
+            results.append(score(case, record or self.cache.get(key), cached=record is None))
+        return results
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.generated_tokens / self.generation_seconds if self.generation_seconds else 0.0
+
+
+def score(case: EvalCase, record: Dict[str, Any], cached: bool = False) -> Dict[str, Any]:
+    """Apply the case's checks to a generation record"""
+    response = record["response"]
+    checks = {}
+    for name in case.checks:
+        if name not in CHECKS:
+            raise KeyError(f"Unknown check: {name}")
+        checks[name] = CHECKS[name](case, response)
+    issues = [c["issue"] for c in checks.values() if not c["passed"]]
+    return {
+        "id": case.id,
+        "group": case.group,
+        "prompt": case.prompt,
+        "response": response,
+        "new_tokens": record["new_tokens"],
+        "seconds": record["seconds"],
+        "cached": cached,
+        "passed": not issues,
+        "issues": issues,
+        "checks": {name: c["passed"] for name, c in checks.items()},
+        "meta": case.meta
+    }
+
+# ==================== Reports ====================
+
+def write_jsonl(results: List[Dict[str, Any]], path):
+    with open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def write_markdown(results: List[Dict[str, Any]], path, title: str, perf: Optional[Dict[str, Any]] = None,
+                   full_responses: bool = False):
+    passed = sum(r["passed"] for r in results)
+    report = f"""# {title}
+**Date:** {time.strftime('%Y-%m-%d %H:%M')}
+**Cases:** {len(results)} ({sum(r['cached'] for r in results)} from cache)
+**Passed:** {passed}/{len(results)} ({(passed / len(results) * 100) if results else 0:.1f}%)
+"""
+    if perf:
+        report += "\n## Performance\n| Metric | Value |\n|--------|-------|\n"
+        for name, value in perf.items():
+            report += f"| {name} | {value:.2f} |\n" if isinstance(value, float) else f"| {name} | {value} |\n"
+
+    check_names = sorted({name for r in results for name in r["checks"]})
+    if check_names:
+        report += "\n## Checks\n| Check | Pass Rate |\n|-------|-----------|\n"
+        for name in check_names:
+            scored = [r["checks"][name] for r in results if name in r["checks"]]
+            report += f"| {name} | {sum(scored)}/{len(scored)} |\n"
+
+    for group in dict.fromkeys(r["group"] for r in results):
+        report += f"\n## {group}\n| Case | Status | Issues | Response Preview |\n|------|--------|--------|------------------|\n"
+        for r in (r for r in results if r["group"] == group):
+            status = "✅" if r["passed"] else "❌"
+            preview = r["response"].replace("\n", " ").replace("|", "-")[:100]
+            report += f"| {r['id']} | {status} | {', '.join(r['issues'])} | {preview} |\n"
+
+    if full_responses:
+        report += "\n## Full Responses\n"
+        for r in results:
+            report += f"### {'✅' if r['passed'] else '❌'} {r['id']}\n**Prompt:** `{r['prompt']}`\n\n"
+            report += f"**Tokens:** {r['new_tokens']} | **Time:** {r['seconds']:.2f}s\n```text\n{r['response']}\n```\n---\n"
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(report)
+
+# ==================== CLI ====================
+
+def parse_args(description: str, default_backend: str = "peft", argv=None):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--backend", choices=BACKENDS, default=default_backend,
+                        help="peft: base + adapter, base: base model, int8/int8-base/gguf: quantized exports")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help="result cache (JSONL)")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate everything")
+    return parser.parse_args(argv)
+
+
+def make_runner(args) -> EvalRunner:
+    from finetune.haithm_style.quantized_backend import resident_memory_mb
+
+    load_start = time.time()
+    model, tokenizer, device = load_model(args.backend)
+    runner = EvalRunner(
+        model, tokenizer, device,
+        model_hash=model_fingerprint(args.backend, adapter_path=Config.HAITHM_STYLE_MODEL_PATH),
+        cache=None if args.no_cache else ResultCache(args.cache),
+        batch_size=args.batch_size
+    )
+    runner.load_seconds = time.time() - load_start
+    runner.rss_after_load_mb = resident_memory_mb()
+    print(f"🔹 Loaded in {runner.load_seconds:.1f}s, resident memory {runner.rss_after_load_mb:.0f} MB")
+    return runner
+
+
+def run_suite(runner: EvalRunner, title: str, cases: List[EvalCase], report_file, backend: str,
+              full_responses: bool = False) -> List[Dict[str, Any]]:
+    """Run one suite and write <report>.md and <report>.jsonl"""
+    from finetune.haithm_style.quantized_backend import peak_memory_mb
+
+    print(f"\n🧪 {title}")
+    tokens_before, seconds_before = runner.generated_tokens, runner.generation_seconds
+    results = runner.run(cases)
+    tokens = runner.generated_tokens - tokens_before
+    seconds = runner.generation_seconds - seconds_before
+    perf = {
+        "Backend": backend,
+        "Load time (s)": getattr(runner, "load_seconds", 0.0),
+        "Resident memory after load (MB)": getattr(runner, "rss_after_load_mb", 0.0),
+        "Peak resident memory (MB)": peak_memory_mb(),
+        "Generated tokens": tokens,
+        "Throughput (tok/s)": tokens / seconds if seconds else 0.0
+    }
+    report_file = Path(report_file)
+    write_jsonl(results, report_file.with_suffix(".jsonl"))
+    write_markdown(results, report_file, title, perf, full_responses)
+    passed = sum(r["passed"] for r in results)
+    print(f"📄 {passed}/{len(results)} passed — report: {report_file} (+ .jsonl)")
+    return results
+
+
+def main_for(title: str, build_cases: Callable[[], List[EvalCase]], report_file, default_backend: str = "peft",
+             full_responses: bool = False):
+    """Entry point shared by the scripts/evaluate_*.py suites"""
+    args = parse_args(title, default_backend)
+    runner = make_runner(args)
+    run_suite(runner, title, build_cases(), report_file, args.backend, full_responses)
@@ -0,0 +1,165 @@
+"""
+Generation Scheduler
+
+In-process request queue in front of the style model. A single worker
+thread owns the model; it takes the oldest waiting request, gathers every
+other queued request with the same adapter/sampling settings (up to
+max_batch_size, waiting at most max_wait for stragglers) and runs them as
+one padded `generate`. Adapter switching therefore happens once per batch
+instead of once per request. Text is streamed back per request while the
+batch is generating.
+
+The model-specific part is the `run_batch(requests)` callable, which must
+call `request.emit(delta)` as text is produced; this module has no torch
+dependency.
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    mode: str = "haithm_v2"
+    max_new_tokens: int = 512
+    temperature: float = 0.7
+    top_p: float = 0.9
+    future: Future = field(default_factory=Future)
+    text: str = ""
+    new_tokens: int = 0
+    batch_size: int = 0
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    _chunks: "queue.Queue" = field(default_factory=queue.Queue, repr=False)
+
+    @property
+    def batch_key(self) -> Tuple[str, float, float]:
+        """Requests can share a generate() call only with the same adapter and sampling settings"""
+        return (self.mode, round(self.temperature, 4), round(self.top_p, 4))
+
+    @property
+    def duration(self) -> float:
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def emit(self, delta: str, tokens: int = 0):
+        """Called by the backend with newly decoded text"""
+        self.new_tokens += tokens
+        if delta:
+            self.text += delta
+            self._chunks.put(delta)
+
+    def _finish(self, error: Optional[BaseException] = None):
+        self.finished_at = time.time()
+        self._chunks.put(_END)
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(self.text)
+
+    def stream(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield text deltas as they are generated; raises the backend error, if any"""
+        while True:
+            chunk = self._chunks.get(timeout=timeout)
+            if chunk is _END:
+                break
+            yield chunk
+        self.future.result()
+
+
+class GenerationScheduler:
+    """
+    Usage:
+        scheduler = GenerationScheduler(run_batch)
+        request = scheduler.submit(prompt, mode="base", max_new_tokens=128)
+        for delta in request.stream():
+            ...
+        # or: text = request.future.result()
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[GenerationRequest]], None],
+        max_batch_size: int = 8,
+        max_wait: float = 0.01
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._backlog: deque = deque()  # Pulled from the queue but not batchable yet
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches_run = 0
+
+    def submit(self, prompt: str, mode: str = "haithm_v2", max_new_tokens: int = 512,
+               temperature: float = 0.7, top_p: float = 0.9) -> GenerationRequest:
+        request = GenerationRequest(prompt, mode, max_new_tokens, temperature, top_p)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="style-generation", daemon=True)
+                self._thread.start()
+
+    # ==================== Worker ====================
+
+    def _next_batch(self) -> List[GenerationRequest]:
+        head = self._backlog.popleft() if self._backlog else self._queue.get()
+        batch = [head]
+
+        # Same-key requests that were already waiting
+        for request in list(self._backlog):
+            if len(batch) >= self.max_batch_size:
+                break
+            if request.batch_key == head.batch_key:
+                self._backlog.remove(request)
+                batch.append(request)
+
+        # Whatever arrives within max_wait
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=max(0.0, remaining)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request.batch_key == head.batch_key:
+                batch.append(request)
+            else:
+                self._backlog.append(request)
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            started = time.time()
+            for request in batch:
+                request.started_at = started
+                request.batch_size = len(batch)
+            try:
+                self.run_batch(batch)
+            except Exception as e:
+                logger.error(f"Generation batch failed ({len(batch)} requests): {e}")
+                for request in batch:
+                    request._finish(e)
+            else:
+                for request in batch:
+                    request._finish()
+            self.batches_run += 1
@@ -1,55 +1,255 @@
 import torch
 import time
 import threading
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from contextlib import contextmanager, nullcontext
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
 from peft import PeftModel
 
 from haitham_voice_agent.config import Config
+from finetune.haithm_style.generation_scheduler import GenerationScheduler
+from finetune.haithm_style import quantized_backend
 
 # Configuration
 BASE_MODEL_NAME = "Qwen/Qwen2.5-3B-Instruct"
 # Fallback to config path, or default if not set (though Config should have it)
 ADAPTER_PATH = str(Config.HAITHM_STYLE_MODEL_PATH)
+MAX_BATCH_SIZE = 8
+BATCH_WAIT_SEC = 0.02
 
 # GLOBAL CACHE
 _CACHED_MODEL = None
 _CACHED_TOKENIZER = None
-_INFERENCE_LOCK = threading.Lock()
+_LOAD_LOCK = threading.Lock()
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER = None
+_BACKEND = None  # Quantized export manifest, or {} for the PEFT path
+
+def get_device() -> str:
+    return "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
+
+def get_backend() -> dict:
+    """Quantized manifest when serving the merged CPU export, {} for base model + PEFT adapter"""
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = quantized_backend.resolve_backend(get_device()) or {}
+        print(f"Style model backend: {_BACKEND.get('format', 'peft')}")
+    return _BACKEND
+
+def get_tokenizer():
+    """Tokenizer only (prompt templating does not need the model loaded)"""
+    global _CACHED_TOKENIZER
+    if _CACHED_TOKENIZER is None:
+        with _LOAD_LOCK:
+            if _CACHED_TOKENIZER is None:
+                _CACHED_TOKENIZER = AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True)
+    return _CACHED_TOKENIZER
 
 def get_model_and_tokenizer(adapter_path=ADAPTER_PATH):
     global _CACHED_MODEL, _CACHED_TOKENIZER
-    
+
     # Check 1 (Fast)
     if _CACHED_MODEL is not None and _CACHED_TOKENIZER is not None:
         return _CACHED_MODEL, _CACHED_TOKENIZER
-        
-    with _INFERENCE_LOCK:
+
+    with _LOAD_LOCK:
         # Check 2 (Safe)
         if _CACHED_MODEL is not None and _CACHED_TOKENIZER is not None:
              return _CACHED_MODEL, _CACHED_TOKENIZER
-             
+
         print("Loading model into cache...")
-        # Device Detection
-        device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-        
-        tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True)
+        device = get_device()
+
+        tokenizer = _CACHED_TOKENIZER or AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True)
         model = AutoModelForCausalLM.from_pretrained(
             BASE_MODEL_NAME,
             torch_dtype=torch.float16 if device != "cpu" else torch.float32,
             device_map=device,
             trust_remote_code=True
         )
-        
+
         try:
             model.load_adapter(adapter_path, adapter_name="haithm_v2")
             model.set_adapter("haithm_v2")
         except Exception as e:
             print(f"Warning: Adapter load failed: {e}")
-            
+
         _CACHED_MODEL = model
         _CACHED_TOKENIZER = tokenizer
         return model, tokenizer
 
+# ==================== Batched Generation ====================
+
+class _BatchStreamer(BaseStreamer, StoppingCriteria):
+    """
+    Receives each generation step for the whole batch and forwards newly
+    decoded text to the owning request. Also acts as the stopping criterion,
+    so a row stops at EOS or at its own max_new_tokens even when the batch
+    was started with a larger limit.
+    """
+
+    def __init__(self, tokenizer, requests, eos_ids=()):
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self.eos_ids = set(eos_ids) | {tokenizer.eos_token_id}
+        self.tokens = [[] for _ in requests]
+        self.sent = [0] * len(requests)
+        self.done = [False] * len(requests)
+        self.prompt_seen = False
+
+    def _flush(self, row: int, final: bool = False):
+        text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        if not final and text.endswith("\ufffd"):
+            return  # Incomplete multi-byte character, wait for the next token
+        self.requests[row].emit(text[self.sent[row]:])
+        self.sent[row] = len(text)
+
+    def put(self, value):
+        if not self.prompt_seen:
+            self.prompt_seen = True  # generate() first echoes the prompt ids
+            return
+        for row, token in enumerate(value.tolist()):
+            if self.done[row]:
+                continue
+            if token in self.eos_ids:
+                self.done[row] = True
+                continue
+            self.tokens[row].append(token)
+            self.requests[row].emit("", tokens=1)
+            self._flush(row)
+            if len(self.tokens[row]) >= self.requests[row].max_new_tokens:
+                self.done[row] = True
+
+    def end(self):
+        for row in range(len(self.requests)):
+            self._flush(row, final=True)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
+
+@contextmanager
+def _adapter_mode(model, mode: str):
+    """Switch adapters once for the whole batch"""
+    if mode == "base":
+        try:
+            model.disable_adapters()
+        except ValueError:
+            yield  # No adapter loaded: already the base model
+            return
+        try:
+            yield
+        finally:
+            model.enable_adapters()
+    else:
+        try:
+            model.set_adapter(mode)
+        except Exception:
+            try:
+                model.load_adapter(ADAPTER_PATH, adapter_name=mode)
+                model.set_adapter(mode)
+            except Exception as e:
+                raise RuntimeError(f"Adapter set failed: {e}")
+        yield
+
+def make_batch_runner(model, tokenizer, device: str = None, variant_loader=None):
+    """
+    run_batch callable for GenerationScheduler: one left-padded generate per batch
+
+    With variant_loader (mode -> model), each mode is a separate merged
+    model (quantized backend) and no adapter switching happens.
+    """
+    device = device or get_device()
+
+    def run_batch(requests):
+        head = requests[0]
+        if variant_loader is not None:
+            target, adapter_ctx = variant_loader(head.mode), nullcontext()
+        else:
+            target, adapter_ctx = model, _adapter_mode(model, head.mode)
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        model_inputs = tokenizer([r.prompt for r in requests], return_tensors="pt", padding=True).to(device)
+        eos_ids = getattr(target.generation_config, "eos_token_id", None) or []
+        streamer = _BatchStreamer(tokenizer, requests, eos_ids if isinstance(eos_ids, list) else [eos_ids])
+
+        with adapter_ctx, torch.no_grad():
+            target.generate(
+                model_inputs.input_ids,
+                attention_mask=model_inputs.attention_mask,
+                max_new_tokens=max(r.max_new_tokens for r in requests),
+                temperature=head.temperature,
+                top_p=head.top_p,
+                do_sample=True,
+                pad_token_id=tokenizer.eos_token_id,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([streamer])
+            )
+
+    return run_batch
+
+def get_scheduler() -> GenerationScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                backend = get_backend()
+                if backend.get("format") == "int8_dynamic":
+                    run_batch = make_batch_runner(None, get_tokenizer(), "cpu", variant_loader=quantized_backend.load_int8_variant)
+                elif backend.get("format") == "gguf":
+                    run_batch = quantized_backend.make_ollama_runner(backend)
+                else:
+                    def run_batch(requests):
+                        model, tokenizer = get_model_and_tokenizer()
+                        make_batch_runner(model, tokenizer)(requests)
+                _SCHEDULER = GenerationScheduler(run_batch, max_batch_size=MAX_BATCH_SIZE, max_wait=BATCH_WAIT_SEC)
+    return _SCHEDULER
+
+def _build_prompt(tokenizer, messages: list) -> str:
+    # Sanitize messages (remove metadata)
+    clean_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
+    return tokenizer.apply_chat_template(
+        clean_messages,
+        tokenize=False,
+        add_generation_prompt=True
+    )
+
+def submit_chat(messages: list,
+                mode: str = "haithm_v2",
+                max_new_tokens: int = 512,
+                temperature: float = 0.7,
+                top_p: float = 0.9):
+    """Queue a chat turn on the shared scheduler and return its GenerationRequest"""
+    return get_scheduler().submit(
+        _build_prompt(get_tokenizer(), messages),
+        mode=mode,
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        top_p=top_p
+    )
+
+def stream_chat(messages: list,
+                mode: str = "haithm_v2",
+                max_new_tokens: int = 512,
+                temperature: float = 0.7,
+                top_p: float = 0.9):
+    """Yield response text deltas as they are generated"""
+    request = submit_chat(messages, mode, max_new_tokens, temperature, top_p)
+    yield from request.stream()
+
+def chat_result(request, mode: str) -> dict:
+    return {
+        "role": "assistant",
+        "content": request.text,
+        "metadata": {
+            "duration": request.duration,
+            "model": mode,
+            "new_tokens": request.new_tokens,
+            "batch_size": request.batch_size,
+            "backend": get_backend().get("format", "peft")
+        }
+    }
+
 def compare_base_vs_haithm_v1(prompt: str,
                               max_new_tokens: int = 256,
                               temperature: float = 0.7,
@@ -66,39 +266,30 @@ def compare_base_vs_haithm_v1(prompt: str,
       "model_info": { ... }
     }
     """
-    # Device Detection
-    device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-    
+    device = get_device()
+    messages = [{"role": "user", "content": prompt}]
+
+    # Both requests are queued up front so they run back to back on the worker
     try:
-        model, tokenizer = get_model_and_tokenizer()
+        req_base = submit_chat(messages, "base", max_new_tokens, temperature, top_p)
+        req_v2 = submit_chat(messages, "haithm_v2", max_new_tokens, temperature, top_p)
+        req_base.future.result()
+        req_v2.future.result()
     except Exception as e:
         return {"error": str(e), "base_response": "", "haithm_v1_response": str(e)}
 
-    # Same logic as chat_with_model but returning both
-    # For now, let's keep it simple or redirect to chat_with_model called twice?
-    # Actually, we can reuse logic or just implement quickly.
-    
-    messages = [{"role": "user", "content": prompt}]
-    
-    # Base
-    res_base = chat_with_model(messages, mode="base", max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
-    if "error" in res_base: return res_base
-    
-    # Adapter
-    res_v2 = chat_with_model(messages, mode="haithm_v2", max_new_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
-    if "error" in res_v2: return res_v2
-    
     return {
         "prompt": prompt,
-        "base_response": res_base["content"],
-        "haithm_v1_response": res_v2["content"], # legacy name v1 for frontend
-        "base_runtime_sec": res_base["metadata"]["duration"],
-        "haithm_v1_runtime_sec": res_v2["metadata"]["duration"],
+        "base_response": req_base.text,
+        "haithm_v1_response": req_v2.text, # legacy name v1 for frontend
+        "base_runtime_sec": req_base.duration,
+        "haithm_v1_runtime_sec": req_v2.duration,
         "device": device,
         "model_info": {
             "base": BASE_MODEL_NAME,
             "adapter": ADAPTER_PATH,
-            "adapter_available": True
+            "adapter_available": True,
+            "backend": get_backend().get("format", "peft")
         }
     }
 
@@ -110,90 +301,21 @@ def chat_with_model(messages: list,
     """
     Stateful-like chat inference.
     messages: [{"role": "user", "content": "..."}, ...]
+
+    Concurrent callers with the same mode/sampling settings share one
+    batched generate() on the scheduler thread.
     """
-    device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-    
     try:
-        model, tokenizer = get_model_and_tokenizer()
+        if not get_backend():
+            get_model_and_tokenizer()
     except Exception as e:
          return {"error": f"Model load failed: {e}"}
 
-    # ACQUIRE LOCK
-    print(f"DEBUG: Waiting for lock... (mode={mode})")
-    with _INFERENCE_LOCK:
-        print(f"DEBUG: Lock ACQUIRED (mode={mode})")
-        try:
-            start_time = time.time()
-            generated_ids_full = None
-            
-            # Sanitize messages (remove metadata)
-            clean_messages = []
-            for m in messages:
-                clean_msg = {"role": m["role"], "content": m["content"]}
-                clean_messages.append(clean_msg)
-            
-            # Re-format prompt with clean messages
-            text = tokenizer.apply_chat_template(
-                clean_messages,
-                tokenize=False,
-                add_generation_prompt=True
-            )
-            model_inputs = tokenizer([text], return_tensors="pt").to(device)
-        
-            if mode == "base":
-                # Base Model Context
-                # disable_adapters is a method
-                model.disable_adapters()
-                try:
-                    with torch.no_grad():
-                        generated_ids_full = model.generate(
-                            model_inputs.input_ids,
-                            max_new_tokens=max_new_tokens,
-                            temperature=temperature,
-                            top_p=top_p,
-                            do_sample=True,
-                            pad_token_id=tokenizer.eos_token_id
-                        )
-                finally:
-                    model.enable_adapters()
-            else:
-                # Adapter Context
-                try:
-                    model.set_adapter("haithm_v2")
-                except:
-                     try:
-                         model.load_adapter(ADAPTER_PATH, adapter_name="haithm_v2")
-                         model.set_adapter("haithm_v2")
-                     except Exception as e:
-                         print(f"ERROR: Adapter failure: {e}")
-                         return {"error": f"Adapter set failed: {e}"}
-        
-                with torch.no_grad():
-                    generated_ids_full = model.generate(
-                        model_inputs.input_ids,
-                        max_new_tokens=max_new_tokens,
-                        temperature=temperature,
-                        top_p=top_p,
-                        do_sample=True,
-                        pad_token_id=tokenizer.eos_token_id
-                    )
-            
-            # Trim input
-            generated_ids = [
-                output_ids[len(input_ids):] for input_ids, output_ids in zip(model_inputs.input_ids, generated_ids_full)
-            ]
-            
-            response = tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
-            duration = time.time() - start_time
-        finally:
-            print(f"DEBUG: Releasing lock (mode={mode})")
-    
-    return {
-        "role": "assistant",
-        "content": response,
-        "metadata": {
-            "duration": duration,
-            "model": mode
-        }
-    }
+    try:
+        request = submit_chat(messages, mode, max_new_tokens, temperature, top_p)
+        request.future.result()
+    except Exception as e:
+        print(f"ERROR: Generation failed: {e}")
+        return {"error": str(e)}
 
+    return chat_result(request, mode)
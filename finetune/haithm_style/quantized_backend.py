@@ -0,0 +1,372 @@
+"""
+Quantized CPU Backend for the Haithm Style Model
+
+The PEFT path keeps Qwen2.5-3B in float32 on CPU (~12 GB resident) and
+applies the LoRA adapter on every forward pass. This module exports the
+model once, offline, in a CPU-friendly form:
+
+- int8_dynamic: the adapter is merged into the base weights and every
+  nn.Linear is dynamically quantized to int8 (torch.ao.quantization). The
+  base model is exported the same way so base-vs-adapter comparison keeps
+  working; each variant is loaded lazily on first use.
+- gguf: the merged model is converted with llama.cpp to GGUF (Q4_K_M /
+  Q5_K_M) and registered with the existing Ollama server. The base
+  variant is the stock Ollama Qwen model (Config.OLLAMA_MODEL).
+
+Every export writes a manifest.json that records the format, variants,
+sizes and the adapter fingerprint, so a retrained adapter is detected.
+
+Usage:
+    python -m finetune.haithm_style.quantized_backend --format int8
+    python -m finetune.haithm_style.quantized_backend --format gguf --quant Q4_K_M \\
+        --llama-cpp ~/llama.cpp --ollama-create
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import platform
+import sys
+import threading
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from haitham_voice_agent.config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+INT8_WEIGHTS = "model.int8.pt"
+FORMATS = ("int8_dynamic", "gguf")
+GGUF_QUANTS = ("Q4_K_M", "Q5_K_M", "Q8_0")
+
+# Same stop tokens as finetune/routing/Modelfile.template
+_MODELFILE = """FROM ./{gguf}
+
+PARAMETER stop "<|endoftext|>"
+PARAMETER stop "<|im_start|>"
+PARAMETER stop "<|im_end|>"
+"""
+
+# ==================== Manifest ====================
+
+def adapter_fingerprint(adapter_path) -> Optional[str]:
+    """sha256 over the adapter weight/config files (None if the adapter is missing)"""
+    adapter_path = Path(adapter_path)
+    files = sorted(p for p in adapter_path.glob("adapter_*") if p.is_file()) if adapter_path.is_dir() else []
+    if not files:
+        return None
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(path.name.encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(artifact_dir=None) -> Optional[Dict[str, Any]]:
+    path = Path(artifact_dir or Config.HAITHM_STYLE_QUANTIZED_PATH) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Unreadable quantized manifest {path}: {e}")
+        return None
+    if manifest.get("format") not in FORMATS:
+        logger.warning(f"Unknown quantized format in {path}: {manifest.get('format')}")
+        return None
+    return manifest
+
+
+def is_stale(manifest: Dict[str, Any], adapter_path=None) -> bool:
+    """True when the adapter on disk differs from the one that was exported"""
+    current = adapter_fingerprint(adapter_path or Config.HAITHM_STYLE_MODEL_PATH)
+    return current is not None and current != manifest.get("adapter_sha256")
+
+
+def _write_manifest(out_dir: Path, fmt: str, base_model: str, adapter_path, variants: Dict[str, Dict[str, Any]], **extra):
+    import torch
+    import transformers
+
+    manifest = {
+        "format": fmt,
+        "base_model": base_model,
+        "adapter_path": str(adapter_path),
+        "adapter_sha256": adapter_fingerprint(adapter_path),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "torch_version": torch.__version__,
+        "transformers_version": transformers.__version__,
+        "machine": platform.machine(),
+        "variants": variants,
+        **extra
+    }
+    with open(out_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# ==================== Export ====================
+
+def _load_base(base_model: str):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    return AutoModelForCausalLM.from_pretrained(
+        base_model,
+        torch_dtype=torch.float32,
+        device_map="cpu",
+        trust_remote_code=True,
+        low_cpu_mem_usage=True
+    )
+
+
+def _merged(base_model: str, adapter_path):
+    from peft import PeftModel
+
+    model = PeftModel.from_pretrained(_load_base(base_model), str(adapter_path))
+    return model.merge_and_unload()
+
+
+def _quantize_int8(model):
+    import torch
+
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_int8(out_dir, base_model: str = None, adapter_path=None) -> Dict[str, Any]:
+    """Merge + int8 dynamic quantization for both variants; returns the manifest"""
+    import torch
+    from transformers import AutoTokenizer
+
+    from finetune.haithm_style.infer_haithm_style_core import BASE_MODEL_NAME
+
+    base_model = base_model or BASE_MODEL_NAME
+    adapter_path = Path(adapter_path or Config.HAITHM_STYLE_MODEL_PATH)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    AutoTokenizer.from_pretrained(base_model, trust_remote_code=True).save_pretrained(out_dir)
+
+    variants = {}
+    for name, build in (("haithm_v2", lambda: _merged(base_model, adapter_path)), ("base", lambda: _load_base(base_model))):
+        print(f"Exporting {name} (int8 dynamic)...")
+        model = _quantize_int8(build())
+        variant_dir = out_dir / name
+        variant_dir.mkdir(exist_ok=True)
+        # Whole-module pickle: loading it does not materialize float32 weights first
+        torch.save(model, variant_dir / INT8_WEIGHTS)
+        variants[name] = {
+            "path": f"{name}/{INT8_WEIGHTS}",
+            "size_bytes": (variant_dir / INT8_WEIGHTS).stat().st_size
+        }
+        del model
+
+    return _write_manifest(out_dir, "int8_dynamic", base_model, adapter_path, variants)
+
+
+def export_gguf(out_dir, llama_cpp, quant: str = "Q4_K_M", base_model: str = None, adapter_path=None,
+                ollama_name: str = "haithm-style", ollama_create: bool = False) -> Dict[str, Any]:
+    """Merge, convert to GGUF with llama.cpp and write an Ollama Modelfile; returns the manifest"""
+    import torch
+    from transformers import AutoTokenizer
+
+    from finetune.haithm_style.infer_haithm_style_core import BASE_MODEL_NAME
+
+    if quant not in GGUF_QUANTS:
+        raise ValueError(f"Unsupported GGUF quantization: {quant} (use one of {GGUF_QUANTS})")
+    base_model = base_model or BASE_MODEL_NAME
+    adapter_path = Path(adapter_path or Config.HAITHM_STYLE_MODEL_PATH)
+    llama_cpp = Path(llama_cpp).expanduser()
+    out_dir = Path(out_dir)
+    merged_dir = out_dir / "merged_hf"
+    merged_dir.mkdir(parents=True, exist_ok=True)
+
+    print("Merging adapter into base weights...")
+    model = _merged(base_model, adapter_path).to(torch.float16)
+    model.save_pretrained(merged_dir, safe_serialization=True)
+    AutoTokenizer.from_pretrained(base_model, trust_remote_code=True).save_pretrained(merged_dir)
+    del model
+
+    f16 = out_dir / "haithm_v2.f16.gguf"
+    gguf = f"haithm_v2.{quant}.gguf"
+    quantize_bin = next((p for p in (llama_cpp / "build" / "bin" / "llama-quantize", llama_cpp / "llama-quantize") if p.exists()), None)
+    if quantize_bin is None:
+        raise FileNotFoundError(f"llama-quantize not found under {llama_cpp} (build llama.cpp first)")
+
+    print(f"Converting to GGUF ({quant})...")
+    subprocess.run([sys.executable, str(llama_cpp / "convert_hf_to_gguf.py"), str(merged_dir),
+                    "--outtype", "f16", "--outfile", str(f16)], check=True)
+    subprocess.run([str(quantize_bin), str(f16), str(out_dir / gguf), quant], check=True)
+    f16.unlink(missing_ok=True)
+
+    (out_dir / "Modelfile").write_text(_MODELFILE.format(gguf=gguf), encoding="utf-8")
+    if ollama_create:
+        subprocess.run(["ollama", "create", ollama_name, "-f", "Modelfile"], cwd=out_dir, check=True)
+
+    variants = {
+        "haithm_v2": {"path": gguf, "size_bytes": (out_dir / gguf).stat().st_size, "ollama_model": ollama_name},
+        "base": {"ollama_model": Config.OLLAMA_MODEL}
+    }
+    return _write_manifest(out_dir, "gguf", base_model, adapter_path, variants, quantization=quant)
+
+# ==================== Inference ====================
+
+_VARIANTS: Dict[str, Any] = {}
+_VARIANT_LOCK = threading.Lock()
+
+
+def load_int8_variant(name: str, artifact_dir=None):
+    """Lazily load (and cache) one int8 variant"""
+    if name in _VARIANTS:
+        return _VARIANTS[name]
+    with _VARIANT_LOCK:
+        if name not in _VARIANTS:
+            import torch
+
+            artifact_dir = Path(artifact_dir or Config.HAITHM_STYLE_QUANTIZED_PATH)
+            manifest = load_manifest(artifact_dir)
+            if not manifest or manifest["format"] != "int8_dynamic" or name not in manifest["variants"]:
+                raise RuntimeError(f"No int8 '{name}' variant in {artifact_dir}")
+            print(f"Loading int8 variant '{name}'...")
+            model = torch.load(artifact_dir / manifest["variants"][name]["path"], weights_only=False)
+            model.eval()
+            _VARIANTS[name] = model
+    return _VARIANTS[name]
+
+
+def ollama_generate(model: str, prompt: str, max_new_tokens: int, temperature: float, top_p: float,
+                    on_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+    """
+    Raw (pre-templated) streaming generation on Ollama
+
+    Returns {"text", "new_tokens", "tokens_per_sec"} using Ollama's own
+    eval counters.
+    """
+    import requests
+
+    response = requests.post(
+        f"{Config.OLLAMA_BASE_URL}/api/generate",
+        json={
+            "model": model,
+            "prompt": prompt,
+            "raw": True,  # Prompt already has the chat template applied
+            "stream": True,
+            "options": {"num_predict": max_new_tokens, "temperature": temperature, "top_p": top_p}
+        },
+        stream=True,
+        timeout=300
+    )
+    response.raise_for_status()
+    text, stats = "", {}
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json.loads(line)
+        if event.get("error"):
+            raise RuntimeError(f"Ollama: {event['error']}")
+        delta = event.get("response", "")
+        if delta:
+            text += delta
+            if on_delta:
+                on_delta(delta)
+        if event.get("done"):
+            stats = event
+    eval_ns = stats.get("eval_duration") or 0
+    return {
+        "text": text,
+        "new_tokens": stats.get("eval_count", 0),
+        "tokens_per_sec": stats.get("eval_count", 0) / (eval_ns / 1e9) if eval_ns else 0.0
+    }
+
+
+def make_ollama_runner(manifest: Dict[str, Any]):
+    """run_batch for GenerationScheduler: Ollama batches internally, so requests go out concurrently"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run_one(request):
+        variant = manifest["variants"].get(request.mode)
+        if not variant:
+            raise RuntimeError(f"No '{request.mode}' variant in the GGUF manifest")
+        result = ollama_generate(
+            variant["ollama_model"], request.prompt, request.max_new_tokens,
+            request.temperature, request.top_p, on_delta=request.emit
+        )
+        request.emit("", tokens=result["new_tokens"])
+
+    def run_batch(requests: List):
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            for future in [pool.submit(run_one, r) for r in requests]:
+                future.result()
+
+    return run_batch
+
+
+def resolve_backend(device: str) -> Optional[Dict[str, Any]]:
+    """
+    Manifest to serve from, or None for the PEFT path
+
+    Config.HAITHM_STYLE_BACKEND: "peft", "quantized", or "auto" (quantized
+    on CPU when a current export exists).
+    """
+    choice = Config.HAITHM_STYLE_BACKEND
+    if choice == "peft" or (choice == "auto" and device != "cpu"):
+        return None
+    manifest = load_manifest()
+    if manifest is None:
+        if choice == "quantized":
+            logger.warning(f"HVA_STYLE_BACKEND=quantized but no export in {Config.HAITHM_STYLE_QUANTIZED_PATH}; using PEFT")
+        return None
+    if is_stale(manifest):
+        logger.warning("Quantized style model was exported from a different adapter; re-run the export. Using PEFT")
+        return None
+    return manifest
+
+# ==================== Measurement ====================
+
+def resident_memory_mb() -> float:
+    """Current resident set size of this process"""
+    import psutil
+
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+def peak_memory_mb() -> float:
+    """Peak resident set size of this process so far"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Haithm style model for CPU inference")
+    parser.add_argument("--format", choices=["int8", "gguf"], default="int8")
+    parser.add_argument("--out", default=str(Config.HAITHM_STYLE_QUANTIZED_PATH))
+    parser.add_argument("--adapter", default=str(Config.HAITHM_STYLE_MODEL_PATH))
+    parser.add_argument("--quant", default="Q4_K_M", choices=GGUF_QUANTS, help="GGUF quantization")
+    parser.add_argument("--llama-cpp", help="llama.cpp checkout (GGUF only)")
+    parser.add_argument("--ollama-name", default="haithm-style")
+    parser.add_argument("--ollama-create", action="store_true", help="register the GGUF with Ollama")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.format == "int8":
+        manifest = export_int8(args.out, adapter_path=args.adapter)
+    else:
+        if not args.llama_cpp:
+            parser.error("--llama-cpp is required for GGUF export")
+        manifest = export_gguf(args.out, args.llama_cpp, args.quant, adapter_path=args.adapter,
+                               ollama_name=args.ollama_name, ollama_create=args.ollama_create)
+    print(f"Done in {time.time() - start:.0f}s")
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -149,10 +149,19 @@ class Config:
     # Haithm Style Fine-tuning
     HAITHM_STYLE_DATASET_PATH: str = "data/dataset_haithm_style_natural.jsonl"
     HAITHM_STYLE_MODEL_PATH = Path("models/hva_haithm_style_lora_v2")
+    # Merged + quantized export (finetune/haithm_style/quantized_backend.py)
+    HAITHM_STYLE_QUANTIZED_PATH = Path(os.getenv("HVA_STYLE_QUANTIZED_PATH", "models/hva_haithm_style_v2_quantized"))
+    # "auto" (quantized on CPU when an up-to-date export exists), "quantized" or "peft"
+    HAITHM_STYLE_BACKEND: str = os.getenv("HVA_STYLE_BACKEND", "auto")
 
     # ==================== LOGGING CONFIG ====================
     # Enable structured logging for routing dataset collection
     LOG_ROUTING_CLASSIFICATIONS: bool = True
+
+    # ==================== ROUTING TELEMETRY ====================
+    # Let recent p95 latency / error rate choose between equally acceptable
+    # logical models for interactive tasks (see routing_telemetry.py)
+    ADAPTIVE_ROUTING: bool = os.getenv("HVA_ADAPTIVE_ROUTING", "0") == "1"
     
     # ==================== VOICE & WHISPER CONFIG ====================
     
@@ -267,6 +276,11 @@ class Config:
     LABELS_CACHE_TTL: int = 600  # 10 minutes
     DRAFTS_CACHE_TTL: int = 60   # 1 minute
     SUMMARY_CACHE_TTL: int = 1800  # 30 minutes
+    BRIEFING_SNAPSHOT_TTL: int = 900  # 15 minutes per briefing source
+    
+    # Morning briefing is pre-computed shortly before the usual wake time
+    # (learned from past "صباح الخير" requests; this is the initial guess)
+    BRIEFING_WAKE_TIME: str = os.getenv("HVA_WAKE_TIME", "07:00")
     
     # ==================== GMAIL SETTINGS ====================
     # Gmail API scopes
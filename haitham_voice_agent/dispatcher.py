@@ -3,22 +3,43 @@ Dispatcher Module
 
 Routes execution plan steps to appropriate tool modules.
 Handles tool responses and error propagation.
+
+Plans run as a dependency DAG: a step depends on the earlier steps it
+references ("$step2.id" in its params, or "depends_on": [2]). Independent
+steps run concurrently, bounded per tool and per plan; a failed step skips
+its dependents. Synchronous tool methods run in worker threads.
 """
 
+import re
+import time
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set
 
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+STEP_REF_RE = re.compile(r"^\$step(\d+)")
+
+
+def primary_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The result to report for a plan: the first failure, else the last step"""
+    return next((r for r in results if r.get("error")), results[-1])
+
 
 class ToolDispatcher:
     """Dispatcher for routing tool calls"""
+
+    # Steps of one tool run one at a time (in plan order) unless registered
+    # with a higher limit: tool instances hold IMAP/Google API clients that are
+    # not thread-safe, and same-tool steps often depend on each other implicitly
+    DEFAULT_TOOL_CONCURRENCY = 1
+    MAX_PARALLEL_STEPS = 4  # Per plan
     
     def __init__(self):
         self.tools = {}
+        self.tool_concurrency: Dict[str, int] = {}
         logger.info("Tool Dispatcher initialized")
         self._register_default_tools()
         
@@ -51,15 +72,19 @@ class ToolDispatcher:
         self.register_tool("drive", DriveTools())
         self.register_tool("system_sentry", SystemSentry())
     
-    def register_tool(self, name: str, handler):
+    def register_tool(self, name: str, handler, max_concurrency: Optional[int] = None):
         """
         Register a tool handler
         
         Args:
             name: Tool name (e.g., 'files', 'gmail', 'memory')
             handler: Tool handler object with execute method
+            max_concurrency: Steps of this tool allowed to run at once within a
+                plan (default: DEFAULT_TOOL_CONCURRENCY)
         """
         self.tools[name] = handler
+        if max_concurrency:
+            self.tool_concurrency[name] = max_concurrency
         logger.info(f"Registered tool: {name}")
     
     async def dispatch(self, step: Dict[str, Any]) -> Dict[str, Any]:
@@ -111,8 +136,8 @@ class ToolDispatcher:
             if asyncio.iscoroutinefunction(action_method):
                 result = await action_method(**params)
             else:
-                # Sync method
-                result = action_method(**params)
+                # Sync method: run in a worker thread to keep the event loop free
+                result = await asyncio.to_thread(action_method, **params)
                 if asyncio.iscoroutine(result):
                     result = await result
             
@@ -142,42 +167,126 @@ class ToolDispatcher:
         """
         Execute a complete execution plan
         
+        Steps run one after another and stop at the first error, unless the
+        plan sets "parallel": true. Then independent steps run concurrently;
+        a step waits for the steps it references ($stepN params or
+        depends_on) and is skipped (DependencyFailedError) if one of them
+        failed. A step of a one-at-a-time tool always depends on the
+        previous step of that tool. If a step raises, the steps still
+        running are cancelled and the error propagates.
+        
         Args:
             plan: Execution plan with steps array
             
         Returns:
-            list: Results from each step
+            list: Results from each step, in plan order, each with
+                "timing": {"step", "start", "duration"} (seconds from plan start)
         """
         steps = plan.get("steps", [])
         logger.info(f"Executing plan with {len(steps)} steps")
         
-        results = []
-        
+        sequential = plan.get("parallel") is not True
+        dependencies = []
+        last_of_tool: Dict[str, int] = {}
         for i, step in enumerate(steps):
-            logger.info(f"Executing step {i+1}/{len(steps)}")
-            
-            # Handle variable substitution from previous steps
-            # e.g., "$step1.id" -> results[0]["id"]
-            step = self._substitute_variables(step, results)
+            deps = self._step_dependencies(i, step)
+            if sequential and i:
+                deps.add(i - 1)
+            tool_name = step.get("tool")
+            # Same-tool steps share a client: a failure (e.g. dropped IMAP session) stops the rest
+            if tool_name in last_of_tool and self.tool_concurrency.get(tool_name, self.DEFAULT_TOOL_CONCURRENCY) == 1:
+                deps.add(last_of_tool[tool_name])
+            last_of_tool[tool_name] = i
+            dependencies.append(deps)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(steps)
+        plan_slots = asyncio.Semaphore(self.MAX_PARALLEL_STEPS)
+        tool_slots: Dict[str, asyncio.Semaphore] = {}
+        tasks: List[asyncio.Task] = []
+        started = time.perf_counter()
+        
+        async def run_step(i: int, step: Dict[str, Any]):
+            if dependencies[i]:
+                await asyncio.gather(*(tasks[d] for d in sorted(dependencies[i])))
             
-            # Execute step
-            result = await self.dispatch(step)
-            results.append(result)
+            failed = next((d for d in sorted(dependencies[i]) if results[d].get("error")), None)
+            if failed is not None:
+                logger.error(f"Step {i+1} skipped: step {failed+1} failed")
+                result = {
+                    "error": True,
+                    "error_type": "DependencyFailedError",
+                    "message": f"Skipped: step {failed+1} failed: {results[failed].get('message', '')}",
+                    "suggestion": f"Fix step {failed+1} and try again"
+                }
+                step_start = time.perf_counter()
+            else:
+                tool_name = step.get("tool")
+                if tool_name not in tool_slots:
+                    tool_slots[tool_name] = asyncio.Semaphore(
+                        self.tool_concurrency.get(tool_name, self.DEFAULT_TOOL_CONCURRENCY)
+                    )
+                async with tool_slots[tool_name], plan_slots:
+                    logger.info(f"Executing step {i+1}/{len(steps)}")
+                    
+                    # Handle variable substitution from the steps this one waited for
+                    # e.g., "$step1.id" -> results[0]["id"]
+                    finished = [results[d] if d in dependencies[i] else None for d in range(i)]
+                    step = self._substitute_variables(step, finished)
+                    
+                    step_start = time.perf_counter()
+                    result = await self.dispatch(step)
+                
+                if result.get("error", False):
+                    logger.error(f"Step {i+1} failed, skipping its dependents")
             
-            # Stop execution if error occurred
-            if result.get("error", False):
-                logger.error(f"Step {i+1} failed, stopping execution")
-                break
+            results[i] = {
+                **result,
+                "timing": {
+                    "step": i + 1,
+                    "start": round(step_start - started, 3),
+                    "duration": round(time.perf_counter() - step_start, 3)
+                }
+            }
         
+        # Tasks are created in plan order, so same-tool steps take the tool's slot in order
+        for i, step in enumerate(steps):
+            tasks.append(asyncio.create_task(run_step(i, step)))
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        logger.info(f"Plan finished in {time.perf_counter() - started:.2f}s")
         return results
     
+    @staticmethod
+    def _step_dependencies(index: int, step: Dict[str, Any]) -> Set[int]:
+        """Indices of earlier steps this step references ($stepN params or depends_on)"""
+        dependencies = set()
+        for value in (step.get("params") or {}).values():
+            if isinstance(value, str):
+                match = STEP_REF_RE.match(value)
+                if match:
+                    dependencies.add(int(match.group(1)) - 1)
+        for ref in step.get("depends_on") or []:
+            try:
+                dependencies.add(int(str(ref).replace("step", "")) - 1)
+            except ValueError:
+                logger.warning(f"Invalid depends_on reference: {ref}")
+        # Only earlier steps (keeps the graph acyclic; other refs are left unresolved)
+        return {d for d in dependencies if 0 <= d < index}
+    
     def _substitute_variables(self, step: Dict[str, Any], previous_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Substitute variables in step parameters with values from previous results
         
         Args:
             step: Step dictionary
-            previous_results: Results from previous steps
+            previous_results: Results from previous steps (None for steps
+                that may not have finished)
             
         Returns:
             dict: Step with substituted variables
@@ -197,7 +306,7 @@ class ToolDispatcher:
                     step_index = int(step_ref.replace("step", "")) - 1
                     
                     # Get value from previous result
-                    if 0 <= step_index < len(previous_results):
+                    if 0 <= step_index < len(previous_results) and previous_results[step_index] is not None:
                         result = previous_results[step_index]
                         
                         if field:
@@ -264,9 +373,8 @@ def dispatch_action(plan: Dict[str, Any]) -> Dict[str, Any]:
         if not results:
             return {"success": False, "message": "No steps executed"}
             
-        # Return the last result as the primary result
-        # Ideally we should aggregate, but for now last result is fine
-        last_result = results[-1]
+        # Report the first failure, else the last result
+        last_result = primary_result(results)
         
         # Ensure success flag exists
         if "success" not in last_result:
@@ -1,19 +1,156 @@
+import os
+import json
+import asyncio
+import hashlib
 import logging
+import threading
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import PyPDF2
-from typing import Optional
+from typing import Optional, List, Dict, Tuple, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
+TEXT_EXTS = ['.txt', '.md', '.py', '.js', '.json', '.html', '.css', '.csv', '.log']
+# Limit pages for massive PDFs
+MAX_PDF_PAGES = 50
+# Pages per worker call when streaming a PDF
+PAGE_CHUNK = 5
+# Resubmissions of a call whose worker was killed by another call's timeout
+POOL_RETRIES = 2
+
+
+def _read_pdf_pages(path: str, start: int = 0, count: int = MAX_PDF_PAGES) -> Tuple[List[str], int]:
+    """
+    Extract pages [start, start+count) of a PDF.
+    Runs inside the process pool; returns (page_texts, total_pages).
+    """
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        total = len(reader.pages)
+        end = min(total, start + count, MAX_PDF_PAGES)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, end)], total
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted PDF text keyed by the file's content hash,
+    so organize/ingest/summarize never parse the same document twice.
+    Evicts least recently used entries once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = "~/HVA_Memory/system/extract_cache", max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> content hash, avoids re-hashing unchanged files
+        self._hashes: Dict[Tuple[str, int, float], str] = {}
+        self._total: Optional[int] = None
+
+    def key_for(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp = (path, st.st_size, st.st_mtime)
+        digest = self._hashes.get(stamp)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(block)
+            digest = h.hexdigest()
+            if len(self._hashes) > 10000:
+                self._hashes.clear()
+            self._hashes[stamp] = digest
+        return digest
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entry(key)
+        try:
+            data = json.loads(entry.read_text(encoding="utf-8"))
+            os.utime(entry)  # LRU: touch on hit
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, data: Dict):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            payload = json.dumps(data, ensure_ascii=False)
+            tmp.write_text(payload, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Extraction cache write failed: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            try:
+                # An overwritten entry only changes the total by the size difference
+                old_size = entry.stat().st_size if entry.exists() else 0
+                new_size = tmp.stat().st_size
+                os.replace(tmp, entry)
+            except OSError as e:
+                logger.warning(f"Extraction cache write failed: {e}")
+                tmp.unlink(missing_ok=True)
+                return
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += new_size - old_size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    total += e.stat().st_size
+        return total
+
+    def _evict(self):
+        """Drop oldest entries until the cache is back under 80% of max_bytes"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.8)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total = total
+
+
 class ContentExtractor:
     """
     Extracts raw text from various file formats.
     Supported: .txt, .md, .py, .js, .json, .html, .css, .pdf
+    PDFs are parsed in a process pool (extract_text_async / iter_pdf_pages)
+    and their text is cached on disk by content hash.
     """
-    
-    def __init__(self):
-        pass
-        
+
+    def __init__(self, cache: Optional[ExtractionCache] = None, workers: Optional[int] = None, timeout: float = 60.0):
+        self.cache = cache or ExtractionCache()
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
     def extract_text(self, path: str, max_length: int = 100000) -> Optional[str]:
         """
         Extract text content from file.
@@ -23,61 +160,179 @@ class ContentExtractor:
         if not file_path.exists():
             logger.warning(f"File not found: {path}")
             return None
-            
+
         ext = file_path.suffix.lower()
-        
+
         try:
             content = None
             if ext == '.pdf':
                 content = self._extract_pdf(file_path)
-            elif ext in ['.txt', '.md', '.py', '.js', '.json', '.html', '.css', '.csv', '.log']:
+            elif ext in TEXT_EXTS:
                 content = self._extract_text(file_path)
             else:
                 # For unsupported files (images, videos, audio), return filename as context
                 # This allows LLM to organize based on filename alone
                 logger.info(f"Unsupported file type {ext}, using filename as content.")
-                return f"File Name: {file_path.name}\nFile Type: {ext}\n(Content extraction not supported for this file type, organize based on filename only)"
-                
+                return self._filename_context(file_path)
+
+            if content:
+                return self._truncate_text(content, max_length)
+            return None
+
+        except Exception as e:
+            logger.error(f"Failed to extract content from {path}: {e}")
+            return None
+
+    async def extract_text_async(self, path: str, max_length: int = 100000, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Non-blocking extract_text for async callers.
+        PDFs are parsed in the process pool with a per-file timeout (None on
+        timeout); plain text is read in a worker thread.
+        """
+        file_path = Path(path)
+        if not file_path.exists():
+            logger.warning(f"File not found: {path}")
+            return None
+
+        ext = file_path.suffix.lower()
+        try:
+            if ext == '.pdf':
+                key = await asyncio.to_thread(self.cache.key_for, str(file_path))
+                cached = await asyncio.to_thread(self.cache.get, key) if key else None
+                if cached is not None:
+                    content = self._join_pages(cached["pages"], cached["total"])
+                else:
+                    pages, total = await self._run_in_pool(_read_pdf_pages, str(file_path), 0, MAX_PDF_PAGES,
+                                                           timeout=timeout)
+                    if key:
+                        await asyncio.to_thread(self.cache.put, key, {"pages": pages, "total": total})
+                    content = self._join_pages(pages, total)
+            elif ext in TEXT_EXTS:
+                content = await asyncio.to_thread(self._extract_text, file_path)
+            else:
+                return self._filename_context(file_path)
+
             if content:
                 return self._truncate_text(content, max_length)
             return None
-            
+
+        except asyncio.TimeoutError:
+            logger.warning(f"Extraction timed out for {path}")
+            return None
         except Exception as e:
             logger.error(f"Failed to extract content from {path}: {e}")
             return None
-            
+
+    async def iter_pdf_pages(self, path: str, timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Stream (page_number, text) for a PDF, PAGE_CHUNK pages per worker call,
+        so callers can start on the first pages before the rest is parsed.
+        """
+        key = await asyncio.to_thread(self.cache.key_for, path)
+        cached = await asyncio.to_thread(self.cache.get, key) if key else None
+        if cached is not None:
+            for i, text in enumerate(cached["pages"]):
+                yield i, text
+            return
+
+        pages: List[str] = []
+        start, total = 0, None
+        while total is None or start < min(total, MAX_PDF_PAGES):
+            chunk, total = await self._run_in_pool(_read_pdf_pages, path, start, PAGE_CHUNK, timeout=timeout)
+            if not chunk:
+                break
+            for text in chunk:
+                yield start, text
+                pages.append(text)
+                start += 1
+
+        if key:
+            await asyncio.to_thread(self.cache.put, key, {"pages": pages, "total": total or 0})
+
+    async def _run_in_pool(self, fn, *args, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        for attempt in range(POOL_RETRIES + 1):
+            pool = self._get_pool()
+            future = loop.run_in_executor(pool, fn, *args)
+            try:
+                return await asyncio.wait_for(future, timeout or self.timeout)
+            except asyncio.TimeoutError:
+                # A stuck parser would hold its worker forever: recycle the pool
+                self._reset_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # Our worker was killed by another call's timeout (or died): resubmit on a fresh pool
+                self._reset_pool(pool)
+                if attempt == POOL_RETRIES:
+                    raise
+                logger.info(f"Extraction worker pool was recycled, resubmitting {fn.__name__}{args[:1]}")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _reset_pool(self, pool: Optional[ProcessPoolExecutor] = None, cancel_futures: bool = False):
+        """
+        Terminate the pool's workers and start fresh on the next call.
+        Other calls in flight on it fail with BrokenProcessPool (not
+        cancellation) and _run_in_pool resubmits them.
+        """
+        with self._pool_lock:
+            if pool is not None and pool is not self._pool:
+                return  # Already recycled by another call
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=cancel_futures)
+
+    def shutdown(self):
+        self._reset_pool(cancel_futures=True)
+
     def _truncate_text(self, text: str, max_length: int) -> str:
         """Smart Truncation: Keep Head and Tail if too long"""
         if len(text) <= max_length:
             return text
-            
+
         # Keep 70% Head, 30% Tail (approx)
         head_len = int(max_length * 0.7)
         tail_len = int(max_length * 0.3)
-        
+
         return (
-            text[:head_len] 
-            + f"\n\n... [TRUNCATED {len(text) - max_length} CHARS] ...\n\n" 
+            text[:head_len]
+            + f"\n\n... [TRUNCATED {len(text) - max_length} CHARS] ...\n\n"
             + text[-tail_len:]
         )
 
+    @staticmethod
+    def _filename_context(file_path: Path) -> str:
+        ext = file_path.suffix.lower()
+        return f"File Name: {file_path.name}\nFile Type: {ext}\n(Content extraction not supported for this file type, organize based on filename only)"
+
     def _extract_text(self, path: Path) -> str:
         """Read plain text files"""
         return path.read_text(encoding='utf-8', errors='ignore')
-        
-    def _extract_pdf(self, path: Path) -> str:
-        """Extract text from PDF"""
-        text = []
-        with open(path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            # Limit pages for massive PDFs
-            MAX_PAGES = 50
-            for i, page in enumerate(reader.pages):
-                if i >= MAX_PAGES:
-                    text.append(f"\n... [PDF TRUNCATED AFTER {MAX_PAGES} PAGES] ...")
-                    break
-                text.append(page.extract_text() or "")
+
+    @staticmethod
+    def _join_pages(pages: List[str], total: int) -> str:
+        text = list(pages)
+        if total > MAX_PDF_PAGES:
+            text.append(f"\n... [PDF TRUNCATED AFTER {MAX_PDF_PAGES} PAGES] ...")
         return "\n".join(text)
 
+    def _extract_pdf(self, path: Path) -> str:
+        """Extract text from PDF (served from the extraction cache when possible)"""
+        key = self.cache.key_for(str(path))
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return self._join_pages(cached["pages"], cached["total"])
+        pages, total = _read_pdf_pages(str(path))
+        if key:
+            self.cache.put(key, {"pages": pages, "total": total})
+        return self._join_pages(pages, total)
+
 # Singleton
 content_extractor = ContentExtractor()
@@ -1,8 +1,10 @@
+import time
 import asyncio
 import logging
 import datetime
 from typing import List, Dict, Any, Optional
 from haitham_voice_agent.dispatcher import get_dispatcher
+from haitham_voice_agent.intelligence.reminder_scheduler import ReminderScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -10,85 +12,157 @@ class SystemGuardian:
     """
     The Guardian: A proactive background system for HVA.
     Monitors tasks, calendar, and system state to provide intelligent reminders and context.
+    
+    Reminders come from a heap-based ReminderScheduler fed by cached calendar
+    and task snapshots. The calendar snapshot is refreshed incrementally with
+    a sync token (and immediately when HVA itself changes the calendar); tasks
+    are rescheduled from TaskManager change notifications. Between reminders
+    the Guardian sleeps.
     """
     
-    def __init__(self):
+    LEAD_MINUTES = 15
+    CALENDAR_REFRESH = 600  # Seconds between incremental (sync token) calendar refreshes
+    
+    def __init__(self, scheduler: Optional[ReminderScheduler] = None):
         self.running = False
-        self.check_interval = 60 # Seconds
-        self.last_check = datetime.datetime.now()
-        self.reminded_events = set() # Track IDs to avoid spam
+        self.scheduler = scheduler or ReminderScheduler(self._on_reminder)
+        self._calendar = None
+        self._tasks = None
+        self._sync_token: Optional[str] = None
+        self._events: Dict[str, Dict[str, Any]] = {}  # Cached calendar snapshot by event id
+        self._refresh_now: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
     async def start_monitoring(self):
-        """Start the main Guardian loop"""
+        """Start the scheduler and the calendar refresh loop"""
         if self.running:
             return
             
         self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._refresh_now = asyncio.Event()
         logger.info("🛡️ Guardian System Activated")
         
-        while self.running:
-            try:
-                await self._check_schedule()
-                # await self._check_system_health() # Future
-            except Exception as e:
-                logger.error(f"Guardian Loop Error: {e}")
-                
-            await asyncio.sleep(self.check_interval)
+        dispatcher = get_dispatcher()
+        self._calendar = dispatcher.tools.get("calendar")
+        self._tasks = dispatcher.tools.get("tasks")
+        
+        await self.scheduler.load_sent()
+        if self._tasks is not None:
+            await self._load_tasks()
+            if hasattr(self._tasks, "change_listeners"):
+                self._tasks.change_listeners.append(self._on_task_change)
+        if self._calendar is not None and hasattr(self._calendar, "change_listeners"):
+            self._calendar.change_listeners.append(self._on_calendar_change)
+        
+        try:
+            await asyncio.gather(self.scheduler.run(), self._calendar_loop())
+        finally:
+            if self._tasks is not None and self._on_task_change in getattr(self._tasks, "change_listeners", []):
+                self._tasks.change_listeners.remove(self._on_task_change)
+            if self._calendar is not None and self._on_calendar_change in getattr(self._calendar, "change_listeners", []):
+                self._calendar.change_listeners.remove(self._on_calendar_change)
             
     async def stop(self):
         self.running = False
+        self.scheduler.stop()
+        if self._refresh_now:
+            self._refresh_now.set()
         logger.info("🛡️ Guardian System Stopped")
-
-    async def _check_schedule(self):
-        """Check for upcoming tasks and calendar events"""
-        dispatcher = get_dispatcher()
-        calendar = dispatcher.tools.get("calendar")
-        tasks = dispatcher.tools.get("tasks")
-        
-        if not calendar:
+    
+    # ==================== Calendar ====================
+    
+    async def _calendar_loop(self):
+        while self.running:
+            if self._calendar is not None:
+                try:
+                    await self.refresh_calendar()
+                except Exception as e:
+                    logger.warning(f"Guardian calendar refresh failed: {e}")
+            self._refresh_now.clear()
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), self.CALENDAR_REFRESH)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def refresh_calendar(self):
+        """Apply calendar changes since the last sync token to the snapshot and the schedule"""
+        if not hasattr(self._calendar, "sync_events"):
             return
-
+        result = await self._calendar.sync_events(sync_token=self._sync_token)
+        if result.get("error"):
+            logger.debug(f"Guardian calendar sync skipped: {result.get('message')}")
+            return
+        if result.get("full"):
+            for event_id in list(self._events):
+                self.scheduler.cancel(f"event:{event_id}")
+            self._events.clear()
+        for event_id in result.get("deleted", []):
+            self._events.pop(event_id, None)
+            self.scheduler.cancel(f"event:{event_id}")
+        for event in result.get("events", []):
+            self._events[event["id"]] = event
+            self._schedule_event(event)
+        self._sync_token = result.get("sync_token")
+    
+    def _schedule_event(self, event: Dict[str, Any]):
+        owner = f"event:{event.get('id')}"
+        start_dt = self._parse_time(event.get("start"))
+        if event.get("all_day") or not start_dt or start_dt <= datetime.datetime.now().astimezone():
+            self.scheduler.cancel(owner)
+            return
+        fire_at = (start_dt - datetime.timedelta(minutes=self.LEAD_MINUTES)).timestamp()
+        self.scheduler.schedule(owner, f"{owner}:{event.get('start')}", fire_at, {
+            "kind": "event", "title": event.get("summary"), "at": start_dt.timestamp()
+        })
+    
+    def _on_calendar_change(self):
+        if self._loop is not None and self._refresh_now is not None:
+            self._loop.call_soon_threadsafe(self._refresh_now.set)
+    
+    # ==================== Tasks ====================
+    
+    async def _load_tasks(self):
         now = datetime.datetime.now().astimezone()
-        
-        # 1. Check Calendar (Next 30 mins)
+        far = now + datetime.timedelta(days=3650)
+        tasks = await asyncio.to_thread(self._tasks.tasks_due_between, now, far)
+        for task in tasks:
+            self._schedule_task(task.id, task)
+    
+    def _schedule_task(self, task_id: str, task):
+        owner = f"task:{task_id}"
+        due_dt = self._parse_time(getattr(task, "due_date", None)) if task else None
+        if task is None or task.status != "open" or not due_dt or due_dt <= datetime.datetime.now().astimezone():
+            self.scheduler.cancel(owner)
+            return
+        fire_at = (due_dt - datetime.timedelta(minutes=self.LEAD_MINUTES)).timestamp()
+        self.scheduler.schedule(owner, f"{owner}:{task.due_date}", fire_at, {
+            "kind": "task", "title": task.title, "at": due_dt.timestamp()
+        })
+    
+    def _on_task_change(self, task_id: str, task):
+        # TaskManager may be called from worker threads; the scheduler lives on the loop
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._schedule_task, task_id, task)
+    
+    # ==================== Reminders ====================
+    
+    @staticmethod
+    def _parse_time(value) -> Optional[datetime.datetime]:
+        if not value or not isinstance(value, str):
+            return None
         try:
-            # We use list_events with "upcoming" but filter manually for short term
-            result = await calendar.list_events(day_str="today")
-            if result.get("success"):
-                for event in result.get("events", []):
-                    event_id = event.get("id")
-                    if event_id in self.reminded_events:
-                        continue
-                        
-                    start_str = event.get("start")
-                    # Handle ISO string or dict
-                    start_dt = None
-                    if isinstance(start_str, str):
-                        try:
-                            start_dt = datetime.datetime.fromisoformat(start_str)
-                        except: pass
-                    elif isinstance(start_str, dict):
-                         # Google dict (dateTime or date)
-                         pass # Usually already parsed by list_events to ISO string if possible?
-                         # Wait, list_events returns cleaned dicts. Let's check format.
-                    
-                    if not start_dt:
-                        continue
-                        
-                    # Calculate time diff
-                    # Ensure start_dt is timezone aware
-                    if start_dt.tzinfo is None:
-                        start_dt = start_dt.astimezone()
-                        
-                    diff = (start_dt - now).total_seconds() / 60
-                    
-                    # Notify if within 15 mins
-                    if 0 < diff <= 15:
-                        await self._announce(f"تذكير: لديك موعد '{event.get('summary')}' بعد {int(diff)} دقيقة.")
-                        self.reminded_events.add(event_id)
-                        
-        except Exception as e:
-            logger.warning(f"Guardian Schedule Check Failed: {e}")
+            dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return dt if dt.tzinfo else dt.astimezone()
+    
+    async def _on_reminder(self, owner: str, payload: Dict[str, Any]):
+        minutes = max(0, int((payload["at"] - time.time()) // 60))
+        if payload["kind"] == "event":
+            await self._announce(f"تذكير: لديك موعد '{payload['title']}' بعد {minutes} دقيقة.")
+        else:
+            await self._announce(f"تذكير: موعد المهمة '{payload['title']}' بعد {minutes} دقيقة.")
 
     async def _announce(self, message: str):
         """Announce via TTS and Frontend Toast"""
@@ -0,0 +1,200 @@
+"""
+Reminder Scheduler
+
+Heap-based timer for Guardian reminders. Sleeps until the next reminder is
+due (or until the schedule changes) instead of polling, and persists the
+keys of reminders already sent in the memory DB so a restart never repeats
+one. Rescheduling or cancelling an owner (e.g. "event:<id>") invalidates its
+old heap entry lazily.
+"""
+
+import time
+import heapq
+import asyncio
+import sqlite3
+import logging
+import itertools
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, List
+
+from haitham_voice_agent.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SentReminderStore:
+    """Keys of reminders already delivered (memory DB table), kept for `retention_days`"""
+
+    def __init__(self, db_path: Optional[Path] = None, retention_days: int = 30):
+        self.db_path = Path(db_path or Config.MEMORY_DB_PATH).expanduser()
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sent_reminders (
+                    key TEXT PRIMARY KEY,
+                    sent_at REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def load(self) -> Dict[str, float]:
+        """Prune expired rows and return the rest"""
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute("DELETE FROM sent_reminders WHERE sent_at < ?", (time.time() - self.retention,))
+            return dict(conn.execute("SELECT key, sent_at FROM sent_reminders").fetchall())
+
+    def add(self, key: str, sent_at: float):
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO sent_reminders (key, sent_at) VALUES (?, ?)", (key, sent_at))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ReminderScheduler:
+    """
+    Usage:
+        scheduler = ReminderScheduler(callback)
+        scheduler.schedule("event:abc", "event:abc:2025-01-01T10:00", fire_at, payload)
+        await scheduler.run()
+
+    `callback(owner, payload)` is awaited when a reminder fires. Keys carry
+    the target time, so a moved event gets a fresh reminder while a
+    re-synced unchanged one stays deduplicated.
+    """
+
+    # Upper bound on one sleep, so laptop sleep / clock changes are caught up quickly
+    MAX_SLEEP = 300.0
+
+    def __init__(
+        self,
+        callback: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        store: Optional[SentReminderStore] = None
+    ):
+        self.callback = callback
+        self.store = store or SentReminderStore()
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._live: Dict[str, Tuple[str, float, Dict[str, Any]]] = {}  # owner -> (key, fire_at, payload)
+        self._sent: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = False
+
+    # ==================== Schedule ====================
+
+    def schedule(self, owner: str, key: str, fire_at: float, payload: Dict[str, Any]) -> bool:
+        """(Re)schedule the reminder for `owner`; returns False if `key` was already sent"""
+        if key in self._sent:
+            self._live.pop(owner, None)
+            return False
+        current = self._live.get(owner)
+        if current and current[0] == key and current[1] == fire_at:
+            self._live[owner] = (key, fire_at, payload)
+            return True
+        self._live[owner] = (key, fire_at, payload)
+        heapq.heappush(self._heap, (fire_at, next(self._seq), owner, key))
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._compact()
+        self._notify()
+        return True
+
+    def cancel(self, owner: str):
+        if self._live.pop(owner, None):
+            self._notify()
+
+    def owners(self, prefix: str = "") -> List[str]:
+        return [owner for owner in self._live if owner.startswith(prefix)]
+
+    def next_fire_time(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _compact(self):
+        self._heap = [(fire_at, next(self._seq), owner, key)
+                      for owner, (key, fire_at, _) in self._live.items()]
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_at, _, owner, key = self._heap[0]
+            live = self._live.get(owner)
+            if live and live[0] == key and live[1] == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    def _notify(self):
+        if self._wake is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ==================== Run ====================
+
+    async def load_sent(self):
+        self._sent = await asyncio.to_thread(self.store.load)
+
+    async def run(self):
+        """Fire reminders as they come due until stop() is called"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.running = True
+        if not self._sent:
+            await self.load_sent()
+        # Drop anything scheduled before the sent set was loaded
+        for owner, (key, _, _) in list(self._live.items()):
+            if key in self._sent:
+                self._live.pop(owner)
+
+        while self.running:
+            self._wake.clear()
+            await self._fire_due(time.time())
+            next_at = self.next_fire_time()
+            timeout = self.MAX_SLEEP if next_at is None else min(self.MAX_SLEEP, max(0.0, next_at - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self.running = False
+        self._notify()
+
+    async def _fire_due(self, now: float):
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return
+            _, _, owner, key = heapq.heappop(self._heap)
+            _, _, payload = self._live.pop(owner)
+            self._sent[key] = now
+            try:
+                await asyncio.to_thread(self.store.add, key, now)
+            except Exception as e:
+                logger.warning(f"Failed to persist reminder {key}: {e}")
+            try:
+                await self.callback(owner, payload)
+            except Exception as e:
+                logger.error(f"Reminder callback failed for {owner}: {e}")
@@ -8,10 +8,12 @@ Implements hybrid LLM routing logic:
 Follows the routing rules from the Master SRS.
 """
 
+import re
+import time
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 from enum import Enum
 
 import openai
@@ -19,10 +21,24 @@ import google.generativeai as genai
 
 from .config import Config
 from .token_tracker import get_tracker
+from .routing_telemetry import RouteSample, get_telemetry
+from .streaming import iterate_in_thread
 from api.connection_manager import manager
 
 logger = logging.getLogger(__name__)
 
+# Routing rules from the Master SRS (substring match, compiled once)
+GEMINI_KEYWORDS_RE = re.compile("|".join(map(re.escape, [
+    "pdf", "translate", "translation", "summarize", "summary",
+    "compare", "comparison", "analyze", "analysis", "image",
+    "photo", "picture", "document", "extract tasks", "read file"
+])))
+GPT_KEYWORDS_RE = re.compile("|".join(map(re.escape, [
+    "plan", "execute", "tool", "email", "gmail", "draft",
+    "memory", "save", "remember", "classify", "organize",
+    "json", "structure", "action", "command"
+])))
+
 
 class LLMType(Enum):
     """LLM types"""
@@ -30,6 +46,35 @@ class LLMType(Enum):
     GPT = "gpt"
 
 
+class LLMStream:
+    """
+    Streaming completion: iterate for text deltas
+
+    `content` and `usage` are complete once iteration finishes (usage is
+    tracked by the router at that point, also when the consumer stops early).
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.content = ""
+        self.usage: Dict[str, Any] = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+        self._deltas: Optional[AsyncIterator[str]] = None
+
+    async def __aiter__(self):
+        try:
+            async for delta in self._deltas:
+                self.content += delta
+                yield delta
+        finally:
+            await self._deltas.aclose()
+
+    async def collect(self) -> Dict[str, Any]:
+        """Drain the stream; same shape as the generate_with_* results"""
+        async for _ in self:
+            pass
+        return {"content": self.content, "model": self.model, "usage": self.usage}
+
+
 class LLMRouter:
     """Hybrid LLM routing system"""
     
@@ -57,27 +102,13 @@ class LLMRouter:
         """
         intent_lower = intent.lower()
         
-        # Gemini routing rules (from Master SRS)
-        gemini_keywords = [
-            "pdf", "translate", "translation", "summarize", "summary",
-            "compare", "comparison", "analyze", "analysis", "image",
-            "photo", "picture", "document", "extract tasks", "read file"
-        ]
-        
-        # GPT routing rules (from Master SRS)
-        gpt_keywords = [
-            "plan", "execute", "tool", "email", "gmail", "draft",
-            "memory", "save", "remember", "classify", "organize",
-            "json", "structure", "action", "command"
-        ]
-        
         # Check for Gemini keywords
-        if any(keyword in intent_lower for keyword in gemini_keywords):
+        if GEMINI_KEYWORDS_RE.search(intent_lower):
             logger.info(f"Routing to Gemini (analytical task): {intent[:50]}...")
             return LLMType.GEMINI
         
         # Check for GPT keywords
-        if any(keyword in intent_lower for keyword in gpt_keywords):
+        if GPT_KEYWORDS_RE.search(intent_lower):
             logger.info(f"Routing to GPT (action task): {intent[:50]}...")
             return LLMType.GPT
         
@@ -92,6 +123,113 @@ class LLMRouter:
         logger.info(f"Routing to GPT (default): {intent[:50]}...")
         return LLMType.GPT
     
+    def _gpt_kwargs(
+        self,
+        model_name: str,
+        prompt: str,
+        system_instruction: Optional[str],
+        temperature: float,
+        response_format: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build chat.completions arguments for a single-turn GPT request"""
+        messages = []
+        
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        
+        messages.append({"role": "user", "content": prompt})
+        
+        kwargs = {
+            "model": model_name,
+            "messages": messages,
+        }
+        
+        # OpenAI o1 models (and gpt-5 placeholder if aliased) do not support temperature != 1
+        # They also don't support system messages in some versions, but the error here is specific to temperature.
+        is_reasoning_model = model_name.startswith("o1") or model_name.startswith("gpt-5")
+        
+        if not is_reasoning_model:
+            kwargs["temperature"] = temperature
+        else:
+            logger.info(f"Skipping temperature for reasoning model: {model_name}")
+        
+        if response_format == "json_object":
+            # o1 models currently don't support response_format="json_object" in all tiers
+            # But if it's gpt-4o it does.
+            # If it's o1, we should probably rely on prompt engineering for JSON or use a different model for structured output.
+            # For now, let's keep it but be aware.
+            if not is_reasoning_model:
+                 kwargs["response_format"] = {"type": "json_object"}
+            else:
+                # For o1, we append "Respond in JSON" to the prompt if not already there
+                # But generate_execution_plan uses system prompt for that.
+                pass
+        
+        return kwargs
+    
+    async def _track_usage(
+        self,
+        model_name: str,
+        input_tokens: int,
+        output_tokens: int,
+        method: str,
+        usage_context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Record token usage and return {"input_tokens", "output_tokens", "cost"}"""
+        usage_data = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+        try:
+            context = {"method": method}
+            if usage_context:
+                context.update(usage_context)
+
+            tracker = get_tracker()
+            cost = tracker.calculate_cost(model_name, input_tokens, output_tokens)
+            
+            await tracker.track_usage(
+                model=model_name,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                context=context
+            )
+            
+            usage_data = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost": cost
+            }
+        except Exception as e:
+            logger.warning(f"Failed to track usage for {model_name}: {e}")
+        return usage_data
+
+    def _record_route(
+        self,
+        provider: str,
+        logical_model: str,
+        model_name: str,
+        started: float,
+        usage_data: Optional[Dict[str, Any]],
+        success: bool,
+        usage_context: Optional[Dict[str, Any]] = None,
+        first_token: Optional[float] = None
+    ):
+        """Add one call to the routing telemetry (task_type/latency come from usage_context)"""
+        context = usage_context or {}
+        usage_data = usage_data or {}
+        get_telemetry().record(RouteSample(
+            ts=time.time(),
+            task_type=context.get("task_type", "other"),
+            latency_class=context.get("latency", "unknown"),
+            provider=provider,
+            model=logical_model,
+            resolved_model=model_name,
+            ttft=None if first_token is None else first_token - started,
+            total=time.perf_counter() - started,
+            input_tokens=usage_data.get("input_tokens", 0),
+            output_tokens=usage_data.get("output_tokens", 0),
+            cost=usage_data.get("cost", 0.0),
+            success=success
+        ))
+    
     async def generate_with_gemini(
         self,
         prompt: str,
@@ -118,13 +256,14 @@ class LLMRouter:
         logger.info(f"[LLMRouter] Gemini: {logical_model} -> {model_name}")
         
         # Broadcast Start
-        await manager.broadcast({
+        manager.publish({
             "type": "llm_start",
             "model": "Gemini",
             "task": "Generating Content",
             "details": f"Model: {model_name}"
         })
         
+        started = time.perf_counter()
         try:
             # Create client for the specific model
             model = genai.GenerativeModel(model_name)
@@ -149,51 +288,32 @@ class LLMRouter:
             result = response.text
             
             # Track Usage
-            usage_data = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
-            try:
-                # Gemini doesn't always return token counts in simple response, 
-                # but we can estimate or check usage_metadata if available.
-                # usage_metadata is available in recent versions.
-                usage = response.usage_metadata
-                input_tokens = usage.prompt_token_count if usage else len(full_prompt) // 4
-                output_tokens = usage.candidates_token_count if usage else len(result) // 4
-                
-                context = {"method": "generate_with_gemini"}
-                if usage_context:
-                    context.update(usage_context)
-
-                tracker = get_tracker()
-                cost = tracker.calculate_cost(model_name, input_tokens, output_tokens)
-                
-                await tracker.track_usage(
-                    model=model_name,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    context=context
-                )
-                
-                usage_data = {
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                    "cost": cost
-                }
-            except Exception as e:
-                logger.warning(f"Failed to track Gemini usage: {e}")
+            # Gemini doesn't always return token counts; estimate when usage_metadata is missing
+            usage = getattr(response, "usage_metadata", None)
+            usage_data = await self._track_usage(
+                model_name,
+                usage.prompt_token_count if usage else len(full_prompt) // 4,
+                usage.candidates_token_count if usage else len(result) // 4,
+                "generate_with_gemini",
+                usage_context
+            )
 
             logger.debug(f"Gemini response: {result[:100]}...")
             
             # Broadcast End
-            await manager.broadcast({
+            manager.publish({
                 "type": "llm_end",
                 "model": "Gemini",
                 "status": "success",
                 "cost": usage_data["cost"]
             })
+            self._record_route("gemini", logical_model, model_name, started, usage_data, True, usage_context)
             
             return {"content": result, "model": model_name, "usage": usage_data}
             
         except Exception as e:
             logger.error(f"Gemini generation failed: {e}")
+            self._record_route("gemini", logical_model, model_name, started, None, False, usage_context)
             raise
     
     async def generate_with_gpt(
@@ -223,48 +343,17 @@ class LLMRouter:
         model_name = Config.resolve_model(logical_model)
         logger.info(f"Generating with GPT ({logical_model} -> {model_name})...")
         
+        started = time.perf_counter()
         try:
-            messages = []
-            
-            if system_instruction:
-                messages.append({"role": "system", "content": system_instruction})
-            
-            messages.append({"role": "user", "content": prompt})
-            
             # Broadcast Start
-            await manager.broadcast({
+            manager.publish({
                 "type": "llm_start",
                 "model": "GPT",
                 "task": "Reasoning/Planning",
                 "details": f"Model: {model_name}"
             })
             
-            # Prepare kwargs
-            kwargs = {
-                "model": model_name,
-                "messages": messages,
-            }
-            
-            # OpenAI o1 models (and gpt-5 placeholder if aliased) do not support temperature != 1
-            # They also don't support system messages in some versions, but the error here is specific to temperature.
-            is_reasoning_model = model_name.startswith("o1") or model_name.startswith("gpt-5")
-            
-            if not is_reasoning_model:
-                kwargs["temperature"] = temperature
-            else:
-                logger.info(f"Skipping temperature for reasoning model: {model_name}")
-            
-            if response_format == "json_object":
-                # o1 models currently don't support response_format="json_object" in all tiers
-                # But if it's gpt-4o it does.
-                # If it's o1, we should probably rely on prompt engineering for JSON or use a different model for structured output.
-                # For now, let's keep it but be aware.
-                if not is_reasoning_model:
-                     kwargs["response_format"] = {"type": "json_object"}
-                else:
-                    # For o1, we append "Respond in JSON" to the prompt if not already there
-                    # But generate_execution_plan uses system prompt for that.
-                    pass
+            kwargs = self._gpt_kwargs(model_name, prompt, system_instruction, temperature, response_format)
             
             # Generate response
             client = openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
@@ -274,45 +363,28 @@ class LLMRouter:
             
             # Track Usage
             usage_data = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
-            try:
-                usage = response.usage
-                if usage:
-                    context = {"method": "generate_with_gpt"}
-                    if usage_context:
-                        context.update(usage_context)
-
-                    tracker = get_tracker()
-                    cost = tracker.calculate_cost(model_name, usage.prompt_tokens, usage.completion_tokens)
-                    
-                    await tracker.track_usage(
-                        model=model_name,
-                        input_tokens=usage.prompt_tokens,
-                        output_tokens=usage.completion_tokens,
-                        context=context
-                    )
-                    
-                    usage_data = {
-                        "input_tokens": usage.prompt_tokens,
-                        "output_tokens": usage.completion_tokens,
-                        "cost": cost
-                    }
-            except Exception as e:
-                logger.warning(f"Failed to track GPT usage: {e}")
+            usage = response.usage
+            if usage:
+                usage_data = await self._track_usage(
+                    model_name, usage.prompt_tokens, usage.completion_tokens, "generate_with_gpt", usage_context
+                )
 
             logger.debug(f"GPT response: {result[:100]}...")
             
             # Broadcast End
-            await manager.broadcast({
+            manager.publish({
                 "type": "llm_end",
                 "model": "GPT",
                 "status": "success",
                 "cost": usage_data["cost"]
             })
+            self._record_route("openai", logical_model, model_name, started, usage_data, True, usage_context)
             
             return {"content": result, "model": model_name, "usage": usage_data}
             
         except Exception as e:
             logger.error(f"GPT generation failed: {e}")
+            self._record_route("openai", logical_model, model_name, started, None, False, usage_context)
             raise
     
     async def generate_execution_plan(self, user_intent: str) -> Dict[str, Any]:
@@ -333,10 +405,19 @@ TOOLS:
 RESPONSE JSON:
 {
     "intent": "Brief description",
-    "steps": [{"tool": "name", "action": "name", "params": {...}}],
+    "steps": [{"tool": "name", "action": "name", "params": {...}, "depends_on": [1]}],
     "tools": ["tool1"],
-    "requires_confirmation": bool
+    "requires_confirmation": bool,
+    "parallel": bool
 }
+
+STEP ORDER:
+- Steps run in order and stop at the first failure (e.g. no email is sent if creating the event failed).
+- Use an earlier step's result as a param value with "$stepN.field" (e.g. "event_id": "$step1.id").
+- Set "parallel": true only when the steps are independent reads (e.g. today's events and unread emails).
+  Then give each step that needs an earlier one "depends_on": [N] (1-based); it is skipped if step N failed.
+
+If the request is a question that needs no tool, return "steps": [] and "tools": [].
 """
         prompt = f"User Request: {user_intent}\n\nCreate an execution plan."
         try:
@@ -481,6 +562,7 @@ JSON Response:
         model_name = model if model else Config.OLLAMA_MODEL
         logger.info(f"Generating with Local LLM ({model_name})...")
         
+        started = time.perf_counter()
         try:
             messages = []
             if system_instruction:
@@ -489,7 +571,7 @@ JSON Response:
             messages.append({"role": "user", "content": prompt})
             
             # Broadcast Start
-            await manager.broadcast({
+            manager.publish({
                 "type": "llm_start",
                 "model": "Local (Qwen)",
                 "task": "Processing",
@@ -517,20 +599,188 @@ JSON Response:
             logger.debug(f"Local response: {result[:100]}...")
             
             # Broadcast End
-            await manager.broadcast({
+            manager.publish({
                 "type": "llm_end",
                 "model": "Local (Qwen)",
                 "status": "success",
                 "cost": 0.0  # Free!
             })
+            usage = getattr(response, "usage", None)
+            self._record_route("local", model_name, model_name, started, {
+                "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            }, True, usage_context)
             
             return {"content": result, "model": model_name, "usage": {"cost": 0.0}}
             
         except Exception as e:
             logger.error(f"Local generation failed: {e}")
+            self._record_route("local", model_name, model_name, started, None, False, usage_context)
             # Fallback to GPT if local fails? No, let it fail for now or user prefers local.
             raise
 
+    # ==================== Streaming ====================
+
+    def stream_with_gpt(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        logical_model: str = "logical.mini",
+        usage_context: Optional[Dict[str, Any]] = None
+    ) -> LLMStream:
+        """Streaming variant of generate_with_gpt"""
+        model_name = Config.resolve_model(logical_model)
+        logger.info(f"Streaming with GPT ({logical_model} -> {model_name})...")
+        stream = LLMStream(model_name)
+        stream._deltas = self._gpt_deltas(stream, prompt, system_instruction, temperature, usage_context, logical_model)
+        return stream
+
+    async def _gpt_deltas(self, stream, prompt, system_instruction, temperature, usage_context, logical_model="logical.mini"):
+        manager.publish({
+            "type": "llm_start",
+            "model": "GPT",
+            "task": "Reasoning/Planning",
+            "details": f"Model: {stream.model}"
+        })
+        usage, status = None, "success"
+        started, first_token = time.perf_counter(), None
+        try:
+            kwargs = self._gpt_kwargs(stream.model, prompt, system_instruction, temperature)
+            client = openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+            response = await client.chat.completions.create(
+                timeout=60.0, stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+            async for chunk in response:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage  # Final chunk, no choices
+                if chunk.choices and chunk.choices[0].delta.content:
+                    first_token = first_token or time.perf_counter()
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"GPT streaming failed: {e}")
+            status = "error"
+            raise
+        finally:
+            # Consumer may have stopped early: estimate what was generated so far
+            stream.usage = await self._track_usage(
+                stream.model,
+                usage.prompt_tokens if usage else len(prompt + (system_instruction or "")) // 4,
+                usage.completion_tokens if usage else len(stream.content) // 4,
+                "stream_with_gpt",
+                usage_context
+            )
+            manager.publish({"type": "llm_end", "model": "GPT", "status": status, "cost": stream.usage["cost"]})
+            self._record_route("openai", logical_model, stream.model, started, stream.usage,
+                               status == "success", usage_context, first_token)
+
+    def stream_with_gemini(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.7,
+        logical_model: str = "logical.gemini.pro",
+        usage_context: Optional[Dict[str, Any]] = None
+    ) -> LLMStream:
+        """Streaming variant of generate_with_gemini"""
+        model_name = Config.resolve_gemini_model(logical_model)
+        logger.info(f"[LLMRouter] Gemini stream: {logical_model} -> {model_name}")
+        stream = LLMStream(model_name)
+        stream._deltas = self._gemini_deltas(stream, prompt, system_instruction, temperature, usage_context, logical_model)
+        return stream
+
+    async def _gemini_deltas(self, stream, prompt, system_instruction, temperature, usage_context,
+                             logical_model="logical.gemini.pro"):
+        manager.publish({
+            "type": "llm_start",
+            "model": "Gemini",
+            "task": "Generating Content",
+            "details": f"Model: {stream.model}"
+        })
+        full_prompt = f"{system_instruction}\n\n{prompt}" if system_instruction else prompt
+        usage, status = None, "success"
+        started, first_token = time.perf_counter(), None
+        try:
+            model = genai.GenerativeModel(stream.model)
+            response = await asyncio.wait_for(
+                asyncio.to_thread(
+                    model.generate_content,
+                    full_prompt,
+                    generation_config=genai.types.GenerationConfig(temperature=temperature),
+                    stream=True
+                ),
+                timeout=60.0
+            )
+            async for chunk in iterate_in_thread(response):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                try:
+                    text = chunk.text
+                except ValueError:  # Chunk without text parts (e.g. safety metadata)
+                    continue
+                if text:
+                    first_token = first_token or time.perf_counter()
+                    yield text
+        except Exception as e:
+            logger.error(f"Gemini streaming failed: {e}")
+            status = "error"
+            raise
+        finally:
+            stream.usage = await self._track_usage(
+                stream.model,
+                getattr(usage, "prompt_token_count", 0) or len(full_prompt) // 4,
+                getattr(usage, "candidates_token_count", 0) or len(stream.content) // 4,
+                "stream_with_gemini",
+                usage_context
+            )
+            manager.publish({"type": "llm_end", "model": "Gemini", "status": status, "cost": stream.usage["cost"]})
+            self._record_route("gemini", logical_model, stream.model, started, stream.usage,
+                               status == "success", usage_context, first_token)
+
+    def stream_with_local(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.1,
+        model: Optional[str] = None
+    ) -> LLMStream:
+        """Streaming variant of generate_with_local (free, not tracked)"""
+        model_name = model if model else Config.OLLAMA_MODEL
+        logger.info(f"Streaming with Local LLM ({model_name})...")
+        stream = LLMStream(model_name)
+        stream._deltas = self._local_deltas(stream, prompt, system_instruction, temperature)
+        return stream
+
+    async def _local_deltas(self, stream, prompt, system_instruction, temperature):
+        manager.publish({
+            "type": "llm_start",
+            "model": "Local (Qwen)",
+            "task": "Processing",
+            "details": f"Model: {stream.model}"
+        })
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        status = "success"
+        started, first_token = time.perf_counter(), None
+        try:
+            client = openai.AsyncOpenAI(base_url=f"{Config.OLLAMA_BASE_URL}/v1", api_key="ollama")
+            response = await client.chat.completions.create(
+                model=stream.model, messages=messages, temperature=temperature, stream=True
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    first_token = first_token or time.perf_counter()
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"Local streaming failed: {e}")
+            status = "error"
+            raise
+        finally:
+            manager.publish({"type": "llm_end", "model": "Local (Qwen)", "status": status, "cost": 0.0})
+            self._record_route("local", stream.model, stream.model, started, None,
+                               status == "success", first_token=first_token)
+
 
 # Singleton instance
 _router_instance: Optional[LLMRouter] = None
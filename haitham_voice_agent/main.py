@@ -19,6 +19,7 @@ from typing import Optional
 from haitham_voice_agent.config import Config
 from haitham_voice_agent.tools.voice import TTS, SessionRecorder, init_whisper_models
 from haitham_voice_agent.llm_router import LLMRouter
+from haitham_voice_agent.tts import get_tts
 from haitham_voice_agent.model_router import TaskMeta, choose_model
 from haitham_voice_agent.tools.gemini.gemini_router import choose_gemini_variant
 from haitham_voice_agent.tools.memory.voice_tools import VoiceMemoryTools
@@ -117,6 +118,31 @@ class HVA:
     def speak(self, text: str):
         """Speak text using TTS"""
         self.tts.speak(text, language=self.language)
+
+    async def speak_reply(self, prompt: str) -> str:
+        """
+        Generate a spoken answer and speak it sentence by sentence as it streams
+
+        Falls back to the local model if GPT fails before producing any text.
+
+        Returns:
+            str: The full reply text
+        """
+        async def speak_sentence(sentence: str, language: str):
+            await asyncio.to_thread(self.tts.speak, sentence, language)
+
+        stream = self.llm_router.stream_with_gpt(
+            prompt, usage_context={"task_type": "chat", "latency": "interactive"})
+        try:
+            return await get_tts().speak_stream(stream, language=self.language, speak=speak_sentence)
+        except Exception as e:
+            if stream.content:
+                logger.error(f"Streamed reply failed midway: {e}")
+                return stream.content
+            logger.warning(f"GPT stream failed, falling back to local model: {e}")
+
+        stream = self.llm_router.stream_with_local(prompt)
+        return await get_tts().speak_stream(stream, language=self.language, speak=speak_sentence)
     
     async def process_command_mode(self):
         """
@@ -257,7 +283,10 @@ class HVA:
         # Generate execution plan using Cloud LLM (GPT/Gemini)
         plan = await self.llm_router.generate_execution_plan(text)
         
-        if plan:
+        if plan and not plan.get("steps") and not plan.get("tool"):
+            # Nothing to execute: answer conversationally, speaking as it streams
+            await self.speak_reply(text)
+        elif plan:
             await self.execute_plan(plan)
         else:
             self.speak("عذراً، لم أستطع فهم طلبك." if self.language == "ar" else "Sorry, I couldn't understand your request.")
@@ -551,13 +580,12 @@ Provide:
 
 Output format: JSON
 """
-        # Call LLM (using router's generic method, but targeting Gemini)
-        # We need to ensure we use the specific model. 
-        # The LLMRouter currently defaults to config.GEMINI_MODEL.
-        # We should ideally pass the model name, but LLMRouter.generate_with_gemini 
-        # uses the configured default. For now, that's fine as it maps to Pro.
-        
-        analysis = await self.llm_router.generate_with_gemini(prompt)
+        # Call LLM with the routed Gemini variant (task type/latency feed routing telemetry)
+        analysis = await self.llm_router.generate_with_gemini(
+            prompt,
+            logical_model=gemini_decision["logical_model"],
+            usage_context={"task_type": meta.task_type, "latency": meta.latency}
+        )
         
         # 4. Save to Memory
         await self.memory_tools.process_voice_note(
@@ -866,7 +894,9 @@ Output format: JSON
         response = await self.llm_router.generate_with_gpt(
             prompt,
             temperature=0.1,  # Lower temperature for more consistent parsing
-            response_format="json_object"
+            response_format="json_object",
+            logical_model=decision["model"],
+            usage_context={"task_type": meta.task_type, "latency": meta.latency}
         )
         
         try:
@@ -11,7 +11,11 @@ Priority:
 """
 
 from dataclasses import dataclass, field
-from typing import Literal, Optional, Dict, Any
+from functools import lru_cache
+from typing import Literal, Optional, Dict, Any, Tuple
+
+from haitham_voice_agent.config import Config
+from haitham_voice_agent.routing_telemetry import get_telemetry
 
 
 @dataclass
@@ -59,7 +63,38 @@ class TaskMeta:
 RouterResult = Dict[str, str]
 
 
-def choose_model(meta: TaskMeta) -> RouterResult:
+# Equally acceptable substitutes (same or higher quality) for a decision;
+# adaptive routing may move interactive tasks to one of these
+ACCEPTABLE_ALTERNATIVES: Dict[str, Tuple[str, ...]] = {
+    "logical.nano": ("logical.nano-plus",),
+    "logical.nano-plus": ("logical.mini",),
+    "logical.mini": ("logical.premium",),
+}
+
+
+def adapt_decision(decision: Dict[str, str], key: str, meta: TaskMeta,
+                   alternatives: Dict[str, Tuple[str, ...]]) -> Dict[str, str]:
+    """
+    Swap decision[key] for a healthier acceptable alternative (interactive,
+    non-high-risk tasks only), based on recent routing telemetry.
+    """
+    if meta.latency != "interactive" or meta.risk == "high":
+        return decision
+    candidates = alternatives.get(decision[key])
+    if not candidates:
+        return decision
+
+    choice = get_telemetry().pick(decision[key], list(candidates))
+    if choice is None:
+        return decision
+    return {
+        **decision,
+        key: choice,
+        "reason": f"{decision['reason']} Adaptive: {decision[key]} is slow/erroring recently, using {choice}."
+    }
+
+
+def choose_model(meta: TaskMeta, adaptive: Optional[bool] = None) -> RouterResult:
     """
     Deterministically choose the best model for the given task meta.
     Priority: quality first, then cost.
@@ -67,55 +102,70 @@ def choose_model(meta: TaskMeta) -> RouterResult:
     
     Args:
         meta: TaskMeta instance describing the task
+        adaptive: Use recent latency/error telemetry to pick between equally
+            acceptable models (default: Config.ADAPTIVE_ROUTING)
         
     Returns:
         RouterResult with keys: provider, model (logical name), mode, reason
     """
+    # Rule decisions are cached (copied so callers may modify them)
+    decision = dict(_rule_decision(meta.context_tokens, meta.task_type, meta.risk, meta.latency, meta.is_document))
+
+    if adaptive is None:
+        adaptive = Config.ADAPTIVE_ROUTING
+    if adaptive:
+        decision = adapt_decision(decision, "model", meta, ACCEPTABLE_ALTERNATIVES)
+    return decision
+
+
+@lru_cache(maxsize=1024)
+def _rule_decision(context_tokens: int, task_type: str, risk: str, latency: str, is_document: bool) -> RouterResult:
+    """The routing rules (pure; cached on the fields they read)"""
     
     # Rule 1: Long documents or very large context → Gemini
-    if meta.is_document or meta.context_tokens > 20_000:
+    if is_document or context_tokens > 20_000:
         return {
             "provider": "gemini",
             "model": "logical.doc-gemini",
-            "mode": "default" if meta.latency == "interactive" else "flex",
+            "mode": "default" if latency == "interactive" else "flex",
             "reason": "Long document or very large context → use Gemini logical doc model."
         }
     
     # Rule 2: Document-level analysis/translation with larger context → Gemini
-    if (meta.task_type in ["doc_analysis", "comparison", "translation"] 
-        and meta.context_tokens > 8_000):
+    if (task_type in ["doc_analysis", "comparison", "translation"] 
+        and context_tokens > 8_000):
         return {
             "provider": "gemini",
             "model": "logical.doc-gemini",
-            "mode": "default" if meta.latency == "interactive" else "flex",
+            "mode": "default" if latency == "interactive" else "flex",
             "reason": "Document-level analysis/translation with larger context → Gemini."
         }
     
     # Rule 3: Non-document tasks with normal context
     
     # Rule 3a: Simple, low-risk tasks → nano
-    if (meta.task_type in ["classification", "tagging", "short_rewrite"] 
-        and meta.risk == "low"):
+    if (task_type in ["classification", "tagging", "short_rewrite"] 
+        and risk == "low"):
         return {
             "provider": "openai",
             "model": "logical.nano",
-            "mode": "batch+flex" if meta.latency == "background" else "default",
+            "mode": "batch+flex" if latency == "background" else "default",
             "reason": "Simple, low-risk task; nano is sufficient and cheapest."
         }
     
     # Rule 3b: Simple but medium risk → nano-plus
-    if (meta.task_type in ["classification", "tagging"] 
-        and meta.risk == "medium"):
+    if (task_type in ["classification", "tagging"] 
+        and risk == "medium"):
         return {
             "provider": "openai",
             "model": "logical.nano-plus",
-            "mode": "batch+flex" if meta.latency == "background" else "default",
+            "mode": "batch+flex" if latency == "background" else "default",
             "reason": "Simple but medium risk; nano-plus offers better reliability."
         }
     
     # Rule 3c: High-stakes or complex multi-step reasoning → premium
     # CHECK THIS BEFORE planning/tool_calling to catch high-risk variants
-    if meta.task_type == "multi_step_reasoning" or meta.risk == "high":
+    if task_type == "multi_step_reasoning" or risk == "high":
         return {
             "provider": "openai",
             "model": "logical.premium",
@@ -124,11 +174,11 @@ def choose_model(meta: TaskMeta) -> RouterResult:
         }
     
     # Rule 3d: Planning/tool calling/memory/email → mini (main workhorse)
-    if meta.task_type in ["planning", "tool_calling", "memory_op", "email_reply"]:
+    if task_type in ["planning", "tool_calling", "memory_op", "email_reply"]:
         return {
             "provider": "openai",
             "model": "logical.mini",
-            "mode": "default" if meta.latency == "interactive" else "flex",
+            "mode": "default" if latency == "interactive" else "flex",
             "reason": "Planning/tool calling/memory/email in HVA; logical.mini is main workhorse."
         }
     
@@ -4,6 +4,7 @@ Acts as a middleware layer to route requests between local Ollama and cloud LLMs
 """
 
 import json
+import uuid
 import logging
 import aiohttp
 import asyncio
@@ -272,9 +273,11 @@ CRITICAL RULES
                         
                         # DATASET COLLECTION LOGGING
                         if Config.LOG_ROUTING_CLASSIFICATIONS:
-                            # Log structured pair for dataset building
-                            logger.info(f"ROUTING INPUT: {user_input}")
-                            logger.info(f"ROUTING OUTPUT: {content}")
+                            # Log structured pair for dataset building; the id lets the
+                            # builder pair them when concurrent requests interleave
+                            request_id = uuid.uuid4().hex[:12]
+                            logger.info(f"ROUTING INPUT [{request_id}]: {user_input}")
+                            logger.info(f"ROUTING OUTPUT [{request_id}]: {json.dumps(classification, ensure_ascii=False)}")
                         
                         # Keep history manageable (last 10 messages)
                         if len(self.history) > 10:
@@ -291,9 +294,19 @@ CRITICAL RULES
 
     async def extract_task_details(self, text: str) -> Dict[str, Any]:
         """
-        Extract task details (title, due_date) from natural language using Qwen.
+        Extract task details (title, due_date) from natural language.
+        
+        The local date parser handles the common phrasings; Qwen is only
+        asked when date-like words are left over that it could not read.
         """
         import datetime
+        from haitham_voice_agent.tools.date_parser import extract_datetime, has_date_hint
+        
+        due, title = extract_datetime(text)
+        local = {"title": title or text, "due_date": due.isoformat() if due else None}
+        if not has_date_hint(title):
+            return local
+        
         now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         prompt = f"""
@@ -329,7 +342,7 @@ CRITICAL RULES
             logger.error(f"Task extraction failed: {e}")
             
         # Fallback
-        return {"title": text, "due_date": None}
+        return local
 
 # Singleton instance
 _orchestrator_instance: Optional[OllamaOrchestrator] = None
@@ -0,0 +1,177 @@
+"""
+Routing Telemetry
+
+Per-call latency/cost samples for the model routers. LLMRouter records one
+sample per generate/stream call (provider, logical model, TTFT, total
+latency, tokens, cost, success) into a fixed-size ring buffer; /usage/routing
+reports percentiles over it.
+
+The adaptive mode (Config.ADAPTIVE_ROUTING) uses the recent p95 latency and
+error rate of each logical model to choose between equally acceptable
+models for interactive tasks. It only ever moves to one of the alternatives
+the router lists for a decision, never to a cheaper/weaker model.
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List, Iterable
+
+
+@dataclass
+class RouteSample:
+    """One routed LLM call"""
+    ts: float
+    task_type: str
+    latency_class: str            # "interactive" / "background" / "unknown"
+    provider: str                 # "openai" / "gemini" / "local"
+    model: str                    # Logical model (e.g. "logical.mini")
+    resolved_model: str
+    ttft: Optional[float]         # Seconds to first token (streaming only)
+    total: float                  # Seconds
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    success: bool = True
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list (q in 0..100)"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples: Iterable[RouteSample]) -> Dict[str, Any]:
+    """Count, error rate, latency/TTFT percentiles, tokens and cost for a group"""
+    samples = list(samples)
+    totals = sorted(s.total for s in samples)
+    ttfts = sorted(s.ttft for s in samples if s.ttft is not None)
+    errors = sum(1 for s in samples if not s.success)
+    return {
+        "calls": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "latency_p50": percentile(totals, 50),
+        "latency_p95": percentile(totals, 95),
+        "latency_p99": percentile(totals, 99),
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95),
+        "input_tokens": sum(s.input_tokens for s in samples),
+        "output_tokens": sum(s.output_tokens for s in samples),
+        "cost": round(sum(s.cost for s in samples), 6),
+    }
+
+
+class RoutingTelemetry:
+    """
+    Ring buffer of routed calls
+
+    Features:
+    - O(1) record from the event loop or worker threads
+    - Percentile summaries by model, provider and task type
+    - Per-model health (p95, error rate) for adaptive routing
+    """
+
+    MAX_SAMPLES = 5000         # Ring buffer size
+    HEALTH_WINDOW = 50         # Most recent calls per model used for adaptive routing
+    HEALTH_MAX_AGE = 900       # Seconds; older calls are ignored (a skipped model gets re-probed)
+    MIN_SAMPLES = 5            # Below this a model has no verdict (keeps the rule's choice)
+    MAX_ERROR_RATE = 0.2       # A model above this is avoided
+    SWITCH_MARGIN = 1.25       # An alternative must be this much faster (p95) to switch
+
+    def __init__(self, max_samples: Optional[int] = None):
+        self._samples: deque = deque(maxlen=max_samples or self.MAX_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, sample: RouteSample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def samples(self, window_seconds: Optional[float] = None) -> List[RouteSample]:
+        with self._lock:
+            samples = list(self._samples)
+        if window_seconds:
+            cutoff = time.time() - window_seconds
+            samples = [s for s in samples if s.ts >= cutoff]
+        return samples
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    # ==================== Reporting ====================
+
+    def summary(self, window_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Percentiles overall and grouped by model, provider and task type"""
+        samples = self.samples(window_seconds)
+        groups: Dict[str, Dict[str, List[RouteSample]]] = {"models": {}, "providers": {}, "task_types": {}}
+        for s in samples:
+            groups["models"].setdefault(s.model, []).append(s)
+            groups["providers"].setdefault(s.provider, []).append(s)
+            groups["task_types"].setdefault(f"{s.task_type}/{s.latency_class}", []).append(s)
+
+        result: Dict[str, Any] = {
+            "window_seconds": window_seconds,
+            "buffer_size": self._samples.maxlen,
+            "overall": summarize(samples),
+        }
+        for name, grouped in groups.items():
+            result[name] = {key: summarize(group) for key, group in sorted(grouped.items())}
+        result["recent"] = [asdict(s) for s in samples[-20:]]
+        return result
+
+    # ==================== Adaptive routing ====================
+
+    def health(self, model: str) -> Optional[Dict[str, float]]:
+        """p95 latency and error rate over a model's recent calls (None if too few)"""
+        cutoff = time.time() - self.HEALTH_MAX_AGE
+        with self._lock:
+            recent = [s for s in reversed(self._samples) if s.model == model and s.ts >= cutoff][:self.HEALTH_WINDOW]
+        if len(recent) < self.MIN_SAMPLES:
+            return None
+        totals = sorted(s.total for s in recent if s.success)
+        return {
+            "p95": percentile(totals, 95) if totals else float("inf"),
+            "error_rate": sum(1 for s in recent if not s.success) / len(recent),
+        }
+
+    def pick(self, preferred: str, alternatives: List[str]) -> Optional[str]:
+        """
+        Healthier alternative to the preferred model, or None to keep it
+
+        Switches only when the preferred model is erroring or clearly slower
+        (p95 beyond SWITCH_MARGIN) than an alternative with enough samples.
+        """
+        current = self.health(preferred)
+        if current is None:
+            return None
+
+        best, best_health = None, None
+        for model in alternatives:
+            health = self.health(model)
+            if health is None or health["error_rate"] > self.MAX_ERROR_RATE:
+                continue
+            if best_health is None or health["p95"] < best_health["p95"]:
+                best, best_health = model, health
+        if best is None:
+            return None
+
+        if current["error_rate"] > self.MAX_ERROR_RATE:
+            return best
+        if current["p95"] > best_health["p95"] * self.SWITCH_MARGIN:
+            return best
+        return None
+
+
+# Singleton
+_telemetry: Optional[RoutingTelemetry] = None
+
+
+def get_telemetry() -> RoutingTelemetry:
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = RoutingTelemetry()
+    return _telemetry
@@ -0,0 +1,120 @@
+"""
+Streaming Helpers
+
+Utilities shared by the token-streaming paths (LLM router, style model,
+SSE endpoints, TTS):
+- SentenceChunker / chunk_sentences: regroup token deltas into speakable
+  sentences (Arabic and English punctuation) as soon as each one ends
+- iterate_in_thread: consume a blocking iterator (Gemini, local HF model)
+  from async code without blocking the event loop
+"""
+
+import re
+import asyncio
+import threading
+from typing import AsyncIterator, Iterable, List, Optional
+
+# Sentence end: . ! ? … and Arabic ؟ ؛ followed by whitespace, or a newline.
+# Requiring whitespace after the mark keeps "3.5", "v2.1" and URLs intact.
+_BOUNDARY = re.compile(r"(?:[.!?…؟؛]+[\"'»)\]]*\s+|\n+)")
+# Fallback split points for very long sentences
+_SOFT_BOUNDARY = re.compile(r"[,،:;]\s+")
+
+
+class SentenceChunker:
+    """
+    Incremental sentence splitter
+
+    Usage:
+        chunker = SentenceChunker()
+        for delta in deltas:
+            for sentence in chunker.feed(delta):
+                speak(sentence)
+        tail = chunker.flush()
+    """
+
+    def __init__(self, min_chars: int = 12, max_chars: int = 240):
+        self.min_chars = min_chars  # Shorter pieces are merged with the next sentence
+        self.max_chars = max_chars  # Longer pieces are cut at a comma or space
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+
+        while len(self._buffer) > self.max_chars:
+            window = self._buffer[:self.max_chars]
+            soft = [m.end() for m in _SOFT_BOUNDARY.finditer(window)]
+            cut = soft[-1] if soft else (window.rfind(" ") + 1 or self.max_chars)
+            sentences.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:]
+        return [s for s in sentences if s]
+
+    def flush(self) -> Optional[str]:
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail or None
+
+
+async def chunk_sentences(deltas: AsyncIterator[str], **kwargs) -> AsyncIterator[str]:
+    """Async generator of complete sentences from a stream of text deltas"""
+    chunker = SentenceChunker(**kwargs)
+    async for delta in deltas:
+        for sentence in chunker.feed(delta):
+            yield sentence
+    tail = chunker.flush()
+    if tail:
+        yield tail
+
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(iterable: Iterable, max_buffer: int = 256) -> AsyncIterator:
+    """
+    Run a blocking iterator in a worker thread and yield its items
+
+    Exceptions raised by the iterator are re-raised here. If the consumer
+    stops early the worker is told to stop at its next item.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(max_buffer)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+            asyncio.run_coroutine_threadsafe(queue.put(_END), loop).result()
+        except BaseException as e:  # Surface iterator errors to the consumer
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(_Failure(e)), loop).result()
+
+    worker = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        while not queue.empty():  # Unblock a producer waiting on a full queue
+            queue.get_nowait()
+        if worker.done():
+            worker.result()
@@ -0,0 +1,336 @@
+"""
+Local IMAP4rev1 test server
+
+A small threaded IMAP server on 127.0.0.1 for tests and benchmarks of
+IMAPHandler. Implements the subset the handler uses: LOGIN, CAPABILITY,
+SELECT/EXAMINE, STATUS, NOOP, (UID) SEARCH (incl. ESEARCH RETURN),
+(UID) FETCH with UID/FLAGS/RFC822.SIZE/RFC822/BODY[...] and partial
+ranges, CHANGEDSINCE, LOGOUT. `latency` adds a delay before every tagged
+response to model a network round trip.
+"""
+
+import re
+import time
+import threading
+import socketserver
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Any, Optional
+
+_TOKEN = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()]+')
+_SECTION = re.compile(rb'(BODY(?:\.PEEK)?)\[([^\]]*)\](?:<(\d+)\.(\d+)>)?', re.I)
+
+
+def make_message(i: int, subject: str = None, sender: str = None, body: str = None, body_size: int = 0) -> bytes:
+    body = body or f"Message body {i}. " + ("lorem ipsum " * (body_size // 12))
+    msg = MIMEText(body)
+    msg["Subject"] = subject or f"Subject {i}"
+    msg["From"] = sender or f"Sender {i} <sender{i}@example.com>"
+    msg["To"] = "me@example.com"
+    msg["Date"] = format_datetime(datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i))
+    return msg.as_bytes()
+
+
+class Mailbox:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uidvalidity = 1
+        self.next_uid = 1
+        self.modseq = 1
+        self.messages: List[Dict[str, Any]] = []  # ordered by uid
+
+    def append(self, raw: bytes, flags=()):
+        with self.lock:
+            self.modseq += 1
+            self.messages.append({"uid": self.next_uid, "raw": raw, "flags": list(flags), "modseq": self.modseq})
+            self.next_uid += 1
+
+    def set_flags(self, uid: int, flags):
+        with self.lock:
+            self.modseq += 1
+            for m in self.messages:
+                if m["uid"] == uid:
+                    m["flags"], m["modseq"] = list(flags), self.modseq
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def send(self, data: bytes):
+        self.wfile.write(data)
+
+    def handle(self):
+        server = self.server
+        self.send(b"* OK [CAPABILITY IMAP4rev1] local test server ready\r\n")
+        while True:
+            line = self._read_command()
+            if line is None:
+                return
+            server.commands.append(line)
+            parts = line.split(b" ", 2)
+            tag = parts[0]
+            command = parts[1].upper() if len(parts) > 1 else b""
+            args = parts[2] if len(parts) > 2 else b""
+            use_uid = False
+            if command == b"UID":
+                use_uid = True
+                sub = args.split(b" ", 1)
+                command, args = sub[0].upper(), (sub[1] if len(sub) > 1 else b"")
+            try:
+                status = self._dispatch(command, args, use_uid)
+            except Exception as e:  # pragma: no cover - surfaced to the client
+                status = b"BAD " + str(e).encode()
+            if server.latency:
+                time.sleep(server.latency)
+            self.send(tag + b" " + status + b"\r\n")
+            if command == b"LOGOUT":
+                return
+
+    def _read_command(self) -> Optional[bytes]:
+        """Read one command line, inlining any client literals"""
+        line = self.rfile.readline()
+        if not line:
+            return None
+        line = line.rstrip(b"\r\n")
+        while True:
+            m = re.search(rb"\{(\d+)\}$", line)
+            if not m:
+                return line
+            self.send(b"+ go ahead\r\n")
+            literal = self.rfile.read(int(m.group(1)))
+            rest = self.rfile.readline().rstrip(b"\r\n")
+            line = line[:m.start()] + b'"' + literal.replace(b'"', b'\\"') + b'"' + rest
+
+    # ==================== Commands ====================
+
+    def _dispatch(self, command: bytes, args: bytes, use_uid: bool) -> bytes:
+        box: Mailbox = self.server.mailbox
+        if command == b"CAPABILITY":
+            self.send(b"* CAPABILITY " + b" ".join(self.server.capabilities) + b"\r\n")
+            return b"OK CAPABILITY completed"
+        if command in (b"LOGIN", b"NOOP", b"CLOSE", b"ENABLE"):
+            return b"OK done"
+        if command == b"LOGOUT":
+            self.send(b"* BYE\r\n")
+            return b"OK bye"
+        if command in (b"SELECT", b"EXAMINE"):
+            with box.lock:
+                self.send(f"* {len(box.messages)} EXISTS\r\n".encode())
+                self.send(f"* OK [UIDVALIDITY {box.uidvalidity}] ok\r\n".encode())
+                self.send(f"* OK [UIDNEXT {box.next_uid}] ok\r\n".encode())
+                self.send(f"* OK [HIGHESTMODSEQ {box.modseq}] ok\r\n".encode())
+            return b"OK [READ-ONLY] done" if command == b"EXAMINE" else b"OK [READ-WRITE] done"
+        if command == b"STATUS":
+            with box.lock:
+                self.send(f"* STATUS INBOX (UIDVALIDITY {box.uidvalidity} UIDNEXT {box.next_uid} "
+                          f"HIGHESTMODSEQ {box.modseq} MESSAGES {len(box.messages)})\r\n".encode())
+            return b"OK STATUS completed"
+        if command == b"SEARCH":
+            return self._search(args, use_uid)
+        if command == b"FETCH":
+            return self._fetch(args, use_uid)
+        return b"BAD unknown command"
+
+    def _numbers(self, spec: bytes, use_uid: bool) -> List[int]:
+        """Resolve a sequence set to message indexes"""
+        box = self.server.mailbox
+        keys = [m["uid"] for m in box.messages] if use_uid else list(range(1, len(box.messages) + 1))
+        top = keys[-1] if keys else 0
+        picked = set()
+        for part in spec.split(b","):
+            if b":" in part:
+                lo, hi = part.split(b":")
+                lo = top if lo == b"*" else int(lo)
+                hi = top if hi == b"*" else int(hi)
+                lo, hi = min(lo, hi), max(lo, hi)
+                picked.update(i for i, k in enumerate(keys) if lo <= k <= hi)
+            else:
+                n = top if part == b"*" else int(part)
+                picked.update(i for i, k in enumerate(keys) if k == n)
+        return sorted(picked)
+
+    def _parse_criteria(self, tokens: List[bytes], use_uid: bool):
+        def unquote(t):
+            return t[1:-1].replace(b'\\"', b'"').decode("utf-8", "replace").lower() if t.startswith(b'"') else t.decode().lower()
+
+        def parse_one(i):
+            t = tokens[i].upper()
+            if t == b"(":
+                preds, i = [], i + 1
+                while tokens[i] != b")":
+                    pred, i = parse_one(i)
+                    preds.append(pred)
+                return (lambda m, idx: all(p(m, idx) for p in preds)), i + 1
+            if t == b"ALL":
+                return (lambda m, idx: True), i + 1
+            if t == b"OR":
+                a, i = parse_one(i + 1)
+                b, i = parse_one(i)
+                return (lambda m, idx: a(m, idx) or b(m, idx)), i
+            if t == b"NOT":
+                a, i = parse_one(i + 1)
+                return (lambda m, idx: not a(m, idx)), i
+            if t == b"UNSEEN":
+                return (lambda m, idx: b"\\Seen" not in m["flags"]), i + 1
+            if t == b"UID":
+                allowed = set(self._numbers(tokens[i + 1], True))
+                return (lambda m, idx: idx in allowed), i + 2
+            if t in (b"SUBJECT", b"FROM", b"TEXT", b"X-GM-RAW"):
+                needle = unquote(tokens[i + 1])
+                header = {b"SUBJECT": "Subject", b"FROM": "From"}.get(t)
+
+                def match(m, idx, needle=needle, header=header):
+                    if header is None:
+                        return needle in m["raw"].decode("utf-8", "replace").lower()
+                    value = message_from_bytes(m["raw"]).get(header, "")
+                    return needle in str(make_header(decode_header(value))).lower()
+                return match, i + 2
+            if t[:1].isdigit() or t[:1] == b"*":
+                allowed = set(self._numbers(t, False))
+                return (lambda m, idx: idx in allowed), i + 1
+            raise ValueError(f"unsupported search key {t!r}")
+
+        preds, i = [], 0
+        while i < len(tokens):
+            pred, i = parse_one(i)
+            preds.append(pred)
+        return lambda m, idx: all(p(m, idx) for p in preds)
+
+    def _search(self, args: bytes, use_uid: bool) -> bytes:
+        tokens = _TOKEN.findall(args)
+        esearch = False
+        if tokens and tokens[0].upper() == b"RETURN":
+            esearch = True
+            end = tokens.index(b")")
+            tokens = tokens[end + 1:]
+        if tokens and tokens[0].upper() == b"CHARSET":
+            tokens = tokens[2:]
+        predicate = self._parse_criteria(tokens, use_uid)
+        box = self.server.mailbox
+        with box.lock:
+            hits = [(m["uid"] if use_uid else idx + 1)
+                    for idx, m in enumerate(box.messages) if predicate(m, idx)]
+        if esearch:
+            self.send(b"* ESEARCH (TAG \"x\")" + (b" UID" if use_uid else b"") +
+                      (b" ALL " + _compact(hits) if hits else b"") + b"\r\n")
+        else:
+            self.send(b"* SEARCH" + b"".join(b" %d" % h for h in hits) + b"\r\n")
+        return b"OK SEARCH completed"
+
+    def _fetch(self, args: bytes, use_uid: bool) -> bytes:
+        spec, _, rest = args.partition(b" ")
+        changedsince = None
+        m = re.search(rb"\(CHANGEDSINCE (\d+)\)\s*$", rest)
+        if m:
+            changedsince = int(m.group(1))
+            rest = rest[:m.start()].strip()
+        items = rest.strip()
+        if items.startswith(b"(") and items.endswith(b")"):
+            items = items[1:-1]
+        wants = items.upper()
+        box = self.server.mailbox
+        with box.lock:
+            for idx in self._numbers(spec, use_uid):
+                msg = box.messages[idx]
+                if changedsince is not None and msg["modseq"] <= changedsince:
+                    continue
+                parts = []
+                if use_uid or b"UID" in wants:
+                    parts.append(b"UID %d" % msg["uid"])
+                if changedsince is not None:
+                    parts.append(b"MODSEQ (%d)" % msg["modseq"])
+                literal = None
+                section = _SECTION.search(items)
+                if section:
+                    literal = self._section(msg, section)
+                    if section.group(1).upper() == b"BODY" and b"\\Seen" not in msg["flags"]:
+                        msg["flags"].append(b"\\Seen")
+                elif re.search(rb"\bRFC822\b(?!\.)", wants):
+                    literal = msg["raw"]
+                    if b"\\Seen" not in msg["flags"]:
+                        msg["flags"].append(b"\\Seen")
+                if b"FLAGS" in wants:
+                    parts.append(b"FLAGS (" + b" ".join(msg["flags"]) + b")")
+                if b"RFC822.SIZE" in wants:
+                    parts.append(b"RFC822.SIZE %d" % len(msg["raw"]))
+                head = b"* %d FETCH (" % (idx + 1) + b" ".join(parts)
+                if literal is not None:
+                    name = b"RFC822" if not section else b"BODY[" + section.group(2).upper() + b"]"
+                    if section and section.group(3):
+                        name += b"<" + section.group(3) + b">"
+                    head += (b" " if parts else b"") + name + b" {%d}\r\n" % len(literal)
+                    self.send(head + literal + b")\r\n")
+                else:
+                    self.send(head + b")\r\n")
+        return b"OK FETCH completed"
+
+    @staticmethod
+    def _section(msg, section) -> bytes:
+        raw = msg["raw"]
+        header_end = raw.find(b"\n\n")
+        header_end = len(raw) if header_end < 0 else header_end + 2
+        name = section.group(2).upper()
+        if name.startswith(b"HEADER.FIELDS"):
+            wanted = {f.lower() for f in re.findall(rb"[A-Za-z0-9-]+", name[len(b"HEADER.FIELDS"):])}
+            lines = [l for l in raw[:header_end].splitlines(keepends=True)
+                     if l.split(b":", 1)[0].lower() in wanted]
+            data = b"".join(lines) + b"\r\n"
+        elif name == b"HEADER":
+            data = raw[:header_end]
+        elif name == b"TEXT":
+            data = raw[header_end:]
+        else:
+            data = raw
+        if section.group(3):
+            start, count = int(section.group(3)), int(section.group(4))
+            data = data[start:start + count]
+        return data
+
+
+def _compact(nums: List[int]) -> bytes:
+    """Sequence-set encode sorted numbers: [1,2,3,7] -> b'1:3,7'"""
+    out, start, prev = [], None, None
+    for n in nums:
+        if start is None:
+            start = prev = n
+        elif n == prev + 1:
+            prev = n
+        else:
+            out.append(b"%d" % start if start == prev else b"%d:%d" % (start, prev))
+            start = prev = n
+    if start is not None:
+        out.append(b"%d" % start if start == prev else b"%d:%d" % (start, prev))
+    return b",".join(out)
+
+
+class LocalIMAPServer(socketserver.ThreadingTCPServer):
+    """
+    Usage:
+        with LocalIMAPServer(latency=0.01) as server:
+            server.mailbox.append(make_message(1))
+            conn = imaplib.IMAP4("127.0.0.1", server.port)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0, capabilities=(b"IMAP4rev1", b"CONDSTORE", b"ESEARCH")):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.capabilities = list(capabilities)
+        self.mailbox = Mailbox()
+        self.commands: List[bytes] = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,156 @@
+"""
+Tests for ContentExtractor's async path
+
+Verifies process-pool PDF extraction, page streaming, the content-hash
+extraction cache (hits, renames, LRU eviction), per-file timeouts and
+resubmission of calls whose worker was recycled by another call's timeout.
+"""
+
+import os
+import time
+import asyncio
+import pytest
+from haitham_voice_agent.intelligence import content_extractor as ce
+from haitham_voice_agent.intelligence.content_extractor import ContentExtractor, ExtractionCache
+
+
+_real_read_pdf_pages = ce._read_pdf_pages
+
+
+def _stalling_read(path, start=0, count=ce.MAX_PDF_PAGES):
+    """Worker stand-in: stuck.pdf never finishes; a first attempt on any other file stalls too"""
+    marker = path + ".attempted"
+    if path.endswith("stuck.pdf") or not os.path.exists(marker):
+        open(marker, "w").close()
+        time.sleep(60)
+    return _real_read_pdf_pages(path, start, count)
+
+
+def _write_pdf(path, pages):
+    """Minimal valid PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return path
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    ex = ContentExtractor(cache=ExtractionCache(cache_dir=str(tmp_path / "cache")), workers=2)
+    yield ex
+    ex.shutdown()
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    return _write_pdf(tmp_path / "report.pdf", [f"Page {i} quarterly numbers" for i in range(12)])
+
+
+@pytest.mark.asyncio
+async def test_async_pdf_matches_sync(extractor, pdf):
+    text = await extractor.extract_text_async(str(pdf))
+    assert "Page 0 quarterly" in text and "Page 11 quarterly" in text
+    assert text == ContentExtractor(cache=ExtractionCache(cache_dir=str(pdf.parent / "other"))).extract_text(str(pdf))
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeat_and_renamed_copies(extractor, pdf, monkeypatch):
+    await extractor.extract_text_async(str(pdf))
+
+    copy = pdf.with_name("copy of report.pdf")
+    copy.write_bytes(pdf.read_bytes())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PDF parsed again")
+    monkeypatch.setattr(ce, "_read_pdf_pages", fail)
+
+    assert "Page 3" in await extractor.extract_text_async(str(copy))
+    assert "Page 3" in extractor.extract_text(str(pdf))
+
+
+@pytest.mark.asyncio
+async def test_page_streaming_in_order(extractor, pdf):
+    pages = [(i, text) async for i, text in extractor.iter_pdf_pages(str(pdf))]
+
+    assert [i for i, _ in pages] == list(range(12))
+    assert "Page 7" in pages[7][1]
+    # Fully streamed documents land in the cache
+    assert extractor.cache.get(extractor.cache.key_for(str(pdf)))["total"] == 12
+
+
+@pytest.mark.asyncio
+async def test_text_files_and_unsupported_types(extractor, tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("hello " * 10)
+    assert await extractor.extract_text_async(str(note), max_length=20) != note.read_text()
+    assert (await extractor.extract_text_async(str(tmp_path / "clip.mp4"))) is None
+
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"\x00")
+    assert "clip.mp4" in await extractor.extract_text_async(str(clip))
+
+
+@pytest.mark.asyncio
+async def test_timeout_returns_none_and_recovers(extractor, pdf):
+    assert await extractor.extract_text_async(str(pdf), timeout=0.0001) is None
+    assert "Page 1" in await extractor.extract_text_async(str(pdf))
+
+
+@pytest.mark.asyncio
+async def test_timeout_only_fails_the_stuck_call(extractor, pdf, tmp_path, monkeypatch):
+    stuck = _write_pdf(tmp_path / "stuck.pdf", ["never parsed"])
+    monkeypatch.setattr(ce, "_read_pdf_pages", _stalling_read)
+
+    async def stuck_call():
+        # Time out only once the other call is in flight on the same pool
+        while not os.path.exists(str(pdf) + ".attempted"):
+            await asyncio.sleep(0.01)
+        return await extractor.extract_text_async(str(stuck), timeout=0.5)
+
+    stuck_text, text = await asyncio.gather(stuck_call(), extractor.extract_text_async(str(pdf), timeout=30))
+
+    assert stuck_text is None
+    # Killed with the recycled pool, resubmitted and parsed on the fresh one
+    assert "Page 1" in text
+
+
+def test_cache_evicts_oldest_entries(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"), max_bytes=3000)
+    for i in range(6):
+        cache.put(f"key{i}", {"pages": ["x" * 900], "total": 1})
+        os.utime(cache._entry(f"key{i}"), (1000 + i, 1000 + i))
+
+    remaining = sorted(p.stem for p in (tmp_path / "cache").glob("*.json"))
+    assert "key0" not in remaining and "key5" in remaining
+    assert sum(p.stat().st_size for p in (tmp_path / "cache").glob("*.json")) <= 3000
+    # The running total tracks the directory after eviction
+    assert cache._total == cache._scan_size()
+
+
+def test_overwriting_an_entry_counts_only_the_size_change(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"), max_bytes=3000)
+    cache.put("first", {"pages": ["x" * 100], "total": 1})
+    for size in (900, 500, 900):
+        cache.put("same", {"pages": ["x" * size], "total": 1})
+
+    assert cache._total == cache._scan_size()
+    assert sorted(p.stem for p in (tmp_path / "cache").glob("*.json")) == ["first", "same"]
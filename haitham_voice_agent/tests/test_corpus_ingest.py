@@ -0,0 +1,121 @@
+"""
+Tests for the corpus ingestion checkpoints
+
+Resume from the manifest, truncation of records written after the last
+checkpoint, and retry of files whose handler failed or whose worker died.
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from ingest_haithm_corpus import CorpusIngestor  # noqa: E402
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "corpus"
+    root.mkdir()
+    (root / "notes.txt").write_text("first note\nsecond line", encoding="utf-8")
+    (root / "plan.md").write_text("# Plan\nship it", encoding="utf-8")
+    return root
+
+
+def _ingest(root, output, workers=0):
+    ingestor = CorpusIngestor(str(root), str(output), max_chars=2000, force=False, workers=workers)
+    ingestor.run()
+    return ingestor
+
+
+def _manifest(output):
+    path = output.with_name(output.stem + ".manifest.jsonl")
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _records(output):
+    return [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_resume_skips_checkpointed_files(corpus, tmp_path):
+    output = tmp_path / "raw.jsonl"
+    first = _ingest(corpus, output)
+    assert first.stats["ingested"] == 2
+
+    (corpus / "later.txt").write_text("added after the first run", encoding="utf-8")
+    (corpus / "copy.txt").write_text("added after the first run", encoding="utf-8")
+    second = _ingest(corpus, output)
+
+    assert second.stats["resumed"] == 2 and second.stats["ingested"] == 1
+    assert second.stats["duplicates"] == 1
+    assert len(_records(output)) == 3
+    assert len(_manifest(output)) == 3
+
+
+def test_resume_truncates_records_after_last_checkpoint(corpus, tmp_path):
+    output = tmp_path / "raw.jsonl"
+    _ingest(corpus, output)
+    complete = output.read_bytes()
+
+    # Crash after writing part of a file's records, before its checkpoint line
+    with open(output, "ab") as f:
+        f.write(b'{"id": "torn", "text": "half a rec')
+    with open(output.with_name("raw.manifest.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"sha256": "torn')
+
+    second = _ingest(corpus, output)
+
+    assert second.stats["resumed"] == 2
+    assert output.read_bytes() == complete
+
+
+def test_failed_file_is_retried(corpus, tmp_path, monkeypatch):
+    output = tmp_path / "raw.jsonl"
+    handle_text = CorpusIngestor._handle_text
+
+    def flaky(self, path):
+        if path.name == "notes.txt":
+            raise MemoryError("handler crashed")
+        return handle_text(self, path)
+    monkeypatch.setattr(CorpusIngestor, "_handle_text", flaky)
+
+    first = _ingest(corpus, output)
+    assert first.stats["skipped"] == 1
+    assert [Path(e["path"]).name for e in _manifest(output)] == ["plan.md"]
+
+    monkeypatch.setattr(CorpusIngestor, "_handle_text", handle_text)
+    second = _ingest(corpus, output)
+
+    assert second.stats["resumed"] == 1 and second.stats["ingested"] == 1
+    assert sorted(Path(r["source_path"]).name for r in _records(output)) == ["notes.txt", "plan.md"]
+
+
+def test_crashed_worker_pool_is_restarted(corpus, tmp_path, monkeypatch):
+    output = tmp_path / "raw.jsonl"
+    for i in range(4):
+        (corpus / f"extra{i}.txt").write_text(f"extra {i}", encoding="utf-8")
+    (corpus / "crash.txt").write_text("kills the worker", encoding="utf-8")
+    handle_text = CorpusIngestor._handle_text
+    crash = tmp_path / "crash.flag"
+    crash.touch()
+
+    def dying(self, path):
+        if path.name == "crash.txt" and crash.exists():
+            os._exit(1)  # e.g. the OOM killer
+        return handle_text(self, path)
+    monkeypatch.setattr(CorpusIngestor, "_handle_text", dying)
+
+    first = _ingest(corpus, output, workers=1)  # Must not raise BrokenProcessPool
+    done = {Path(e["path"]).name for e in _manifest(output)}
+    assert "crash.txt" not in done
+    assert first.stats["ingested"] + first.stats["skipped"] == 7
+
+    crash.unlink()
+    second = _ingest(corpus, output, workers=1)
+    assert second.stats["resumed"] == len(done)
+    assert {Path(e["path"]).name for e in _manifest(output)} == {
+        "notes.txt", "plan.md", "crash.txt", "extra0.txt", "extra1.txt", "extra2.txt", "extra3.txt"}
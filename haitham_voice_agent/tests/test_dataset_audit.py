@@ -0,0 +1,83 @@
+"""
+Tests for the training data audit
+
+Combined-regex leakage matching, MinHash/LSH near-duplicates and the
+cross-split audit (inline and with worker processes).
+"""
+
+import re
+import json
+
+import pytest
+
+from finetune.dataset_audit import (
+    LEAKAGE, PatternSet, MinHasher, audit_splits, near_duplicate_clusters, shingles, similarity
+)
+
+BASE = "الاجتماعات الطويلة تضيع الوقت إذا ما كان فيه هدف واضح وقرار في النهاية ومسؤول عن التنفيذ بعدها مباشرة"
+
+
+def test_pattern_set_matches_like_the_per_pattern_loop():
+    patterns = [r"(?i)^your task is", r"(?i)^act as", r"do not reveal"]
+    prompts = PatternSet(patterns)
+    for text in ["Your task is to", "ACT AS a judge", "please do not reveal", "you are fine", "x your task is"]:
+        expected = next((p for p in patterns if re.search(p, text)), None)
+        assert prompts.first_match(text) == expected
+        assert prompts.search(text) == (expected is not None)
+
+    assert LEAKAGE.first_match("As an AI developed by openai") == "As an AI"
+    assert LEAKAGE.all_matches("see :contentReference[oaicite:2]{index=2} from OpenAI") == [
+        "OpenAI", r":contentReference\[oaicite:\d+\]\{index=\d+\}"
+    ]
+    assert LEAKAGE.first_match("نص نظيف") is None
+
+
+def test_first_matches_on_series():
+    pd = pytest.importorskip("pandas")
+    texts = pd.Series(["clean", "uses web.run here", "I am an AI"])
+    assert list(LEAKAGE.first_matches(texts).fillna("-")) == ["-", r"web\.run", "I am an AI"]
+
+
+def test_minhash_near_duplicates():
+    hasher = MinHasher(num_perm=64)
+    near = BASE.replace("الطويلة", "الطويله").replace("مباشرة", "مباشرةً") + " فعلاً"
+    other = "خطة التسويق تحتاج ميزانية واضحة وقناة واحدة نبدأ فيها قبل ما نوسع على كل المنصات"
+    sigs = [hasher.signature(shingles(t)) for t in (BASE, other, near)]
+
+    assert similarity(sigs[0], sigs[2]) > 0.7
+    assert similarity(sigs[0], sigs[1]) < 0.2
+    assert near_duplicate_clusters(sigs, threshold=0.7) == [[0, 2]]
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write((row if isinstance(row, str) else json.dumps(row, ensure_ascii=False)) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_audit_splits(tmp_path, workers):
+    train = _write(tmp_path / "train.jsonl", [
+        {"instruction": "سؤال", "input": "", "output": BASE},
+        {"instruction": "سؤال", "input": "", "output": BASE},
+        {"instruction": "x", "input": "", "output": "As an AI language model I cannot"},
+        "{not json",
+    ])
+    val = _write(tmp_path / "val.jsonl", [
+        {"messages": [{"role": "user", "content": "سؤال"}, {"role": "assistant", "content": BASE + " فعلاً"}]},
+        {"messages": [{"role": "assistant", "content": "رد مختلف تماماً عن أي شيء في بيانات التدريب الحالية"}]},
+    ])
+
+    audit = audit_splits({"train": train, "val": val}, threshold=0.7, workers=workers, chunk_size=2)
+
+    assert audit["splits"]["train"]["records"] == 3
+    assert audit["splits"]["train"]["bad_lines"] == 1
+    assert audit["splits"]["train"]["leakage"] == {"As an AI": 1}
+    assert audit["splits"]["train"]["exact_duplicates"] == 1
+    assert audit["splits"]["train"]["near_duplicates"] == 1
+    assert audit["cross_split"]["train <> val"]["clusters"] == 1
+    assert audit["train_eval_leakage"]["val"]["records"] == 1
+    assert audit["train_eval_leakage"]["val"]["ratio"] == 0.5
+    assert audit["clean"] is False
+    json.dumps(audit)
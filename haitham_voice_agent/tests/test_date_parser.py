@@ -0,0 +1,132 @@
+"""
+Tests for the local date parser
+
+Covers Arabic and English relative dates, weekdays, times and timezones,
+extraction of a due date from a task command, memoization, and that
+CalendarTools / OllamaOrchestrator only reach the LLM for phrases the
+parser cannot handle.
+"""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from haitham_voice_agent.tools import date_parser
+from haitham_voice_agent.tools.date_parser import parse_datetime, extract_datetime, has_date_hint
+
+NOW = datetime.datetime(2025, 12, 3, 14, 0)  # Wednesday afternoon
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("بكرة الساعة 5", datetime.datetime(2025, 12, 4, 17, 0)),
+    ("بكره الساعه ٥ ونص", datetime.datetime(2025, 12, 4, 17, 30)),
+    ("يوم السبت الساعة 4 الا ربع", datetime.datetime(2025, 12, 6, 15, 45)),
+    ("بعد بكرة الصبح", datetime.datetime(2025, 12, 5, 9, 0)),
+    ("بعد ساعتين", datetime.datetime(2025, 12, 3, 16, 0)),
+    ("5 ديسمبر 10:30", datetime.datetime(2025, 12, 5, 10, 30)),
+    ("next Monday 3pm", datetime.datetime(2025, 12, 8, 15, 0)),
+    ("next Wednesday", datetime.datetime(2025, 12, 10, 9, 0)),
+    ("wednesday at 8pm", datetime.datetime(2025, 12, 3, 20, 0)),
+    ("in 45 minutes", datetime.datetime(2025, 12, 3, 14, 45)),
+    ("at 10", datetime.datetime(2025, 12, 4, 10, 0)),  # already past today
+    ("March 1st", datetime.datetime(2026, 3, 1, 9, 0)),
+    ("noon tomorrow", datetime.datetime(2025, 12, 4, 12, 0)),
+])
+def test_local_phrases(text, expected):
+    assert parse_datetime(text, NOW) == expected
+
+
+def test_todays_weekday_once_past_means_next_week():
+    # NOW is a Wednesday at 14:00: the default 09:00 has already passed
+    assert parse_datetime("wednesday", NOW) == datetime.datetime(2025, 12, 10, 9, 0)
+    assert parse_datetime("يوم الأربعاء", NOW) == datetime.datetime(2025, 12, 10, 9, 0)
+    assert parse_datetime("wednesday at 8pm", NOW) == datetime.datetime(2025, 12, 3, 20, 0)
+    # An explicit "this" or "today" keeps today
+    assert parse_datetime("this wednesday", NOW) == datetime.datetime(2025, 12, 3, 9, 0)
+    assert parse_datetime("today", NOW) == datetime.datetime(2025, 12, 3, 9, 0)
+
+
+def test_timezones():
+    cairo = parse_datetime("tomorrow 3pm Cairo time", NOW)
+    assert cairo == datetime.datetime(2025, 12, 4, 15, 0, tzinfo=ZoneInfo("Africa/Cairo"))
+    assert str(cairo.tzinfo) == "Africa/Cairo"
+
+    riyadh = parse_datetime("الساعة 5 بتوقيت الرياض", NOW)
+    assert riyadh.utcoffset() == datetime.timedelta(hours=3) and riyadh.hour == 17
+
+    offset = parse_datetime("9am GMT+4", NOW)
+    assert offset.utcoffset() == datetime.timedelta(hours=4) and offset.hour == 9
+
+
+def test_rejects_what_it_does_not_understand():
+    assert parse_datetime("sometime after the holidays", NOW) is None
+    assert parse_datetime("next week", NOW) is None
+    assert parse_datetime("meeting with Cairo team", NOW) is None
+
+
+def test_memoized_per_string_and_day():
+    date_parser._compile.cache_clear()
+    date_parser._anchor.cache_clear()
+    for _ in range(3):
+        parse_datetime("بكرة الساعة 5", NOW)
+    parse_datetime("بكرة الساعة 5", NOW + datetime.timedelta(days=1))
+    assert date_parser._compile.cache_info().misses == 1
+    assert date_parser._anchor.cache_info().misses == 2
+
+
+def test_extract_task_command():
+    due, title = extract_datetime("ذكرني أدفع الفاتورة بكرة الساعة 5", NOW)
+    assert due == datetime.datetime(2025, 12, 4, 17, 0) and title == "أدفع الفاتورة"
+
+    due, title = extract_datetime("Remind me to call mom next Monday at 3pm", NOW)
+    assert due == datetime.datetime(2025, 12, 8, 15, 0) and title == "call mom"
+
+    due, title = extract_datetime("أضف مهمة مراجعة العقد", NOW)
+    assert due is None and title == "مراجعة العقد" and not has_date_hint(title)
+
+    assert has_date_hint(extract_datetime("call 3 clients before end of next month", NOW)[1])
+
+
+class _Router:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_with_gemini(self, prompt, temperature=0.0):
+        self.prompts.append(prompt)
+        return {"content": "2025-12-01T17:00:00+04:00", "model": "gemini"}
+
+
+@pytest.mark.asyncio
+async def test_calendar_only_uses_llm_as_last_resort(monkeypatch):
+    import haitham_voice_agent.llm_router as llm_router
+    from haitham_voice_agent.tools import calendar as calendar_module
+
+    router = _Router()
+    monkeypatch.setattr(llm_router, "get_router", lambda: router)
+    monkeypatch.setattr(calendar_module, "get_credential_store", lambda: None)
+    calendar = calendar_module.CalendarTools()
+
+    parsed = await calendar._smart_parse_date("tomorrow at 5pm Dubai time")
+    assert parsed.hour == 17 and str(parsed.tzinfo) == "Asia/Dubai"
+    assert router.prompts == []
+
+    # Unknown zone name: LLM result (a dict) is used
+    parsed = await calendar._smart_parse_date("5pm Reykjavik time, utc based")
+    assert parsed == datetime.datetime(2025, 12, 1, 17, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=4)))
+    assert len(router.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_task_extraction_skips_ollama(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from haitham_voice_agent import ollama_orchestrator
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("Ollama should not be called")
+
+    monkeypatch.setattr(ollama_orchestrator.aiohttp, "ClientSession", no_network)
+    orchestrator = ollama_orchestrator.OllamaOrchestrator()
+    details = await orchestrator.extract_task_details("ذكرني أتصل بالبنك بكرة الساعة 10")
+    assert details["title"] == "أتصل بالبنك"
+    assert details["due_date"].endswith("T10:00:00")
@@ -0,0 +1,102 @@
+"""
+Tests for the Layer 3 local search engine
+
+Verifies crawling with ignore rules, name/content ranking, directory
+scoping, incremental updates and re-crawl change detection.
+"""
+
+import pytest
+from haitham_voice_agent.tools.system_awareness.deep_search import DeepSearch
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "Documents"
+    (root / "Projects" / "HVA").mkdir(parents=True)
+    (root / "Invoices").mkdir()
+    (root / "node_modules" / "pkg").mkdir(parents=True)
+    (root / ".git").mkdir()
+
+    (root / "Projects" / "HVA" / "roadmap.md").write_text("Quarterly milestones for the voice agent")
+    (root / "Invoices" / "invoice_march.txt").write_text("Electricity bill, total 420")
+    (root / "Invoices" / "roadmap_notes.txt").write_text("unrelated")
+    (root / "node_modules" / "pkg" / "roadmap.md").write_text("should be ignored")
+    (root / ".git" / "roadmap").write_text("hidden")
+    return root
+
+
+@pytest.fixture
+def engine(tree, tmp_path):
+    search = DeepSearch(
+        db_path=str(tmp_path / "deep.db"),
+        roots=[str(tree)],
+        ignore_dirs={"node_modules"},
+        workers=4
+    )
+    search.crawl()
+    yield search
+    search.close()
+
+
+def test_crawl_respects_ignore_rules(engine, tree):
+    paths = [r["path"] for r in engine.search("roadmap")]
+    assert str(tree / "node_modules" / "pkg" / "roadmap.md") not in paths
+    assert all(".git" not in p for p in paths)
+
+
+def test_name_match_outranks_content_match(engine, tree):
+    (tree / "Projects" / "meeting.txt").write_text("roadmap roadmap roadmap review")
+    engine.crawl()
+
+    names = [r["name"] for r in engine.search("roadmap")]
+    assert names[0] == "roadmap.md"
+    assert names.index("meeting.txt") > names.index("roadmap_notes.txt")
+
+
+def test_content_is_searchable(engine):
+    results = engine.search("electricity")
+    assert [r["name"] for r in results] == ["invoice_march.txt"]
+
+
+def test_prefix_query(engine):
+    names = [r["name"] for r in engine.search("invo")]
+    assert "invoice_march.txt" in names
+    assert "Invoices" in names
+
+
+def test_only_in_scopes_results(engine, tree):
+    results = engine.search("roadmap", only_in=str(tree / "Invoices"))
+    assert [r["name"] for r in results] == ["roadmap_notes.txt"]
+
+
+def test_limit(engine):
+    assert len(engine.search("roadmap", limit=1)) == 1
+
+
+def test_incremental_changes(engine, tree):
+    new_file = tree / "Projects" / "HVA" / "budget.txt"
+    new_file.write_text("forecast for next year")
+    removed = tree / "Invoices" / "invoice_march.txt"
+    removed.unlink()
+
+    engine.apply_changes({str(new_file): "created", str(removed): "deleted"})
+
+    assert engine.search("forecast")[0]["name"] == "budget.txt"
+    assert engine.search("electricity") == []
+
+
+def test_recrawl_only_touches_changed_files(engine, tree):
+    (tree / "Projects" / "HVA" / "roadmap.md").write_text("changed text with more bytes")
+    (tree / "Invoices" / "roadmap_notes.txt").unlink()
+
+    stats = engine.crawl()
+
+    # Only the edited file and the touched directories are re-indexed
+    assert stats["removed"] == 1
+    assert 1 <= stats["indexed"] <= 3
+    assert engine.search("changed")[0]["name"] == "roadmap.md"
+
+
+def test_recent_files(engine, tree):
+    recent = engine.recent_files(limit=10)
+    assert str(tree / "Projects" / "HVA" / "roadmap.md") in recent
@@ -0,0 +1,228 @@
+"""
+Tests for plan execution in the tool dispatcher
+
+Sequential plans by default, dependency DAG from $stepN references in
+parallel plans, concurrent independent steps, per-tool limits, skipping
+dependents of failed steps, cancelling running steps when one raises,
+worker threads for sync tools and per-step timings. Concurrency is asserted through
+rendezvous points and event logs rather than wall-clock limits.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from haitham_voice_agent.dispatcher import ToolDispatcher, primary_result
+
+
+class Rendezvous:
+    """Steps that must be running at the same time: each waits for all the others"""
+
+    def __init__(self, parties):
+        self.parties = parties
+        self.arrived = 0
+        self.event = asyncio.Event()
+
+    async def wait(self):
+        self.arrived += 1
+        if self.arrived == self.parties:
+            self.event.set()
+        await asyncio.wait_for(self.event.wait(), timeout=5)
+
+
+class FakeTool:
+    def __init__(self, log=None):
+        self.log = log if log is not None else []
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def fetch(self, name, ref=None, meet=None, hold=None, signal=None):
+        self.calls.append(name)
+        self.log.append(("start", name))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if meet is not None:
+                await meet.wait()
+            if hold is not None:
+                await asyncio.wait_for(hold.wait(), timeout=5)
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.log.append(("cancelled", name))
+            raise
+        self.running -= 1
+        self.log.append(("end", name))
+        if signal is not None:
+            signal.set()
+        return {"success": True, "id": f"{name}-id", "ref": ref}
+
+    async def fail(self, name):
+        self.calls.append(name)
+        raise ConnectionError(f"{name} unreachable")
+
+    async def open_gate(self, gate):
+        gate.set()
+        return {"success": True}
+
+    def blocking(self, gate):
+        # Only returns True if an async step ran while this one was blocked
+        return {"success": True, "overlapped": gate.wait(timeout=5), "thread": threading.get_ident()}
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def dispatcher(monkeypatch, log):
+    monkeypatch.setattr(ToolDispatcher, "_register_default_tools", lambda self: None)
+    dispatcher = ToolDispatcher()
+    for name in ("calendar", "gmail", "tasks"):
+        dispatcher.register_tool(name, FakeTool(log))
+    return dispatcher
+
+
+def _step(tool, action="fetch", **params):
+    return {"tool": tool, "action": action, "params": params}
+
+
+def _before(log, first, second):
+    return log.index(first) < log.index(second)
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently(dispatcher):
+    meet = Rendezvous(3)  # Deadlocks (and times out) unless all three run at once
+    plan = {"parallel": True, "steps": [
+        _step("calendar", name="events", meet=meet), _step("gmail", name="unread", meet=meet),
+        _step("tasks", name="open", meet=meet)]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert [r.get("id") for r in results] == ["events-id", "unread-id", "open-id"]
+    assert [r["timing"]["step"] for r in results] == [1, 2, 3]
+    assert all(r["timing"]["start"] >= 0 and r["timing"]["duration"] >= 0 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_references_and_tool_limits_order_steps(dispatcher, log):
+    calendar = dispatcher.tools["calendar"]
+    plan = {"parallel": True, "steps": [
+        _step("calendar", name="a"),
+        _step("gmail", name="b", ref="$step1.id"),
+        _step("calendar", name="c"),
+        {**_step("tasks", name="d"), "depends_on": [2]},
+    ]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert results[1]["ref"] == "a-id"
+    assert _before(log, ("end", "a"), ("start", "b"))
+    assert _before(log, ("end", "b"), ("start", "d"))
+    # Same tool: one at a time, in plan order
+    assert calendar.calls == ["a", "c"] and calendar.max_running == 1
+    assert _before(log, ("end", "a"), ("start", "c"))
+
+    dispatcher.register_tool("calendar", FakeTool(), max_concurrency=2)
+    meet = Rendezvous(2)
+    await dispatcher.execute_plan({"parallel": True, "steps": [
+        _step("calendar", name="x", meet=meet), _step("calendar", name="y", meet=meet)]})
+    assert dispatcher.tools["calendar"].max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_skips_dependents_only(dispatcher):
+    plan = {"parallel": True, "steps": [
+        _step("gmail", "fail", name="mail"),
+        _step("calendar", name="events"),
+        _step("tasks", name="summary", ref="$step1.id"),
+    ]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert results[0]["error_type"] == "ConnectionError"
+    assert results[1]["success"]
+    assert results[2]["error_type"] == "DependencyFailedError"
+    assert "mail unreachable" in results[2]["message"]
+    assert dispatcher.tools["tasks"].calls == []
+    assert primary_result(results) is results[0]
+
+
+@pytest.mark.asyncio
+async def test_plans_are_sequential_by_default(dispatcher, log):
+    # e.g. no email is sent when creating the event failed
+    plan = {"steps": [_step("calendar", "fail", name="event"), _step("gmail", name="invite")]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert results[1]["error_type"] == "DependencyFailedError"
+    assert dispatcher.tools["gmail"].calls == []
+
+    await dispatcher.execute_plan({"steps": [_step("calendar", name="a"), _step("gmail", name="b"),
+                                             _step("tasks", name="c")]})
+    assert _before(log, ("end", "a"), ("start", "b")) and _before(log, ("end", "b"), ("start", "c"))
+
+
+@pytest.mark.asyncio
+async def test_raising_step_cancels_running_siblings(dispatcher, log):
+    never = asyncio.Event()
+    plan = {"parallel": True, "steps": [
+        _step("calendar", name="slow", hold=never),
+        {"tool": "gmail", "action": "fetch", "params": None},  # Raises before dispatch
+    ]}
+
+    with pytest.raises(AttributeError):
+        await dispatcher.execute_plan(plan)
+
+    assert ("cancelled", "slow") in log
+
+
+@pytest.mark.asyncio
+async def test_same_tool_failure_skips_later_steps_of_that_tool(dispatcher):
+    plan = {"parallel": True, "steps": [
+        _step("gmail", "fail", name="first"),
+        _step("calendar", name="events"),
+        _step("gmail", name="second"),
+        _step("gmail", name="third"),
+    ]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert results[1]["success"]
+    assert [r["error_type"] for r in (results[2], results[3])] == ["DependencyFailedError"] * 2
+    assert dispatcher.tools["gmail"].calls == ["first"]
+
+    # Tools registered as concurrency-safe keep their steps independent
+    dispatcher.register_tool("gmail", FakeTool(), max_concurrency=2)
+    results = await dispatcher.execute_plan(plan)
+    assert results[2]["success"] and results[3]["success"]
+
+
+@pytest.mark.asyncio
+async def test_forward_references_are_not_resolved(dispatcher, log):
+    b_done = asyncio.Event()
+    plan = {"parallel": True, "steps": [
+        _step("calendar", name="a", hold=b_done),
+        _step("calendar", name="c", ref="$step3.id"),
+        _step("gmail", name="b", signal=b_done),
+    ]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    # Step 3 finished before step 2 started, but step 2 never waited for it
+    assert _before(log, ("end", "b"), ("start", "c"))
+    assert results[1]["ref"] == "$step3.id"
+
+
+@pytest.mark.asyncio
+async def test_sync_tools_run_in_worker_threads(dispatcher):
+    gate = threading.Event()
+    plan = {"parallel": True, "steps": [_step("calendar", "blocking", gate=gate), _step("gmail", "open_gate", gate=gate)]}
+
+    results = await dispatcher.execute_plan(plan)
+
+    assert results[0]["overlapped"] is True
+    assert results[0]["thread"] != threading.get_ident()
@@ -0,0 +1,142 @@
+"""
+Tests for the consolidated email analysis pipeline
+
+A fake router counts LLM calls: one structured call per email, none on
+re-open, one call per batch for list prefetch, and concurrent requests for
+an email that is being prefetched share the batch result.
+"""
+
+import json
+import asyncio
+import pytest
+
+from haitham_voice_agent.tools.gmail import llm_helper
+from haitham_voice_agent.tools.gmail.llm_helper import EmailLLMHelpers
+from haitham_voice_agent.tools.gmail.analysis_cache import EmailAnalysisCache
+
+
+def _analysis(message_id=None):
+    data = {
+        "main_idea": "طلب مراجعة العقد",
+        "key_points": ["الموعد يوم الخميس"],
+        "action_items": [{"task": "مراجعة العقد", "due": "الخميس", "priority": "high"}],
+        "sentiment": "Neutral",
+        "tone": "professional",
+        "urgency": "high",
+    }
+    if message_id is not None:
+        data["id"] = message_id
+    return data
+
+
+class FakeRouter:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+
+    async def generate_with_gemini(self, prompt, temperature=0.7, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if "JSON array" in prompt:
+            ids = [line[5:-1] for line in prompt.splitlines() if line.startswith("[id: ")]
+            content = json.dumps([_analysis(i) for i in ids], ensure_ascii=False)
+        else:
+            content = "```json\n" + json.dumps(_analysis(), ensure_ascii=False) + "\n```"
+        return {"content": content, "model": "fake"}
+
+
+def _email(i, body=None):
+    return {"id": f"m{i}", "from": "a@example.com", "subject": f"Contract {i}",
+            "body_text": body if body is not None else f"Please review contract {i} by Thursday."}
+
+
+@pytest.fixture
+def helpers(tmp_path, monkeypatch):
+    router = FakeRouter()
+    monkeypatch.setattr(llm_helper, "get_router", lambda: router)
+    h = EmailLLMHelpers(cache=EmailAnalysisCache(db_path=str(tmp_path / "analysis.db")))
+    yield h
+    h.cache.close()
+
+
+@pytest.mark.asyncio
+async def test_one_structured_call_then_cached(helpers):
+    first = await helpers.summarize_email(_email(1))
+
+    assert len(helpers.router.prompts) == 1
+    assert first["analysis"]["action_items"][0]["priority"] == "high"
+    assert first["analysis"]["sentiment"] == "neutral"
+    assert "**الفكرة الرئيسية**" in first["summary"] and not first["cached"]
+
+    again = await helpers.summarize_email(_email(1))
+    assert again["cached"] and again["summary"] == first["summary"]
+    assert len(helpers.router.prompts) == 1
+
+    # Changed body => new analysis
+    await helpers.summarize_email(_email(1, body="Updated: the meeting moved to Sunday."))
+    assert len(helpers.router.prompts) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_survives_restart(helpers, tmp_path):
+    await helpers.analyze_email(_email(1))
+    fresh = EmailLLMHelpers(cache=EmailAnalysisCache(db_path=str(tmp_path / "analysis.db")))
+
+    result = await fresh.analyze_email(_email(1))
+    assert result["cached"]
+    assert len(helpers.router.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_batches_list_and_loads_bodies(helpers):
+    listed = [{"id": f"m{i}", "subject": f"Contract {i}", "from": "a@example.com", "snippet": "..."}
+              for i in range(10)]
+    loaded = []
+
+    async def loader(message_id):
+        loaded.append(message_id)
+        return _email(int(message_id[1:]))
+
+    await helpers.schedule_prefetch(listed, loader=loader)
+
+    assert len(loaded) == 10
+    assert len(helpers.router.prompts) == 2  # PREFETCH_BATCH = 8 -> 8 + 2
+    opened = await helpers.analyze_email(_email(4))
+    assert opened["cached"] and len(helpers.router.prompts) == 2
+
+    # Already analyzed messages are not reloaded
+    loaded.clear()
+    await helpers.schedule_prefetch(listed, loader=loader)
+    assert loaded == []
+
+
+@pytest.mark.asyncio
+async def test_open_during_prefetch_joins_batch(helpers):
+    helpers.router.delay = 0.05
+    emails = [_email(i) for i in range(3)]
+
+    batch = asyncio.create_task(helpers.analyze_emails(emails))
+    await asyncio.sleep(0.01)
+    opened = await helpers.analyze_email(_email(1))
+    await batch
+
+    assert opened["main_idea"] and opened["cached"]
+    assert len(helpers.router.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_failures(helpers, monkeypatch):
+    async def prose(prompt, temperature=0.7, **kwargs):
+        return {"content": "Contract review requested for Thursday.", "model": "fake"}
+
+    monkeypatch.setattr(helpers.router, "generate_with_gemini", prose)
+    result = await helpers.summarize_email(_email(1))
+    assert result["summary"] == "Contract review requested for Thursday."
+
+    async def down(prompt, temperature=0.7, **kwargs):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(helpers.router, "generate_with_gemini", down)
+    result = await helpers.summarize_email(_email(2))
+    assert result["error"]
+    assert not helpers.cache.has("m2")
@@ -0,0 +1,93 @@
+"""
+Tests for the batched evaluation harness
+
+Checks, batching by sampling parameters and the resumable result cache;
+generation is replaced by a fake so no model is loaded.
+"""
+
+import json
+
+from finetune.eval_harness import EvalCase, EvalRunner, ResultCache, Sampling, write_markdown, CHECKS
+
+GREEDY = Sampling(max_new_tokens=100, do_sample=False)
+
+
+class FakeGenerate:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def __call__(self, model, tokenizer, prompts, sampling, device):
+        self.calls.append((list(prompts), sampling))
+        return [(self.responses[p], 7) for p in prompts]
+
+
+def test_checks():
+    case = EvalCase(id="q", prompt="مين أنت؟", meta={"expect": "open_app"})
+    assert not CHECKS["repetition"](case, "مين أنت؟ أنا هيثم")["passed"]
+    assert CHECKS["repetition"](case, "أنا هيثم")["passed"]
+    assert not CHECKS["identity"](case, "I am ChatGPT")["passed"]
+    assert not CHECKS["generic_persona"](case, "أنا مساعد ذكي")["passed"]
+
+    output = 'Output: {"tool": "open_app", "params": {"app": "Terminal"}} trailing'
+    assert CHECKS["json_valid"](case, output)["parsed"]["tool"] == "open_app"
+    assert CHECKS["expected_tool"](case, output)["passed"]
+    assert not CHECKS["json_valid"](case, "{broken")["passed"]
+    assert not CHECKS["expected_tool"](case, '{"tool": "web_search"}')["passed"]
+
+
+def test_batches_by_sampling_and_resumes_from_cache(tmp_path):
+    cases = [EvalCase(id=f"p{i}", prompt=f"persona {i}") for i in range(3)]
+    cases += [EvalCase(id=f"j{i}", prompt=f"cmd {i}", sampling=GREEDY, checks=("json_valid",)) for i in range(2)]
+    responses = {c.prompt: '{"action": "open"}' for c in cases}
+    fake = FakeGenerate(responses)
+    cache_path = tmp_path / "cache.jsonl"
+
+    runner = EvalRunner(None, None, "cpu", "model-a", ResultCache(cache_path), batch_size=2, generate_fn=fake)
+    results = runner.run(cases)
+    assert [r["id"] for r in results] == ["p0", "p1", "p2", "j0", "j1"]
+    assert all(r["passed"] and not r["cached"] for r in results)
+    assert sorted(len(prompts) for prompts, _ in fake.calls) == [1, 2, 2]
+    assert all(p.startswith("cmd") == (sampling == GREEDY) for prompts, sampling in fake.calls for p in prompts)
+    assert runner.generated_tokens == 35
+
+    # A new run (fresh process) only generates prompts it has not seen
+    fake.calls.clear()
+    cases.append(EvalCase(id="j9", prompt="cmd 9", sampling=GREEDY, checks=("json_valid",)))
+    fake.responses["cmd 9"] = "not json"
+    runner = EvalRunner(None, None, "cpu", "model-a", ResultCache(cache_path), batch_size=2, generate_fn=fake)
+    results = runner.run(cases)
+    assert fake.calls == [(["cmd 9"], GREEDY)]
+    assert [r["cached"] for r in results] == [True] * 5 + [False]
+    assert results[-1]["issues"] == ["Invalid_JSON"]
+
+    # A different model or sampling is a cache miss
+    runner = EvalRunner(None, None, "cpu", "model-b", ResultCache(cache_path), batch_size=8, generate_fn=fake)
+    runner.run(cases[:1])
+    assert fake.calls[-1] == (["persona 0"], Sampling())
+
+
+def test_torn_cache_line_is_ignored(tmp_path):
+    cache_path = tmp_path / "cache.jsonl"
+    case = EvalCase(id="a", prompt="hello")
+    fake = FakeGenerate({"hello": "hi"})
+    EvalRunner(None, None, "cpu", "m", ResultCache(cache_path), generate_fn=fake).run([case])
+    with open(cache_path, "a") as f:
+        f.write('{"key": "trunc')
+
+    assert len(ResultCache(cache_path).records) == 1
+
+
+def test_markdown_report(tmp_path):
+    case = EvalCase(id="cmd", prompt="x", sampling=GREEDY, checks=("json_valid",), group="JSON")
+    fake = FakeGenerate({"x": "no | json\nhere"})
+    results = EvalRunner(None, None, "cpu", "m", generate_fn=fake).run([case])
+
+    path = tmp_path / "report.md"
+    write_markdown(results, path, "Report", {"Backend": "peft", "Throughput (tok/s)": 12.5})
+    report = path.read_text(encoding="utf-8")
+    assert "**Passed:** 0/1" in report
+    assert "| Throughput (tok/s) | 12.50 |" in report
+    assert "| json_valid | 0/1 |" in report
+    assert "| cmd | ❌ | Invalid_JSON | no - json here |" in report
+    assert json.loads(json.dumps(results, ensure_ascii=False))[0]["checks"] == {"json_valid": False}
@@ -0,0 +1,109 @@
+"""
+Tests for paginated file listing and the lazy file tree
+
+Verifies cursor paging across sort orders, total counts, pattern and
+recursive scans, and on-demand tree expansion.
+"""
+
+import os
+import pytest
+from haitham_voice_agent.tools.files import FileTools
+
+
+@pytest.fixture
+def file_tools(tmp_path):
+    ft = FileTools()
+    # Sandbox the temp dir as "home"
+    ft.home_dir = tmp_path.resolve()
+    return ft
+
+
+@pytest.fixture
+def folder(tmp_path):
+    root = tmp_path / "Inbox"
+    root.mkdir()
+    for i in range(25):
+        f = root / f"file_{i:02d}.txt"
+        f.write_text("x" * i)
+        os.utime(f, (1_700_000_000 + i, 1_700_000_000 + i))
+    (root / "nested" / "deeper").mkdir(parents=True)
+    (root / "nested" / "report.pdf").write_text("pdf")
+    (root / "nested" / "deeper" / "notes.txt").write_text("notes")
+    (root / ".ssh").mkdir()
+    return root
+
+
+async def _collect(file_tools, folder, **kwargs):
+    names, cursor = [], None
+    while True:
+        page = await file_tools.list_files(str(folder), cursor=cursor, **kwargs)
+        assert not page.get("error"), page
+        names.extend(f["name"] for f in page["files"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return names, page
+
+
+@pytest.mark.asyncio
+async def test_first_page_and_total_count(file_tools, folder):
+    result = await file_tools.list_files(str(folder), limit=10)
+
+    assert result["count"] == 26  # 25 files + nested (blacklisted .ssh skipped)
+    assert len(result["files"]) == 10
+    assert result["has_more"] is True
+    assert result["files"][0]["name"] == "file_00.txt"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by", ["name", "date", "size"])
+async def test_cursor_pages_match_full_sort(file_tools, folder, sort_by):
+    paged, _ = await _collect(file_tools, folder, sort_by=sort_by, limit=7)
+    full = await file_tools.list_files(str(folder), sort_by=sort_by, limit=1000)
+
+    assert paged == [f["name"] for f in full["files"]]
+    assert len(paged) == len(set(paged)) == 26
+
+
+@pytest.mark.asyncio
+async def test_date_sort_is_newest_first(file_tools, folder):
+    result = await file_tools.list_files(str(folder), sort_by="date", pattern="file_*", limit=3)
+    assert [f["name"] for f in result["files"]] == ["file_24.txt", "file_23.txt", "file_22.txt"]
+
+
+@pytest.mark.asyncio
+async def test_recursive_pattern(file_tools, folder):
+    result = await file_tools.list_files(str(folder), pattern="*.pdf", recursive=True)
+    assert [f["name"] for f in result["files"]] == ["report.pdf"]
+
+    result = await file_tools.list_files(str(folder), pattern="notes*", recursive=True)
+    assert result["files"][0]["path"] == str(folder / "nested" / "deeper" / "notes.txt")
+
+
+@pytest.mark.asyncio
+async def test_cursor_from_other_sort_is_rejected(file_tools, folder):
+    page = await file_tools.list_files(str(folder), sort_by="name", limit=5)
+    result = await file_tools.list_files(str(folder), sort_by="size", cursor=page["next_cursor"])
+    assert result["error"] is True
+
+
+@pytest.mark.asyncio
+async def test_tree_leaves_deep_folders_unexpanded(file_tools, folder):
+    result = await file_tools.get_file_tree(str(folder), depth=1)
+    tree = result["tree"]
+
+    nested = tree["children"][0]
+    assert nested["name"] == "nested" and nested["expanded"] is True
+    deeper = next(c for c in nested["children"] if c["name"] == "deeper")
+    assert deeper["expanded"] is False and deeper["children"] == []
+    assert all(not c["name"].startswith(".") for c in tree["children"])
+
+
+@pytest.mark.asyncio
+async def test_list_children_pages(file_tools, folder):
+    first = await file_tools.list_children(str(folder), limit=20)
+    assert first["children"][0]["name"] == "nested"
+    assert first["has_more"] is True
+
+    rest = await file_tools.list_children(str(folder), limit=20, cursor=first["next_cursor"])
+    names = [c["name"] for c in first["children"] + rest["children"]]
+    assert len(names) == 26 and rest["has_more"] is False
@@ -0,0 +1,141 @@
+"""
+Tests for the System Awareness file-watch pipeline
+
+Verifies per-path debouncing, burst coalescing and event merging
+in FileWatcher, and batch processing in MemorySyncWorker.
+"""
+
+import time
+import pytest
+from haitham_voice_agent.tools.system_awareness.file_watcher import (
+    FileWatcher, merge_event, CREATED, MODIFIED, DELETED
+)
+from haitham_voice_agent.tools.system_awareness.sync_worker import MemorySyncWorker
+
+
+class TestMergeEvent:
+    """Event coalescing rules"""
+
+    def test_created_then_modified_stays_created(self):
+        assert merge_event(CREATED, MODIFIED) == CREATED
+
+    def test_created_then_deleted_cancels(self):
+        assert merge_event(CREATED, DELETED) is None
+
+    def test_deleted_then_created_is_modified(self):
+        """Atomic saves (delete + rename) surface as a modification"""
+        assert merge_event(DELETED, CREATED) == MODIFIED
+
+    def test_modified_then_deleted_is_deleted(self):
+        assert merge_event(MODIFIED, DELETED) == DELETED
+
+
+class TestFileWatcherBatching:
+    """Debounce and batch delivery"""
+
+    def _watcher(self, tmp_path, batches, **kwargs):
+        return FileWatcher(
+            folders=[str(tmp_path)],
+            callback=batches.append,
+            ignore_dirs={"node_modules"},
+            **kwargs
+        )
+
+    def test_burst_is_delivered_as_one_batch(self, tmp_path):
+        """200 saves in a burst should produce a single callback"""
+        batches = []
+        watcher = self._watcher(tmp_path, batches, debounce=0.2)
+        watcher.start()
+        try:
+            for i in range(200):
+                watcher.record_event(str(tmp_path / f"file_{i}.txt"), MODIFIED)
+            deadline = time.time() + 3
+            while not batches and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+
+        assert len(batches) == 1
+        assert len(batches[0]) == 200
+
+    def test_repeated_events_on_same_path_collapse(self, tmp_path):
+        batches = []
+        watcher = self._watcher(tmp_path, batches)
+        path = str(tmp_path / "report.docx")
+        watcher.record_event(path, CREATED)
+        watcher.record_event(path, MODIFIED)
+        watcher.record_event(path, MODIFIED)
+
+        batch = watcher.flush()
+
+        assert batch == {path: CREATED}
+
+    def test_ignored_paths_are_dropped(self, tmp_path):
+        batches = []
+        watcher = self._watcher(tmp_path, batches)
+        watcher.record_event(str(tmp_path / ".DS_Store"), MODIFIED)
+        watcher.record_event(str(tmp_path / "node_modules" / "pkg" / "index.js"), MODIFIED)
+        watcher.record_event(str(tmp_path / ".git" / "HEAD"), MODIFIED)
+        watcher.record_event(str(tmp_path / "draft.docx.crdownload"), CREATED)
+
+        assert watcher.flush() == {}
+
+    def test_nested_files_are_watched(self, tmp_path):
+        batches = []
+        watcher = self._watcher(tmp_path, batches)
+        nested = str(tmp_path / "Projects" / "HVA" / "notes.md")
+        watcher.record_event(nested, CREATED)
+
+        assert watcher.flush() == {nested: CREATED}
+
+    def test_polling_snapshot_is_recursive(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "deep.txt").write_text("x")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "skip.js").write_text("x")
+
+        watcher = self._watcher(tmp_path, [])
+        snapshot = watcher._get_snapshot(tmp_path)
+
+        assert str(tmp_path / "a" / "deep.txt") in snapshot
+        assert str(tmp_path / "node_modules" / "skip.js") not in snapshot
+
+
+class _FakeMemorySystem:
+    def __init__(self):
+        self.calls = []
+
+    async def index_file(self, path, project_id, description="", tags=None, content=None, file_hash=None):
+        self.calls.append((path, project_id, file_hash))
+        return True
+
+
+class TestMemorySyncWorker:
+    """Batched Layer 3 indexing"""
+
+    @pytest.mark.asyncio
+    async def test_batch_indexes_changed_files_once(self, tmp_path):
+        worker = MemorySyncWorker()
+        fake = _FakeMemorySystem()
+
+        async def get_memory_system():
+            return fake
+        worker._get_memory_system = get_memory_system
+
+        project_file = tmp_path / "Projects" / "Alpha" / "plan.txt"
+        project_file.parent.mkdir(parents=True)
+        project_file.write_text("plan")
+        other = tmp_path / "other.txt"
+        other.write_text("other")
+
+        changes = {
+            str(project_file): CREATED,
+            str(other): MODIFIED,
+            str(tmp_path / "gone.txt"): DELETED,
+        }
+        assert await worker.process_batch(changes) == 2
+        assert {c[1] for c in fake.calls} == {"Alpha", "documents"}
+
+        # Same content again -> skipped by hash
+        assert await worker.process_batch(changes) == 0
+        assert len(fake.calls) == 2
@@ -0,0 +1,96 @@
+"""
+Tests for the style-model generation scheduler
+
+Concurrent requests with the same adapter/sampling settings are batched
+into one backend call, other settings wait for their own batch, text is
+streamed per request and a backend failure reaches every caller.
+"""
+
+import time
+import threading
+
+import pytest
+
+from finetune.haithm_style.generation_scheduler import GenerationScheduler
+
+
+class FakeBackend:
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, requests):
+        self.batches.append([(r.mode, r.prompt) for r in requests])
+        if self.fail:
+            raise RuntimeError("CUDA out of memory")
+        for word in ("hello", " from", " batch"):
+            time.sleep(self.delay / 3)
+            for r in requests:
+                r.emit(word, tokens=1)
+
+
+def test_same_mode_requests_share_a_batch():
+    backend = FakeBackend()
+    scheduler = GenerationScheduler(backend, max_batch_size=4, max_wait=0.05)
+
+    requests = [scheduler.submit(f"p{i}", mode="haithm_v2") for i in range(3)]
+    requests.append(scheduler.submit("b0", mode="base"))
+    requests.append(scheduler.submit("p3", mode="haithm_v2"))
+
+    results = [r.future.result(timeout=2) for r in requests]
+    assert results == ["hello from batch"] * 5
+    assert backend.batches[0] == [("haithm_v2", f"p{i}") for i in range(4)]
+    assert backend.batches[1] == [("base", "b0")]
+    assert requests[0].batch_size == 4 and requests[0].new_tokens == 3
+
+
+def test_max_batch_size_is_respected():
+    backend = FakeBackend(delay=0.01)
+    scheduler = GenerationScheduler(backend, max_batch_size=2, max_wait=0.05)
+    requests = [scheduler.submit(f"p{i}") for i in range(5)]
+    for r in requests:
+        r.future.result(timeout=2)
+    assert [len(b) for b in backend.batches] == [2, 2, 1]
+
+
+def test_stream_yields_while_generating():
+    scheduler = GenerationScheduler(FakeBackend(delay=0.3), max_wait=0)
+    request = scheduler.submit("hi")
+
+    arrivals = []
+    for chunk in request.stream(timeout=2):
+        arrivals.append((chunk, time.perf_counter()))
+    assert [c for c, _ in arrivals] == ["hello", " from", " batch"]
+    assert arrivals[-1][1] - arrivals[0][1] > 0.1  # not delivered all at once
+
+
+def test_backend_error_reaches_every_request():
+    scheduler = GenerationScheduler(FakeBackend(fail=True), max_wait=0.05)
+    requests = [scheduler.submit("a"), scheduler.submit("b")]
+    for r in requests:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            r.future.result(timeout=2)
+    with pytest.raises(RuntimeError):
+        list(requests[0].stream(timeout=2))
+
+    # Worker survives the failure
+    scheduler.run_batch = FakeBackend()
+    assert scheduler.submit("c").future.result(timeout=2) == "hello from batch"
+
+
+def test_concurrent_callers_from_threads():
+    backend = FakeBackend(delay=0.03)
+    scheduler = GenerationScheduler(backend, max_batch_size=8, max_wait=0.05)
+    results = []
+
+    def call(i):
+        results.append(scheduler.submit(f"t{i}").future.result(timeout=2))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 6
+    assert len(backend.batches) < 6
@@ -0,0 +1,157 @@
+"""
+Tests for GmailAPIHandler message hydration
+
+Uses an in-memory fake of the Gmail API service to verify that list views
+hydrate through HTTP batches with format=metadata, that bodies are fetched
+lazily, and that the async token bucket paces without blocking.
+"""
+
+import time
+import asyncio
+import pytest
+from haitham_voice_agent.tools.gmail import gmail_api_handler
+from haitham_voice_agent.tools.gmail.gmail_api_handler import GmailAPIHandler
+from haitham_voice_agent.tools.gmail.utils.rate_limiter import AsyncTokenBucket
+
+
+def _message(i, fmt):
+    headers = [
+        {"name": "From", "value": f"Sender {i} <s{i}@example.com>"},
+        {"name": "Subject", "value": f"Subject {i}"},
+        {"name": "Date", "value": "Mon, 20 Nov 2023 10:00:00 +0000"},
+    ]
+    payload = {"mimeType": "text/plain", "headers": headers}
+    if fmt == "full":
+        payload["body"] = {"data": "Qm9keSB0ZXh0"}  # "Body text"
+    return {"id": f"m{i}", "threadId": f"t{i}", "snippet": f"preview {i}",
+            "labelIds": ["INBOX", "UNREAD"], "payload": payload}
+
+
+class _Request:
+    def __init__(self, service, result, kind):
+        self.service, self.result, self.kind = service, result, kind
+
+    def execute(self):
+        self.service.round_trips.append(self.kind)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self.service, self.callback, self.items = service, callback, []
+
+    def add(self, request, request_id):
+        self.items.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips.append(f"batch[{len(self.items)}]")
+        for request_id, request in self.items:
+            if request_id in self.service.throttled:
+                self.service.throttled.discard(request_id)
+                self.callback(request_id, None, RuntimeError("429"))
+            else:
+                self.callback(request_id, request.result, None)
+
+
+class FakeGmailService:
+    def __init__(self, count=30):
+        self.count = count
+        self.round_trips = []
+        self.formats = []
+        self.throttled = set()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, maxResults, q=None, labelIds=None):
+        ids = [{"id": f"m{i}"} for i in range(min(maxResults, self.count))]
+        return _Request(self, {"messages": ids}, "list")
+
+    def get(self, userId, id, format, metadataHeaders=None):
+        self.formats.append(format)
+        return _Request(self, _message(int(id[1:]), format), f"get:{format}")
+
+    def new_batch_http_request(self, callback):
+        return _Batch(self, callback)
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(gmail_api_handler, "get_oauth_flow", lambda: None)
+    h = GmailAPIHandler()
+    h.service = FakeGmailService()
+    h.rate_limiter = AsyncTokenBucket(rate=1000)
+    return h
+
+
+@pytest.mark.asyncio
+async def test_unread_list_is_two_round_trips(handler):
+    result = await handler.search_emails("is:unread", limit=20)
+
+    assert result["count"] == 20
+    assert handler.service.round_trips == ["list", "batch[20]"]
+    assert set(handler.service.formats) == {"metadata"}
+    first = result["emails"][0]
+    assert first["id"] == "m0" and first["subject"] == "Subject 0"
+    assert first["snippet"] == "preview 0" and first["body_text"] == ""
+
+
+@pytest.mark.asyncio
+async def test_batches_are_chunked(handler):
+    handler.service.count = 120
+    result = await handler.fetch_latest_email(limit=120)
+
+    assert result["count"] == 120
+    assert handler.service.round_trips == ["list", "batch[50]", "batch[50]", "batch[20]"]
+    assert [e["id"] for e in result["emails"][:3]] == ["m0", "m1", "m2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_items_are_retried(handler):
+    handler.service.throttled = {"m3", "m7"}
+    result = await handler.search_emails("from:x", limit=10)
+
+    assert [e["id"] for e in result["emails"]] == [f"m{i}" for i in range(10)]
+    assert handler.service.round_trips.count("get:metadata") == 2
+
+
+@pytest.mark.asyncio
+async def test_body_is_fetched_lazily(handler):
+    await handler.fetch_latest_email(limit=5)
+    email = await handler.get_email_by_id("m2")
+
+    assert email["body_text"] == "Body text"
+    assert handler.service.formats.count("full") == 1
+
+    # Second list view reuses cached messages
+    handler.service.round_trips.clear()
+    await handler.search_emails("other", limit=5)
+    assert handler.service.round_trips == ["list"]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_without_blocking_loop():
+    bucket = AsyncTokenBucket(rate=50, capacity=5)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    start = time.monotonic()
+    for _ in range(15):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    task.cancel()
+
+    # 5 burst tokens, then 10 more at 50/s => ~0.2s
+    assert 0.15 <= elapsed < 0.5
+    assert ticks >= 10
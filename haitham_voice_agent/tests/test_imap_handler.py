@@ -0,0 +1,122 @@
+"""
+Tests for IMAPHandler fetch pipelining
+
+Runs the handler against the local IMAP test server and checks that list
+views are a single header-only FETCH, that searches go through UID SEARCH
+with only the newest UIDs fetched, and that bodies are streamed on demand.
+"""
+
+import time
+import asyncio
+import imaplib
+import pytest
+
+from haitham_voice_agent.tools.gmail import imap_handler
+from haitham_voice_agent.tools.gmail.imap_handler import IMAPHandler, _tail_of_set
+from imap_test_server import LocalIMAPServer, make_message
+
+
+@pytest.fixture
+def server():
+    with LocalIMAPServer() as srv:
+        for i in range(1, 31):
+            srv.mailbox.append(make_message(i), flags=[b"\\Seen"] if i % 2 else [])
+        yield srv
+
+
+@pytest.fixture
+def handler(server, monkeypatch):
+    monkeypatch.setattr(imap_handler, "get_credential_store", lambda: None)
+    h = IMAPHandler()
+    h.connection = imaplib.IMAP4("127.0.0.1", server.port)
+    h.connection.login("me@example.com", "secret")
+    h.last_connection_time = time.time()
+    server.commands.clear()
+    yield h
+    h.close()
+
+
+def _commands(server, verb):
+    return [c for c in server.commands if verb in c.upper()]
+
+
+@pytest.mark.asyncio
+async def test_latest_is_one_header_fetch(handler, server):
+    result = await handler.fetch_latest_email(limit=10)
+
+    assert result["count"] == 10
+    assert [e["id"] for e in result["emails"]] == [str(i) for i in range(30, 20, -1)]
+    first = result["emails"][0]
+    assert first["subject"] == "Subject 30" and first["body_text"] == ""
+    assert first["is_unread"] and not result["emails"][1]["is_unread"]
+
+    fetches = _commands(server, b"FETCH")
+    assert len(fetches) == 1 and b"21:30" in fetches[0]
+    assert b"BODY.PEEK[HEADER.FIELDS" in fetches[0]
+    assert not _commands(server, b"SEARCH")
+    # PEEK leaves flags alone
+    assert b"\\Seen" not in server.mailbox.messages[-1]["flags"]
+
+
+@pytest.mark.asyncio
+async def test_search_fetches_newest_matches_only(handler, server):
+    server.mailbox.append(make_message(31, subject="Invoice March"))
+    server.mailbox.append(make_message(32, subject="Invoice April"))
+    server.mailbox.append(make_message(33, subject="Invoice May"))
+
+    result = await handler.search_emails("invoice", limit=2)
+
+    assert [e["subject"] for e in result["emails"]] == ["Invoice May", "Invoice April"]
+    searches = _commands(server, b"SEARCH")
+    assert len(searches) == 1 and b"UID SEARCH RETURN (ALL)" in searches[0]
+    fetches = _commands(server, b"FETCH")
+    assert len(fetches) == 1 and b"UID FETCH 32,33 " in fetches[0]
+
+
+@pytest.mark.asyncio
+async def test_search_without_esearch_and_utf8_query(handler, server):
+    handler.connection.capabilities = ("IMAP4REV1",)
+    server.mailbox.append(make_message(31, subject="فاتورة الكهرباء"))
+
+    result = await handler.search_emails("فاتورة", limit=5)
+
+    assert [e["id"] for e in result["emails"]] == ["31"]
+    assert b"CHARSET UTF-8 SUBJECT" in _commands(server, b"SEARCH")[0]
+
+
+@pytest.mark.asyncio
+async def test_body_streamed_in_chunks_on_demand(handler, server):
+    server.mailbox.append(make_message(31, body_size=5000))
+    handler.BODY_CHUNK = 2048
+
+    email = await handler.get_email_by_id("31")
+
+    assert email["body_text"].startswith("Message body 31.")
+    assert len(email["body_text"]) > 5000
+    fetches = _commands(server, b"FETCH")
+    assert len(fetches) == 3 and b"BODY.PEEK[]<2048.2048>" in fetches[1]
+    assert (await handler.get_email_by_id("999"))["error"]
+
+
+@pytest.mark.asyncio
+async def test_socket_work_stays_off_the_event_loop(handler, server):
+    server.latency = 0.05
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    await handler.fetch_latest_email(limit=5)
+    task.cancel()
+
+    assert ticks >= 5
+
+
+def test_tail_of_set():
+    assert _tail_of_set(b"1:5,9,12:14", 4) == [5, 9, 12, 13, 14][-4:]
+    assert _tail_of_set(b"7", 3) == [7]
+    assert _tail_of_set(b"1:1000000", 3) == [999998, 999999, 1000000]
@@ -0,0 +1,420 @@
+"""
+Tests for the local mailbox mirror
+
+Runs the sync engine against in-memory fakes of the Gmail API (history.list)
+and an IMAP server (UIDVALIDITY/UIDNEXT/CONDSTORE), then checks that list
+and search views are answered locally.
+"""
+
+import base64
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+from datetime import datetime, timezone, timedelta
+from googleapiclient.errors import HttpError
+
+from haitham_voice_agent.tools.gmail import gmail_api_handler
+from haitham_voice_agent.tools.gmail.gmail_api_handler import GmailAPIHandler
+from haitham_voice_agent.tools.gmail.imap_handler import IMAPHandler
+from haitham_voice_agent.tools.gmail.mailbox_store import MailboxStore
+from haitham_voice_agent.tools.gmail.mailbox_mirror import MailboxMirror
+from haitham_voice_agent.tools.gmail.utils.rate_limiter import AsyncTokenBucket
+
+BASE = datetime(2024, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+# ==================== Fake Gmail API ====================
+
+class _Request:
+    def __init__(self, service, fn):
+        self.service, self.fn = service, fn
+
+    def execute(self):
+        self.service.calls += 1
+        return self.fn()
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self.service, self.callback, self.items = service, callback, []
+
+    def add(self, request, request_id):
+        self.items.append((request_id, request))
+
+    def execute(self):
+        self.service.calls += 1
+        for request_id, request in self.items:
+            try:
+                self.callback(request_id, request.fn(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+class _Resp(dict):
+    def __init__(self, status):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeGmail:
+    """Mailbox with a history log, enough of the API surface for the mirror"""
+
+    def __init__(self):
+        self.mail = {}
+        self.log = []
+        self.history_id = 100
+        self.min_history_id = 100
+        self.calls = 0
+
+    # --- server-side mutations ---
+    def deliver(self, mid, subject, sender, body, labels=("INBOX", "UNREAD", "CATEGORY_PERSONAL"), minutes=0):
+        self.mail[mid] = {"subject": subject, "from": sender, "body": body, "labels": list(labels),
+                              "date": BASE + timedelta(minutes=minutes)}
+        self._record({"messagesAdded": [{"message": {"id": mid}}]})
+
+    def mark_read(self, mid):
+        self.mail[mid]["labels"].remove("UNREAD")
+        self._record({"labelsRemoved": [{"message": {"id": mid}}]})
+
+    def remove(self, mid):
+        del self.mail[mid]
+        self._record({"messagesDeleted": [{"message": {"id": mid}}]})
+
+    def _record(self, record):
+        self.history_id += 1
+        self.log.append((self.history_id, record))
+
+    # --- API surface ---
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _HistoryResource(self)
+
+    def getProfile(self, userId):
+        return _Request(self, lambda: {"historyId": str(self.history_id)})
+
+    def list(self, userId, maxResults, q=None, labelIds=None, pageToken=None):
+        def run():
+            ordered = sorted(self.mail, key=lambda m: self.mail[m]["date"], reverse=True)
+            return {"messages": [{"id": m} for m in ordered[:maxResults]]}
+        return _Request(self, run)
+
+    def get(self, userId, id, format, metadataHeaders=None):
+        def run():
+            msg = self.mail[id]
+            headers = [{"name": "From", "value": msg["from"]}, {"name": "Subject", "value": msg["subject"]},
+                       {"name": "Date", "value": format_datetime(msg["date"])}]
+            payload = {"mimeType": "text/plain", "headers": headers}
+            if format == "full":
+                payload["body"] = {"data": base64.urlsafe_b64encode(msg["body"].encode()).decode()}
+            return {"id": id, "threadId": id, "snippet": msg["body"][:20],
+                    "labelIds": list(msg["labels"]), "payload": payload}
+        return _Request(self, run)
+
+    def new_batch_http_request(self, callback):
+        return _Batch(self, callback)
+
+
+class _HistoryResource:
+    def __init__(self, fake):
+        self.fake = fake
+
+    def list(self, userId, startHistoryId, pageToken=None):
+        def run():
+            start = int(startHistoryId)
+            if start < self.fake.min_history_id:
+                raise HttpError(_Resp(404), b"history expired")
+            return {"history": [r for hid, r in self.fake.log if hid > start],
+                    "historyId": str(self.fake.history_id)}
+        return _Request(self.fake, run)
+
+
+# ==================== Fake IMAP ====================
+
+class FakeIMAP:
+    """imaplib.IMAP4-shaped INBOX with UIDs, flags and CONDSTORE modseqs"""
+
+    def __init__(self, condstore=True):
+        self.capabilities = ("IMAP4REV1", "CONDSTORE") if condstore else ("IMAP4REV1",)
+        self.uidvalidity = 7
+        self.next_uid = 1
+        self.modseq = 1
+        self.mail = {}  # uid -> {"raw", "flags", "modseq"}
+        self.commands = []
+
+    def deliver(self, subject, sender, body, seen=False):
+        msg = MIMEText(body)
+        msg["Subject"], msg["From"], msg["Date"] = subject, sender, format_datetime(BASE)
+        self.modseq += 1
+        self.mail[self.next_uid] = {"raw": msg.as_bytes(), "flags": [b"\\Seen"] if seen else [],
+                                    "modseq": self.modseq}
+        self.next_uid += 1
+
+    def set_flags(self, uid, flags):
+        self.modseq += 1
+        self.mail[uid].update(flags=flags, modseq=self.modseq)
+
+    def expunge(self, uid):
+        self.modseq += 1
+        del self.mail[uid]
+
+    def noop(self):
+        return "OK", [b""]
+
+    def status(self, mailbox, items):
+        self.commands.append("STATUS")
+        text = f'"INBOX" (UIDVALIDITY {self.uidvalidity} UIDNEXT {self.next_uid}'
+        if "HIGHESTMODSEQ" in items:
+            text += f" HIGHESTMODSEQ {self.modseq}"
+        return "OK", [(text + ")").encode()]
+
+    def select(self, mailbox, readonly=False):
+        return "OK", [str(len(self.mail)).encode()]
+
+    @staticmethod
+    def _uid_set(spec, uids):
+        if ":" in spec:
+            low, high = spec.split(":")
+            high = max(uids, default=0) if high == "*" else int(high)
+            picked = [u for u in uids if int(low) <= u <= high]
+            # "n:*" always includes the highest UID
+            return picked or ([max(uids)] if uids and spec.endswith("*") else [])
+        return [int(u) for u in spec.split(",") if int(u) in uids]
+
+    def uid(self, command, *args):
+        self.commands.append(f"UID {command}")
+        uids = sorted(self.mail)
+        if command == "SEARCH":
+            criteria = args[-1]
+            picked = uids if criteria == "ALL" else self._uid_set(criteria.split()[1], uids)
+            return "OK", [" ".join(map(str, picked)).encode()]
+        spec, items = args[0], args[1]
+        data = []
+        changedsince = int(items.rsplit(" ", 1)[1].rstrip(")")) if "CHANGEDSINCE" in items else None
+        for seq, uid in enumerate(self._uid_set(spec, uids), start=1):
+            entry = self.mail[uid]
+            if changedsince is not None and entry["modseq"] <= changedsince:
+                continue
+            flags = b" ".join(entry["flags"])
+            if "BODY.PEEK[]" in items:
+                data.append((f"{seq} (UID {uid} FLAGS (".encode() + flags + f") BODY[] {{{len(entry['raw'])}}}".encode(),
+                             entry["raw"]))
+                data.append(b")")
+            else:
+                data.append(f"{seq} (UID {uid} MODSEQ ({entry['modseq']}) FLAGS (".encode() + flags + b"))")
+        return "OK", data
+
+
+# ==================== Fixtures ====================
+
+@pytest.fixture
+def store(tmp_path):
+    s = MailboxStore(db_path=str(tmp_path / "mailbox.db"))
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    monkeypatch.setattr(gmail_api_handler, "get_oauth_flow", lambda: None)
+    handler = GmailAPIHandler()
+    handler.service = FakeGmail()
+    handler.rate_limiter = AsyncTokenBucket(rate=10000)
+    return handler
+
+
+@pytest.fixture
+def imap(monkeypatch):
+    handler = IMAPHandler.__new__(IMAPHandler)
+    handler.connection = FakeIMAP()
+    handler._executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(handler, "_get_connection", lambda: handler.connection)
+    return handler
+
+
+# ==================== Gmail sync ====================
+
+@pytest.mark.asyncio
+async def test_gmail_backfill_then_local_reads(gmail, store):
+    fake = gmail.service
+    fake.deliver("a1", "Invoice March", "Billing <billing@acme.com>", "Total due 420 SAR", minutes=1)
+    fake.deliver("a2", "Team lunch", "Sara <sara@example.com>", "Pizza on Thursday", minutes=2,
+                 labels=("INBOX", "CATEGORY_SOCIAL"))
+    mirror = MailboxMirror(gmail, None, store=store, refresh_interval=3600)
+
+    stats = await mirror.sync("gmail_api")
+    assert stats["added"] == 2
+
+    calls = fake.calls
+    latest = await mirror.latest("gmail_api", 10)
+    assert [m["id"] for m in latest] == ["a2", "a1"]
+    assert [m["id"] for m in await mirror.search("gmail_api", "is:unread category:primary")] == ["a1"]
+    assert [m["id"] for m in await mirror.search("gmail_api", "pizza")] == ["a2"]
+    assert [m["id"] for m in await mirror.search("gmail_api", "from:acme")] == ["a1"]
+    assert fake.calls == calls  # served locally
+
+
+@pytest.mark.asyncio
+async def test_gmail_incremental_history(gmail, store):
+    fake = gmail.service
+    fake.deliver("a1", "Invoice", "billing@acme.com", "Total due", minutes=1)
+    fake.deliver("a2", "Old news", "news@example.com", "Weekly digest", minutes=2)
+    mirror = MailboxMirror(gmail, None, store=store)
+    await mirror.sync("gmail_api")
+
+    fake.deliver("a3", "Contract draft", "legal@acme.com", "Please review clause 4", minutes=3)
+    fake.mark_read("a1")
+    fake.remove("a2")
+
+    stats = await mirror.sync("gmail_api")
+
+    assert stats == {"added": 1, "deleted": 1, "updated": 1}
+    assert store.get("a1", "gmail_api")["is_unread"] is False
+    assert store.get("a2", "gmail_api") is None
+    assert [m["id"] for m in store.search("gmail_api", "clause")] == ["a3"]
+    assert store.get_state("gmail_api", "history_id") == str(fake.history_id)
+
+
+@pytest.mark.asyncio
+async def test_expired_history_triggers_backfill(gmail, store):
+    fake = gmail.service
+    fake.deliver("a1", "Hello", "x@example.com", "first")
+    mirror = MailboxMirror(gmail, None, store=store)
+    await mirror.sync("gmail_api")
+
+    fake.min_history_id = fake.history_id + 50
+    fake.deliver("a9", "After gap", "y@example.com", "second", minutes=5)
+    await mirror.sync("gmail_api")
+
+    assert store.ids("gmail_api") == {"a1", "a9"}
+
+
+@pytest.mark.asyncio
+async def test_cold_read_backfills_in_background(gmail, store, monkeypatch):
+    fake = gmail.service
+    fake.deliver("a1", "Invoice", "billing@acme.com", "Total due", minutes=1)
+    release = asyncio.Event()
+    list_ids = gmail.list_message_ids
+
+    async def slow_list(*args, **kwargs):
+        await release.wait()
+        return await list_ids(*args, **kwargs)
+    monkeypatch.setattr(gmail, "list_message_ids", slow_list)
+    mirror = MailboxMirror(gmail, None, store=store)
+
+    # The caller's timeout would cancel an inline backfill; the read defers to the server instead
+    assert await asyncio.wait_for(mirror.latest("gmail_api", 5), timeout=1) is None
+    assert await asyncio.wait_for(mirror.search("gmail_api", "invoice"), timeout=1) is None
+    assert not mirror.ready.get("gmail_api")
+
+    release.set()
+    await mirror._backfills["gmail_api"]
+    assert mirror.ready["gmail_api"] is True
+    assert [m["id"] for m in await mirror.latest("gmail_api", 5)] == ["a1"]
+
+
+@pytest.mark.asyncio
+async def test_expired_history_on_read_defers_to_server(gmail, store):
+    fake = gmail.service
+    fake.deliver("a1", "Hello", "x@example.com", "first")
+    mirror = MailboxMirror(gmail, None, store=store, refresh_interval=0)
+    await mirror.sync("gmail_api")
+
+    fake.min_history_id = fake.history_id + 50
+    assert await mirror.latest("gmail_api", 5) is None
+    fake.min_history_id = 0
+    await mirror._backfills["gmail_api"]
+    assert [m["id"] for m in await mirror.latest("gmail_api", 5)] == ["a1"]
+
+
+def test_unsupported_operator_defers_to_server(store):
+    store.set_state("gmail_api", complete=1)
+    assert store.search("gmail_api", "has:attachment invoice") is None
+    assert store.search("gmail_api", "invoice") == []
+    for query in ["invoice OR receipt", "invoice -draft", "{invoice receipt}",
+                  "(invoice receipt)", "subject:(march invoice)", "+invoice"]:
+        assert store.search("gmail_api", query) is None, query
+
+
+@pytest.mark.asyncio
+async def test_partial_mirror_defers_short_results(gmail, store):
+    fake = gmail.service
+    fake.deliver("a1", "Old invoice", "billing@acme.com", "January", minutes=1)
+    fake.deliver("a2", "Invoice", "billing@acme.com", "March", minutes=2)
+    mirror = MailboxMirror(gmail, None, store=store, backfill_limit=1, refresh_interval=3600)
+    await mirror.sync("gmail_api")
+
+    # Only the newest message is mirrored: a short answer may be missing older mail
+    assert store.get_state("gmail_api", "complete") == "0"
+    assert await mirror.search("gmail_api", "invoice") is None
+    assert await mirror.search("gmail_api", "quarterly") is None
+    # A full page is a complete answer either way
+    assert [m["id"] for m in await mirror.search("gmail_api", "invoice", limit=1)] == ["a2"]
+
+    # Whole mailbox mirrored, then trimmed below it again
+    mirror = MailboxMirror(gmail, None, store=store, max_messages=2)
+    store.clear("gmail_api")
+    await mirror.sync("gmail_api")
+    assert [m["id"] for m in store.search("gmail_api", "invoice")] == ["a2", "a1"]
+    assert store.search("gmail_api", "quarterly") == []
+    fake.deliver("a3", "Lunch", "sara@example.com", "Pizza", minutes=3)
+    await mirror.sync("gmail_api")
+    assert store.get_state("gmail_api", "complete") == "0"
+
+
+# ==================== IMAP sync ====================
+
+@pytest.mark.asyncio
+async def test_imap_uidnext_and_condstore_sync(imap, store):
+    server = imap.connection
+    server.deliver("Welcome", "hr@acme.com", "Your first day")
+    server.deliver("Payslip", "payroll@acme.com", "March payslip attached", seen=True)
+    mirror = MailboxMirror(None, imap, store=store)
+
+    assert (await mirror.sync("imap"))["added"] == 2
+    assert [m["subject"] for m in store.latest("imap", 10, label="UNREAD")] == ["Welcome"]
+
+    server.commands.clear()
+    server.deliver("Offsite", "ceo@acme.com", "Agenda for the offsite")
+    server.set_flags(1, [b"\\Seen", b"\\Flagged"])
+    server.expunge(2)
+
+    stats = await mirror.sync("imap")
+
+    assert stats == {"added": 1, "deleted": 1, "updated": 1}
+    assert store.get("1", "imap")["is_starred"] is True
+    assert [m["id"] for m in store.search("imap", "agenda")] == ["3"]
+    # Only the new UID was fetched in full
+    assert server.commands.count("UID FETCH") == 2
+
+
+@pytest.mark.asyncio
+async def test_imap_uidvalidity_change_resets_mirror(imap, store):
+    server = imap.connection
+    server.deliver("One", "a@example.com", "first")
+    mirror = MailboxMirror(None, imap, store=store)
+    await mirror.sync("imap")
+
+    server.uidvalidity += 1
+    server.mail = {}
+    server.next_uid = 1
+    server.deliver("Renumbered", "b@example.com", "second")
+    await mirror.sync("imap")
+
+    assert [m["subject"] for m in store.latest("imap", 10)] == ["Renumbered"]
+
+
+@pytest.mark.asyncio
+async def test_sync_failure_returns_none(store):
+    class Broken:
+        def _ensure_service(self):
+            return False
+    mirror = MailboxMirror(Broken(), None, store=store)
+    assert await mirror.latest("gmail_api", 5) is None
@@ -0,0 +1,99 @@
+"""
+Tests for the quantized style-model backend selection
+
+The merged/quantized export is used only when its manifest matches the
+adapter on disk; the GGUF variant streams through Ollama and keeps the
+base-vs-adapter split.
+"""
+
+import json
+
+import pytest
+
+from finetune.haithm_style import quantized_backend
+from finetune.haithm_style.generation_scheduler import GenerationScheduler
+from haitham_voice_agent.config import Config
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    adapter = tmp_path / "adapter"
+    adapter.mkdir()
+    (adapter / "adapter_config.json").write_text('{"r": 16}')
+    (adapter / "adapter_model.safetensors").write_bytes(b"weights-v1")
+    artifact = tmp_path / "quantized"
+    artifact.mkdir()
+    monkeypatch.setattr(Config, "HAITHM_STYLE_MODEL_PATH", adapter)
+    monkeypatch.setattr(Config, "HAITHM_STYLE_QUANTIZED_PATH", artifact)
+    monkeypatch.setattr(Config, "HAITHM_STYLE_BACKEND", "auto")
+
+    def write(fmt="int8_dynamic", **variants):
+        manifest = {
+            "format": fmt,
+            "adapter_sha256": quantized_backend.adapter_fingerprint(adapter),
+            "variants": variants or {"haithm_v2": {"path": "haithm_v2/model.int8.pt"}, "base": {"path": "base/model.int8.pt"}}
+        }
+        (artifact / quantized_backend.MANIFEST_NAME).write_text(json.dumps(manifest))
+        return manifest
+
+    return adapter, write
+
+
+def test_fingerprint_tracks_adapter_changes(export):
+    adapter, write = export
+    manifest = write()
+    assert manifest["adapter_sha256"]
+    assert not quantized_backend.is_stale(manifest)
+
+    (adapter / "adapter_model.safetensors").write_bytes(b"weights-v2")
+    assert quantized_backend.is_stale(manifest)
+    assert quantized_backend.adapter_fingerprint(adapter.parent / "missing") is None
+
+
+def test_resolve_backend(export, monkeypatch):
+    adapter, write = export
+    assert quantized_backend.resolve_backend("cpu") is None  # nothing exported yet
+
+    write()
+    assert quantized_backend.resolve_backend("cpu")["format"] == "int8_dynamic"
+    assert quantized_backend.resolve_backend("cuda") is None  # auto keeps PEFT on GPU
+
+    monkeypatch.setattr(Config, "HAITHM_STYLE_BACKEND", "peft")
+    assert quantized_backend.resolve_backend("cpu") is None
+    monkeypatch.setattr(Config, "HAITHM_STYLE_BACKEND", "quantized")
+    assert quantized_backend.resolve_backend("mps")["format"] == "int8_dynamic"
+
+    (adapter / "adapter_model.safetensors").write_bytes(b"retrained")
+    assert quantized_backend.resolve_backend("cpu") is None  # stale export is ignored
+
+
+def test_unknown_format_is_ignored(export):
+    _, write = export
+    write(fmt="onnx")
+    assert quantized_backend.load_manifest() is None
+
+
+def test_gguf_runner_streams_each_variant(export, monkeypatch):
+    _, write = export
+    manifest = write("gguf", haithm_v2={"ollama_model": "haithm-style"}, base={"ollama_model": "qwen2.5:3b"})
+    calls = []
+
+    def fake_generate(model, prompt, max_new_tokens, temperature, top_p, on_delta=None):
+        calls.append((model, prompt, max_new_tokens))
+        for part in ("مرحبا", " يا", " صديقي"):
+            on_delta(part)
+        return {"text": "مرحبا يا صديقي", "new_tokens": 3, "tokens_per_sec": 10.0}
+
+    monkeypatch.setattr(quantized_backend, "ollama_generate", fake_generate)
+    scheduler = GenerationScheduler(quantized_backend.make_ollama_runner(manifest), max_wait=0.05)
+
+    style = scheduler.submit("<prompt a>", mode="haithm_v2", max_new_tokens=64)
+    base = scheduler.submit("<prompt b>", mode="base", max_new_tokens=32)
+    assert list(style.stream(timeout=2)) == ["مرحبا", " يا", " صديقي"]
+    assert base.future.result(timeout=2) == "مرحبا يا صديقي"
+    assert style.new_tokens == 3
+    assert sorted(calls) == [("haithm-style", "<prompt a>", 64), ("qwen2.5:3b", "<prompt b>", 32)]
+
+    missing = scheduler.submit("x", mode="haithm_v3")
+    with pytest.raises(RuntimeError, match="haithm_v3"):
+        missing.future.result(timeout=2)
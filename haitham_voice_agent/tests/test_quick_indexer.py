@@ -0,0 +1,147 @@
+"""
+Tests for the Layer 2 Quick Index
+
+Verifies trie/trigram lookups (prefix, substring, transliterated and
+typo-tolerant), incremental event application and log persistence.
+"""
+
+import time
+import pytest
+from haitham_voice_agent.tools.system_awareness.name_index import NameIndex, edit_distance
+from haitham_voice_agent.tools.system_awareness.quick_indexer import QuickIndexer
+
+
+def _entry(name, source="Desktop", mtime=None):
+    return {
+        "name": name,
+        "path": f"/home/user/{source}/{name}",
+        "type": "file",
+        "size": 10,
+        "mtime": mtime or time.time(),
+        "source": source
+    }
+
+
+class TestNameIndex:
+    """Ranked filename lookups"""
+
+    @pytest.fixture
+    def index(self):
+        idx = NameIndex()
+        for name in ["Annual_Report_2024.pdf", "report.docx", "CRAFTS catalogue.xlsx",
+                     "meeting notes.txt", "فاتورة الكهرباء.pdf"]:
+            idx.add(_entry(name))
+        return idx
+
+    def test_prefix_match(self, index):
+        names = [r["name"] for r in index.search("ann rep")]
+        assert names == ["Annual_Report_2024.pdf"]
+
+    def test_exact_name_ranks_first(self, index):
+        results = index.search("report")
+        assert results[0]["name"] == "report.docx"
+        assert results[0]["score"] == 1.0
+
+    def test_substring_match(self, index):
+        names = [r["name"] for r in index.search("port")]
+        assert "report.docx" in names
+
+    def test_typo_tolerant_match(self, index):
+        names = [r["name"] for r in index.search("reprot")]
+        assert "report.docx" in names
+
+    def test_arabic_query_matches_latin_name(self, index):
+        """Arabic "كرافت" transliterates to "kraft", close enough to CRAFTS"""
+        names = [r["name"] for r in index.search("كرافت")]
+        assert "CRAFTS catalogue.xlsx" in names
+
+    def test_arabic_name_found_by_arabic_and_latin_queries(self, index):
+        assert index.search("فاتورة")[0]["name"] == "فاتورة الكهرباء.pdf"
+        assert index.search("fatwra")[0]["name"] == "فاتورة الكهرباء.pdf"
+
+    def test_remove_prunes_entry(self, index):
+        index.remove("/home/user/Desktop/report.docx")
+        assert all(r["name"] != "report.docx" for r in index.search("report"))
+        assert len(index) == 4
+
+    def test_edit_distance_transposition(self):
+        assert edit_distance("reprot", "report", 2) == 1
+        assert edit_distance("abc", "xyz", 1) == 2
+
+    def test_lookup_stays_fast_on_large_index(self):
+        idx = NameIndex()
+        for i in range(20000):
+            idx.add(_entry(f"document_{i}_draft.txt", mtime=i))
+        idx.add(_entry("budget forecast.xlsx"))
+
+        start = time.perf_counter()
+        for _ in range(100):
+            results = idx.search("budget fore")
+        elapsed = (time.perf_counter() - start) / 100
+
+        assert results[0]["name"] == "budget forecast.xlsx"
+        assert elapsed < 0.005
+
+
+class TestQuickIndexer:
+    """Incremental updates and persistence"""
+
+    @pytest.fixture
+    def home(self, tmp_path):
+        for folder in ("Desktop", "Downloads", "Documents"):
+            (tmp_path / folder).mkdir()
+        (tmp_path / "Desktop" / "invoice.pdf").write_text("x")
+        (tmp_path / "Downloads" / "setup.dmg").write_text("x")
+        return tmp_path
+
+    @pytest.fixture
+    def indexer(self, home, tmp_path, monkeypatch):
+        idx = QuickIndexer(storage_path=str(tmp_path / "index.jsonl"), home=str(home))
+        monkeypatch.setattr(idx, "_get_recent_files", lambda limit=20: [])
+        return idx
+
+    def test_update_index_builds_views(self, indexer):
+        indexer.update_index()
+        assert [i["name"] for i in indexer.index["desktop"]] == ["invoice.pdf"]
+        assert indexer.find_in_index("setup")[0]["source"] == "Downloads"
+
+    def test_apply_changes_is_incremental(self, indexer, home):
+        indexer.update_index()
+        new_file = home / "Desktop" / "contract.docx"
+        new_file.write_text("x")
+        nested = home / "Documents" / "Projects" / "HVA" / "spec.md"
+        nested.parent.mkdir(parents=True)
+        nested.write_text("x")
+
+        touched = indexer.apply_changes({
+            str(new_file): "created",
+            str(nested): "created",
+            str(home / "Desktop" / "invoice.pdf"): "deleted",
+        })
+
+        assert touched == 3
+        assert [i["name"] for i in indexer.index["desktop"]] == ["contract.docx"]
+        assert indexer.find_in_index("spec")[0]["source"] == "Recent"
+        assert indexer.find_in_index("invoice") == []
+
+    def test_log_replay_restores_index(self, indexer, home, tmp_path):
+        indexer.update_index()
+        new_file = home / "Desktop" / "notes.txt"
+        new_file.write_text("x")
+        indexer.apply_changes({str(new_file): "created"})
+
+        reloaded = QuickIndexer(storage_path=str(tmp_path / "index.jsonl"), home=str(home))
+        reloaded.load_index()
+
+        assert reloaded.index["last_updated"] == indexer.index["last_updated"]
+        assert {i["name"] for i in reloaded.index["desktop"]} == {"invoice.pdf", "notes.txt"}
+
+    def test_torn_log_line_is_ignored(self, indexer, home, tmp_path):
+        indexer.update_index()
+        with open(tmp_path / "index.jsonl", "a", encoding="utf-8") as f:
+            f.write('["+","/broken"')
+
+        reloaded = QuickIndexer(storage_path=str(tmp_path / "index.jsonl"), home=str(home))
+        reloaded.load_index()
+
+        assert len(reloaded.names) == 2
@@ -0,0 +1,204 @@
+"""
+Tests for the Guardian reminder scheduler
+
+Checks that reminders fire at their lead time without polling, that sent
+reminders are persisted across restarts, and that the Guardian feeds the
+scheduler from calendar sync-token deltas and task change notifications.
+"""
+
+import time
+import asyncio
+import datetime
+
+import pytest
+
+from haitham_voice_agent.intelligence import guardian as guardian_module
+from haitham_voice_agent.intelligence.guardian import SystemGuardian
+from haitham_voice_agent.intelligence.reminder_scheduler import ReminderScheduler, SentReminderStore
+from haitham_voice_agent.tools.tasks.task_manager import TaskManager
+from haitham_voice_agent.tools.tasks.task_store import TaskStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SentReminderStore(db_path=tmp_path / "memory.db")
+    yield s
+    s.close()
+
+
+async def _run_for(scheduler, seconds):
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    scheduler.stop()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_fires_on_time_without_polling(store):
+    fired = []
+
+    async def callback(owner, payload):
+        fired.append((owner, time.time()))
+
+    scheduler = ReminderScheduler(callback, store=store)
+    wakeups = 0
+    original = scheduler._fire_due
+
+    async def counting(now):
+        nonlocal wakeups
+        wakeups += 1
+        await original(now)
+
+    scheduler._fire_due = counting
+    start = time.time()
+    scheduler.schedule("event:a", "event:a:1", start + 0.2, {})
+    scheduler.schedule("event:b", "event:b:1", start + 3600, {})
+    await _run_for(scheduler, 0.4)
+
+    assert [owner for owner, _ in fired] == ["event:a"]
+    assert 0.18 <= fired[0][1] - start < 0.35
+    assert wakeups <= 3
+
+
+@pytest.mark.asyncio
+async def test_reschedule_cancel_and_persistence(store):
+    fired = []
+
+    async def callback(owner, payload):
+        fired.append(payload["n"])
+
+    scheduler = ReminderScheduler(callback, store=store)
+    now = time.time()
+    scheduler.schedule("task:1", "task:1:a", now + 60, {"n": "moved-away"})
+    scheduler.schedule("task:1", "task:1:b", now + 0.05, {"n": "moved"})
+    scheduler.schedule("task:2", "task:2:a", now + 0.05, {"n": "cancelled"})
+    scheduler.cancel("task:2")
+    await _run_for(scheduler, 0.2)
+    assert fired == ["moved"]
+
+    # A restart does not repeat the sent reminder
+    restarted = ReminderScheduler(callback, store=store)
+    await restarted.load_sent()
+    assert not restarted.schedule("task:1", "task:1:b", time.time(), {"n": "again"})
+    await _run_for(restarted, 0.1)
+    assert fired == ["moved"]
+
+
+class FakeCalendar:
+    def __init__(self):
+        self.calls = []
+        self.change_listeners = []
+        self.pending = {"events": [], "deleted": []}
+
+    async def sync_events(self, sync_token=None):
+        self.calls.append(sync_token)
+        result = {"success": True, "sync_token": f"t{len(self.calls)}", "full": sync_token is None, **self.pending}
+        self.pending = {"events": [], "deleted": []}
+        return result
+
+    def change(self, events=(), deleted=()):
+        self.pending = {"events": list(events), "deleted": list(deleted)}
+        for listener in self.change_listeners:
+            listener()
+
+
+class FakeDispatcher:
+    def __init__(self, tools):
+        self.tools = tools
+
+
+def _iso(seconds_from_now):
+    return (datetime.datetime.now().astimezone() + datetime.timedelta(seconds=seconds_from_now)).isoformat()
+
+
+@pytest.mark.asyncio
+async def test_guardian_event_driven(tmp_path, monkeypatch):
+    calendar = FakeCalendar()
+    tasks = TaskManager(store=TaskStore(db_path=tmp_path / "memory.db"))
+    tasks._imported = True
+    monkeypatch.setattr(guardian_module, "get_dispatcher", lambda: FakeDispatcher({"calendar": calendar, "tasks": tasks}))
+
+    announced = []
+    guardian = SystemGuardian(scheduler=None)
+    guardian.scheduler = ReminderScheduler(guardian._on_reminder, store=SentReminderStore(db_path=tmp_path / "memory.db"))
+
+    async def announce(message):
+        announced.append(message)
+
+    monkeypatch.setattr(guardian, "_announce", announce)
+    lead = guardian.LEAD_MINUTES * 60
+
+    calendar.pending = {"events": [
+        {"id": "e1", "summary": "Standup", "start": _iso(lead + 0.2), "all_day": False},
+        {"id": "e2", "summary": "Dropped", "start": _iso(lead + 0.3), "all_day": False},
+        {"id": "e3", "summary": "Holiday", "start": "2030-01-01", "all_day": True},
+    ], "deleted": []}
+    runner = asyncio.create_task(guardian.start_monitoring())
+    await asyncio.sleep(0.05)
+
+    # Calendar change made through HVA triggers an incremental sync right away
+    calendar.change(deleted=["e2"])
+    tasks.create_task("Pay invoice", due_date=_iso(lead + 0.25))
+    await asyncio.sleep(0.5)
+
+    assert calendar.calls == [None, "t1"]
+    assert len(announced) == 2
+    assert "Standup" in announced[0]
+    assert "Pay invoice" in announced[1]
+
+    await guardian.stop()
+    await asyncio.wait_for(runner, 1)
+    assert tasks.change_listeners == [] and calendar.change_listeners == []
+    tasks.store.close()
+
+
+class _Request:
+    def __init__(self, fn):
+        self.execute = fn
+
+
+class FakeEventsService:
+    """events().list() stub: pages for a full sync, 410 for an expired token"""
+
+    def __init__(self):
+        self.params = []
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.params.append(params)
+
+        def execute():
+            if params.get("syncToken") == "expired":
+                from googleapiclient.errors import HttpError
+                raise HttpError(type("Resp", (), {"status": 410, "reason": "Gone"})(), b"")
+            if params.get("syncToken"):
+                return {"items": [{"id": "e1", "status": "cancelled"}], "nextSyncToken": "t2"}
+            if params.get("pageToken"):
+                return {"items": [{"id": "e2", "summary": "Lunch", "start": {"date": "2030-01-01"},
+                                   "end": {"date": "2030-01-02"}}], "nextSyncToken": "t1"}
+            return {"items": [{"id": "e1", "summary": "Standup", "start": {"dateTime": "2030-01-01T09:00:00Z"},
+                               "end": {"dateTime": "2030-01-01T09:15:00Z"}}], "nextPageToken": "p2"}
+
+        return _Request(execute)
+
+
+@pytest.mark.asyncio
+async def test_calendar_sync_tokens(monkeypatch):
+    from haitham_voice_agent.tools import calendar as calendar_module
+
+    monkeypatch.setattr(calendar_module, "get_credential_store", lambda: None)
+    calendar = calendar_module.CalendarTools()
+    calendar.service = FakeEventsService()
+
+    full = await calendar.sync_events()
+    assert full["full"] and full["sync_token"] == "t1"
+    assert [(e["id"], e["all_day"]) for e in full["events"]] == [("e1", False), ("e2", True)]
+
+    delta = await calendar.sync_events("t1")
+    assert not delta["full"] and delta["events"] == [] and delta["deleted"] == ["e1"]
+
+    resynced = await calendar.sync_events("expired")
+    assert resynced["full"] and resynced["sync_token"] == "t1"
+    assert "timeMin" in calendar.service.params[-2]
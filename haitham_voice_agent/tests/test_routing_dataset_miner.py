@@ -0,0 +1,153 @@
+"""
+Tests for the incremental routing dataset miner
+
+Pairs split across runs, partial trailing lines, dry runs, rotation by
+inode, reused inodes, pruning of deleted logs, --force rebuilds and
+persistent dedup.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from build_hva_routing_dataset import DatasetBuilder  # noqa: E402
+
+
+def _line(message, second=0):
+    return f"2025-12-01 11:01:{second:02d},223 - hva - INFO - {message}\n"
+
+
+def _route(request_id, text, intent, second=0):
+    tag = f" [{request_id}]" if request_id else ""
+    return (_line(f"ROUTING INPUT{tag}: {text}", second)
+            + _line(f"ROUTING OUTPUT{tag}: " + json.dumps({"intent": intent}), second))
+
+
+@pytest.fixture
+def paths(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    return logs / "hva.log", tmp_path / "data" / "routing.jsonl"
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _mine(logs, output, **kwargs):
+    builder = DatasetBuilder([Path(p) for p in logs], output, **kwargs)
+    builder.run()
+    return builder
+
+
+def _rows(output):
+    if not output.exists():
+        return []
+    return [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def _cursors(output):
+    with sqlite3.connect(output.with_suffix(".state.db")) as db:
+        return dict(db.execute("SELECT path, offset FROM cursors"))
+
+
+def test_pairs_split_across_runs(paths):
+    log, output = paths
+    _append(log, _line("ROUTING INPUT [a1]: remind me at 5") + _line("ROUTING INPUT: what's on today"))
+    assert _mine([log], output).stats["pending"] == 2
+    assert _rows(output) == []
+
+    _append(log, _line("ROUTING OUTPUT: " + json.dumps({"intent": "calendar"}))
+            + _line("ROUTING OUTPUT [a1]: " + json.dumps({"intent": "reminder"})))
+    second = _mine([log], output)
+
+    assert second.stats["new_pairs"] == 2 and second.stats["pending"] == 0
+    assert {(r["input"], json.loads(r["output"])["intent"]) for r in _rows(output)} == {
+        ("remind me at 5", "reminder"), ("what's on today", "calendar")}
+
+
+def test_partial_trailing_line_waits_for_next_run(paths):
+    log, output = paths
+    _append(log, _route("a1", "first", "chat") + _line("ROUTING INPUT [b2]: second").rstrip("\n"))
+    first = _mine([log], output)
+    assert first.stats["lines_scanned"] == 2 and first.stats["pending"] == 0
+
+    _append(log, " request\n" + _line("ROUTING OUTPUT [b2]: " + json.dumps({"intent": "email"})))
+    _mine([log], output)
+
+    assert [r["input"] for r in _rows(output)] == ["first", "second request"]
+
+
+def test_dry_run_writes_nothing(paths):
+    log, output = paths
+    _append(log, _route("a1", "first", "chat"))
+    _mine([log], output)
+    state = _cursors(output)
+
+    _append(log, _route("b2", "second", "email"))
+    dry = _mine([log], output, dry_run=True)
+
+    assert dry.stats["new_pairs"] == 1
+    assert len(_rows(output)) == 1 and _cursors(output) == state
+    # A forced dry run does not wipe the state either
+    _mine([log], output, force=True, dry_run=True)
+    assert _mine([log], output).stats["new_pairs"] == 1
+    assert [r["input"] for r in _rows(output)] == ["first", "second"]
+
+
+def test_rotation_is_followed_by_inode(paths):
+    log, output = paths
+    _append(log, _route("a1", "before rotation", "chat") + _line("ROUTING INPUT [b2]: spans rotation"))
+    _mine([log], output)
+
+    rotated = log.with_name("hva.log.1")
+    _append(log, _route("c3", "late write before rotation", "notes"))
+    os.rename(log, rotated)
+    _append(log, _line("ROUTING OUTPUT [b2]: " + json.dumps({"intent": "tasks"})) + _route("d4", "after", "chat"))
+    os.utime(rotated, (1, 1))  # Rotated file is older
+    run = _mine([log, rotated], output)
+
+    assert run.stats["duplicates"] == 0
+    assert [r["input"] for r in _rows(output)] == ["before rotation", "late write before rotation",
+                                                    "spans rotation", "after"]
+    assert set(_cursors(output)) == {str(log), str(rotated)}
+
+
+def test_reused_inode_and_deleted_logs(paths):
+    log, output = paths
+    old = log.with_name("hva.log.2")
+    _append(old, _route("a1", "old log", "chat"))
+    _append(log, _route("b2", "live log", "chat") * 3)
+    _mine([log, old], output)
+
+    # Same inode, new content (e.g. the log was recreated in place)
+    with open(log, "r+", encoding="utf-8") as f:
+        f.write(_route("c3", "fresh file", "email", second=30) * 4)
+    old.unlink()
+    run = _mine([log, old], output)
+
+    assert "fresh file" in [r["input"] for r in _rows(output)]
+    assert run.stats["new_pairs"] == 1
+    assert set(_cursors(output)) == {str(log)}
+
+
+def test_force_rebuilds_and_dedup_persists(paths):
+    log, output = paths
+    _append(log, _route("a1", "same", "chat") + _route("b2", "same", "chat") + _route(None, "other", "email"))
+    first = _mine([log], output)
+    assert first.stats["new_pairs"] == 2 and first.stats["duplicates"] == 1
+
+    _append(log, _route("c3", "same", "chat"))
+    assert _mine([log], output).stats["duplicates"] == 1
+    rows = _rows(output)
+
+    rebuilt = _mine([log], output, force=True)
+    assert rebuilt.stats["new_pairs"] == 2 and rebuilt.stats["duplicates"] == 2
+    assert [r["input"] for r in _rows(output)] == [r["input"] for r in rows]
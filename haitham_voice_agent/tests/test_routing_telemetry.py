@@ -0,0 +1,152 @@
+"""
+Tests for routing telemetry
+
+Percentile summaries over the ring buffer, adaptive choice between
+equally acceptable logical models, and samples recorded by LLMRouter.
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from haitham_voice_agent import llm_router as llm_router_module
+from haitham_voice_agent import routing_telemetry
+from haitham_voice_agent.model_router import TaskMeta, choose_model
+from haitham_voice_agent.routing_telemetry import RouteSample, RoutingTelemetry, percentile
+from haitham_voice_agent.tools.gemini.gemini_router import choose_gemini_variant
+
+
+def _sample(model, total, success=True, provider="openai", ttft=None, task_type="planning"):
+    return RouteSample(ts=time.time(), task_type=task_type, latency_class="interactive", provider=provider,
+                       model=model, resolved_model=model, ttft=ttft, total=total,
+                       input_tokens=10, output_tokens=5, cost=0.001, success=success)
+
+
+@pytest.fixture
+def telemetry(monkeypatch):
+    telemetry = RoutingTelemetry(max_samples=100)
+    monkeypatch.setattr(routing_telemetry, "_telemetry", telemetry)
+    return telemetry
+
+
+def test_percentile_and_ring_buffer():
+    assert percentile([], 95) is None
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([3.0], 99) == 3.0
+
+    telemetry = RoutingTelemetry(max_samples=3)
+    for total in [1.0, 2.0, 3.0, 4.0]:
+        telemetry.record(_sample("logical.mini", total))
+    assert [s.total for s in telemetry.samples()] == [2.0, 3.0, 4.0]
+
+
+def test_summary_groups(telemetry):
+    for total in [0.5, 0.7, 0.9]:
+        telemetry.record(_sample("logical.mini", total, ttft=0.1))
+    telemetry.record(_sample("logical.gemini.flash", 2.0, success=False, provider="gemini", task_type="doc_analysis"))
+
+    summary = telemetry.summary()
+    assert summary["overall"]["calls"] == 4
+    assert summary["models"]["logical.mini"]["latency_p50"] == 0.7
+    assert summary["models"]["logical.mini"]["ttft_p95"] == 0.1
+    assert summary["providers"]["gemini"]["error_rate"] == 1.0
+    assert set(summary["task_types"]) == {"planning/interactive", "doc_analysis/interactive"}
+    assert summary["overall"]["cost"] == 0.004
+    assert telemetry.summary(window_seconds=60)["overall"]["calls"] == 4
+
+
+def test_adaptive_pick(telemetry):
+    # Not enough data: keep the rule's choice
+    assert telemetry.pick("logical.mini", ["logical.premium"]) is None
+
+    for _ in range(10):
+        telemetry.record(_sample("logical.mini", 1.0))
+        telemetry.record(_sample("logical.premium", 0.9))
+    assert telemetry.pick("logical.mini", ["logical.premium"]) is None  # within the switch margin
+
+    for _ in range(10):
+        telemetry.record(_sample("logical.mini", 4.0))
+    assert telemetry.pick("logical.mini", ["logical.premium"]) == "logical.premium"
+
+    telemetry.clear()
+    for i in range(10):
+        telemetry.record(_sample("logical.mini", 0.5, success=i % 2 == 0))
+        telemetry.record(_sample("logical.premium", 1.5))
+    assert telemetry.pick("logical.mini", ["logical.premium"]) == "logical.premium"  # erroring
+
+
+def test_choose_model_adaptive(telemetry):
+    meta = TaskMeta(context_tokens=100, task_type="planning", risk="low", latency="interactive")
+    for _ in range(10):
+        telemetry.record(_sample("logical.mini", 5.0))
+        telemetry.record(_sample("logical.premium", 1.0))
+
+    assert choose_model(meta)["model"] == "logical.mini"  # adaptive mode is off by default
+    decision = choose_model(meta, adaptive=True)
+    assert decision["model"] == "logical.premium"
+    assert "Adaptive" in decision["reason"]
+
+    # Background and high-risk tasks always follow the rules
+    background = TaskMeta(context_tokens=100, task_type="planning", risk="low", latency="background")
+    assert choose_model(background, adaptive=True)["model"] == "logical.mini"
+
+    # Cached decisions are returned as copies
+    choose_model(meta)["model"] = "changed"
+    assert choose_model(meta)["model"] == "logical.mini"
+
+    for _ in range(10):
+        telemetry.record(_sample("logical.gemini.flash", 1.0, success=False, provider="gemini"))
+        telemetry.record(_sample("logical.gemini.pro", 2.0, provider="gemini"))
+    chat = TaskMeta(context_tokens=100, task_type="other", risk="low", latency="interactive")
+    assert choose_gemini_variant(chat)["logical_model"] == "logical.gemini.flash"
+    assert choose_gemini_variant(chat, adaptive=True)["logical_model"] == "logical.gemini.pro"
+
+
+class _FakeCompletions:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def create(self, **kwargs):
+        if self.fail:
+            raise RuntimeError("upstream down")
+        if kwargs.get("stream"):
+            async def chunks():
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Hi"))], usage=None)
+                yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=12, completion_tokens=5))
+            return chunks()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))],
+                               usage=SimpleNamespace(prompt_tokens=20, completion_tokens=3))
+
+
+class _Tracker:
+    def calculate_cost(self, model, input_tokens, output_tokens):
+        return 0.002
+
+    async def track_usage(self, model, input_tokens, output_tokens, context=None):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_llm_router_records_samples(telemetry, monkeypatch):
+    completions = _FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm_router_module.openai, "AsyncOpenAI", lambda **kwargs: client)
+    monkeypatch.setattr(llm_router_module, "get_tracker", lambda: _Tracker())
+    router = llm_router_module.LLMRouter()
+
+    await router.generate_with_gpt("hi", logical_model="logical.nano",
+                                   usage_context={"task_type": "classification", "latency": "interactive"})
+    await router.stream_with_gpt("hi").collect()
+    completions.fail = True
+    with pytest.raises(RuntimeError):
+        await router.generate_with_gpt("hi")
+
+    first, streamed, failed = telemetry.samples()
+    assert (first.provider, first.model, first.task_type, first.latency_class) == (
+        "openai", "logical.nano", "classification", "interactive")
+    assert (first.input_tokens, first.output_tokens, first.cost, first.ttft) == (20, 3, 0.002, None)
+    assert streamed.model == "logical.mini" and streamed.ttft is not None and streamed.ttft <= streamed.total
+    assert not failed.success and failed.task_type == "other"
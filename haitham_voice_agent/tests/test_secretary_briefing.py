@@ -0,0 +1,117 @@
+"""
+Tests for the morning briefing fan-out
+
+Sources are gathered concurrently, each with its own timeout; a slow or
+failing source falls back to its last snapshot, and a pre-computed
+briefing is answered without touching any source.
+"""
+
+import time
+import asyncio
+import datetime
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from haitham_voice_agent.tools import secretary as secretary_module
+from haitham_voice_agent.tools.secretary import Secretary
+
+
+class _Stale:
+    project = "HVA"
+    nag_count = 0
+
+
+@pytest.fixture
+def secretary(tmp_path, monkeypatch):
+    s = Secretary()
+    s._wake_log = tmp_path / "briefing_times.json"
+    calls = []
+
+    def source(name, value, delay=0.05):
+        async def load():
+            calls.append(name)
+            await asyncio.sleep(delay)
+            return value
+        return load
+
+    s._load_tasks = source("tasks", {"count": 2, "high_priority": ["Urgent: sign contract"]})
+    s._load_calendar = source("calendar", [{"time": "10:00 AM", "title": "Standup"}])
+    s._load_memory = source("memory", ["Board meeting moved to Thursday"])
+    s._load_gmail = source("gmail", {"count": 4, "messages": [{"subject": "Invoice", "from": "bank"}]})
+    s._load_system = source("system", {"battery": 80})
+    s._load_stale = source("stale", [_Stale()])
+    saved = []
+
+    async def save(memory):
+        saved.append(memory.nag_count)
+
+    s._save_memory = save
+    s.calls, s.saved, s.source = calls, saved, source
+    return s
+
+
+@pytest.mark.asyncio
+async def test_sources_run_concurrently(secretary):
+    start = time.perf_counter()
+    result = await secretary.get_morning_briefing()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.2  # six 50 ms sources, not 300 ms
+    assert sorted(secretary.calls) == ["calendar", "gmail", "memory", "stale", "system", "tasks"]
+    assert "Standup" in result["text"] and "Invoice" in result["text"]
+    assert result["data"]["unread_count"] == 4 and result["data"]["tasks_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_source_uses_snapshot(secretary, monkeypatch):
+    await secretary._collect()
+    monkeypatch.setitem(Secretary.SOURCE_TIMEOUTS, "calendar", 0.1)
+    secretary._load_calendar = secretary.source("calendar", [{"time": "11:00 AM", "title": "New"}], delay=5)
+
+    start = time.perf_counter()
+    data = await secretary._collect(refresh=True)
+    assert time.perf_counter() - start < 0.5
+    assert data["calendar"] == [{"time": "10:00 AM", "title": "Standup"}]
+
+
+@pytest.mark.asyncio
+async def test_precomputed_briefing_is_served_from_memory(secretary):
+    await secretary.prepare_briefing()
+    secretary.calls.clear()
+
+    start = time.perf_counter()
+    result = await secretary.get_morning_briefing()
+    await asyncio.sleep(0)
+    assert time.perf_counter() - start < 0.05
+    assert secretary.calls == []
+    assert "HVA" in result["data"]["feedback_question"] or datetime.datetime.now().weekday() >= 5
+
+
+def test_prepare_time_follows_usual_wake_time(secretary):
+    assert secretary.usual_wake_time() == datetime.time(7, 0)
+    for minute in (6 * 60 + 30, 6 * 60 + 40, 6 * 60 + 50):
+        secretary._record_request(datetime.datetime(2025, 12, 1, minute // 60, minute % 60))
+    assert secretary.usual_wake_time() == datetime.time(6, 40)
+
+    now = datetime.datetime(2025, 12, 2, 5, 0)
+    assert secretary.next_prepare_time(now) == datetime.datetime(2025, 12, 2, 6, 20)
+    later = datetime.datetime(2025, 12, 2, 9, 0)
+    assert secretary.next_prepare_time(later) == datetime.datetime(2025, 12, 3, 6, 20)
+
+
+@pytest.mark.asyncio
+async def test_date_only_events_are_all_day(secretary, monkeypatch):
+    class Calendar:
+        async def list_events(self, day):
+            return {"events": [{"start": "2026-10-19", "summary": "Holiday"},
+                               {"start": "2026-10-19T14:30:00+03:00", "summary": "Review"}]}
+
+    class Dispatcher:
+        tools = {"calendar": Calendar()}
+
+    monkeypatch.setattr("haitham_voice_agent.dispatcher.get_dispatcher", lambda: Dispatcher())
+
+    assert await Secretary._load_calendar(secretary) == [
+        {"time": "All day", "title": "Holiday"}, {"time": "02:30 PM", "title": "Review"}]
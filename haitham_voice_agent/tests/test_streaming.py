@@ -0,0 +1,185 @@
+"""
+Tests for token streaming
+
+Sentence chunking for TTS, the blocking-iterator bridge, GPT streaming
+with final usage tracking, SSE encoding and speaking while generating.
+"""
+
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from haitham_voice_agent import llm_router as llm_router_module
+from haitham_voice_agent.streaming import SentenceChunker, chunk_sentences, iterate_in_thread
+from haitham_voice_agent.tts import TTSModule
+from api.sse import sse_reply
+
+
+async def _deltas(parts, delay=0.0):
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+def test_sentence_chunker_arabic_and_english():
+    chunker = SentenceChunker(min_chars=5)
+    out = []
+    for delta in ["Hello the", "re. Version 2.5 is", " out! مرحبا", " كيف حالك؟ ", "تم"]:
+        out += chunker.feed(delta)
+    assert out == ["Hello there.", "Version 2.5 is out!", "مرحبا كيف حالك؟"]
+    assert chunker.flush() == "تم"
+
+
+def test_sentence_chunker_merges_short_and_splits_long():
+    chunker = SentenceChunker(min_chars=12, max_chars=40)
+    assert chunker.feed("Ok. Sure. ") == []  # too short on their own
+    assert chunker.feed("That works fine. ") == ["Ok. Sure. That works fine."]
+    long = "first part of a long clause, second part that keeps going and going"
+    pieces = chunker.feed(long)
+    assert pieces == ["first part of a long clause,"]
+    assert chunker.flush() == "second part that keeps going and going"
+
+
+@pytest.mark.asyncio
+async def test_chunk_sentences_yields_before_stream_ends():
+    seen = []
+    async for sentence in chunk_sentences(_deltas(["One sentence here. ", "Two", " words"], delay=0.05)):
+        seen.append((sentence, time.perf_counter()))
+    assert [s for s, _ in seen] == ["One sentence here.", "Two words"]
+    assert seen[1][1] - seen[0][1] > 0.05
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_streams_and_raises():
+    def slow():
+        for i in range(3):
+            time.sleep(0.02)
+            yield i
+
+    assert [i async for i in iterate_in_thread(slow())] == [0, 1, 2]
+
+    def broken():
+        yield "a"
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        async for _ in iterate_in_thread(broken()):
+            pass
+
+
+class _FakeCompletions:
+    def __init__(self, parts):
+        self.parts = parts
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+
+        async def chunks():
+            for part in self.parts:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=12, completion_tokens=5))
+        return chunks()
+
+
+class _Tracker:
+    def __init__(self):
+        self.events = []
+
+    def calculate_cost(self, model, input_tokens, output_tokens):
+        return 0.001
+
+    async def track_usage(self, model, input_tokens, output_tokens, context=None):
+        self.events.append((model, input_tokens, output_tokens, context["method"]))
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    completions = _FakeCompletions(["Hi ", "there. ", "Bye."])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llm_router_module.openai, "AsyncOpenAI", lambda **kwargs: client)
+    tracker = _Tracker()
+    monkeypatch.setattr(llm_router_module, "get_tracker", lambda: tracker)
+    return completions, tracker
+
+
+@pytest.mark.asyncio
+async def test_stream_with_gpt_tracks_final_usage(fake_openai):
+    completions, tracker = fake_openai
+    router = llm_router_module.LLMRouter()
+
+    stream = router.stream_with_gpt("hello", system_instruction="be brief")
+    deltas = [d async for d in stream]
+
+    assert deltas == ["Hi ", "there. ", "Bye."]
+    assert completions.kwargs["stream"] is True
+    assert completions.kwargs["stream_options"] == {"include_usage": True}
+    assert stream.content == "Hi there. Bye."
+    assert tracker.events == [(stream.model, 12, 5, "stream_with_gpt")]
+    assert stream.usage["output_tokens"] == 5
+
+
+@pytest.mark.asyncio
+async def test_early_stop_still_tracks_usage(fake_openai):
+    _, tracker = fake_openai
+    stream = llm_router_module.LLMRouter().stream_with_gpt("hello")
+    async for _ in stream:
+        break
+    await asyncio.sleep(0.01)
+    assert len(tracker.events) == 1
+
+
+@pytest.mark.asyncio
+async def test_sse_reply_events():
+    events = [e async for e in sse_reply(_deltas(["Hello there. ", "More"]), lambda text: {"response": text})]
+    parsed = [(e.split("\n")[0][7:], json.loads(e.split("\n")[1][6:])) for e in events]
+    assert parsed == [
+        ("delta", {"text": "Hello there. "}),
+        ("sentence", {"text": "Hello there."}),
+        ("delta", {"text": "More"}),
+        ("sentence", {"text": "More"}),
+        ("done", {"response": "Hello there. More"}),
+    ]
+
+    async def failing():
+        yield "partial"
+        raise RuntimeError("upstream closed")
+
+    events = [e async for e in sse_reply(failing(), {})]
+    assert events[-1].startswith("event: error")
+
+
+@pytest.mark.asyncio
+async def test_speak_stream_starts_before_generation_ends(monkeypatch):
+    tts = TTSModule()
+    spoken = []
+    first_spoken = asyncio.Event()
+
+    async def speak(text, language=None, wait=True):
+        spoken.append((text, language))
+        first_spoken.set()
+
+    async def deltas():
+        yield "أهلاً بك يا صديقي. "
+        # Deadlocks (and times out) unless the first sentence is spoken mid-stream
+        await asyncio.wait_for(first_spoken.wait(), timeout=5)
+        for part in ("هذه ", "الجملة الثانية."):
+            yield part
+
+    monkeypatch.setattr(tts, "speak", speak)
+    text = await tts.speak_stream(deltas())
+
+    assert text == "أهلاً بك يا صديقي. هذه الجملة الثانية."
+    assert spoken == [("أهلاً بك يا صديقي.", "ar"), ("هذه الجملة الثانية.", "ar")]
+
+    # A custom speaker (e.g. the voice loop's blocking TTS) replaces self.speak
+    custom = []
+
+    async def speak_sentence(text, language):
+        custom.append((text, language))
+
+    await tts.speak_stream(_deltas(["Hello there. ", "Bye."]), speak=speak_sentence)
+    assert custom == [("Hello there.", "en"), ("Bye.", "en")]
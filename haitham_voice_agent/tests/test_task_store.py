@@ -0,0 +1,107 @@
+"""
+Tests for the SQLite-backed TaskManager
+
+Covers single-row mutations, project/status filtering, due-date range
+queries served by the (status, due_ts) index, and the one-time import of
+legacy per-project tasks.json files.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from haitham_voice_agent.tools.tasks import task_manager as task_manager_module
+from haitham_voice_agent.tools.tasks.task_manager import TaskManager
+from haitham_voice_agent.tools.tasks.task_store import TaskStore
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    ws = task_manager_module.workspace_manager
+    monkeypatch.setattr(ws, "inbox_root", tmp_path / "inbox")
+    monkeypatch.setattr(ws, "projects_root", tmp_path / "projects")
+    (tmp_path / "projects").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def manager(workspace):
+    m = TaskManager(store=TaskStore(db_path=workspace / "memory.db"))
+    yield m
+    m.store.close()
+
+
+def _legacy(path, tasks, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(tasks, ensure_ascii=False), encoding="utf-8")
+    if mtime:
+        os.utime(path, (mtime, mtime))
+
+
+def _legacy_task(task_id, title, project_id, status="open"):
+    now = datetime.now().isoformat()
+    return {"id": task_id, "user_id": "haitham-local", "project_id": project_id, "title": title,
+            "description": "", "status": status, "created_at": now, "updated_at": now,
+            "language": "ar", "due_date": None, "notes": "", "tags": ["legacy"]}
+
+
+def test_crud_and_filters(manager):
+    a = manager.create_task("مراجعة العقد")
+    b = manager.create_task("Deploy", project_id="hva")
+
+    assert [t.title for t in manager.list_tasks()] == ["مراجعة العقد", "Deploy"]
+    assert [t.id for t in manager.list_tasks(project_id="hva")] == [b.id]
+
+    done = manager.complete_task(b.id, "inbox")  # project id no longer has to match
+    assert done.status == "completed" and done.updated_at >= b.updated_at
+    assert [t.id for t in manager.list_tasks(status="open")] == [a.id]
+
+    assert manager.update_task("missing", title="x") is None
+    assert manager.delete_task(a.id)
+    assert not manager.delete_task(a.id)
+    assert manager.store.count() == 1
+
+
+def test_due_range_query_uses_index(manager):
+    now = datetime.now()
+    soon = manager.create_task("Call bank", due_date=now + timedelta(minutes=10))
+    manager.create_task("Later", due_date=now + timedelta(hours=5))
+    manager.create_task("No date")
+    past = manager.create_task("Overdue", due_date=(now - timedelta(hours=1)).isoformat())
+    closed = manager.create_task("Closed", due_date=now + timedelta(minutes=5))
+    manager.complete_task(closed.id)
+
+    assert [t.id for t in manager.tasks_due_within(30)] == [soon.id]
+    window = manager.tasks_due_between(now - timedelta(days=1), now + timedelta(days=1))
+    assert [t.title for t in window] == ["Overdue", "Call bank", "Later"]
+    assert window[0].id == past.id
+
+    plan = manager.store._db().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE status = ? AND due_ts >= ? AND due_ts < ?",
+        ("open", 0, 1)
+    ).fetchall()
+    assert any("idx_tasks_status_due" in row[-1] for row in plan)
+
+
+def test_imports_legacy_json_once(manager, workspace):
+    _legacy(workspace / "inbox" / "tasks" / "tasks.json", [_legacy_task("t1", "Inbox task", "inbox")])
+    _legacy(workspace / "projects" / "hva" / "tasks" / "tasks.json",
+            [_legacy_task("t2", "Project task", None), _legacy_task("t3", "Done", "hva", "completed")])
+
+    tasks = manager.list_tasks()
+    assert {t.id for t in tasks} == {"t1", "t2", "t3"}
+    assert manager.get_task("t2").project_id == "hva"
+    assert manager.get_task("t1").tags == ["legacy"]
+
+    # Store edits survive a re-import of the unchanged or changed file
+    manager.update_task("t1", title="Edited")
+    fresh = TaskManager(store=manager.store)
+    assert fresh.get_task("t1").title == "Edited"
+    _legacy(workspace / "inbox" / "tasks" / "tasks.json",
+            [_legacy_task("t1", "Inbox task", "inbox"), _legacy_task("t4", "New", "inbox")],
+            mtime=datetime.now().timestamp() + 60)
+    newer = TaskManager(store=manager.store)
+    assert newer.get_task("t1").title == "Edited"
+    assert newer.get_task("t4") is not None
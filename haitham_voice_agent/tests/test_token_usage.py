@@ -0,0 +1,116 @@
+"""
+Tests for buffered token usage tracking
+
+track_usage only queues the event; a background writer flushes batches in
+one transaction and keeps per-day / per-model rollups that the stats
+endpoint reads instead of aggregating the raw table.
+"""
+
+import asyncio
+import datetime
+
+import pytest
+
+from haitham_voice_agent.token_tracker import TokenTracker
+
+
+class RecordingStore:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def log_token_usage_batch(self, events):
+        if self.fail:
+            return False
+        self.batches.append(list(events))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_track_usage_is_buffered_and_batched(monkeypatch):
+    store = RecordingStore()
+    tracker = TokenTracker(store=store)
+    monkeypatch.setattr(tracker, "FLUSH_INTERVAL", 0.05)
+
+    for i in range(5):
+        await tracker.track_usage("gpt-4o", 100, 50, context={"i": i})
+    assert store.batches == []  # nothing written inline
+
+    await asyncio.sleep(0.15)
+    assert len(store.batches) == 1 and len(store.batches[0]) == 5
+    assert store.batches[0][0]["cost"] == pytest.approx(tracker.calculate_cost("gpt-4o", 100, 50))
+    assert tracker._writer.done()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_immediately_and_failures_are_kept(monkeypatch):
+    store = RecordingStore(fail=True)
+    tracker = TokenTracker(store=store)
+    monkeypatch.setattr(tracker, "BATCH_SIZE", 3)
+
+    for _ in range(3):
+        await tracker.track_usage("gemini-1.5-flash", 10, 10)
+    await asyncio.sleep(0)
+    assert len(tracker._buffer) == 3  # write failed, events kept for retry
+
+    store.fail = False
+    assert await tracker.flush()
+    assert [len(b) for b in store.batches] == [3] and not tracker._buffer
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_keeps_a_single_flush_task(monkeypatch):
+    store = RecordingStore()
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_batch(events):
+        calls.append(len(events))
+        await release.wait()  # The store is down until released
+        return await RecordingStore.log_token_usage_batch(store, events)
+
+    store.log_token_usage_batch = slow_batch
+    tracker = TokenTracker(store=store)
+    monkeypatch.setattr(tracker, "BATCH_SIZE", 2)
+
+    for _ in range(2):
+        await tracker.track_usage("gpt-4o", 10, 10)
+    flush_task = tracker._flush_task
+    for _ in range(5):
+        await tracker.track_usage("gpt-4o", 10, 10)
+        await asyncio.sleep(0)
+
+    assert tracker._flush_task is flush_task and calls == [2]
+
+    release.set()
+    await flush_task
+    assert tracker._flush_task.done() and not tracker._buffer
+    assert sum(len(b) for b in store.batches) == 7
+
+
+@pytest.mark.asyncio
+async def test_rollups_match_raw_rows(tmp_path):
+    pytest.importorskip("chromadb")
+    from haitham_voice_agent.tools.memory.storage.sqlite_store import SQLiteStore
+
+    store = SQLiteStore(db_path=tmp_path / "memory.db")
+    await store.initialize()
+    tracker = TokenTracker(store=store)
+
+    today = datetime.datetime.now()
+    yesterday = (today - datetime.timedelta(days=1)).isoformat()
+    await store.log_token_usage_batch([
+        {"timestamp": yesterday, "model": "gpt-4o", "input_tokens": 1000, "output_tokens": 0, "cost": 0.5}
+    ])
+    await tracker.track_usage("gpt-4o", 100, 50)
+    await tracker.track_usage("gemini-1.5-flash", 2000, 100)
+    await tracker.track_usage("gemini-1.5-flash", 0, 100)
+    await tracker.flush()
+
+    stats = await store.get_token_usage_stats(days=7)
+    assert stats["request_count"] == 4
+    assert stats["total_tokens"] == 1000 + 150 + 2100 + 100
+    assert [d["tokens"] for d in stats["daily_stats"]] == [1000, 2350]
+    by_model = {m["model"]: m for m in stats["by_model"]}
+    assert by_model["gemini-1.5-flash"]["count"] == 2 and by_model["gpt-4o"]["tokens"] == 1150
+    assert len(await store.get_token_usage_logs(limit=10)) == 4
@@ -0,0 +1,92 @@
+"""
+Tests for streamed spoken replies in the voice loop
+
+The first sentence must be spoken while the reply is still generating,
+and a GPT stream that fails before any text falls back to the local model.
+"""
+
+import asyncio
+
+import pytest
+
+from haitham_voice_agent.main import HVA
+
+
+class FakeStream:
+    def __init__(self, deltas):
+        self.content = ""
+        self._deltas = deltas
+
+    async def __aiter__(self):
+        async for delta in self._deltas:
+            self.content += delta
+            yield delta
+
+
+class FakeRouter:
+    def __init__(self, gpt, local=None):
+        self.gpt = gpt
+        self.local = local
+        self.calls = []
+
+    def stream_with_gpt(self, prompt, **kwargs):
+        self.calls.append("gpt")
+        return FakeStream(self.gpt())
+
+    def stream_with_local(self, prompt, **kwargs):
+        self.calls.append("local")
+        return FakeStream(self.local())
+
+
+class FakeTTS:
+    def __init__(self):
+        self.spoken = []
+        self.first_spoken = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    def speak(self, text, language="en", rate=200):
+        # Runs in a worker thread, like the blocking `say` call
+        self.spoken.append(text)
+        self.loop.call_soon_threadsafe(self.first_spoken.set)
+
+
+def _hva(router):
+    hva = HVA.__new__(HVA)  # Skip hardware and model initialization
+    hva.language = "en"
+    hva.tts = FakeTTS()
+    hva.llm_router = router
+    return hva
+
+
+@pytest.mark.asyncio
+async def test_first_sentence_spoken_before_stream_ends():
+    hva = _hva(None)
+
+    async def gpt():
+        yield "Your next meeting is at ten. "
+        # Deadlocks (and times out) unless the first sentence is spoken mid-stream
+        await asyncio.wait_for(hva.tts.first_spoken.wait(), timeout=5)
+        yield "It is with the design team."
+
+    hva.llm_router = FakeRouter(gpt)
+    reply = await hva.speak_reply("when is my next meeting?")
+
+    assert reply == "Your next meeting is at ten. It is with the design team."
+    assert hva.tts.spoken == ["Your next meeting is at ten.", "It is with the design team."]
+
+
+@pytest.mark.asyncio
+async def test_gpt_failure_before_any_text_falls_back_to_local():
+    async def gpt():
+        raise ConnectionError("offline")
+        yield
+
+    async def local():
+        yield "Local answer."
+
+    router = FakeRouter(gpt, local)
+    hva = _hva(router)
+
+    assert await hva.speak_reply("hello") == "Local answer."
+    assert router.calls == ["gpt", "local"]
+    assert hva.tts.spoken == ["Local answer."]
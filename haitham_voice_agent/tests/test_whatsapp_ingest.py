@@ -0,0 +1,109 @@
+"""
+Tests for the WhatsApp export parser and parallel ZIP ingestion
+
+iOS and Android headers, AM/PM and ص/م suffixes, Arabic-Indic digits,
+system events, multi-line merging, and chats whose worker died.
+"""
+
+import os
+import sys
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import ingest_whatsapp_haithm_only as ingest  # noqa: E402
+from ingest_whatsapp_haithm_only import MESSAGE_START, iter_messages, parse_line  # noqa: E402
+
+
+def _messages(*lines, stats=None):
+    return list(iter_messages((line + "\n" for line in lines), stats))
+
+
+@pytest.mark.parametrize("line, timestamp", [
+    ("[12/09/2024, 21:35:10] Haithm: hello", "12/09/2024, 21:35:10"),
+    ("[12/09/2024, 9:35:10 PM] Haithm: hello", "12/09/2024, 9:35:10 PM"),
+    ("12/09/2024, 21:35 - Haithm: hello", "12/09/2024, 21:35"),
+    ("12/09/2024, 9:35 am - Haithm: hello", "12/09/2024, 9:35 am"),
+    ("12.09.24 21:35 - Haithm: hello", "12.09.24 21:35"),
+    ("12/09/2024، 9:35 م - Haithm: hello", "12/09/2024، 9:35 م"),
+    ("12/09/2024، 9:35 ص - Haithm: hello", "12/09/2024، 9:35 ص"),
+])
+def test_ios_and_android_headers(line, timestamp):
+    assert _messages(line) == [(timestamp, "Haithm", "hello")]
+
+
+def test_arabic_indic_digits():
+    line = "١٢/٠٩/٢٠٢٤، ٩:٣٥ م - هيثم: مرحبا"
+
+    assert _messages(line) == [("١٢/٠٩/٢٠٢٤، ٩:٣٥ م", "هيثم", "مرحبا")]
+    # Timestamps are converted to ASCII digits when kept
+    assert parse_line(line) == ("12/09/2024، 9:35 م", "هيثم", "مرحبا")
+    assert parse_line("[۱۲/۰۹/۲۰۲۴, ۲۱:۳۵:۱۰] Haithm: hi")[0] == "12/09/2024, 21:35:10"
+
+
+def test_system_events_have_no_sender():
+    event = "12/09/2024, 21:36 - Messages to this group are now secured with end-to-end encryption."
+    assert MESSAGE_START.match(event).group("sender") is None
+    assert parse_line(event) is None
+
+    stats = {"lines": 0, "continuation_lines": 0, "events": 0}
+    messages = _messages("12/09/2024, 21:35 - Haithm: before", event,
+                         "‎[12/09/2024, 21:37:00] Sara: after", stats=stats)
+
+    assert messages == [("12/09/2024, 21:35", "Haithm", "before"), ("12/09/2024, 21:37:00", "Sara", "after")]
+    assert stats == {"lines": 3, "continuation_lines": 0, "events": 1}
+
+
+def test_multi_line_messages_are_merged():
+    stats = {"lines": 0, "continuation_lines": 0, "events": 0}
+    messages = _messages(
+        "continuation before any header is dropped",
+        "12/09/2024, 21:37 - Haithm: first line",
+        "second line",
+        "note: not a header",
+        "[12/09/2024, 21:38:00] Sara: bye",
+        "",
+        "see you",
+        stats=stats,
+    )
+
+    assert messages == [
+        ("12/09/2024, 21:37", "Haithm", "first line\nsecond line\nnote: not a header"),
+        ("12/09/2024, 21:38:00", "Sara", "bye\n\nsee you"),
+    ]
+    assert stats["continuation_lines"] == 4
+
+
+def _zip(path, *lines, padding=0):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("_chat.txt", "\n".join(lines) + "\n")
+        z.writestr("padding.bin", os.urandom(padding))  # Size decides processing order
+    return path
+
+
+_process_zip_file = ingest.process_zip_file
+
+
+def _dying(zip_path, out_file):
+    if "Crash" in zip_path:
+        os._exit(1)  # e.g. the OOM killer
+    return _process_zip_file(zip_path, out_file)
+
+
+def test_dead_worker_is_recorded_and_run_continues(tmp_path, monkeypatch):
+    good = _zip(tmp_path / "WhatsApp Chat - Family.zip", "12/09/2024, 21:35 - Haithm: hello", padding=4096)
+    crash = _zip(tmp_path / "WhatsApp Chat - Crash.zip", "12/09/2024, 21:35 - Haithm: lost")
+    output = tmp_path / "out.jsonl"
+    monkeypatch.setattr(ingest, "process_zip_file", _dying)
+
+    stats = {s["chat_name"]: s for s in ingest.ingest_zips([crash, good], output, workers=1)}
+
+    assert set(stats) == {"Family", "Crash"}
+    assert "error" in stats["Crash"] and stats["Crash"]["haithm_messages"] == 0
+    assert "error" not in stats["Family"]
+    assert [json.loads(line)["text"] for line in output.read_text(encoding="utf-8").splitlines()] == ["hello"]
+    assert not output.with_name("out.jsonl.parts").exists()
@@ -0,0 +1,103 @@
+"""
+Tests for the WebSocket fan-out in api/connection_manager
+
+A slow client must not delay the broadcaster or the other clients;
+progress events are coalesced / dropped under backpressure and broken
+connections are pruned.
+"""
+
+import json
+import time
+import asyncio
+
+import pytest
+
+from api.connection_manager import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self):
+        self.closed = True
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_broadcast():
+    manager = ConnectionManager()
+    fast, slow = FakeSocket(), FakeSocket(delay=1.0)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    start = time.perf_counter()
+    for i in range(20):
+        await manager.broadcast({"type": "notification", "message": f"n{i}"})
+    assert time.perf_counter() - start < 0.05
+
+    await _settle()
+    assert [m["message"] for m in fast.sent] == [f"n{i}" for i in range(20)]
+    assert len(slow.sent) == 0
+    manager.disconnect(slow)
+
+
+@pytest.mark.asyncio
+async def test_progress_is_coalesced_and_dropped_first(monkeypatch):
+    manager = ConnectionManager()
+    monkeypatch.setattr(manager, "QUEUE_SIZE", 4)
+    slow = FakeSocket(delay=10)
+    await manager.connect(slow)
+    await asyncio.sleep(0)
+    client = manager._clients[slow]
+    client.writer.cancel()  # Keep everything queued for inspection
+
+    for status in ("scanning", "analyzing", "done"):
+        manager.publish({"type": "task_progress", "task": "Deep Organize", "file": "a.pdf", "status": status})
+    assert [json.loads(i.text)["status"] for i in client.queue] == ["done"]
+
+    manager.publish({"type": "task_progress", "task": "Deep Organize", "file": "b.pdf", "status": "scanning"})
+    manager.publish({"type": "notification", "message": "one"})
+    manager.publish({"type": "notification", "message": "two"})
+    manager.publish({"type": "notification", "message": "three"})  # Full: oldest progress frame goes
+    kinds = [json.loads(i.text).get("file") or json.loads(i.text)["message"] for i in client.queue]
+    assert kinds == ["b.pdf", "one", "two", "three"]
+
+    manager.publish({"type": "notification", "message": "four"})
+    manager.publish({"type": "notification", "message": "five"})  # Nothing left to drop: disconnect
+    assert slow not in manager.active_connections
+    await _settle()
+    assert slow.closed
+
+
+@pytest.mark.asyncio
+async def test_dead_connection_is_pruned_and_publish_from_thread():
+    manager = ConnectionManager()
+    dead, alive = FakeSocket(fail=True), FakeSocket()
+    await manager.connect(dead)
+    await manager.connect(alive)
+
+    await asyncio.to_thread(manager.publish, {"type": "log", "message": "from worker"})
+    await _settle()
+    assert manager.active_connections == [alive]
+    assert alive.sent == [{"type": "log", "message": "from worker"}]
+
+    await manager.send_personal(alive, {"type": "pong"})
+    await _settle()
+    assert alive.sent[-1] == {"type": "pong"}
@@ -1,5 +1,8 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import datetime
+from collections import deque
+from typing import Dict, Any, Optional, List
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -8,8 +11,16 @@ class TokenTracker:
     """
     Tracks token usage and calculates costs for LLM calls.
     Singleton instance.
+    
+    Usage events are buffered in memory and written in batches by a
+    background writer (one transaction per batch, which also updates the
+    daily/model rollup tables), so LLM calls never wait on a disk commit.
     """
     
+    FLUSH_INTERVAL = 2.0   # Seconds between background flushes
+    BATCH_SIZE = 200       # Events per transaction; a full batch flushes immediately
+    MAX_BUFFER = 10000     # Oldest events are dropped beyond this (DB unavailable for long)
+    
     # Cost per 1k tokens (USD)
     # As of late 2024/2025 estimates
     PRICING = {
@@ -31,9 +42,13 @@ class TokenTracker:
         "whisper": {"input": 0.0, "output": 0.0}, # STT usually per minute, but let's track 0 for now
     }
     
-    def __init__(self):
+    def __init__(self, store=None):
         self.pricing_file = Path(__file__).parent / "data" / "pricing.json"
         self.PRICING = self._load_pricing()
+        self.store = store  # Defaults to memory_system.sqlite_store
+        self._buffer: deque = deque(maxlen=self.MAX_BUFFER)
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None  # Immediate flush of a full batch
         
     def _load_pricing(self) -> Dict[str, Any]:
         """Load pricing from JSON file"""
@@ -69,27 +84,66 @@ class TokenTracker:
         
     async def track_usage(self, model: str, input_tokens: int, output_tokens: int, context: Dict[str, Any] = None):
         """
-        Calculate cost and log usage to DB.
+        Calculate cost and queue the usage event for the background writer.
         """
-        from haitham_voice_agent.tools.memory.memory_system import memory_system
-        
         cost = self.calculate_cost(model, input_tokens, output_tokens)
         
-        # Log to DB
-        # We access sqlite_store via memory_system
-        if memory_system and memory_system.sqlite_store:
-            await memory_system.sqlite_store.log_token_usage(
-                model=model,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                cost=cost,
-                context=context
-            )
+        if len(self._buffer) == self._buffer.maxlen:
+            logger.warning("Token usage buffer full, dropping oldest event")
+        self._buffer.append({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": cost,
+            "context": context
+        })
+        self._ensure_writer()
             
         # Log to console for debug
         if cost > 0:
             logger.debug(f"Token Usage [{model}]: {input_tokens}+{output_tokens} tokens = ${cost:.6f}")
 
+    def _get_store(self):
+        if self.store is not None:
+            return self.store
+        # We access sqlite_store via memory_system
+        from haitham_voice_agent.tools.memory.memory_system import memory_system
+        return memory_system.sqlite_store if memory_system else None
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        # One immediate flush at a time (a store outage must not pile up tasks)
+        if len(self._buffer) >= self.BATCH_SIZE and (
+                self._flush_task is None or self._flush_task.done() or self._flush_task.get_loop() is not loop):
+            self._flush_task = loop.create_task(self.flush())
+        if self._writer is None or self._writer.done() or self._writer.get_loop() is not loop:
+            self._writer = loop.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        """Flush periodically while events are pending, then exit"""
+        while self._buffer:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            if not await self.flush():
+                break  # Retried when the next event arrives
+
+    async def flush(self) -> bool:
+        """
+        Write all buffered events now (e.g. before reading stats or on shutdown).
+        
+        Concurrent flushes take disjoint batches; the rollups are additive.
+        """
+        store = self._get_store()
+        if store is None:
+            self._buffer.clear()
+            return True
+        while self._buffer:
+            batch: List[Dict[str, Any]] = [self._buffer.popleft() for _ in range(min(self.BATCH_SIZE, len(self._buffer)))]
+            if not await store.log_token_usage_batch(batch):
+                self._buffer.extendleft(reversed(batch))
+                return False
+        return True
+
     def calculate_cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
         """
         Calculate cost based on model pricing.
@@ -6,9 +6,10 @@ Handles events, availability, and scheduling.
 """
 
 import os
+import asyncio
 import logging
 import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
 
 from google.auth.transport.requests import Request
@@ -18,6 +19,7 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from haitham_voice_agent.config import Config
+from haitham_voice_agent.tools.date_parser import parse_datetime
 from haitham_voice_agent.tools.gmail.auth.credentials_store import get_credential_store
 
 logger = logging.getLogger(__name__)
@@ -29,8 +31,17 @@ class CalendarTools:
         self.service = None
         self.credential_store = get_credential_store()
         self.client_secret_path = Config.CREDENTIALS_DIR / "client_secret.json"
+        # Called after events are created/deleted through HVA (e.g. Guardian re-sync)
+        self.change_listeners: List[Callable[[], None]] = []
         
         logger.info("CalendarTools initialized")
+    
+    def _notify_change(self):
+        for listener in list(self.change_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"Calendar change listener failed: {e}")
 
     def _get_credentials(self) -> Optional[Credentials]:
         """Get valid OAuth credentials for Calendar"""
@@ -118,28 +129,42 @@ class CalendarTools:
             return False
 
     async def _smart_parse_date(self, date_str: str) -> Optional[datetime.datetime]:
-        """Use Gemini to parse natural language date into ISO format"""
+        """
+        Parse natural language date into a datetime
+        
+        Order: ISO -> local rule-based parser (Arabic/English, timezones)
+        -> dateparser -> Gemini, so the LLM only sees phrases nothing
+        else understood.
+        """
         # 1. Check if it's already a datetime object
         if isinstance(date_str, datetime.datetime):
              return date_str
+        if not date_str:
+            return None
              
         # 2. Check if it's already an ISO string
         try:
             return datetime.datetime.fromisoformat(date_str)
         except ValueError:
             pass
+        
+        # 3. Local parser (memoized)
+        dt = parse_datetime(date_str)
+        if dt:
+            return dt
             
-        # 3. Try dateparser
+        # 4. Try dateparser
         import dateparser
         dt = dateparser.parse(date_str, settings={'PREFER_DATES_FROM': 'future'})
         
-        suspicious_keywords = ["time", "in ", "gmt", "utc", "est", "pst", "cairo", "egypt", "saudi", "london", "dubai"]
+        # Zone names the local parser did not resolve need the LLM to get the offset right
+        suspicious_keywords = ["gmt", "utc", "est", "pst", "cairo", "egypt", "saudi", "london", "dubai", "توقيت"]
         is_complex = any(k in date_str.lower() for k in suspicious_keywords)
         
         if dt and not is_complex:
             return dt
             
-        # 4. Fallback to LLM (Gemini) for complex parsing
+        # 5. Fallback to LLM (Gemini) for complex parsing
         try:
             from haitham_voice_agent.llm_router import get_router
             router = get_router()
@@ -159,10 +184,11 @@ class CalendarTools:
             4. If invalid, return "None".
             """
             
-            iso_str = await router.generate_with_gemini(prompt, temperature=0.0)
+            result = await router.generate_with_gemini(prompt, temperature=0.0)
+            iso_str = result.get("content", "") if isinstance(result, dict) else str(result)
             iso_str = iso_str.strip().replace('"', '').replace("'", "")
             
-            if iso_str.lower() == "none":
+            if not iso_str or iso_str.lower() == "none":
                 return dt # Fallback to whatever dateparser found (or None)
                 
             # Parse ISO string
@@ -231,14 +257,15 @@ class CalendarTools:
             time_min_iso = time_min.isoformat()
             time_max_iso = time_max.isoformat()
             
-            events_result = self.service.events().list(
+            # Blocking HTTP call; keep it off the event loop (briefing fans out in parallel)
+            events_result = await asyncio.to_thread(self.service.events().list(
                 calendarId='primary',
                 timeMin=time_min_iso,
                 timeMax=time_max_iso,
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ).execute)
             
             events = events_result.get('items', [])
             
@@ -262,6 +289,73 @@ class CalendarTools:
             logger.error(f"List events failed: {e}")
             return {"error": True, "message": str(e)}
 
+    @staticmethod
+    def _format_event(event: Dict[str, Any]) -> Dict[str, Any]:
+        start = event.get('start', {})
+        end = event.get('end', {})
+        return {
+            "id": event.get('id'),
+            "summary": event.get('summary', 'No Title'),
+            "start": start.get('dateTime', start.get('date')),
+            "end": end.get('dateTime', end.get('date')),
+            "all_day": 'dateTime' not in start,
+            "link": event.get('htmlLink')
+        }
+
+    async def sync_events(self, sync_token: Optional[str] = None, days_back: int = 1) -> Dict[str, Any]:
+        """
+        Incremental event sync using Calendar API sync tokens
+        
+        Without a token, lists events from `days_back` days ago onward and
+        returns a nextSyncToken. With a token, returns only events changed
+        since then (cancelled ones as "deleted"). An expired token (410) falls
+        back to a full sync.
+        
+        Returns:
+            dict: events, deleted (ids), sync_token, full (bool)
+        """
+        if not self._ensure_service():
+            return {"error": True, "message": "Calendar not authorized. Please say 'Authorize Calendar'."}
+        
+        def fetch(token: Optional[str]):
+            params = {"calendarId": 'primary', "singleEvents": True, "maxResults": 250}
+            if token:
+                params["syncToken"] = token
+            else:
+                time_min = datetime.datetime.now().astimezone() - datetime.timedelta(days=days_back)
+                params["timeMin"] = time_min.isoformat()
+            items = []
+            while True:
+                result = self.service.events().list(**params).execute()
+                items.extend(result.get('items', []))
+                if not result.get('nextPageToken'):
+                    return items, result.get('nextSyncToken')
+                params["pageToken"] = result['nextPageToken']
+        
+        try:
+            full = not sync_token
+            try:
+                items, next_token = await asyncio.to_thread(fetch, sync_token)
+            except HttpError as e:
+                if getattr(e, "resp", None) is None or e.resp.status != 410:
+                    raise
+                logger.info("Calendar sync token expired, running full sync")
+                full = True
+                items, next_token = await asyncio.to_thread(fetch, None)
+            
+            events, deleted = [], []
+            for event in items:
+                if event.get('status') == 'cancelled':
+                    deleted.append(event.get('id'))
+                else:
+                    events.append(self._format_event(event))
+            return {"success": True, "events": events, "deleted": deleted,
+                    "sync_token": next_token, "full": full}
+            
+        except Exception as e:
+            logger.error(f"Calendar sync failed: {e}")
+            return {"error": True, "message": str(e)}
+
     async def delete_event(self, event_id: str) -> bool:
         """Delete an event by ID"""
         if not self._ensure_service():
@@ -270,6 +364,7 @@ class CalendarTools:
         try:
             self.service.events().delete(calendarId='primary', eventId=event_id).execute()
             logger.info(f"Deleted calendar event: {event_id}")
+            self._notify_change()
             return True
         except Exception as e:
             logger.error(f"Failed to delete event {event_id}: {e}")
@@ -383,6 +478,7 @@ class CalendarTools:
             }
             
             event_result = self.service.events().insert(calendarId='primary', body=event).execute()
+            self._notify_change()
             
             msg = f"Event created: {summary} at {start_dt.strftime('%Y-%m-%d %H:%M')}."
             if conflict_warning:
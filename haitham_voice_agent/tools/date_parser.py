@@ -0,0 +1,499 @@
+"""
+Date Parser
+
+Rule-based parser for the Arabic and English date/time phrases HVA hears
+("بكرة الساعة 5", "next Monday 3pm", "الخميس الجاي العصر", "in 2 hours",
+"5 ديسمبر 10:30", "3pm Cairo time"). Patterns are compiled once; the
+syntactic parse is memoized per string and the resolved date per
+(string, reference day), so repeated commands cost a dict lookup.
+
+Anything the rules cannot fully account for returns None, and callers fall
+back to dateparser / the LLM.
+"""
+
+import re
+import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple, List
+from zoneinfo import ZoneInfo
+
+# ==================== Vocabulary (normalized forms) ====================
+
+# City / country / abbreviation -> IANA zone. Cities only count next to
+# "time" / "بتوقيت"; abbreviations also count on their own ("3pm EST").
+TIMEZONES = {
+    "utc": "UTC", "gmt": "UTC", "جرينتش": "UTC", "غرينتش": "UTC",
+    "cairo": "Africa/Cairo", "egypt": "Africa/Cairo", "القاهره": "Africa/Cairo", "مصر": "Africa/Cairo",
+    "riyadh": "Asia/Riyadh", "saudi": "Asia/Riyadh", "ksa": "Asia/Riyadh", "jeddah": "Asia/Riyadh",
+    "الرياض": "Asia/Riyadh", "السعوديه": "Asia/Riyadh", "جده": "Asia/Riyadh", "مكه": "Asia/Riyadh",
+    "dubai": "Asia/Dubai", "uae": "Asia/Dubai", "abu dhabi": "Asia/Dubai", "gst": "Asia/Dubai",
+    "دبي": "Asia/Dubai", "الامارات": "Asia/Dubai", "ابوظبي": "Asia/Dubai", "ابو ظبي": "Asia/Dubai",
+    "kuwait": "Asia/Kuwait", "الكويت": "Asia/Kuwait",
+    "doha": "Asia/Qatar", "qatar": "Asia/Qatar", "الدوحه": "Asia/Qatar", "قطر": "Asia/Qatar",
+    "bahrain": "Asia/Bahrain", "manama": "Asia/Bahrain", "البحرين": "Asia/Bahrain", "المنامه": "Asia/Bahrain",
+    "muscat": "Asia/Muscat", "oman": "Asia/Muscat", "مسقط": "Asia/Muscat",
+    "amman": "Asia/Amman", "jordan": "Asia/Amman", "الاردن": "Asia/Amman",
+    "beirut": "Asia/Beirut", "lebanon": "Asia/Beirut", "بيروت": "Asia/Beirut", "لبنان": "Asia/Beirut",
+    "baghdad": "Asia/Baghdad", "iraq": "Asia/Baghdad", "بغداد": "Asia/Baghdad", "العراق": "Asia/Baghdad",
+    "istanbul": "Europe/Istanbul", "turkey": "Europe/Istanbul", "اسطنبول": "Europe/Istanbul", "تركيا": "Europe/Istanbul",
+    "london": "Europe/London", "uk": "Europe/London", "bst": "Europe/London", "لندن": "Europe/London",
+    "paris": "Europe/Paris", "cet": "Europe/Paris", "باريس": "Europe/Paris",
+    "berlin": "Europe/Berlin", "برلين": "Europe/Berlin",
+    "new york": "America/New_York", "nyc": "America/New_York", "est": "America/New_York",
+    "edt": "America/New_York", "نيويورك": "America/New_York",
+    "chicago": "America/Chicago", "cst": "America/Chicago",
+    "los angeles": "America/Los_Angeles", "san francisco": "America/Los_Angeles",
+    "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles",
+    "tokyo": "Asia/Tokyo", "طوكيو": "Asia/Tokyo",
+    "india": "Asia/Kolkata", "ist": "Asia/Kolkata", "الهند": "Asia/Kolkata",
+}
+TZ_ABBREVIATIONS = {"utc", "gmt", "gst", "bst", "cet", "est", "edt", "cst", "pst", "pdt", "ist"}
+
+WEEKDAYS = {
+    "monday": 0, "الاثنين": 0, "الاتنين": 0, "اثنين": 0,
+    "tuesday": 1, "tues": 1, "الثلاثاء": 1, "التلات": 1, "التلاتاء": 1,
+    "wednesday": 2, "الاربعاء": 2, "الاربع": 2,
+    "thursday": 3, "thurs": 3, "الخميس": 3,
+    "friday": 4, "الجمعه": 4,
+    "saturday": 5, "السبت": 5,
+    "sunday": 6, "الاحد": 6, "الحد": 6,
+}
+
+MONTHS = {
+    "january": 1, "jan": 1, "يناير": 1, "february": 2, "feb": 2, "فبراير": 2,
+    "march": 3, "mar": 3, "مارس": 3, "april": 4, "apr": 4, "ابريل": 4,
+    "may": 5, "مايو": 5, "june": 6, "jun": 6, "يونيو": 6,
+    "july": 7, "jul": 7, "يوليو": 7, "august": 8, "aug": 8, "اغسطس": 8,
+    "september": 9, "sep": 9, "sept": 9, "سبتمبر": 9, "october": 10, "oct": 10, "اكتوبر": 10,
+    "november": 11, "nov": 11, "نوفمبر": 11, "december": 12, "dec": 12, "ديسمبر": 12,
+}
+
+DAY_WORDS = {
+    "today": 0, "tonight": 0, "اليوم": 0, "الليله": 0, "النهارده": 0, "النهاردا": 0,
+    "tomorrow": 1, "بكره": 1, "بكرا": 1, "غدا": 1, "الغد": 1,
+    "day after tomorrow": 2, "the day after tomorrow": 2, "بعد بكره": 2, "بعد بكرا": 2, "بعد غد": 2,
+}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty five": 45,
+    "واحده": 1, "واحد": 1, "اتنين": 2, "اثنين": 2, "تلاته": 3, "ثلاثه": 3, "اربعه": 4,
+    "خمسه": 5, "سته": 6, "سبعه": 7, "تمانيه": 8, "ثمانيه": 8, "تسعه": 9, "عشره": 10,
+    "حداشر": 11, "احدعشر": 11, "اتناشر": 12, "اثنا عشر": 12, "عشرين": 20, "تلاتين": 30, "ثلاثين": 30,
+}
+
+UNITS = {
+    "minute": 60, "minutes": 60, "min": 60, "mins": 60, "دقيقه": 60, "دقايق": 60, "دقائق": 60,
+    "hour": 3600, "hours": 3600, "hr": 3600, "hrs": 3600, "ساعه": 3600, "ساعات": 3600,
+    "day": 86400, "days": 86400, "يوم": 86400, "ايام": 86400,
+    "week": 604800, "weeks": 604800, "اسبوع": 604800, "اسابيع": 604800,
+}
+
+# Arabic duals / fractions that carry their own count
+DUALS = {
+    "دقيقتين": 120, "ساعتين": 7200, "يومين": 172800, "اسبوعين": 1209600,
+    "ساعه": 3600, "دقيقه": 60, "يوم": 86400, "اسبوع": 604800,
+    "نص ساعه": 1800, "نصف ساعه": 1800, "ربع ساعه": 900, "half an hour": 1800, "half hour": 1800,
+}
+
+PM_WORDS = {"pm", "p.m.", "مساء", "مساءا", "المسا", "المساء", "العصر", "عصرا", "بالليل", "ليلا",
+            "afternoon", "evening", "night", "tonight", "in the evening", "in the afternoon", "at night"}
+AM_WORDS = {"am", "a.m.", "صباحا", "الصبح", "الصباح", "فجرا", "الفجر", "morning", "in the morning"}
+NOON_WORDS = {"noon", "midday", "الظهر", "ظهرا"}
+
+# Words that may surround a date phrase without carrying meaning
+FILLERS = {"at", "on", "in", "by", "the", "of", "this", "for", "around", "about", ",", "-",
+           "في", "يوم", "عند", "الساعه", "ساعه", "الموافق", "تاريخ", "بتاريخ", "حوالي", "على", "و"}
+
+# Still-temporal words; if any survive extraction the text needs a smarter parser
+_HINT_WORDS = set(WEEKDAYS) | set(MONTHS) | set(DAY_WORDS) | PM_WORDS | AM_WORDS | NOON_WORDS | {
+    "next", "last", "week", "month", "year", "o'clock", "الجاي", "الجايه", "القادم", "القادمه",
+    "الاسبوع", "الشهر", "السنه", "بعد", "قبل", "midnight", "الساعه",
+}
+_HINT_WORDS -= {"may", "mar"}
+
+# ==================== Normalization ====================
+
+_CHAR_MAP = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ة": "ه", "ى": "ي", "ـ": "",
+    "،": ",", "؛": ",", "؟": "",
+}
+_CHAR_MAP.update({chr(0x0660 + i): str(i) for i in range(10)})   # Arabic-Indic digits
+_CHAR_MAP.update({chr(0x06F0 + i): str(i) for i in range(10)})   # Extended (Persian) digits
+_CHAR_MAP.update({chr(c): "" for c in range(0x064B, 0x0653)})    # Harakat
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """
+    Lowercase, unify Arabic letter variants and digits, drop diacritics
+
+    Returns the normalized string and, for each of its characters, the
+    index of the source character (so spans map back to the original).
+    """
+    chars, index = [], []
+    for i, ch in enumerate(text):
+        mapped = _CHAR_MAP.get(ch, ch.lower())
+        for m in mapped:
+            chars.append(m)
+            index.append(i)
+    return "".join(chars), index
+
+
+# ==================== Patterns ====================
+
+def _alt(words) -> str:
+    """Regex alternation, longest first so multi-word phrases win"""
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+_B = r"(?<![\w])"   # \b that also holds next to "." and "'" inside "p.m." / "o'clock"
+_E = r"(?![\w])"
+_NUM = rf"(?:\d+|{_alt(NUMBER_WORDS)})"
+_HOUR_NUM = rf"(?:\d{{1,2}}|{_alt(set(NUMBER_WORDS) - {'a', 'an'})})"
+
+_TZ_NAMES = _alt(TIMEZONES)
+_PATTERNS = [
+    ("offset", re.compile(rf"{_B}(?:utc|gmt)\s*([+-])\s*(\d{{1,2}})(?::?(\d{{2}}))?{_E}")),
+    ("tz", re.compile(
+        rf"{_B}(?:(?:in|by)\s+)?(?:(?:بتوقيت|توقيت|حسب توقيت)\s+({_TZ_NAMES})"
+        rf"|({_TZ_NAMES})\s+time|({_alt(TZ_ABBREVIATIONS)})){_E}"
+    )),
+    ("dual", re.compile(rf"{_B}(?:in|after|بعد|كمان)\s+({_alt(DUALS)}){_E}")),
+    ("relative", re.compile(rf"{_B}(?:in|after|بعد|كمان)\s+({_NUM})\s*({_alt(UNITS)}){_E}")),
+    ("iso_date", re.compile(rf"{_B}(\d{{4}})-(\d{{1,2}})-(\d{{1,2}}){_E}")),
+    ("numeric_date", re.compile(rf"{_B}(\d{{1,2}})/(\d{{1,2}})(?:/(\d{{2,4}}))?{_E}")),
+    ("day_month", re.compile(
+        rf"{_B}(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_alt(MONTHS)})(?:\s*,?\s*(\d{{4}}))?{_E}"
+    )),
+    ("month_day", re.compile(
+        rf"{_B}({_alt(MONTHS)})\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:\s*,?\s*(\d{{4}}))?{_E}"
+    )),
+    ("day_word", re.compile(rf"{_B}({_alt(DAY_WORDS)}){_E}")),
+    ("weekday", re.compile(
+        rf"{_B}(?:(next|this|coming)\s+)?(?:يوم\s+)?({_alt(WEEKDAYS)})"
+        rf"(?:\s+(الجاي|الجايه|القادم|القادمه|اللي جاي))?{_E}"
+    )),
+    ("clock", re.compile(
+        rf"{_B}(?:at\s+|الساعه\s+|ساعه\s+)?(\d{{1,2}}):(\d{{2}})(?:\s*({_alt(AM_WORDS | PM_WORDS)}))?{_E}"
+    )),
+    ("hour", re.compile(
+        rf"{_B}(?:(at|الساعه|ساعه)\s+)?({_HOUR_NUM})"
+        rf"(?:\s*(o'clock|oclock))?"
+        rf"(?:\s+(ونص|و نص|ونصف|وربع|و ربع|الا ربع|الا تلت|وتلت|and a half|thirty))?"
+        rf"(?:\s*({_alt(AM_WORDS | PM_WORDS | NOON_WORDS)}))?{_E}"
+    )),
+    ("noon", re.compile(rf"{_B}(?:at\s+)?(noon|midday|midnight|منتصف الليل|الظهر){_E}")),
+    ("period", re.compile(rf"{_B}({_alt(AM_WORDS | PM_WORDS)}){_E}")),
+]
+
+_MINUTE_WORDS = {
+    "ونص": 30, "و نص": 30, "ونصف": 30, "and a half": 30, "thirty": 30,
+    "وربع": 15, "و ربع": 15, "وتلت": 20, "الا ربع": -15, "الا تلت": -20,
+}
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+# ==================== Parse ====================
+
+@dataclass(frozen=True)
+class _Spec:
+    """Syntactic parse of a date phrase, independent of the current time"""
+    delta: Optional[int] = None             # seconds, for "in 2 hours"
+    day_offset: Optional[int] = None        # today / tomorrow
+    weekday: Optional[int] = None
+    weekday_next: bool = False              # "next Monday" skips today
+    weekday_this: bool = False              # "this Monday" keeps today even once past
+    date: Optional[Tuple[Optional[int], int, int]] = None   # (year, month, day)
+    hour: Optional[int] = None
+    minute: int = 0
+    meridiem: Optional[str] = None          # "am" / "pm" / "noon"
+    tz: Optional[str] = None                # IANA name or "+HH:MM"
+
+    @property
+    def empty(self) -> bool:
+        return (self.delta is None and self.day_offset is None and self.weekday is None
+                and self.date is None and self.hour is None and self.meridiem is None)
+
+
+def _meridiem(word: Optional[str]) -> Optional[str]:
+    if not word:
+        return None
+    if word in PM_WORDS:
+        return "pm"
+    if word in AM_WORDS:
+        return "am"
+    return "noon" if word in NOON_WORDS else None
+
+
+def _scan(norm: str) -> Tuple[dict, List[Tuple[int, int]]]:
+    """Match every pattern against the normalized string; earlier patterns claim spans first"""
+    fields, spans = {}, []
+
+    def free(start, end):
+        return all(end <= s or start >= e for s, e in spans)
+
+    for name, pattern in _PATTERNS:
+        for m in pattern.finditer(norm):
+            if not free(m.start(), m.end()):
+                continue
+            if name == "hour" and not _plausible_hour(m):
+                continue
+            if not _apply(name, m, fields):
+                continue
+            spans.append((m.start(), m.end()))
+    return fields, sorted(spans)
+
+
+def _plausible_hour(m: re.Match) -> bool:
+    """A bare number is only an hour with "at"/"الساعة", "o'clock", a fraction or am/pm"""
+    marker, value, oclock, fraction, period = m.groups()
+    if not (marker or oclock or fraction or period):
+        return False
+    return 0 <= _number(value) <= 24
+
+
+def _apply(name: str, m: re.Match, f: dict) -> bool:
+    g = m.groups()
+    if name == "offset":
+        if "tz" in f:
+            return False
+        sign, hours, minutes = g
+        f["tz"] = f"{sign}{int(hours):02d}:{int(minutes or 0):02d}"
+    elif name == "tz":
+        if "tz" in f:
+            return False
+        f["tz"] = TIMEZONES[next(x for x in g if x)]
+    elif name in ("dual", "relative"):
+        if "delta" in f:
+            return False
+        f["delta"] = DUALS[g[0]] if name == "dual" else _number(g[0]) * UNITS[g[1]]
+    elif name in ("iso_date", "numeric_date", "day_month", "month_day"):
+        if "date" in f:
+            return False
+        if name == "iso_date":
+            year, month, day = int(g[0]), int(g[1]), int(g[2])
+        elif name == "numeric_date":   # day-first, as written in the region
+            day, month = int(g[0]), int(g[1])
+            year = int(g[2]) if g[2] else None
+            if year is not None and year < 100:
+                year += 2000
+        elif name == "day_month":
+            day, month, year = int(g[0]), MONTHS[g[1]], int(g[2]) if g[2] else None
+        else:
+            month, day, year = MONTHS[g[0]], int(g[1]), int(g[2]) if g[2] else None
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return False
+        f["date"] = (year, month, day)
+    elif name == "day_word":
+        if "day_offset" in f:
+            return False
+        f["day_offset"] = DAY_WORDS[g[0]]
+        if g[0] in ("tonight", "الليله"):
+            f.setdefault("meridiem", "pm")
+    elif name == "weekday":
+        if "weekday" in f:
+            return False
+        f["weekday"] = WEEKDAYS[g[1]]
+        f["weekday_next"] = bool(g[0] in ("next", "coming") or g[2])
+        f["weekday_this"] = g[0] == "this"
+    elif name == "clock":
+        if "hour" in f:
+            return False
+        hour, minute = int(g[0]), int(g[1])
+        if hour > 23 or minute > 59:
+            return False
+        f["hour"], f["minute"] = hour, minute
+        if g[2]:
+            f["meridiem"] = _meridiem(g[2])
+    elif name == "hour":
+        if "hour" in f:
+            return False
+        f["hour"] = _number(g[1])
+        minute = _MINUTE_WORDS.get(g[3] or "", 0)
+        if minute < 0:
+            f["hour"] -= 1
+            minute += 60
+        f["minute"] = minute
+        if g[4]:
+            f["meridiem"] = _meridiem(g[4])
+    elif name == "noon":
+        if "hour" in f:
+            return False
+        f["hour"], f["minute"] = (0, 0) if g[0] in ("midnight", "منتصف الليل") else (12, 0)
+        f["meridiem"] = None
+    elif name == "period":
+        if f.get("meridiem"):
+            return False
+        f["meridiem"] = _meridiem(g[0])
+    return True
+
+
+@lru_cache(maxsize=2048)
+def _compile(text: str) -> Tuple[Optional[_Spec], Tuple[Tuple[int, int], ...], str]:
+    """(spec, spans in `text`, normalized leftover) for one input string"""
+    norm, index = normalize(text)
+    fields, spans = _scan(norm)
+    leftover = norm
+    for start, end in reversed(spans):
+        leftover = leftover[:start] + " " + leftover[end:]
+    spec = _Spec(**fields)
+    source_spans = tuple((index[s], index[e - 1] + 1) for s, e in spans)
+    return (None if spec.empty else spec), source_spans, " ".join(leftover.split())
+
+
+def _zone(name: Optional[str]) -> Optional[datetime.tzinfo]:
+    if not name:
+        return None
+    if name[0] in "+-":
+        sign = -1 if name[0] == "-" else 1
+        hours, minutes = name[1:].split(":")
+        return datetime.timezone(sign * datetime.timedelta(hours=int(hours), minutes=int(minutes)))
+    return ZoneInfo(name)
+
+
+def _hour24(spec: _Spec) -> Optional[int]:
+    hour = spec.hour
+    if hour is None:
+        return None
+    if spec.meridiem == "pm" and hour < 12:
+        return hour + 12
+    if spec.meridiem == "am" and hour == 12:
+        return 0
+    if spec.meridiem is None and 1 <= hour <= 6:
+        # "الساعة 5" / "at 5" with no am/pm almost always means the afternoon
+        return hour + 12
+    return hour % 24
+
+
+@lru_cache(maxsize=2048)
+def _anchor(spec: _Spec, today: datetime.date, default_time: datetime.time) -> Optional[datetime.datetime]:
+    """Resolve a day-anchored spec against the reference day"""
+    day = today
+    if spec.date:
+        year, month, dom = spec.date
+        try:
+            day = datetime.date(year or today.year, month, dom)
+            if year is None and day < today:
+                day = day.replace(year=today.year + 1)
+        except ValueError:
+            return None
+    elif spec.weekday is not None:
+        ahead = (spec.weekday - today.weekday()) % 7
+        if spec.weekday_next and ahead == 0:
+            ahead = 7
+        day = today + datetime.timedelta(days=ahead)
+    if spec.day_offset:
+        day = day + datetime.timedelta(days=spec.day_offset)
+
+    hour = _hour24(spec)
+    if hour is None:
+        if spec.meridiem == "pm":
+            at = datetime.time(18, 0)
+        elif spec.meridiem == "noon":
+            at = datetime.time(12, 0)
+        elif spec.meridiem == "am":
+            at = datetime.time(9, 0)
+        else:
+            at = default_time
+    else:
+        at = datetime.time(hour, spec.minute)
+    return datetime.datetime.combine(day, at, tzinfo=_zone(spec.tz))
+
+
+def _resolve(spec: _Spec, now: datetime.datetime, default_time: datetime.time) -> Optional[datetime.datetime]:
+    if spec.delta is not None:
+        if spec.date or spec.weekday is not None or spec.day_offset or spec.hour is not None:
+            return None  # "in 2 hours on Monday" is not something the rules can reconcile
+        result = now + datetime.timedelta(seconds=spec.delta)
+        return result.astimezone(_zone(spec.tz)) if spec.tz else result
+
+    zone = _zone(spec.tz)
+    local_now = now.astimezone(zone) if zone else now
+    result = _anchor(spec, local_now.date(), default_time)
+    if result is None:
+        return None
+    explicit_day = spec.date or spec.weekday is not None or spec.day_offset is not None
+    passed = result < local_now.replace(tzinfo=result.tzinfo)
+    if not explicit_day and spec.hour is not None and passed:
+        result += datetime.timedelta(days=1)  # A bare time that already passed means tomorrow
+    elif spec.weekday is not None and not spec.weekday_this and spec.day_offset is None and passed:
+        result += datetime.timedelta(days=7)  # So does today's weekday: "monday" at 14:00 on a Monday
+    return result
+
+
+def parse_datetime(
+    text: str,
+    now: Optional[datetime.datetime] = None,
+    default_time: datetime.time = datetime.time(9, 0)
+) -> Optional[datetime.datetime]:
+    """
+    Parse a whole string as a date/time phrase
+
+    Results are naive local time, or aware in the named zone when the
+    phrase carries one ("بتوقيت القاهرة", "GMT+3"). Returns None when any
+    part of the string is not understood.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    spec, _, leftover = _compile(text.strip())
+    if spec is None or any(token not in FILLERS for token in leftover.split()):
+        return None
+    return _resolve(spec, now or datetime.datetime.now(), default_time)
+
+
+# Command phrases stripped from task titles
+_COMMAND_RE = re.compile(
+    r"^\s*(?:please\s+|لو سمحت\s+|من فضلك\s+)?"
+    r"(?:(?:add|create|new)\s+(?:a\s+)?(?:new\s+)?task\s*(?:to|:)?"
+    r"|remind\s+me\s*(?:to|about|that)?"
+    r"|(?:[اأإ]ضف|ضيف|سجل|[اأإ]نشئ|اعمل)\s+(?:لي\s+)?مهم[ةه](?:\s+جديد[ةه])?\s*:?"
+    r"|(?:ذك|فك)رني\s*(?:[اأإ]ن[يه]?|ب)?)\s*",
+    re.IGNORECASE,
+)
+
+
+def extract_datetime(
+    text: str,
+    now: Optional[datetime.datetime] = None,
+    default_time: datetime.time = datetime.time(9, 0)
+) -> Tuple[Optional[datetime.datetime], str]:
+    """
+    Find a date/time phrase inside a longer command
+
+    Returns (datetime or None, the rest of the text in its original
+    script with command phrases like "remind me" / "ذكرني" removed).
+    """
+    if not text:
+        return None, ""
+    text = text.strip()
+    spec, spans, _ = _compile(text)
+    rest = text
+    for start, end in reversed(spans):
+        rest = rest[:start] + " " + rest[end:]
+    rest = _COMMAND_RE.sub("", " ".join(rest.split()), count=1)
+
+    # Drop fillers left dangling at either end ("... on", "في ...")
+    tokens = rest.split()
+    while tokens and normalize(tokens[-1])[0].strip(".,:") in FILLERS:
+        tokens.pop()
+    while tokens and normalize(tokens[0])[0].strip(".,:") in FILLERS:
+        tokens.pop(0)
+    title = " ".join(tokens).strip(" ,:-")
+
+    when = _resolve(spec, now or datetime.datetime.now(), default_time) if spec else None
+    return when, title
+
+
+def has_date_hint(text: str) -> bool:
+    """True if text still contains digits or date words the rules did not consume"""
+    norm, _ = normalize(text or "")
+    if re.search(r"\d", norm):
+        return True
+    tokens = norm.split()
+    bigrams = {" ".join(pair) for pair in zip(tokens, tokens[1:])}
+    return any(t in _HINT_WORDS for t in tokens) or any(b in _HINT_WORDS for b in bigrams)
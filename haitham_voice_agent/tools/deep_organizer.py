@@ -105,7 +105,7 @@ class DeepOrganizer:
             # Broadcast: Scanning
             from api.connection_manager import manager
             # await manager.broadcast({"type": "log", "message": f"🔍 Scanning: {file_path.name}..."})
-            await manager.broadcast({
+            manager.publish({
                 "type": "task_progress",
                 "task": "Deep Organize",
                 "status": "scanning",
@@ -138,7 +138,7 @@ class DeepOrganizer:
                         new_dst = root_path / cached_result["category"] / cached_result["new_filename"]
                         cached_result["proposed_path"] = str(new_dst)
                     
-                    await manager.broadcast({
+                    manager.publish({
                         "type": "task_progress",
                         "task": "Deep Organize",
                         "status": "skipped",
@@ -154,7 +154,7 @@ class DeepOrganizer:
             # Check for obvious patterns (Regex/Keywords)
             local_result = self._local_categorization(file_path, root_path)
             if local_result:
-                await manager.broadcast({
+                manager.publish({
                     "type": "task_progress",
                     "task": "Deep Organize",
                     "status": "local_rule",
@@ -165,7 +165,7 @@ class DeepOrganizer:
             # --------------------------------
 
             # Extract text
-            text = content_extractor.extract_text(str(file_path))
+            text = await content_extractor.extract_text_async(str(file_path))
             # ALLOW MEDIA FILES: If text is empty, use filename/metadata instead of skipping
             if not text:
                 text = f"Filename: {file_path.name}\nType: {file_path.suffix}\n(No text content extracted)"
@@ -211,7 +211,7 @@ class DeepOrganizer:
                                 
                                 # High confidence (>= 0.8): Apply automatically
                                 if confidence >= 0.8:
-                                    await manager.broadcast({
+                                    manager.publish({
                                         "type": "task_progress",
                                         "task": "Deep Organize",
                                         "status": "learning_applied",
@@ -273,7 +273,7 @@ class DeepOrganizer:
                             mimic_category = "/".join(parts[idx+1:-1])
                             
                     if mimic_category:
-                        await manager.broadcast({
+                        manager.publish({
                             "type": "task_progress",
                             "task": "Deep Organize",
                             "status": "mimicking",
@@ -299,12 +299,12 @@ class DeepOrganizer:
             # -----------------------------------
 
             # Step 1: Summarize with Gemini (Cost efficient & fast)
-            await manager.broadcast({"type": "log", "message": f"🧠 Gemini: Summarizing {file_path.name}..."})
+            manager.publish({"type": "log", "message": f"🧠 Gemini: Summarizing {file_path.name}..."})
             summary_result = await self.llm_router.summarize_with_gemini(text, summary_type="brief")
             summary = summary_result["content"]
             
             # Step 2: Plan with GPT (Reasoning)
-            await manager.broadcast({"type": "log", "message": f"🤖 GPT: Planning organization for {file_path.name}..."})
+            manager.publish({"type": "log", "message": f"🤖 GPT: Planning organization for {file_path.name}..."})
             
             # LLM Prompt (ARABIC FORCED)
             prompt = f"""
@@ -437,7 +437,7 @@ class DeepOrganizer:
                     continue
                     
                 # Extract
-                text = content_extractor.extract_text(str(file_path))
+                text = await content_extractor.extract_text_async(str(file_path))
                 # ALLOW MEDIA FILES: If text is empty, use filename/metadata
                 if not text:
                     text = f"Filename: {file_path.name}\nType: {file_path.suffix}\n(No text content extracted)"
@@ -9,7 +9,13 @@ Implements "Smart User Sandbox":
 """
 
 import os
+import stat as stat_module
+import json
+import base64
+import heapq
+import fnmatch
 import shutil
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -25,6 +31,11 @@ class FileTools:
         '.ssh', '.aws', '.kube', 'Library', 'Applications', 
         '.bashrc', '.zshrc', '.profile', '.env'
     }
+
+    # Pagination for list_files / tree expansion
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    TREE_CHILD_LIMIT = 500
     
     def __init__(self):
         self.home_dir = Path.home().resolve()
@@ -111,9 +122,15 @@ class FileTools:
         pattern: Optional[str] = None,
         recursive: bool = False,
         sort_by: str = "name", # name, date, size
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
         **kwargs # Ignore extra params from LLM hallucinations
     ) -> Dict[str, Any]:
-        """List files in a directory (Sandboxed)"""
+        """
+        List files in a directory (Sandboxed).
+        Returns one page of `limit` entries plus `next_cursor` for the next page;
+        `count` is the total number of matches.
+        """
         try:
             # Resolve input
             raw_dir = directory or folder_name or folder or "~"
@@ -133,45 +150,130 @@ class FileTools:
 
             if not dir_path.is_dir():
                 return {"error": True, "message": f"Not a directory: {dir_path.name}"}
-            
-            # Execute List
-            files = []
-            scan_iter = dir_path.rglob(pattern or "*") if recursive else dir_path.glob(pattern or "*")
-            
-            for file_path in scan_iter:
-                # Skip blacklisted
-                if file_path.name in self.BLACKLIST_DIRS:
-                    continue
-                    
-                # Get info for both files and directories
-                files.append(self._get_file_info(file_path))
-            
-            # Sort files
-            if sort_by == "date":
-                files.sort(key=lambda x: x.get("modified", 0), reverse=True)
-            elif sort_by == "size":
-                files.sort(key=lambda x: x.get("size", 0), reverse=True)
-            else: # name (default)
-                files.sort(key=lambda x: x.get("name", "").lower())
+
+            if sort_by not in ("name", "date", "size"):
+                sort_by = "name"
+            limit = max(1, min(int(limit or self.DEFAULT_PAGE_SIZE), self.MAX_PAGE_SIZE))
+            after = self._decode_cursor(cursor, sort_by) if cursor else None
+
+            # Scan off the event loop (large folders take seconds)
+            files, total, has_more = await asyncio.to_thread(
+                self._list_page, dir_path, pattern, recursive, sort_by, limit, after
+            )
+
+            next_cursor = None
+            if has_more:
+                next_cursor = self._encode_cursor(sort_by, self._sort_key(files[-1], sort_by))
 
             # Format output
             file_names = [f["name"] for f in files]
             display_text = "\n".join(file_names[:10])
-            if len(files) > 10:
-                display_text += f"\n... and {len(files)-10} more"
+            if total > 10:
+                display_text += f"\n... and {total-10} more"
             
             return {
                 "success": True,
-                "message": f"Found {len(files)} files in {dir_path.name}",
+                "message": f"Found {total} files in {dir_path.name}",
                 "data": display_text,
                 "directory": str(dir_path),
                 "files": files,
-                "count": len(files)
+                "count": total,
+                "next_cursor": next_cursor,
+                "has_more": has_more
             }
             
+        except ValueError as e:
+            return {"error": True, "message": f"Invalid cursor: {e}"}
         except Exception as e:
             return {"error": True, "message": str(e)}
 
+    def _scan(self, dir_path: Path, pattern: Optional[str] = None, recursive: bool = False, skip_hidden: bool = False):
+        """
+        Lazily yield (name, path, stat, is_dir) under dir_path.
+        One os.scandir pass with a single stat per entry; blacklisted
+        folders are pruned instead of walked.
+        """
+        root = str(dir_path)
+        match_path = bool(pattern) and "/" in pattern
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name in self.BLACKLIST_DIRS or (skip_hidden and name.startswith(".")):
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        is_dir = stat_module.S_ISDIR(st.st_mode)
+                        if recursive and is_dir and not entry.is_symlink():
+                            stack.append(entry.path)
+                        if pattern:
+                            target = os.path.relpath(entry.path, root) if match_path else name
+                            if not fnmatch.fnmatch(target, pattern):
+                                continue
+                        yield name, entry.path, st, is_dir
+            except OSError:
+                continue
+
+    @staticmethod
+    def _sort_key(item: Dict[str, Any], sort_by: str) -> tuple:
+        """Total order used for sorting and cursors (path breaks ties)"""
+        if sort_by == "date":
+            return (-item.get("modified", 0), item["path"])
+        if sort_by == "size":
+            return (-item.get("size", 0), item["path"])
+        if sort_by == "tree":
+            return (item["type"] != "directory", item["name"].lower(), item["path"])
+        return (item["name"].lower(), item["path"])
+
+    def _top_k(self, items, sort_by: str, limit: int, after: Optional[tuple]):
+        """
+        Keep only the `limit` smallest keys past the cursor with a bounded heap,
+        so a page costs O(n log limit) instead of sorting the whole folder.
+        Returns (page, total, has_more).
+        """
+        total = 0
+
+        def keyed():
+            nonlocal total
+            for name, path, st, is_dir in items:
+                total += 1
+                size = 0 if is_dir else st.st_size
+                probe = {"name": name, "path": path, "size": size,
+                         "modified": st.st_mtime, "type": "directory" if is_dir else "file"}
+                key = self._sort_key(probe, sort_by)
+                if after is not None and key <= after:
+                    continue
+                yield key, name, path, st, is_dir
+
+        best = heapq.nsmallest(limit + 1, keyed(), key=lambda row: row[0])
+        has_more = len(best) > limit
+        page = [self._info_from_stat(name, path, st, is_dir) for _, name, path, st, is_dir in best[:limit]]
+        return page, total, has_more
+
+    def _list_page(self, dir_path: Path, pattern: Optional[str], recursive: bool,
+                   sort_by: str, limit: int, after: Optional[tuple]):
+        return self._top_k(self._scan(dir_path, pattern, recursive), sort_by, limit, after)
+
+    @staticmethod
+    def _encode_cursor(sort_by: str, key: tuple) -> str:
+        raw = json.dumps({"s": sort_by, "k": list(key)}, ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_by: str) -> tuple:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        except Exception:
+            raise ValueError("malformed")
+        if data.get("s") != sort_by:
+            raise ValueError(f"cursor was issued for sort_by={data.get('s')}")
+        return tuple(data["k"])
+
     async def create_folder(self, directory: str, **kwargs) -> Dict[str, Any]:
         """Create a new folder (Sandboxed)"""
         try:
@@ -346,18 +448,21 @@ class FileTools:
         """Get file metadata"""
         try:
             stat = file_path.stat()
-            is_dir = file_path.is_dir()
-            return {
-                "name": file_path.name,
-                "path": str(file_path),
-                "size": stat.st_size if not is_dir else 0,
-                "size_human": self._format_size(stat.st_size) if not is_dir else "DIR",
-                "modified": stat.st_mtime,
-                "extension": file_path.suffix if not is_dir else "DIR",
-                "type": "directory" if is_dir else "file"
-            }
+            return self._info_from_stat(file_path.name, str(file_path), stat, stat_module.S_ISDIR(stat.st_mode))
         except:
             return {"name": file_path.name, "error": "access_error"}
+
+    def _info_from_stat(self, name: str, path: str, stat: os.stat_result, is_dir: bool) -> Dict[str, Any]:
+        """File metadata from an already-fetched stat (no extra syscalls)"""
+        return {
+            "name": name,
+            "path": path,
+            "size": stat.st_size if not is_dir else 0,
+            "size_human": self._format_size(stat.st_size) if not is_dir else "DIR",
+            "modified": stat.st_mtime,
+            "extension": os.path.splitext(name)[1] if not is_dir else "DIR",
+            "type": "directory" if is_dir else "file"
+        }
     
     @staticmethod
     def _format_size(size: int) -> str:
@@ -697,52 +802,87 @@ class FileTools:
 
 
 
-    async def get_file_tree(self, path: str = "~", depth: int = 2, **kwargs) -> Dict[str, Any]:
-        """Get file system tree structure (Sandboxed)"""
+    async def get_file_tree(self, path: str = "~", depth: int = 2, limit: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Get file system tree structure (Sandboxed).
+        Directories deeper than `depth` come back unexpanded ("expanded": False)
+        and are loaded on demand via list_children. At most `limit` children
+        are returned per directory.
+        """
         try:
             root_path = self._validate_path(path)
             if not root_path or not root_path.exists() or not root_path.is_dir():
                 return {"error": True, "message": "Invalid directory"}
 
-            def build_tree(current_path: Path, current_depth: int):
-                if current_depth > depth:
-                    return None
-                
-                node = {
-                    "name": current_path.name,
-                    "path": str(current_path),
-                    "type": "directory",
-                    "children": []
-                }
-                
-                try:
-                    # Sort directories first, then files
-                    items = sorted(list(current_path.iterdir()), key=lambda x: (not x.is_dir(), x.name.lower()))
-                    
-                    for item in items:
-                        # Skip hidden/blacklisted
-                        if item.name.startswith(".") or item.name in self.BLACKLIST_DIRS:
-                            continue
-                            
-                        if item.is_dir():
-                            child = build_tree(item, current_depth + 1)
-                            if child:
-                                node["children"].append(child)
-                        else:
-                            # Add file node (leaf)
-                            node["children"].append({
-                                "name": item.name,
-                                "path": str(item),
-                                "type": "file",
-                                "extension": item.suffix
-                            })
-                except PermissionError:
-                    pass
-                    
-                return node
-
-            tree = build_tree(root_path, 0)
+            limit = max(1, min(int(limit or self.TREE_CHILD_LIMIT), self.MAX_PAGE_SIZE))
+            tree = await asyncio.to_thread(self._build_tree, root_path, depth, limit)
             return {"success": True, "tree": tree}
             
         except Exception as e:
             return {"error": True, "message": str(e)}
+
+    async def list_children(self, path: str = "~", limit: Optional[int] = None, cursor: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """One page of a directory's direct children (lazy tree expansion)"""
+        try:
+            dir_path = self._validate_path(path)
+            if not dir_path or not dir_path.exists() or not dir_path.is_dir():
+                return {"error": True, "message": "Invalid directory"}
+
+            limit = max(1, min(int(limit or self.TREE_CHILD_LIMIT), self.MAX_PAGE_SIZE))
+            after = self._decode_cursor(cursor, "tree") if cursor else None
+            children, next_cursor = await asyncio.to_thread(self._tree_level, dir_path, limit, after)
+            return {
+                "success": True,
+                "path": str(dir_path),
+                "children": children,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
+        except ValueError as e:
+            return {"error": True, "message": f"Invalid cursor: {e}"}
+        except Exception as e:
+            return {"error": True, "message": str(e)}
+
+    def _tree_level(self, dir_path: Path, limit: int, after: Optional[tuple] = None):
+        """Directories first, then files, both by name; hidden entries skipped"""
+        page, _, has_more = self._top_k(self._scan(dir_path, skip_hidden=True), "tree", limit, after)
+        children = []
+        for item in page:
+            if item["type"] == "directory":
+                children.append({
+                    "name": item["name"],
+                    "path": item["path"],
+                    "type": "directory",
+                    "children": [],
+                    "expanded": False
+                })
+            else:
+                children.append({
+                    "name": item["name"],
+                    "path": item["path"],
+                    "type": "file",
+                    "extension": item["extension"]
+                })
+        next_cursor = self._encode_cursor("tree", self._sort_key(page[-1], "tree")) if has_more else None
+        return children, next_cursor
+
+    def _build_tree(self, root_path: Path, depth: int, limit: int) -> Dict[str, Any]:
+        node = {
+            "name": root_path.name,
+            "path": str(root_path),
+            "type": "directory",
+            "children": [],
+            "expanded": True
+        }
+        frontier = [(node, 0)]
+        while frontier:
+            current, level = frontier.pop()
+            children, next_cursor = self._tree_level(Path(current["path"]), limit)
+            current["children"] = children
+            current["expanded"] = True
+            if next_cursor:
+                current["next_cursor"] = next_cursor
+                current["has_more"] = True
+            if level < depth:
+                frontier.extend((child, level + 1) for child in children if child["type"] == "directory")
+        return node
@@ -5,19 +5,28 @@ Chooses between Flash and Pro variants based on task requirements.
 Priority: Quality first, then cost optimization.
 """
 
-from typing import Dict
-from haitham_voice_agent.model_router import TaskMeta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from haitham_voice_agent.config import Config
+from haitham_voice_agent.model_router import TaskMeta, adapt_decision
 
 # Type alias for router result
 GeminiResult = Dict[str, str]
 
+# Pro is an acceptable substitute for Flash (never the other way round)
+GEMINI_ALTERNATIVES: Dict[str, Tuple[str, ...]] = {
+    "logical.gemini.flash": ("logical.gemini.pro",),
+}
+
 
-def choose_gemini_variant(meta: TaskMeta) -> GeminiResult:
+def choose_gemini_variant(meta: TaskMeta, adaptive: Optional[bool] = None) -> GeminiResult:
     """
     Decide between 'logical.gemini.flash' and 'logical.gemini.pro'
     based on task requirements.
     
-    This function MUST be pure and deterministic (no LLM calls).
+    This function MUST be pure and deterministic (no LLM calls); only the
+    opt-in adaptive mode reads recent routing telemetry.
     
     Priority:
     1. QUALITY FIRST: Prefer Pro for reasoning, complex documents, or high-risk tasks
@@ -25,43 +34,56 @@ def choose_gemini_variant(meta: TaskMeta) -> GeminiResult:
     
     Args:
         meta: TaskMeta instance describing the task
+        adaptive: Let recent latency/error telemetry move Flash to Pro for
+            interactive tasks (default: Config.ADAPTIVE_ROUTING)
         
     Returns:
         GeminiResult with keys: logical_model, reason
     """
+    decision = dict(_rule_decision(meta.context_tokens, meta.task_type, meta.risk, meta.latency, meta.is_document))
+    if adaptive is None:
+        adaptive = Config.ADAPTIVE_ROUTING
+    if adaptive:
+        decision = adapt_decision(decision, "logical_model", meta, GEMINI_ALTERNATIVES)
+    return decision
+
+
+@lru_cache(maxsize=1024)
+def _rule_decision(context_tokens: int, task_type: str, risk: str, latency: str, is_document: bool) -> GeminiResult:
+    """The Flash/Pro rules (pure; cached on the fields they read)"""
     
     # Rule 1: Massive Context → Force Pro
-    if meta.context_tokens > 75_000:
+    if context_tokens > 75_000:
         return {
             "logical_model": "logical.gemini.pro",
             "reason": "Massive context (>75k tokens) requires Pro stability."
         }
     
     # Rule 2: High Risk / Heavy Reasoning → Pro
-    if meta.risk == "high" or meta.task_type == "multi_step_reasoning":
+    if risk == "high" or task_type == "multi_step_reasoning":
         return {
             "logical_model": "logical.gemini.pro",
             "reason": "High risk or complex reasoning requires Pro quality."
         }
     
     # Rule 3: Complex Document Tasks → Pro
-    if (meta.task_type in ["doc_analysis", "comparison", "translation"] 
-        and meta.is_document):
+    if (task_type in ["doc_analysis", "comparison", "translation"] 
+        and is_document):
         return {
             "logical_model": "logical.gemini.pro",
             "reason": "Document-level comparison/translation needs Pro nuance."
         }
     
     # Rule 4: Simple Vision / Low-Risk Tasks → Flash
-    if (meta.task_type in ["classification", "tagging"] 
-        and meta.risk == "low"):
+    if (task_type in ["classification", "tagging"] 
+        and risk == "low"):
         return {
             "logical_model": "logical.gemini.flash",
             "reason": "Simple low-risk task; Flash is sufficient and cheaper."
         }
     
     # Rule 5: Interactive Latency → Prefer Flash if not high-risk
-    if meta.latency == "interactive" and meta.risk != "high":
+    if latency == "interactive" and risk != "high":
         return {
             "logical_model": "logical.gemini.flash",
             "reason": "User waiting in real time; Flash preferred for speed."
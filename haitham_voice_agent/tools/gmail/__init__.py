@@ -4,7 +4,10 @@ from .connection_manager import ConnectionManager
 from .gmail_api_handler import GmailAPIHandler
 from .imap_handler import IMAPHandler
 from .smtp_handler import SMTPHandler
+from .mailbox_store import MailboxStore
+from .mailbox_mirror import MailboxMirror
 from .models.email_message import EmailMessage, Draft, Label, Attachment
+from .analysis_cache import EmailAnalysisCache
 from .llm_helper import EmailLLMHelpers, get_email_llm_helpers
 
 __all__ = [
@@ -12,10 +15,13 @@ __all__ = [
     "GmailAPIHandler",
     "IMAPHandler",
     "SMTPHandler",
+    "MailboxStore",
+    "MailboxMirror",
     "EmailMessage",
     "Draft",
     "Label",
     "Attachment",
+    "EmailAnalysisCache",
     "EmailLLMHelpers",
     "get_email_llm_helpers"
 ]
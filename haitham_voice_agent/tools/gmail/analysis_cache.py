@@ -0,0 +1,127 @@
+"""
+Email Analysis Cache
+
+Persists structured email analyses (summary, action items, sentiment)
+keyed by message id + body hash, so re-opening an email costs no LLM call
+and an edited/redelivered body is re-analyzed. Small in-memory LRU in front
+of SQLite. All methods are blocking; async callers go through asyncio.to_thread.
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def body_hash(email_obj: Dict[str, Any]) -> str:
+    """Hash of the content the analysis was computed from"""
+    content = "\n".join([
+        email_obj.get("subject", "") or "",
+        email_obj.get("from", "") or "",
+        email_obj.get("body_text", "") or email_obj.get("snippet", "") or "",
+    ])
+    return hashlib.sha256(content.encode("utf-8", "ignore")).hexdigest()[:32]
+
+
+class EmailAnalysisCache:
+    """
+    Analysis cache
+
+    Features:
+    - (message_id, body_hash) keyed rows in SQLite
+    - In-memory LRU for hot entries (the open inbox)
+    - Bounded: oldest rows dropped past max_entries
+    """
+
+    MEMORY_ENTRIES = 256
+
+    def __init__(self, db_path: str = "~/HVA_Memory/system/email_analysis.db", max_entries: int = 20000):
+        self.db_path = Path(db_path).expanduser()
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._conn = None
+        self._memory: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS email_analysis (
+                    message_id TEXT NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (message_id, body_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_created ON email_analysis(created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: Tuple[str, str], data: Dict[str, Any]):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def get(self, message_id: str, digest: str) -> Optional[Dict[str, Any]]:
+        key = (message_id, digest)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            row = self._db().execute(
+                "SELECT data FROM email_analysis WHERE message_id = ? AND body_hash = ?", key
+            ).fetchone()
+            if not row:
+                return None
+            data = json.loads(row[0])
+            self._remember(key, data)
+            return data
+
+    def has(self, message_id: str) -> bool:
+        """Any analysis for this message (Gmail/IMAP message content is immutable per id)"""
+        with self._lock:
+            if any(key[0] == message_id for key in self._memory):
+                return True
+            return self._db().execute(
+                "SELECT 1 FROM email_analysis WHERE message_id = ? LIMIT 1", (message_id,)
+            ).fetchone() is not None
+
+    def put(self, message_id: str, digest: str, data: Dict[str, Any]):
+        key = (message_id, digest)
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO email_analysis (message_id, body_hash, data, created_at) VALUES (?, ?, ?, ?)",
+                    (message_id, digest, json.dumps(data, ensure_ascii=False), time.time())
+                )
+            self._remember(key, data)
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection):
+        with conn:
+            conn.execute("""
+                DELETE FROM email_analysis WHERE rowid IN (
+                    SELECT rowid FROM email_analysis ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
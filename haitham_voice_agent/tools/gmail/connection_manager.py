@@ -13,6 +13,7 @@ from enum import Enum
 from .gmail_api_handler import GmailAPIHandler
 from .imap_handler import IMAPHandler
 from .smtp_handler import SMTPHandler
+from .mailbox_mirror import MailboxMirror
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +33,14 @@ class ConnectionManager:
     2. If API fails (quota/auth error), auto-switch to IMAP/SMTP
     3. Maintain active connection state
     4. All methods return unified EmailMessage model
+    5. Serve list/search views from the local mailbox mirror when it can sync
     """
     
     def __init__(self):
         self.gmail_api = GmailAPIHandler()
         self.imap = IMAPHandler()
         self.smtp = SMTPHandler()
+        self.mirror = MailboxMirror(self.gmail_api, self.imap)
         
         self.active_method = None
         self.api_available = None  # Cache API availability
@@ -117,11 +120,24 @@ class ConnectionManager:
         # Use IMAP directly
         return imap_method(*args, **kwargs)
     
+    def _mirror_source(self) -> str:
+        """Mirror partition for the active connection method"""
+        return "gmail_api" if self._check_api_availability() else "imap"
+    
+    def _local_result(self, emails: List[Dict[str, Any]], **extra) -> Dict[str, Any]:
+        return {
+            **extra,
+            "emails": emails,
+            "count": len(emails),
+            "connection_method": self.active_method.value if self.active_method else "unknown",
+            "served_from": "local_mirror"
+        }
+    
     # ==================== EMAIL OPERATIONS ====================
     
     async def fetch_latest_email(self, limit: int = 10) -> Dict[str, Any]:
         """
-        Fetch latest emails (API with IMAP fallback)
+        Fetch latest emails (local mirror, then API with IMAP fallback)
         
         Args:
             limit: Number of emails to fetch
@@ -131,6 +147,10 @@ class ConnectionManager:
         """
         logger.info(f"Fetching latest {limit} emails...")
         
+        emails = await self.mirror.latest(self._mirror_source(), limit)
+        if emails is not None:
+            return self._local_result(emails)
+        
         result = await self._try_api_with_fallback(
             self.gmail_api.fetch_latest_email,
             self.imap.fetch_latest_email,
@@ -145,7 +165,7 @@ class ConnectionManager:
     
     async def search_emails(self, query: str, limit: int = 10) -> Dict[str, Any]:
         """
-        Search emails (API with IMAP fallback)
+        Search emails (local mirror, then API with IMAP fallback)
         
         Args:
             query: Search query
@@ -156,6 +176,10 @@ class ConnectionManager:
         """
         logger.info(f"Searching emails: {query}")
         
+        emails = await self.mirror.search(self._mirror_source(), query, limit)
+        if emails is not None:
+            return self._local_result(emails, query=query)
+        
         result = await self._try_api_with_fallback(
             self.gmail_api.search_emails,
             self.imap.search_emails,
@@ -180,6 +204,11 @@ class ConnectionManager:
         """
         logger.info(f"Getting email: {email_id}")
         
+        mirrored = await self.mirror.get(self._mirror_source(), email_id)
+        if mirrored and (mirrored.get("body_text") or mirrored.get("body_html")):
+            mirrored["connection_method"] = self.active_method.value if self.active_method else "unknown"
+            return mirrored
+        
         result = await self._try_api_with_fallback(
             self.gmail_api.get_email_by_id,
             self.imap.get_email_by_id,
@@ -324,7 +353,10 @@ class ConnectionManager:
             dict: Status
         """
         if self._check_api_availability():
-            return await self.gmail_api.mark_as_read(email_id)
+            result = await self.gmail_api.mark_as_read(email_id)
+            if not result.get("error"):
+                await self.mirror.mark_read("gmail_api", email_id)
+            return result
         else:
             return {
                 "error": True,
@@ -6,11 +6,14 @@ From Gmail Module SRS Sections 3.3, 4.1-4.6.
 """
 
 import base64
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 import time
 
 from googleapiclient.errors import HttpError
@@ -23,11 +26,16 @@ from .utils.text_processing import (
     parse_email_list,
     extract_snippet
 )
+from .utils.rate_limiter import AsyncTokenBucket
 from ...config import Config
 
 logger = logging.getLogger(__name__)
 
 
+class HistoryExpiredError(Exception):
+    """startHistoryId is too old for history.list; a full resync is needed"""
+
+
 class GmailAPIHandler:
     """
     Gmail API operations handler
@@ -37,15 +45,24 @@ class GmailAPIHandler:
     - Draft operations (create, update, delete, send)
     - Label operations
     - Caching for performance
-    - Rate limiting
+    - Rate limiting (async token bucket)
+    - Batched message hydration (one HTTP batch per 50 messages)
     """
     
+    # Gmail caps a batch request at 100 calls; 50 keeps us clear of per-user throttling
+    BATCH_SIZE = 50
+    # Headers needed by list views (format=metadata)
+    LIST_HEADERS = ['From', 'To', 'Cc', 'Subject', 'Date']
+    # In-memory cache bound (the persistent copy lives in the mailbox mirror)
+    CACHE_MAX_ENTRIES = 500
+    
     def __init__(self):
         self.oauth_flow = get_oauth_flow()
         self.service = None
-        self.cache = {}  # Simple in-memory cache
-        self.last_request_time = 0
-        self.rate_limit_delay = 1.0 / Config.GMAIL_API_RATE_LIMIT  # seconds between requests
+        self.cache = OrderedDict()  # Bounded LRU cache
+        self.rate_limiter = AsyncTokenBucket(Config.GMAIL_API_RATE_LIMIT)
+        # httplib2 is not thread-safe: all API calls go through one worker thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gmail-api")
         
         logger.info("GmailAPIHandler initialized")
     
@@ -61,12 +78,14 @@ class GmailAPIHandler:
         
         return self.service is not None
     
-    def _rate_limit(self):
-        """Apply rate limiting"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_request_time = time.time()
+    async def _rate_limit(self, cost: int = 1):
+        """Apply rate limiting (awaits, never blocks the event loop)"""
+        await self.rate_limiter.acquire(cost)
+    
+    async def _run(self, request):
+        """Execute a googleapiclient request off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, request.execute)
     
     def _get_cached(self, key: str, ttl: int) -> Optional[Any]:
         """
@@ -83,20 +102,112 @@ class GmailAPIHandler:
             cached_time, value = self.cache[key]
             if time.time() - cached_time < ttl:
                 logger.debug(f"Cache hit: {key}")
+                self.cache.move_to_end(key)
                 return value
+            del self.cache[key]
         
         return None
     
     def _set_cached(self, key: str, value: Any):
-        """Set cached value"""
+        """Set cached value (evicts least recently used past CACHE_MAX_ENTRIES)"""
         self.cache[key] = (time.time(), value)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.CACHE_MAX_ENTRIES:
+            self.cache.popitem(last=False)
+    
+    # ==================== SYNC PRIMITIVES ====================
+    
+    async def get_history_id(self) -> str:
+        """
+        Current mailbox historyId (starting point for incremental sync)
+        
+        Returns:
+            str: historyId
+        """
+        await self._rate_limit()
+        profile = await self._run(self.service.users().getProfile(userId='me'))
+        return str(profile['historyId'])
     
-    async def fetch_latest_email(self, limit: int = 10) -> Dict[str, Any]:
+    async def list_message_ids(self, limit: int = 500, query: Optional[str] = None) -> List[str]:
+        """
+        List message IDs newest first, following pagination
+        
+        Args:
+            limit: Maximum IDs
+            query: Optional Gmail search query
+            
+        Returns:
+            list: Message IDs
+        """
+        ids: List[str] = []
+        page_token = None
+        while len(ids) < limit:
+            await self._rate_limit()
+            params = {"userId": 'me', "maxResults": min(500, limit - len(ids))}
+            if query:
+                params["q"] = query
+            if page_token:
+                params["pageToken"] = page_token
+            results = await self._run(self.service.users().messages().list(**params))
+            ids.extend(msg['id'] for msg in results.get('messages', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return ids[:limit]
+    
+    async def list_history(self, start_history_id: str) -> Dict[str, Any]:
+        """
+        Changes since start_history_id via history.list
+        
+        Args:
+            start_history_id: historyId from the previous sync
+            
+        Returns:
+            dict: {"history_id", "added", "deleted", "relabeled"} (sets of message IDs)
+            
+        Raises:
+            HistoryExpiredError: The history window has expired (HTTP 404)
+        """
+        added, deleted, relabeled = set(), set(), set()
+        history_id = start_history_id
+        page_token = None
+        while True:
+            await self._rate_limit()
+            params = {"userId": 'me', "startHistoryId": start_history_id}
+            if page_token:
+                params["pageToken"] = page_token
+            try:
+                results = await self._run(self.service.users().history().list(**params))
+            except HttpError as e:
+                if e.resp.status == 404:
+                    raise HistoryExpiredError(start_history_id)
+                raise
+            
+            for record in results.get('history', []):
+                for item in record.get('messagesAdded', []):
+                    added.add(item['message']['id'])
+                for item in record.get('messagesDeleted', []):
+                    deleted.add(item['message']['id'])
+                for key in ('labelsAdded', 'labelsRemoved'):
+                    for item in record.get(key, []):
+                        relabeled.add(item['message']['id'])
+            
+            history_id = str(results.get('historyId', history_id))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        
+        added -= deleted
+        relabeled -= added | deleted
+        return {"history_id": history_id, "added": added, "deleted": deleted, "relabeled": relabeled}
+    
+    async def fetch_latest_email(self, limit: int = 10, full: bool = False) -> Dict[str, Any]:
         """
         Fetch latest emails
         
         Args:
             limit: Number of emails to fetch
+            full: Include bodies (otherwise headers + snippet; use get_email_by_id for the body)
             
         Returns:
             dict: Email list with metadata
@@ -106,31 +217,30 @@ class GmailAPIHandler:
                 return {"error": True, "message": "Gmail API service not available"}
             
             # Check cache
-            cache_key = f"latest_{limit}"
+            cache_key = f"latest_{limit}_{full}"
             cached = self._get_cached(cache_key, Config.EMAIL_CACHE_TTL)
             if cached:
                 return cached
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             # Fetch messages
             logger.info(f"Fetching latest {limit} emails...")
             
-            results = self.service.users().messages().list(
+            results = await self._run(self.service.users().messages().list(
                 userId='me',
                 maxResults=limit,
                 labelIds=['INBOX']
-            ).execute()
+            ))
             
             messages = results.get('messages', [])
             
-            # Fetch full message details
-            emails = []
-            for msg in messages:
-                email = await self._get_message_details(msg['id'])
-                if email:
-                    emails.append(email)
+            # Hydrate in one batch round trip (headers + snippet unless full=True)
+            emails = await self._hydrate_messages(
+                [msg['id'] for msg in messages],
+                fmt='full' if full else 'metadata'
+            )
             
             result = {
                 "emails": [email.to_dict() for email in emails],
@@ -172,14 +282,14 @@ class GmailAPIHandler:
                 return cached
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             # Fetch message
-            message = self.service.users().messages().get(
+            message = await self._run(self.service.users().messages().get(
                 userId='me',
                 id=message_id,
                 format='full'
-            ).execute()
+            ))
             
             # Parse message
             email = self._parse_message(message)
@@ -193,6 +303,90 @@ class GmailAPIHandler:
             logger.error(f"Failed to get message {message_id}: {e}")
             return None
     
+    async def _hydrate_messages(self, message_ids: List[str], fmt: str = 'metadata', use_cache: bool = True) -> List[EmailMessage]:
+        """
+        Fetch many messages with Gmail's HTTP batch endpoint
+        
+        One round trip per BATCH_SIZE ids instead of one per message. Cached
+        messages are skipped (a cached full message also serves metadata),
+        calls that fail inside a batch are retried once individually.
+        
+        Args:
+            message_ids: Message IDs, in display order
+            fmt: 'metadata' (headers + snippet) or 'full'
+            use_cache: Serve recently fetched messages from memory (sync passes False)
+            
+        Returns:
+            list: EmailMessage objects in the order of message_ids
+        """
+        found: Dict[str, EmailMessage] = {}
+        missing = []
+        for message_id in message_ids:
+            if not use_cache:
+                missing.append(message_id)
+                continue
+            cached = self._get_cached(f"msg_{message_id}", Config.EMAIL_CACHE_TTL)
+            if cached is None and fmt == 'metadata':
+                cached = self._get_cached(f"meta_{message_id}", Config.EMAIL_CACHE_TTL)
+            if cached is not None:
+                found[message_id] = cached
+            else:
+                missing.append(message_id)
+        
+        failed = []
+        for start in range(0, len(missing), self.BATCH_SIZE):
+            chunk = missing[start:start + self.BATCH_SIZE]
+            responses: Dict[str, Any] = {}
+            
+            def on_response(request_id, response, exception):
+                if exception is None:
+                    responses[request_id] = response
+                else:
+                    logger.debug(f"Batch item {request_id} failed: {exception}")
+            
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for message_id in chunk:
+                batch.add(self._message_request(message_id, fmt), request_id=message_id)
+            
+            await self._rate_limit(len(chunk))
+            try:
+                await self._run(batch)
+            except HttpError as e:
+                logger.warning(f"Batch request failed ({e.status_code}), retrying individually")
+            
+            for message_id in chunk:
+                raw = responses.get(message_id)
+                if raw is None:
+                    failed.append(message_id)
+                    continue
+                email = self._parse_message(raw)
+                self._set_cached(f"{'msg' if fmt == 'full' else 'meta'}_{message_id}", email)
+                found[message_id] = email
+        
+        # Retry throttled/failed items one by one
+        for message_id in failed:
+            try:
+                await self._rate_limit()
+                raw = await self._run(self._message_request(message_id, fmt))
+                email = self._parse_message(raw)
+                self._set_cached(f"{'msg' if fmt == 'full' else 'meta'}_{message_id}", email)
+                found[message_id] = email
+            except Exception as e:
+                logger.error(f"Failed to get message {message_id}: {e}")
+        
+        return [found[message_id] for message_id in message_ids if message_id in found]
+    
+    def _message_request(self, message_id: str, fmt: str):
+        """Build a messages.get request for the given format"""
+        if fmt == 'metadata':
+            return self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=self.LIST_HEADERS
+            )
+        return self.service.users().messages().get(userId='me', id=message_id, format=fmt)
+    
     def _parse_message(self, message: Dict[str, Any]) -> EmailMessage:
         """
         Parse Gmail API message to EmailMessage
@@ -227,8 +421,8 @@ class GmailAPIHandler:
                 elif part['mimeType'] == 'text/html':
                     body_html = self._decode_body(part['body'].get('data', ''))
         else:
-            body_data = message['payload']['body'].get('data', '')
-            if message['payload']['mimeType'] == 'text/html':
+            body_data = message['payload'].get('body', {}).get('data', '')
+            if message['payload'].get('mimeType') == 'text/html':
                 body_html = self._decode_body(body_data)
                 body_text = extract_plain_text_from_html(body_html)
             else:
@@ -239,7 +433,7 @@ class GmailAPIHandler:
             body_text = extract_plain_text_from_html(body_html)
         
         # Extract snippet
-        snippet = message.get('snippet', extract_snippet(body_text))
+        snippet = message.get('snippet') or extract_snippet(body_text)
         
         # Parse labels
         labels = message.get('labelIds', [])
@@ -305,7 +499,8 @@ class GmailAPIHandler:
     async def search_emails(
         self,
         query: str,
-        limit: int = 10
+        limit: int = 10,
+        full: bool = False
     ) -> Dict[str, Any]:
         """
         Search emails using Gmail search syntax
@@ -313,6 +508,7 @@ class GmailAPIHandler:
         Args:
             query: Gmail search query (e.g., "from:john@example.com")
             limit: Maximum results
+            full: Include bodies (otherwise headers + snippet)
             
         Returns:
             dict: Search results
@@ -322,31 +518,30 @@ class GmailAPIHandler:
                 return {"error": True, "message": "Gmail API service not available"}
             
             # Check cache
-            cache_key = f"search_{query}_{limit}"
+            cache_key = f"search_{query}_{limit}_{full}"
             cached = self._get_cached(cache_key, Config.SEARCH_CACHE_TTL)
             if cached:
                 return cached
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info(f"Searching emails: {query}")
             
             # Search
-            results = self.service.users().messages().list(
+            results = await self._run(self.service.users().messages().list(
                 userId='me',
                 q=query,
                 maxResults=limit
-            ).execute()
+            ))
             
             messages = results.get('messages', [])
             
-            # Fetch details
-            emails = []
-            for msg in messages:
-                email = await self._get_message_details(msg['id'])
-                if email:
-                    emails.append(email)
+            # Hydrate in one batch round trip (headers + snippet unless full=True)
+            emails = await self._hydrate_messages(
+                [msg['id'] for msg in messages],
+                fmt='full' if full else 'metadata'
+            )
             
             result = {
                 "query": query,
@@ -430,15 +625,15 @@ class GmailAPIHandler:
             raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             # Create draft
             logger.info(f"Creating draft: {subject}")
             
-            draft = self.service.users().drafts().create(
+            draft = await self._run(self.service.users().drafts().create(
                 userId='me',
                 body={'message': {'raw': raw}}
-            ).execute()
+            ))
             
             logger.info(f"Draft created: {draft['id']}")
             
@@ -477,15 +672,15 @@ class GmailAPIHandler:
                 return cached
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info("Listing drafts...")
             
             # List drafts
-            results = self.service.users().drafts().list(
+            results = await self._run(self.service.users().drafts().list(
                 userId='me',
                 maxResults=limit
-            ).execute()
+            ))
             
             drafts = results.get('drafts', [])
             
@@ -528,15 +723,15 @@ class GmailAPIHandler:
                 return {"error": True, "message": "Gmail API service not available"}
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info(f"Deleting draft: {draft_id}")
             
             # Delete
-            self.service.users().drafts().delete(
+            await self._run(self.service.users().drafts().delete(
                 userId='me',
                 id=draft_id
-            ).execute()
+            ))
             
             logger.info(f"Draft deleted: {draft_id}")
             
@@ -576,15 +771,15 @@ class GmailAPIHandler:
                 return {"error": True, "message": "Gmail API service not available"}
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.warning(f"Sending draft: {draft_id} (CONFIRMED)")
             
             # Send
-            sent = self.service.users().drafts().send(
+            sent = await self._run(self.service.users().drafts().send(
                 userId='me',
                 body={'id': draft_id}
-            ).execute()
+            ))
             
             logger.info(f"Draft sent: {draft_id}")
             
@@ -618,16 +813,16 @@ class GmailAPIHandler:
                 return {"error": True, "message": "Gmail API service not available"}
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info(f"Marking as read: {email_id}")
             
             # Remove UNREAD label
-            self.service.users().messages().modify(
+            await self._run(self.service.users().messages().modify(
                 userId='me',
                 id=email_id,
                 body={'removeLabelIds': ['UNREAD']}
-            ).execute()
+            ))
             
             return {
                 "status": "marked_read",
@@ -669,16 +864,16 @@ class GmailAPIHandler:
                 return {"error": True, "message": f"Label not found: {label_name}"}
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info(f"Applying label '{label_name}' to {email_id}")
             
             # Apply label
-            self.service.users().messages().modify(
+            await self._run(self.service.users().messages().modify(
                 userId='me',
                 id=email_id,
                 body={'addLabelIds': [label_id]}
-            ).execute()
+            ))
             
             return {
                 "status": "label_applied",
@@ -711,12 +906,12 @@ class GmailAPIHandler:
                 return cached
             
             # Rate limit
-            self._rate_limit()
+            await self._rate_limit()
             
             logger.info("Listing labels...")
             
             # List labels
-            results = self.service.users().labels().list(userId='me').execute()
+            results = await self._run(self.service.users().labels().list(userId='me'))
             labels = results.get('labels', [])
             
             result = {
@@ -5,13 +5,17 @@ Fallback method for Gmail operations using IMAP protocol.
 From Gmail Module SRS Section 3.3.
 """
 
+import re
 import imaplib
+import asyncio
+import functools
 import email
 from email.header import decode_header
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from .models.email_message import EmailMessage, Attachment
 from .auth.credentials_store import get_credential_store
@@ -24,6 +28,31 @@ from haitham_voice_agent.config import Config
 
 logger = logging.getLogger(__name__)
 
+_UID_RE = re.compile(rb'UID (\d+)')
+_FLAGS_RE = re.compile(rb'FLAGS \(([^)]*)\)')
+_STATUS_RE = re.compile(rb'(UIDVALIDITY|UIDNEXT|HIGHESTMODSEQ) (\d+)')
+_FETCH_START_RE = re.compile(rb'^\d+ \(')
+_ESEARCH_ALL_RE = re.compile(rb'\bALL ([\d:,]+)')
+
+# List views need headers and flags only; PEEK keeps \Seen untouched
+LIST_FETCH_ITEMS = '(UID FLAGS BODY.PEEK[HEADER.FIELDS (FROM TO CC SUBJECT DATE)])'
+
+
+def _tail_of_set(sequence_set: bytes, limit: int) -> List[int]:
+    """Largest `limit` numbers of an IMAP sequence set, ascending, without expanding all of it"""
+    ranges = []
+    for part in sequence_set.split(b','):
+        low, _, high = part.partition(b':')
+        low, high = int(low), int(high or low)
+        ranges.append((min(low, high), max(low, high)))
+    
+    tail: List[int] = []
+    for low, high in sorted(ranges, reverse=True):
+        if len(tail) >= limit:
+            break
+        tail.extend(range(high, max(low, high - (limit - len(tail)) + 1) - 1, -1))
+    return sorted(tail)
+
 
 class IMAPHandler:
     """
@@ -31,15 +60,25 @@ class IMAPHandler:
     
     Features:
     - Email fetching and searching via IMAP
-    - Connection pooling
+    - Header-only list views in one pipelined FETCH per range
+    - Bodies streamed on demand with partial fetches
+    - Connection pooling, all socket work on one I/O thread
     - Maps to unified EmailMessage model
     """
     
+    # UIDs per header UID FETCH command
+    HEADER_FETCH_CHUNK = 500
+    # Partial fetch size and cap for get_email_by_id
+    BODY_CHUNK = 256 * 1024
+    MAX_BODY_BYTES = 10 * 1024 * 1024
+    
     def __init__(self):
         self.credential_store = get_credential_store()
         self.connection = None
         self.last_connection_time = 0
         self.connection_timeout = 300  # 5 minutes
+        # imaplib connections are not thread-safe: one worker serializes commands
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imap")
         
         logger.info("IMAPHandler initialized")
     
@@ -88,9 +127,16 @@ class IMAPHandler:
             logger.error(f"IMAP connection failed: {e}")
             return None
     
+    # ==================== Blocking I/O ====================
+    
+    async def _run(self, fn, *args):
+        """Run blocking imaplib work on the handler's single I/O thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+    
     async def fetch_latest_email(self, limit: int = 10) -> Dict[str, Any]:
         """
-        Fetch latest emails via IMAP
+        Fetch latest emails via IMAP (headers and flags only)
         
         Args:
             limit: Number of emails to fetch
@@ -99,33 +145,10 @@ class IMAPHandler:
             dict: Email list with metadata
         """
         try:
-            conn = self._get_connection()
-            if not conn:
+            emails = await self._run(self._fetch_latest, limit)
+            if emails is None:
                 return {"error": True, "message": "IMAP connection not available"}
             
-            # Select INBOX
-            conn.select('INBOX')
-            
-            # Search for all messages
-            status, messages = conn.search(None, 'ALL')
-            
-            if status != 'OK':
-                return {"error": True, "message": "IMAP search failed"}
-            
-            # Get message IDs (newest first)
-            message_ids = messages[0].split()
-            message_ids.reverse()
-            
-            # Limit results
-            message_ids = message_ids[:limit]
-            
-            # Fetch emails
-            emails = []
-            for msg_id in message_ids:
-                email_obj = await self._fetch_email_by_id(conn, msg_id)
-                if email_obj:
-                    emails.append(email_obj)
-            
             logger.info(f"Fetched {len(emails)} emails via IMAP")
             
             return {
@@ -137,34 +160,76 @@ class IMAPHandler:
             logger.error(f"IMAP fetch failed: {e}")
             return {"error": True, "message": str(e)}
     
-    async def _fetch_email_by_id(self, conn: imaplib.IMAP4_SSL, msg_id: bytes) -> Optional[EmailMessage]:
+    def _fetch_latest(self, limit: int) -> Optional[List[EmailMessage]]:
+        conn = self._get_connection()
+        if not conn:
+            return None
+        
+        # EXISTS from SELECT gives the newest sequence numbers without a SEARCH ALL
+        status, data = conn.select('INBOX', readonly=True)
+        exists = int(data[0]) if status == 'OK' and data and data[0] else 0
+        if not exists or limit <= 0:
+            return []
+        
+        first = max(1, exists - limit + 1)
+        status, data = conn.fetch(f'{first}:{exists}', LIST_FETCH_ITEMS)
+        if status != 'OK':
+            raise RuntimeError("IMAP fetch failed")
+        return self._parse_header_fetch(data)
+    
+    def _fetch_headers(self, conn, uids: List[int]) -> List[EmailMessage]:
+        """One UID FETCH of header fields per HEADER_FETCH_CHUNK UIDs, newest first"""
+        emails = []
+        for start in range(0, len(uids), self.HEADER_FETCH_CHUNK):
+            chunk = uids[start:start + self.HEADER_FETCH_CHUNK]
+            status, data = conn.uid('FETCH', ",".join(str(u) for u in chunk), LIST_FETCH_ITEMS)
+            if status == 'OK':
+                emails.extend(self._parse_header_fetch(data))
+        emails.sort(key=lambda e: int(e.id), reverse=True)
+        return emails
+    
+    def _parse_header_fetch(self, data) -> List[EmailMessage]:
+        emails = []
+        for meta, literal in self._split_fetch(data):
+            uid = _UID_RE.search(meta)
+            if not uid or literal is None:
+                continue
+            emails.append(self._build_email(literal, uid.group(1).decode(), _FLAGS_RE.search(meta)))
+        emails.sort(key=lambda e: int(e.id), reverse=True)
+        return emails
+    
+    def _build_email(self, raw: bytes, uid: str, flags_match) -> EmailMessage:
+        email_obj = self._parse_email_message(email.message_from_bytes(raw), uid)
+        email_obj.labels = self._labels_from_flags(flags_match.group(1) if flags_match else b'')
+        email_obj.is_unread = "UNREAD" in email_obj.labels
+        email_obj.is_starred = "STARRED" in email_obj.labels
+        return email_obj
+    
+    def _fetch_body(self, conn, uid: str) -> Optional[Tuple[bytes, Any]]:
         """
-        Fetch single email by ID
+        Stream one message with partial BODY.PEEK[]<offset.count> fetches
         
-        Args:
-            conn: IMAP connection
-            msg_id: Message ID
-            
-        Returns:
-            EmailMessage: Parsed email or None
+        Most messages fit in the first BODY_CHUNK; large ones are read in
+        chunks up to MAX_BODY_BYTES instead of one huge literal.
         """
-        try:
-            # Fetch message
-            status, msg_data = conn.fetch(msg_id, '(RFC822)')
-            
+        chunks = []
+        flags = None
+        offset = 0
+        while offset < self.MAX_BODY_BYTES:
+            status, data = conn.uid('FETCH', uid, f'(UID FLAGS BODY.PEEK[]<{offset}.{self.BODY_CHUNK}>)')
             if status != 'OK':
                 return None
-            
-            # Parse email
-            raw_email = msg_data[0][1]
-            email_message = email.message_from_bytes(raw_email)
-            
-            # Parse to EmailMessage model
-            return self._parse_email_message(email_message, msg_id.decode())
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch email {msg_id}: {e}")
-            return None
+            parts = [(meta, literal) for meta, literal in self._split_fetch(data) if _UID_RE.search(meta)]
+            if not parts:
+                return None if offset == 0 else (b"".join(chunks), flags)
+            meta, literal = parts[0]
+            flags = flags or _FLAGS_RE.search(meta)
+            literal = literal or b""
+            chunks.append(literal)
+            offset += len(literal)
+            if len(literal) < self.BODY_CHUNK:
+                break
+        return b"".join(chunks), flags
     
     def _parse_email_message(self, msg: email.message.Message, msg_id: str) -> EmailMessage:
         """
@@ -298,43 +363,21 @@ class IMAPHandler:
         """
         Search emails via IMAP
         
+        Uses Gmail's X-GM-RAW when the server offers it, otherwise
+        SUBJECT/FROM. Only the newest `limit` UIDs are fetched (headers only).
+        
         Args:
-            query: Search query (simplified, not Gmail syntax)
+            query: Search query
             limit: Maximum results
             
         Returns:
             dict: Search results
         """
         try:
-            conn = self._get_connection()
-            if not conn:
+            emails = await self._run(self._search, query, limit)
+            if emails is None:
                 return {"error": True, "message": "IMAP connection not available"}
             
-            # Select INBOX
-            conn.select('INBOX')
-            
-            # Convert query to IMAP search criteria
-            # Simple implementation: search in subject and from
-            search_criteria = f'(OR SUBJECT "{query}" FROM "{query}")'
-            
-            # Search
-            status, messages = conn.search(None, search_criteria)
-            
-            if status != 'OK':
-                return {"error": True, "message": "IMAP search failed"}
-            
-            # Get message IDs
-            message_ids = messages[0].split()
-            message_ids.reverse()
-            message_ids = message_ids[:limit]
-            
-            # Fetch emails
-            emails = []
-            for msg_id in message_ids:
-                email_obj = await self._fetch_email_by_id(conn, msg_id)
-                if email_obj:
-                    emails.append(email_obj)
-            
             logger.info(f"Found {len(emails)} emails via IMAP search")
             
             return {
@@ -347,24 +390,69 @@ class IMAPHandler:
             logger.error(f"IMAP search failed: {e}")
             return {"error": True, "message": str(e)}
     
+    def _search(self, query: str, limit: int) -> Optional[List[EmailMessage]]:
+        conn = self._get_connection()
+        if not conn:
+            return None
+        conn.select('INBOX', readonly=True)
+        uids = self._uid_search(conn, query, limit)
+        return self._fetch_headers(conn, uids)
+    
+    def _uid_search(self, conn, query: str, limit: int) -> List[int]:
+        """
+        UID SEARCH returning the newest `limit` UIDs
+        
+        With ESEARCH the server answers with a compact sequence set
+        (e.g. "1:4800,4802") instead of every UID, and only the tail of
+        it is expanded.
+        """
+        capabilities = getattr(conn, 'capabilities', ())
+        criteria = self._search_criteria(conn, query, 'X-GM-EXT-1' in capabilities)
+        
+        if 'ESEARCH' in capabilities:
+            status, _ = conn.uid('SEARCH', 'RETURN', '(ALL)', *criteria)
+            if status != 'OK':
+                raise RuntimeError("IMAP search failed")
+            _, data = conn.response('ESEARCH')
+            found = _ESEARCH_ALL_RE.search(b" ".join(d for d in data if isinstance(d, bytes)))
+            return _tail_of_set(found.group(1), limit) if found else []
+        
+        status, data = conn.uid('SEARCH', None, *criteria)
+        if status != 'OK':
+            raise RuntimeError("IMAP search failed")
+        uids = [int(u) for u in data[0].split()] if data and data[0] else []
+        return sorted(uids)[-limit:] if limit > 0 else []
+    
+    @staticmethod
+    def _search_criteria(conn, query: str, gmail_raw: bool) -> List[str]:
+        """Build UID SEARCH arguments; non-ASCII queries go as a UTF-8 literal"""
+        key = 'X-GM-RAW' if gmail_raw else None
+        try:
+            query.encode('ascii')
+        except UnicodeEncodeError:
+            # imaplib only sends ASCII command text; the literal is appended last
+            conn.literal = query.encode('utf-8')
+            return ['CHARSET', 'UTF-8', key or 'SUBJECT']
+        quoted = '"' + query.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        if key:
+            return [key, quoted]
+        return [f'(OR SUBJECT {quoted} FROM {quoted})']
+    
     async def get_email_by_id(self, email_id: str) -> Dict[str, Any]:
         """
-        Get specific email by ID
+        Get specific email by UID (full body)
         
         Args:
-            email_id: Email ID
+            email_id: Email UID
             
         Returns:
             dict: Email data
         """
         try:
-            conn = self._get_connection()
-            if not conn:
-                return {"error": True, "message": "IMAP connection not available"}
-            
-            conn.select('INBOX')
+            if not str(email_id).isdigit():
+                return {"error": True, "message": f"Email not found: {email_id}"}
             
-            email_obj = await self._fetch_email_by_id(conn, email_id.encode())
+            email_obj = await self._run(self._get_email, str(email_id))
             
             if email_obj:
                 return email_obj.to_dict()
@@ -375,6 +463,145 @@ class IMAPHandler:
             logger.error(f"Failed to get email: {e}")
             return {"error": True, "message": str(e)}
     
+    def _get_email(self, uid: str) -> Optional[EmailMessage]:
+        conn = self._get_connection()
+        if not conn:
+            raise ConnectionError("IMAP connection not available")
+        conn.select('INBOX', readonly=True)
+        fetched = self._fetch_body(conn, uid)
+        if not fetched:
+            return None
+        raw, flags = fetched
+        return self._build_email(raw, uid, flags)
+    
+    # ==================== MIRROR SYNC ====================
+    
+    # UIDs per UID FETCH command during sync
+    SYNC_FETCH_CHUNK = 100
+    
+    async def sync_mailbox(
+        self,
+        state: Dict[str, Optional[int]],
+        known_uids: Set[int],
+        backfill_limit: int = 500
+    ) -> Dict[str, Any]:
+        """
+        Incremental INBOX sync for the local mailbox mirror
+        
+        Uses UIDVALIDITY to detect a reset mailbox, UIDNEXT to fetch only new
+        messages and, when the server supports CONDSTORE, HIGHESTMODSEQ with
+        CHANGEDSINCE to fetch only changed flags.
+        
+        Args:
+            state: Previous {"uidvalidity", "uidnext", "modseq"} (values may be None)
+            known_uids: UIDs already in the mirror
+            backfill_limit: Newest messages to fetch on a fresh/reset mirror
+            
+        Returns:
+            dict: New state plus "reset", "added" (EmailMessage list),
+                  "flags" ({uid: labels}) and "deleted" (UID list); a backfill
+                  also sets "complete" (whole mailbox fetched)
+        """
+        return await self._run(self._sync_mailbox, state, known_uids, backfill_limit)
+    
+    def _sync_mailbox(self, state, known_uids, backfill_limit) -> Dict[str, Any]:
+        conn = self._get_connection()
+        if not conn:
+            raise ConnectionError("IMAP connection not available")
+        
+        condstore = 'CONDSTORE' in getattr(conn, 'capabilities', ())
+        items = '(UIDVALIDITY UIDNEXT HIGHESTMODSEQ)' if condstore else '(UIDVALIDITY UIDNEXT)'
+        status, data = conn.status('INBOX', items)
+        if status != 'OK':
+            raise ConnectionError("IMAP STATUS failed")
+        current = {k.decode().lower(): int(v) for k, v in _STATUS_RE.findall(b" ".join(d for d in data if isinstance(d, bytes)))}
+        current["modseq"] = current.pop("highestmodseq", None)
+        
+        conn.select('INBOX', readonly=True)
+        result = {**current, "reset": False, "added": [], "flags": {}, "deleted": []}
+        
+        if state.get("uidvalidity") != current["uidvalidity"] or not known_uids:
+            # Fresh mirror or the server renumbered UIDs: backfill newest messages
+            result["reset"] = bool(state.get("uidvalidity"))
+            status, data = conn.uid('SEARCH', None, 'ALL')
+            uids = [int(u) for u in data[0].split()] if status == 'OK' and data and data[0] else []
+            result["added"] = self._fetch_messages(conn, uids[-backfill_limit:])
+            result["complete"] = len(uids) <= backfill_limit
+            return result
+        
+        # New messages: everything from the previous UIDNEXT on
+        previous_next = state.get("uidnext") or 1
+        if current["uidnext"] > previous_next:
+            status, data = conn.uid('SEARCH', None, f'UID {previous_next}:*')
+            new_uids = [int(u) for u in data[0].split()] if status == 'OK' and data and data[0] else []
+            result["added"] = self._fetch_messages(conn, [u for u in new_uids if u >= previous_next])
+        
+        # Flag changes on messages we already mirror
+        low = min(known_uids)
+        if condstore and state.get("modseq"):
+            if current["modseq"] != state["modseq"]:
+                status, data = conn.uid('FETCH', f'{low}:*', f'(FLAGS) (CHANGEDSINCE {state["modseq"]})')
+                result["flags"] = self._flags_from_fetch(data, known_uids) if status == 'OK' else {}
+        else:
+            status, data = conn.uid('FETCH', f'{low}:*', '(FLAGS)')
+            result["flags"] = self._flags_from_fetch(data, known_uids) if status == 'OK' else {}
+        
+        # Expunged messages
+        status, data = conn.uid('SEARCH', None, f'UID {low}:*')
+        present = {int(u) for u in data[0].split()} if status == 'OK' and data and data[0] else set()
+        result["deleted"] = sorted(known_uids - present)
+        return result
+    
+    @staticmethod
+    def _labels_from_flags(flags: bytes) -> List[str]:
+        """Map IMAP flags to Gmail-style labels"""
+        parts = flags.split()
+        labels = ["INBOX"]
+        if b'\\Seen' not in parts:
+            labels.append("UNREAD")
+        if b'\\Flagged' in parts:
+            labels.append("STARRED")
+        return labels
+    
+    @staticmethod
+    def _split_fetch(data: List[Any]) -> List[Tuple[bytes, Optional[bytes]]]:
+        """Group an imaplib FETCH response into (metadata, literal) per message"""
+        entries: List[List[Any]] = []
+        for item in data or []:
+            if isinstance(item, tuple):
+                entries.append([item[0], item[1]])
+            elif isinstance(item, bytes):
+                if entries and not _FETCH_START_RE.match(item):
+                    # Trailing items after a literal, e.g. b' FLAGS (\\Seen))'
+                    entries[-1][0] += item
+                else:
+                    entries.append([item, None])
+        return [(meta, literal) for meta, literal in entries]
+    
+    def _flags_from_fetch(self, data, known_uids: Set[int]) -> Dict[int, List[str]]:
+        flags = {}
+        for meta, _ in self._split_fetch(data):
+            uid = _UID_RE.search(meta)
+            found = _FLAGS_RE.search(meta)
+            if uid and found and int(uid.group(1)) in known_uids:
+                flags[int(uid.group(1))] = self._labels_from_flags(found.group(1))
+        return flags
+    
+    def _fetch_messages(self, conn, uids: List[int]) -> List[EmailMessage]:
+        """UID FETCH full messages (without setting \\Seen), SYNC_FETCH_CHUNK per command"""
+        emails = []
+        for start in range(0, len(uids), self.SYNC_FETCH_CHUNK):
+            chunk = uids[start:start + self.SYNC_FETCH_CHUNK]
+            status, data = conn.uid('FETCH', ",".join(str(u) for u in chunk), '(UID FLAGS BODY.PEEK[])')
+            if status != 'OK':
+                continue
+            for meta, literal in self._split_fetch(data):
+                uid = _UID_RE.search(meta)
+                if not uid or literal is None:
+                    continue
+                emails.append(self._build_email(literal, uid.group(1).decode(), _FLAGS_RE.search(meta)))
+        return emails
+    
     def close(self):
         """Close IMAP connection"""
         if self.connection:
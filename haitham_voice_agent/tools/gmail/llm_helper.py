@@ -5,60 +5,289 @@ LLM-enhanced email operations using Gemini and GPT.
 From Gmail Module SRS Section 4.7.
 
 Routing:
-- Gemini: Summarization, action extraction, translation, sentiment analysis
+- Gemini: Structured analysis (summary + actions + sentiment in one call),
+  thread summaries, translation
 - GPT: Smart reply generation (JSON-friendly outputs)
 """
 
-import logging
-from typing import Dict, Any, List, Optional
+import re
 import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 
 from ...llm_router import get_router
 from . import prompts
+from .analysis_cache import EmailAnalysisCache, body_hash
 
 logger = logging.getLogger(__name__)
 
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.MULTILINE)
+
+
+def _parse_json(text: str, opener: str = "{"):
+    """Parse the first JSON object/array in an LLM response"""
+    closer = "}" if opener == "{" else "]"
+    text = _FENCE_RE.sub("", text or "")
+    start, end = text.find(opener), text.rfind(closer)
+    if start < 0 or end <= start:
+        raise ValueError("No JSON found in LLM response")
+    return json.loads(text[start:end + 1])
+
 
 class EmailLLMHelpers:
     """
     LLM-enhanced email operations
     
     Public Functions:
-    - summarize_email: Summarize email object (Gemini)
+    - analyze_email: Summary, action items and sentiment in one cached call (Gemini)
+    - analyze_emails / schedule_prefetch: Batched analysis for list views
+    - summarize_email: Formatted summary built from analyze_email
     - generate_smart_reply: Generate smart reply from text (GPT)
     - extract_email_actions: Extract action items (Gemini)
     - translate_email_content: Translate email (Gemini)
     - analyze_email_sentiment: Analyze sentiment (Gemini)
     """
     
-    def __init__(self):
+    # Body characters sent per email
+    ANALYSIS_BODY_CHARS = 2000
+    # Emails per batched analysis call
+    PREFETCH_BATCH = 8
+    # Concurrent body loads during prefetch
+    PREFETCH_CONCURRENCY = 4
+    
+    def __init__(self, cache: Optional[EmailAnalysisCache] = None):
         self.router = get_router()
+        self.cache = cache or EmailAnalysisCache()
+        # (message_id, body_hash) -> future of an analysis already being computed
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._tasks: set = set()
         logger.info("EmailLLMHelpers initialized")
     
-    # ==================== SUMMARIZATION (Gemini) ====================
+    async def _generate(self, prompt: str, temperature: float, model: str = "gemini", **kwargs) -> str:
+        """Run one prompt through the router and return the text"""
+        if model == "gpt":
+            result = await self.router.generate_with_gpt(prompt=prompt, temperature=temperature, **kwargs)
+        else:
+            result = await self.router.generate_with_gemini(prompt=prompt, temperature=temperature, **kwargs)
+        content = result.get("content", "") if isinstance(result, dict) else result
+        return (content or "").strip()
     
-    async def summarize_email(self, email_obj: Dict[str, Any]) -> Dict[str, Any]:
+    # ==================== STRUCTURED ANALYSIS (Gemini) ====================
+    
+    def _email_text(self, email_obj: Dict[str, Any]) -> str:
+        body = email_obj.get('body_text', '') or email_obj.get('snippet', '')
+        return (f"From: {email_obj.get('from', '')}\nSubject: {email_obj.get('subject', '')}\n\n"
+                f"{body[:self.ANALYSIS_BODY_CHARS]}")
+    
+    def _parse_analysis(self, content: str) -> Dict[str, Any]:
+        try:
+            return self._normalize_analysis(_parse_json(content, "{"))
+        except ValueError:
+            # Model ignored the JSON format: keep its prose as the summary
+            return {**self._normalize_analysis({}), "text": content}
+    
+    @staticmethod
+    def _normalize_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+        actions = []
+        for item in data.get("action_items") or []:
+            if isinstance(item, str):
+                item = {"task": item}
+            if isinstance(item, dict) and item.get("task"):
+                actions.append({"task": item["task"], "due": item.get("due"),
+                                "priority": item.get("priority") or "medium"})
+        key_points = data.get("key_points") or []
+        return {
+            "main_idea": str(data.get("main_idea") or ""),
+            "key_points": [str(p) for p in key_points] if isinstance(key_points, list) else [str(key_points)],
+            "action_items": actions,
+            "sentiment": str(data.get("sentiment") or "neutral").lower(),
+            "tone": str(data.get("tone") or ""),
+            "urgency": str(data.get("urgency") or "low").lower(),
+        }
+    
+    @staticmethod
+    def format_analysis(analysis: Dict[str, Any]) -> str:
+        """Arabic markdown summary for the Gmail panel"""
+        if analysis.get("text"):
+            return analysis["text"]
+        lines = [f"- **الفكرة الرئيسية**: {analysis.get('main_idea', '')}"]
+        if analysis.get("key_points"):
+            lines.append("- **النقاط الهامة**:")
+            lines.extend(f"  - {point}" for point in analysis["key_points"])
+        if analysis.get("action_items"):
+            lines.append("- **الإجراء المطلوب**:")
+            for item in analysis["action_items"]:
+                due = f" ({item['due']})" if item.get("due") else ""
+                lines.append(f"  - {item['task']}{due}")
+        return "\n".join(lines)
+    
+    async def analyze_email(self, email_obj: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Summarize email object using Gemini (Unified function)
+        Summary, action items and sentiment in one structured Gemini call
+        
+        Cached by message id + body hash; a request for an email that is
+        already part of a running batch waits for that batch instead of
+        issuing its own call.
         
         Args:
             email_obj: Email dictionary (from GmailAPIHandler or IMAPHandler)
             
         Returns:
-            dict: Summary result
+            dict: main_idea, key_points, action_items, sentiment, tone,
+                  urgency and "cached"
         """
-        # Extract content
-        subject = email_obj.get('subject', '')
-        sender = email_obj.get('from', '')
-        body = email_obj.get('body_text', '') or email_obj.get('snippet', '')
+        message_id = str(email_obj.get('id') or '')
+        key = (message_id, body_hash(email_obj))
+        
+        if message_id:
+            cached = await asyncio.to_thread(self.cache.get, *key)
+            if cached:
+                return {**cached, "cached": True}
+            pending = self._pending.get(key)
+            if pending:
+                analysis = await asyncio.shield(pending)
+                if analysis:
+                    return {**analysis, "cached": True}
+        
+        future = asyncio.get_running_loop().create_future()
+        if message_id:
+            self._pending[key] = future
+        try:
+            logger.info("Analyzing email with Gemini...")
+            prompt = prompts.ANALYZE_EMAIL_PROMPT.format(email_text=self._email_text(email_obj))
+            content = await self._generate(prompt, 0.3, usage_context={"method": "email_analysis"})
+            analysis = self._parse_analysis(content)
+            if message_id:
+                await asyncio.to_thread(self.cache.put, *key, analysis)
+            future.set_result(analysis)
+            return {**analysis, "cached": False}
+        except Exception as e:
+            logger.error(f"Email analysis failed: {e}")
+            future.set_result(None)
+            return {
+                "error": True,
+                "message": str(e)
+            }
+        finally:
+            self._pending.pop(key, None)
+    
+    async def analyze_emails(self, emails: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze several emails with one Gemini call per PREFETCH_BATCH
+        
+        Args:
+            emails: Email dictionaries with ids (full bodies preferred)
+            
+        Returns:
+            dict: {message_id: analysis} for every email analyzed or cached
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        todo = []
+        for email_obj in emails:
+            message_id = str(email_obj.get('id') or '')
+            if not message_id:
+                continue
+            key = (message_id, body_hash(email_obj))
+            cached = await asyncio.to_thread(self.cache.get, *key)
+            if cached:
+                results[message_id] = cached
+            elif key not in self._pending and all(k != key for k, _ in todo):
+                todo.append((key, email_obj))
         
-        # Combine for context
-        full_text = f"From: {sender}\nSubject: {subject}\n\n{body}"
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(todo), self.PREFETCH_BATCH):
+            chunk = todo[start:start + self.PREFETCH_BATCH]
+            futures = {}
+            for key, _ in chunk:
+                futures[key] = self._pending[key] = loop.create_future()
+            parsed: Dict[str, Dict[str, Any]] = {}
+            try:
+                logger.info(f"Analyzing {len(chunk)} emails with Gemini (batched)...")
+                emails_text = "\n\n---\n\n".join(
+                    f"[id: {key[0]}]\n{self._email_text(email_obj)}" for key, email_obj in chunk
+                )
+                prompt = prompts.ANALYZE_EMAILS_BATCH_PROMPT.format(emails_text=emails_text)
+                content = await self._generate(prompt, 0.3, usage_context={"method": "email_analysis_batch"})
+                for item in _parse_json(content, "["):
+                    if isinstance(item, dict) and item.get("id") is not None:
+                        parsed[str(item["id"])] = self._normalize_analysis(item)
+            except Exception as e:
+                logger.error(f"Batched email analysis failed: {e}")
+            finally:
+                for key, future in futures.items():
+                    analysis = parsed.get(key[0])
+                    if analysis:
+                        await asyncio.to_thread(self.cache.put, *key, analysis)
+                        results[key[0]] = analysis
+                    future.set_result(analysis)
+                    self._pending.pop(key, None)
+        return results
+    
+    def schedule_prefetch(
+        self,
+        emails: List[Dict[str, Any]],
+        loader: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None
+    ) -> Optional[asyncio.Task]:
+        """
+        Analyze a list view in the background so opening an email is instant
         
-        # Determine if detailed summary is needed (e.g. if long)
-        detailed = len(body) > 1000
+        Args:
+            emails: Emails from a list view (may be metadata-only)
+            loader: Coroutine fetching a full email by id, used when a list
+                    item has no body
+        """
+        todo = [e for e in emails if e.get('id')]
+        if not todo:
+            return None
+        task = asyncio.create_task(self._prefetch(todo, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _prefetch(self, emails, loader):
+        try:
+            emails = [e for e in emails if not await asyncio.to_thread(self.cache.has, str(e['id']))]
+            if not emails:
+                return
+            if loader:
+                semaphore = asyncio.Semaphore(self.PREFETCH_CONCURRENCY)
+                
+                async def load(email_obj):
+                    if email_obj.get('body_text'):
+                        return email_obj
+                    async with semaphore:
+                        full = await loader(str(email_obj['id']))
+                    return email_obj if not full or full.get("error") else full
+                
+                emails = await asyncio.gather(*(load(e) for e in emails))
+            results = await self.analyze_emails(list(emails))
+            logger.info(f"Prefetched analysis for {len(results)} emails")
+        except Exception as e:
+            logger.warning(f"Email analysis prefetch failed: {e}")
+    
+    # ==================== SUMMARIZATION (Gemini) ====================
+    
+    async def summarize_email(self, email_obj: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Summarize email object using Gemini (Unified function)
         
-        return await self.summarize_email_content(full_text, detailed=detailed)
+        Args:
+            email_obj: Email dictionary (from GmailAPIHandler or IMAPHandler)
+            
+        Returns:
+            dict: Formatted summary plus the structured analysis
+        """
+        analysis = await self.analyze_email(email_obj)
+        if analysis.get("error"):
+            return analysis
+        cached = analysis.pop("cached", False)
+        return {
+            "summary": self.format_analysis(analysis),
+            "analysis": analysis,
+            "model": "gemini",
+            "cached": cached
+        }
 
     async def summarize_email_content(
         self,
@@ -88,17 +317,12 @@ class EmailLLMHelpers:
                     email_text=email_text
                 )
             
-            # Generate summary using Gemini
-            summary = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.5
-            )
+            summary = await self._generate(prompt, 0.5)
             
             logger.info("Email summarization complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "summary": summary.strip(),
+                "summary": summary,
                 "model": "gemini",
                 "detailed": detailed
             }
@@ -136,17 +360,12 @@ class EmailLLMHelpers:
                 thread_text=thread_text
             )
             
-            # Generate summary using Gemini
-            summary = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.5
-            )
+            summary = await self._generate(prompt, 0.5)
             
             logger.info("Thread summarization complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "summary": summary.strip(),
+                "summary": summary,
                 "model": "gemini",
                 "message_count": len(thread_messages)
             }
@@ -180,17 +399,12 @@ class EmailLLMHelpers:
                 email_text=email_text
             )
             
-            # Extract actions using Gemini
-            actions_text = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.3
-            )
+            actions_text = await self._generate(prompt, 0.3)
             
             logger.info("Action extraction complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "actions": actions_text.strip(),
+                "actions": actions_text,
                 "model": "gemini",
                 "has_actions": "No action items" not in actions_text
             }
@@ -228,17 +442,12 @@ class EmailLLMHelpers:
                 thread_text=thread_text
             )
             
-            # Extract actions using Gemini
-            actions_text = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.3
-            )
+            actions_text = await self._generate(prompt, 0.3)
             
             logger.info("Thread action extraction complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "actions": actions_text.strip(),
+                "actions": actions_text,
                 "model": "gemini",
                 "message_count": len(thread_messages)
             }
@@ -311,17 +520,12 @@ class EmailLLMHelpers:
                 reply_type=reply_type_desc
             )
             
-            # Generate reply using GPT
-            reply = await self.router.generate_with_gpt(
-                prompt=prompt,
-                temperature=0.7
-            )
+            reply = await self._generate(prompt, 0.7, model="gpt")
             
             logger.info("Reply generation complete")
-            logger.debug(f"Used model: GPT")
             
             return {
-                "reply": reply.strip(),
+                "reply": reply,
                 "model": "gpt",
                 "style": style,
                 "tone": tone,
@@ -363,17 +567,12 @@ class EmailLLMHelpers:
                 email_text=email_text
             )
             
-            # Translate using Gemini
-            translated = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.3
-            )
+            translated = await self._generate(prompt, 0.3)
             
             logger.info("Email translation complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "translated_text": translated.strip(),
+                "translated_text": translated,
                 "model": "gemini",
                 "target_language": target_language,
                 "language_name": lang_name
@@ -408,17 +607,12 @@ class EmailLLMHelpers:
                 email_text=email_text
             )
             
-            # Analyze using Gemini
-            analysis = await self.router.generate_with_gemini(
-                prompt=prompt,
-                temperature=0.3
-            )
+            analysis = await self._generate(prompt, 0.3)
             
             logger.info("Sentiment analysis complete")
-            logger.debug(f"Used model: Gemini")
             
             return {
-                "analysis": analysis.strip(),
+                "analysis": analysis,
                 "model": "gemini"
             }
             
@@ -0,0 +1,230 @@
+"""
+Mailbox Mirror
+
+Keeps the local MailboxStore in step with the server so list and search
+views are answered from SQLite:
+- Gmail API: backfill, then incremental history.list from the stored historyId
+- IMAP fallback: UIDVALIDITY / UIDNEXT / HIGHESTMODSEQ (CONDSTORE) sync
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List
+
+from .mailbox_store import MailboxStore
+from .gmail_api_handler import HistoryExpiredError
+
+logger = logging.getLogger(__name__)
+
+GMAIL = "gmail_api"
+IMAP = "imap"
+
+
+class MailboxMirror:
+    """
+    Local mailbox mirror
+
+    Reads call _ensure_fresh() first: at most one incremental sync per
+    `refresh_interval` seconds, so a burst of panel refreshes costs one
+    history.list round trip. Any sync failure returns None and the caller
+    falls back to the live server path.
+
+    The initial backfill (and the re-backfill after expired Gmail history)
+    runs as a background task; until it has completed for a source, reads
+    return None and are served by the server.
+    """
+
+    def __init__(
+        self,
+        gmail_api,
+        imap,
+        store: Optional[MailboxStore] = None,
+        backfill_limit: int = 500,
+        max_messages: int = 5000,
+        refresh_interval: float = 60.0
+    ):
+        self.gmail_api = gmail_api
+        self.imap = imap
+        self.store = store or MailboxStore()
+        self.backfill_limit = backfill_limit
+        self.max_messages = max_messages
+        self.refresh_interval = refresh_interval
+        self._last_sync: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._ready: Dict[str, bool] = {}
+        self._backfills: Dict[str, asyncio.Task] = {}
+
+    # ==================== Sync ====================
+
+    async def sync(self, source: str = GMAIL, backfill: bool = True) -> Dict[str, int]:
+        """
+        Run one sync pass for the source; returns change counts
+
+        With backfill=False an empty/reset mirror is left empty (the read
+        path schedules the backfill in the background instead).
+        """
+        lock = self._locks.setdefault(source, asyncio.Lock())
+        async with lock:
+            if source == GMAIL:
+                stats = await self._sync_gmail(backfill)
+            else:
+                stats = await self._sync_imap(backfill)
+            self._ready[source] = await asyncio.to_thread(self._has_baseline, source)
+            self._last_sync[source] = time.monotonic()
+            logger.info(f"Mailbox mirror synced ({source}): {stats}")
+            return stats
+
+    async def _sync_gmail(self, backfill: bool = True) -> Dict[str, int]:
+        if not self.gmail_api._ensure_service():
+            raise ConnectionError("Gmail API service not available")
+
+        history_id = await asyncio.to_thread(self.store.get_state, GMAIL, "history_id")
+        if history_id:
+            try:
+                return await self._apply_gmail_history(history_id)
+            except HistoryExpiredError:
+                logger.warning("Gmail history expired, re-backfilling mailbox mirror")
+                await asyncio.to_thread(self.store.clear, GMAIL)
+        if not backfill:
+            return {"added": 0, "deleted": 0, "updated": 0}
+        return await self._backfill_gmail()
+
+    async def _backfill_gmail(self) -> Dict[str, int]:
+        # Read the historyId first so changes made during the backfill are replayed next time
+        history_id = await self.gmail_api.get_history_id()
+        ids = await self.gmail_api.list_message_ids(limit=self.backfill_limit)
+        emails = await self.gmail_api._hydrate_messages(ids, fmt='full', use_cache=False)
+        added = await asyncio.to_thread(self.store.upsert, emails, GMAIL)
+        # Fewer IDs than the limit: the mirror holds the whole mailbox, so a
+        # local search with few hits is a complete answer
+        await asyncio.to_thread(self.store.set_state, GMAIL, history_id=history_id,
+                                complete=int(len(ids) < self.backfill_limit))
+        return {"added": added, "deleted": 0, "updated": 0}
+
+    async def _apply_gmail_history(self, history_id: str) -> Dict[str, int]:
+        changes = await self.gmail_api.list_history(history_id)
+
+        added = await self.gmail_api._hydrate_messages(sorted(changes["added"]), fmt='full', use_cache=False)
+        gone = set(changes["deleted"])
+        keep = []
+        for email_obj in added:
+            if {"TRASH", "SPAM"} & set(email_obj.labels):
+                gone.add(email_obj.id)
+            else:
+                keep.append(email_obj)
+
+        # Label changes: one metadata batch gives the current label set
+        updated = 0
+        relabeled = await self.gmail_api._hydrate_messages(sorted(changes["relabeled"]), fmt='metadata', use_cache=False)
+        for email_obj in relabeled:
+            if {"TRASH", "SPAM"} & set(email_obj.labels):
+                gone.add(email_obj.id)
+            elif await asyncio.to_thread(self.store.update_labels, email_obj.id, GMAIL, replace=email_obj.labels):
+                updated += 1
+
+        count = await asyncio.to_thread(self.store.upsert, keep, GMAIL)
+        deleted = await asyncio.to_thread(self.store.delete, gone, GMAIL)
+        await self._trim(GMAIL)
+        await asyncio.to_thread(self.store.set_state, GMAIL, history_id=changes["history_id"])
+        return {"added": count, "deleted": deleted, "updated": updated}
+
+    async def _sync_imap(self, backfill: bool = True) -> Dict[str, int]:
+        state = {}
+        for key in ("uidvalidity", "uidnext", "modseq"):
+            value = await asyncio.to_thread(self.store.get_state, IMAP, key)
+            state[key] = int(value) if value else None
+        known = {int(uid) for uid in await asyncio.to_thread(self.store.ids, IMAP)}
+        if not backfill and not state["uidvalidity"]:
+            return {"added": 0, "deleted": 0, "updated": 0}
+
+        result = await self.imap.sync_mailbox(state, known, self.backfill_limit)
+        if result["reset"]:
+            await asyncio.to_thread(self.store.clear, IMAP)
+
+        added = await asyncio.to_thread(self.store.upsert, result["added"], IMAP)
+        updated = 0
+        for uid, labels in result["flags"].items():
+            if await asyncio.to_thread(self.store.update_labels, str(uid), IMAP, replace=labels):
+                updated += 1
+        deleted = await asyncio.to_thread(self.store.delete, [str(uid) for uid in result["deleted"]], IMAP)
+        await self._trim(IMAP)
+        if "complete" in result:  # Backfill pass
+            await asyncio.to_thread(self.store.set_state, IMAP, complete=int(result["complete"]))
+        await asyncio.to_thread(
+            self.store.set_state, IMAP,
+            uidvalidity=result["uidvalidity"], uidnext=result["uidnext"], modseq=result.get("modseq")
+        )
+        return {"added": added, "deleted": deleted, "updated": updated}
+
+    async def _trim(self, source: str):
+        if await asyncio.to_thread(self.store.trim, source, self.max_messages):
+            await asyncio.to_thread(self.store.set_state, source, complete=0)
+
+    def _has_baseline(self, source: str) -> bool:
+        """A backfill has completed (blocking)"""
+        key = "history_id" if source == GMAIL else "uidvalidity"
+        return self.store.get_state(source, key) is not None
+
+    def _start_backfill(self, source: str):
+        task = self._backfills.get(source)
+        if task is None or task.done():
+            self._backfills[source] = asyncio.create_task(self._run_backfill(source))
+
+    async def _run_backfill(self, source: str):
+        try:
+            await self.sync(source)
+        except Exception as e:
+            logger.warning(f"Mailbox mirror backfill failed ({source}): {e}")
+
+    @property
+    def ready(self) -> Dict[str, bool]:
+        """Sources whose initial backfill has completed"""
+        return dict(self._ready)
+
+    async def _ensure_fresh(self, source: str) -> bool:
+        if not self._ready.get(source):
+            self._ready[source] = await asyncio.to_thread(self._has_baseline, source)
+            if not self._ready[source]:
+                self._start_backfill(source)
+                return False
+
+        last = self._last_sync.get(source)
+        if last is not None and time.monotonic() - last < self.refresh_interval:
+            return True
+        try:
+            await self.sync(source, backfill=False)
+        except Exception as e:
+            logger.warning(f"Mailbox mirror sync failed ({source}): {e}")
+            return False
+        if not self._ready[source]:  # History expired / UIDVALIDITY changed
+            self._start_backfill(source)
+            return False
+        return True
+
+    def invalidate(self, source: Optional[str] = None):
+        """Force a sync on the next read"""
+        if source:
+            self._last_sync.pop(source, None)
+        else:
+            self._last_sync.clear()
+
+    # ==================== Reads ====================
+
+    async def latest(self, source: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        if not await self._ensure_fresh(source):
+            return None
+        return await asyncio.to_thread(self.store.latest, source, limit)
+
+    async def search(self, source: str, query: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Local search; None when the mirror cannot give a complete answer"""
+        if not await self._ensure_fresh(source):
+            return None
+        return await asyncio.to_thread(self.store.search, source, query, limit)
+
+    async def get(self, source: str, message_id: str) -> Optional[Dict[str, Any]]:
+        """Mirrored message, without forcing a sync"""
+        return await asyncio.to_thread(self.store.get, message_id, source)
+
+    async def mark_read(self, source: str, message_id: str):
+        await asyncio.to_thread(self.store.update_labels, message_id, source, remove=["UNREAD"])
@@ -0,0 +1,299 @@
+"""
+Mailbox Store
+
+Local SQLite mirror of the mailbox: messages, FTS over subject/from/body
+and per-source sync state (Gmail historyId, IMAP UIDVALIDITY/UIDNEXT/MODSEQ).
+All methods are blocking; async callers go through asyncio.to_thread.
+"""
+
+import re
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Set
+
+from .models.email_message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# Gmail search operators that map onto label filters
+_LABEL_OPERATORS = {
+    "is:unread": "UNREAD",
+    "is:starred": "STARRED",
+    "is:important": "IMPORTANT",
+    "in:inbox": "INBOX",
+    "in:sent": "SENT",
+    "category:primary": "CATEGORY_PERSONAL",
+    "category:social": "CATEGORY_SOCIAL",
+    "category:promotions": "CATEGORY_PROMOTIONS",
+    "category:updates": "CATEGORY_UPDATES",
+}
+_TERM = re.compile(r'(\w+:"[^"]*"|\w+:\S+|"[^"]*"|\S+)')
+_WORD = re.compile(r"\w+", re.UNICODE)
+# OR/AROUND, -negation, +exact, {} and () groups: boolean syntax the FTS translation can't express
+_BOOLEAN_TERM = re.compile(r'^(?:OR|AND|AROUND)$|^[-+{(]|[})]$|^\w+:[{(]')
+
+
+class MailboxStore:
+    """
+    SQLite mailbox mirror
+
+    Features:
+    - Upsert/delete/label updates applied by the sync engine
+    - Newest-first listing per label
+    - Local search for the common Gmail operators plus FTS5 free text
+    """
+
+    def __init__(self, db_path: str = "~/HVA_Memory/system/mailbox.db"):
+        self.db_path = Path(db_path).expanduser()
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    thread_id TEXT,
+                    sender TEXT,
+                    subject TEXT,
+                    date REAL NOT NULL,
+                    labels TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    UNIQUE(source, id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_date ON messages(source, date DESC);
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    subject, sender, body, tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT,
+                    PRIMARY KEY (source, key)
+                );
+            """)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _labels_field(labels: Iterable[str]) -> str:
+        # Space-padded so "% UNREAD %" matches whole labels only
+        return " " + " ".join(labels) + " "
+
+    # ==================== Writes ====================
+
+    def upsert(self, emails: Iterable[EmailMessage], source: str) -> int:
+        """Insert or replace messages (full bodies expected)"""
+        count = 0
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for email_obj in emails:
+                    data = email_obj.to_dict()
+                    row = conn.execute(
+                        "SELECT rowid FROM messages WHERE source = ? AND id = ?", (source, email_obj.id)
+                    ).fetchone()
+                    values = (email_obj.thread_id, email_obj.from_, email_obj.subject,
+                              email_obj.date.timestamp(), self._labels_field(email_obj.labels),
+                              json.dumps(data, ensure_ascii=False))
+                    if row:
+                        rowid = row[0]
+                        conn.execute("""
+                            UPDATE messages SET thread_id = ?, sender = ?, subject = ?, date = ?,
+                                labels = ?, data = ? WHERE rowid = ?
+                        """, values + (rowid,))
+                        conn.execute("DELETE FROM messages_fts WHERE rowid = ?", (rowid,))
+                    else:
+                        rowid = conn.execute("""
+                            INSERT INTO messages (thread_id, sender, subject, date, labels, data, id, source)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """, values + (email_obj.id, source)).lastrowid
+                    conn.execute(
+                        "INSERT INTO messages_fts (rowid, subject, sender, body) VALUES (?, ?, ?, ?)",
+                        (rowid, email_obj.subject, email_obj.from_, email_obj.body_text or email_obj.snippet)
+                    )
+                    count += 1
+        return count
+
+    def delete(self, ids: Iterable[str], source: str) -> int:
+        count = 0
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for message_id in ids:
+                    row = conn.execute(
+                        "SELECT rowid FROM messages WHERE source = ? AND id = ?", (source, message_id)
+                    ).fetchone()
+                    if row:
+                        conn.execute("DELETE FROM messages_fts WHERE rowid = ?", (row[0],))
+                        conn.execute("DELETE FROM messages WHERE rowid = ?", (row[0],))
+                        count += 1
+        return count
+
+    def update_labels(self, message_id: str, source: str, add: Iterable[str] = (), remove: Iterable[str] = (),
+                      replace: Optional[List[str]] = None) -> bool:
+        """Apply label changes without refetching the message"""
+        with self._lock:
+            conn = self._db()
+            row = conn.execute(
+                "SELECT rowid, data FROM messages WHERE source = ? AND id = ?", (source, message_id)
+            ).fetchone()
+            if not row:
+                return False
+            data = json.loads(row[1])
+            if replace is not None:
+                labels = list(replace)
+            else:
+                labels = [l for l in data.get("labels", []) if l not in set(remove)]
+                labels += [l for l in add if l not in labels]
+            data["labels"] = labels
+            data["is_unread"] = "UNREAD" in labels
+            data["is_starred"] = "STARRED" in labels
+            data["is_important"] = "IMPORTANT" in labels
+            with conn:
+                conn.execute("UPDATE messages SET labels = ?, data = ? WHERE rowid = ?",
+                             (self._labels_field(labels), json.dumps(data, ensure_ascii=False), row[0]))
+            return True
+
+    def trim(self, source: str, keep: int) -> int:
+        """Drop the oldest messages beyond `keep` (bounds the mirror)"""
+        with self._lock:
+            conn = self._db()
+            rows = conn.execute("""
+                SELECT id FROM messages WHERE source = ? ORDER BY date DESC LIMIT -1 OFFSET ?
+            """, (source, keep)).fetchall()
+        return self.delete([r[0] for r in rows], source) if rows else 0
+
+    def clear(self, source: str):
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute("""
+                    DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE source = ?)
+                """, (source,))
+                conn.execute("DELETE FROM messages WHERE source = ?", (source,))
+                conn.execute("DELETE FROM sync_state WHERE source = ?", (source,))
+
+    # ==================== Sync state ====================
+
+    def get_state(self, source: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT value FROM sync_state WHERE source = ? AND key = ?", (source, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, source: str, **values):
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sync_state (source, key, value) VALUES (?, ?, ?)",
+                    [(source, k, None if v is None else str(v)) for k, v in values.items()]
+                )
+
+    # ==================== Reads ====================
+
+    def ids(self, source: str) -> Set[str]:
+        with self._lock:
+            return {r[0] for r in self._db().execute("SELECT id FROM messages WHERE source = ?", (source,))}
+
+    def count(self, source: str) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM messages WHERE source = ?", (source,)).fetchone()[0]
+
+    def get(self, message_id: str, source: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data FROM messages WHERE source = ? AND id = ?", (source, message_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest(self, source: str, limit: int = 10, label: Optional[str] = "INBOX") -> List[Dict[str, Any]]:
+        sql = "SELECT data FROM messages WHERE source = ?"
+        params: List[Any] = [source]
+        if label:
+            sql += " AND labels LIKE ?"
+            params.append(f"% {label} %")
+        sql += " ORDER BY date DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [json.loads(r[0]) for r in self._db().execute(sql, params)]
+
+    def search(self, source: str, query: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer a Gmail-syntax query locally.
+
+        Supports is:/in:/category:/label:/from:/subject: and free text.
+        Returns None for operators the mirror cannot evaluate, so the
+        caller can fall back to the server. Also None when fewer than
+        `limit` rows match and the mirror does not hold the whole mailbox
+        (older mail may match on the server).
+        """
+        where = ["m.source = ?"]
+        params: List[Any] = [source]
+        fts_terms: List[str] = []
+
+        for term in _TERM.findall(query or ""):
+            if _BOOLEAN_TERM.search(term):
+                return None
+            lowered = term.lower()
+            if lowered in _LABEL_OPERATORS:
+                # IMAP has no Gmail categories; every INBOX message counts as primary
+                if source == "imap" and lowered.startswith("category:"):
+                    continue
+                where.append("m.labels LIKE ?")
+                params.append(f"% {_LABEL_OPERATORS[lowered]} %")
+                continue
+            op, sep, value = term.partition(":")
+            value = value.strip('"')
+            if sep and op.lower() == "label":
+                where.append("m.labels LIKE ?")
+                params.append(f"% {value} %")
+            elif sep and op.lower() == "from":
+                where.append("m.sender LIKE ?")
+                params.append(f"%{value}%")
+            elif sep and op.lower() == "subject":
+                words = _WORD.findall(value)
+                if words:
+                    fts_terms.append("subject : (" + " ".join(f'"{w}"*' for w in words) + ")")
+            elif sep and op.isalpha() and not term.startswith('"'):
+                return None  # after:, has:, larger: ... need the server
+            else:
+                words = _WORD.findall(term)
+                if words:
+                    fts_terms.append(" ".join(f'"{w}"*' for w in words))
+
+        if fts_terms:
+            sql = """
+                SELECT m.data FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+                WHERE messages_fts MATCH ? AND """ + " AND ".join(where) + " ORDER BY m.date DESC LIMIT ?"
+            params = [" AND ".join(fts_terms)] + params
+        else:
+            sql = "SELECT m.data FROM messages m WHERE " + " AND ".join(where) + " ORDER BY m.date DESC LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self._lock:
+                rows = [json.loads(r[0]) for r in self._db().execute(sql, params)]
+        except sqlite3.Error as e:
+            logger.warning(f"Local mailbox search failed ({e}), deferring to server")
+            return None
+        if len(rows) < limit and self.get_state(source, "complete") != "1":
+            return None
+        return rows
@@ -52,6 +52,39 @@ Provide:
 Keep it concise but comprehensive.
 """
 
+# ==================== STRUCTURED ANALYSIS PROMPTS (Gemini) ====================
+
+# One call yields summary, action items and sentiment; Arabic output for the UI
+ANALYZE_EMAIL_PROMPT = """
+Analyze the following email and answer in Arabic.
+
+Email:
+{email_text}
+
+Return ONLY a JSON object with these keys:
+- "main_idea": one line
+- "key_points": list of short strings (dates, numbers, names)
+- "action_items": list of objects with "task", "due" (or null) and "priority" (high/medium/low)
+- "sentiment": one of "positive", "neutral", "negative"
+- "tone": short description (e.g. professional, urgent, friendly)
+- "urgency": one of "high", "medium", "low"
+"""
+
+ANALYZE_EMAILS_BATCH_PROMPT = """
+Analyze each of the following emails and answer in Arabic.
+
+{emails_text}
+
+Return ONLY a JSON array with one object per email, in any order. Each object has:
+- "id": the email id exactly as given
+- "main_idea": one line
+- "key_points": list of short strings (dates, numbers, names)
+- "action_items": list of objects with "task", "due" (or null) and "priority" (high/medium/low)
+- "sentiment": one of "positive", "neutral", "negative"
+- "tone": short description
+- "urgency": one of "high", "medium", "low"
+"""
+
 # ==================== ACTION EXTRACTION PROMPTS (Gemini) ====================
 
 EXTRACT_ACTIONS_PROMPT = """
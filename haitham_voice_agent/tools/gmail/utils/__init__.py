@@ -9,6 +9,7 @@ from .text_processing import (
     remove_email_quotes,
     format_email_for_display
 )
+from .rate_limiter import AsyncTokenBucket
 
 __all__ = [
     "extract_plain_text_from_html",
@@ -17,5 +18,6 @@ __all__ = [
     "clean_email_body",
     "extract_snippet",
     "remove_email_quotes",
-    "format_email_for_display"
+    "format_email_for_display",
+    "AsyncTokenBucket"
 ]
@@ -0,0 +1,45 @@
+"""
+Async Rate Limiting for Gmail
+
+Token bucket that awaits instead of blocking the event loop.
+"""
+
+import time
+import asyncio
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/second, holding at most `capacity`.
+
+    acquire() reserves tokens immediately and sleeps off any deficit, so
+    concurrent callers queue up fairly without a lock. A request larger
+    than the bucket (e.g. a 50-message batch) is allowed and simply pushes
+    later callers back.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens only if available right now"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until `tokens` may be spent"""
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
@@ -91,7 +91,7 @@ class MemorySystem:
         """
         try:
             # 0. Extract Content & Summarize (Smart Layer)
-            extracted_text = content_extractor.extract_text(path)
+            extracted_text = await content_extractor.extract_text_async(path)
             final_description = description
             
             if extracted_text:
@@ -401,19 +401,8 @@ class MemorySystem:
 
             # 3. Transliteration Search (Arabic -> Latin) - Fallback bonus
             # e.g. "كرافت" -> "kraft" to match "CRAFTS"
-            import re
-            arabic_to_latin = {
-                'ا': 'a', 'أ': 'a', 'إ': 'e', 'آ': 'a',
-                'ب': 'b', 'ت': 't', 'ث': 'th',
-                'ج': 'j', 'ح': 'h', 'خ': 'kh',
-                'د': 'd', 'ذ': 'th', 'ر': 'r', 'ز': 'z',
-                'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd',
-                'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh',
-                'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l',
-                'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'w',
-                'ي': 'y', 'ى': 'a', 'ة': 'a', 'ء': '',
-            }
-            transliterated = ''.join(arabic_to_latin.get(c, c) for c in query)
+            from haitham_voice_agent.tools.system_awareness.name_index import transliterate
+            transliterated = transliterate(query)
             
             if transliterated != query:
                 trans_results = await self.sqlite_store.search_file_index(transliterated)
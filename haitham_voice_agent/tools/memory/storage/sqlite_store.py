@@ -55,7 +55,6 @@ class SQLiteStore:
                     last_accessed TEXT,
                     version INTEGER NOT NULL,
                     created_by TEXT NOT NULL,
-                    created_by TEXT NOT NULL,
                     updated_at TEXT,
                     status TEXT DEFAULT 'active',
                     structured_data TEXT, -- JSON dict
@@ -104,6 +103,46 @@ class SQLiteStore:
             await db.execute("CREATE INDEX IF NOT EXISTS idx_usage_timestamp ON token_usage(timestamp)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_usage_model ON token_usage(model)")
             
+            # Token usage rollups (maintained on write, read by /usage/stats)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS token_usage_daily (
+                    date TEXT PRIMARY KEY, -- YYYY-MM-DD (local)
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    total_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0.0,
+                    request_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS token_usage_model_daily (
+                    date TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    total_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0.0,
+                    request_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (date, model)
+                )
+            """)
+            
+            # Migration: build rollups from existing raw rows once
+            async with db.execute("SELECT COUNT(*) FROM token_usage_daily") as cursor:
+                has_rollups = (await cursor.fetchone())[0] > 0
+            if not has_rollups:
+                await db.execute("""
+                    INSERT INTO token_usage_model_daily
+                    SELECT substr(timestamp, 1, 10), model, SUM(input_tokens), SUM(output_tokens),
+                           SUM(total_tokens), SUM(cost), COUNT(*)
+                    FROM token_usage GROUP BY 1, 2
+                """)
+                await db.execute("""
+                    INSERT INTO token_usage_daily
+                    SELECT date, SUM(input_tokens), SUM(output_tokens), SUM(total_tokens), SUM(cost), SUM(request_count)
+                    FROM token_usage_model_daily GROUP BY date
+                """)
+            
             # Create Checkpoints Table (Time Machine)
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS checkpoints (
@@ -564,20 +603,62 @@ class SQLiteStore:
 
     async def log_token_usage(self, model: str, input_tokens: int, output_tokens: int, cost: float, context: Dict[str, Any] = None) -> bool:
         """Log token usage and cost"""
+        return await self.log_token_usage_batch([{
+            "timestamp": datetime.now().isoformat(),
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": cost,
+            "context": context
+        }])
+
+    async def log_token_usage_batch(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        Log a batch of usage events in one transaction
+        
+        Inserts the raw rows and adds their totals to the per-day and
+        per-(day, model) rollup tables.
+        """
+        if not events:
+            return True
+        rows = []
+        daily: Dict[str, List[float]] = {}
+        by_model: Dict[tuple, List[float]] = {}
+        for e in events:
+            timestamp = e.get("timestamp") or datetime.now().isoformat()
+            total = e["input_tokens"] + e["output_tokens"]
+            rows.append((timestamp, e["model"], e["input_tokens"], e["output_tokens"], total,
+                         e["cost"], json.dumps(e.get("context") or {})))
+            for bucket in (daily.setdefault(timestamp[:10], [0, 0, 0, 0.0, 0]),
+                           by_model.setdefault((timestamp[:10], e["model"]), [0, 0, 0, 0.0, 0])):
+                bucket[0] += e["input_tokens"]
+                bucket[1] += e["output_tokens"]
+                bucket[2] += total
+                bucket[3] += e["cost"]
+                bucket[4] += 1
+        
+        upsert = """
+            ON CONFLICT({key}) DO UPDATE SET
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                total_tokens = total_tokens + excluded.total_tokens,
+                cost = cost + excluded.cost,
+                request_count = request_count + excluded.request_count
+        """
         try:
             async with aiosqlite.connect(self.db_path) as db:
-                await db.execute("""
+                await db.executemany("""
                     INSERT INTO token_usage (timestamp, model, input_tokens, output_tokens, total_tokens, cost, context)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    datetime.now().isoformat(),
-                    model,
-                    input_tokens,
-                    output_tokens,
-                    input_tokens + output_tokens,
-                    cost,
-                    json.dumps(context or {})
-                ))
+                """, rows)
+                await db.executemany("""
+                    INSERT INTO token_usage_daily (date, input_tokens, output_tokens, total_tokens, cost, request_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """ + upsert.format(key="date"), [(d, *v) for d, v in daily.items()])
+                await db.executemany("""
+                    INSERT INTO token_usage_model_daily (date, model, input_tokens, output_tokens, total_tokens, cost, request_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """ + upsert.format(key="date, model"), [(d, m, *v) for (d, m), v in by_model.items()])
                 await db.commit()
             return True
         except Exception as e:
@@ -585,23 +666,20 @@ class SQLiteStore:
             return False
 
     async def get_token_usage_stats(self, days: int = 30) -> Dict[str, Any]:
-        """Get usage statistics for the last N days"""
+        """Get usage statistics for the last N days (from the rollup tables)"""
         try:
             modifier = f"-{days} days"
             async with aiosqlite.connect(self.db_path) as db:
                 db.row_factory = aiosqlite.Row
                 
-                # Total Stats
+                # Daily Stats (for Chart)
                 async with db.execute("""
-                    SELECT 
-                        SUM(cost) as total_cost,
-                        SUM(total_tokens) as total_tokens,
-                        COUNT(*) as request_count
-                    FROM token_usage
-                    WHERE timestamp > date('now', ?)
+                    SELECT date, cost, total_tokens as tokens, request_count
+                    FROM token_usage_daily
+                    WHERE date >= date('now', ?)
+                    ORDER BY date ASC
                 """, (modifier,)) as cursor:
-                    total_row = await cursor.fetchone()
-                    total_stats = dict(total_row) if total_row else {}
+                    daily_stats = [dict(row) for row in await cursor.fetchall()]
 
                 # Stats by Model
                 async with db.execute("""
@@ -609,35 +687,19 @@ class SQLiteStore:
                         model,
                         SUM(cost) as cost,
                         SUM(total_tokens) as tokens,
-                        COUNT(*) as count
-                    FROM token_usage
-                    WHERE timestamp > date('now', ?)
+                        SUM(request_count) as count
+                    FROM token_usage_model_daily
+                    WHERE date >= date('now', ?)
                     GROUP BY model
                     ORDER BY cost DESC
                 """, (modifier,)) as cursor:
-                    model_rows = await cursor.fetchall()
-                    model_stats = [dict(row) for row in model_rows]
-
-                # Daily Stats (for Chart)
-                # Group by date (YYYY-MM-DD)
-                async with db.execute("""
-                    SELECT 
-                        substr(timestamp, 1, 10) as date,
-                        SUM(cost) as cost,
-                        SUM(total_tokens) as tokens
-                    FROM token_usage
-                    WHERE timestamp > date('now', ?)
-                    GROUP BY date
-                    ORDER BY date ASC
-                """, (modifier,)) as cursor:
-                    daily_rows = await cursor.fetchall()
-                    daily_stats = [dict(row) for row in daily_rows]
+                    model_stats = [dict(row) for row in await cursor.fetchall()]
 
                 return {
                     "period_days": days,
-                    "total_cost": total_stats.get("total_cost") or 0.0,
-                    "total_tokens": total_stats.get("total_tokens") or 0,
-                    "request_count": total_stats.get("request_count") or 0,
+                    "total_cost": sum(d["cost"] for d in daily_stats),
+                    "total_tokens": sum(d["tokens"] for d in daily_stats),
+                    "request_count": sum(d.pop("request_count") for d in daily_stats),
                     "by_model": model_stats,
                     "daily_stats": daily_stats
                 }
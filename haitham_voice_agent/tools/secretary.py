@@ -1,10 +1,15 @@
+import json
+import time
+import asyncio
 import logging
 import datetime
+import statistics
 import psutil
 import platform
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from pathlib import Path
 
+from haitham_voice_agent.config import Config
 from haitham_voice_agent.tools.tasks.task_manager import task_manager
 from haitham_voice_agent.tools.system_tools import SystemTools
 
@@ -16,11 +21,41 @@ class Secretary:
     """
     Executive Secretary Module
     Handles Morning Briefing, Work Modes, and Context Management.
+    
+    The briefing fans out over tasks, calendar, memory, Gmail and system
+    status concurrently. Each source has its own timeout and a cached
+    snapshot that is served when the source is slow or failing, and a
+    background job pre-computes everything shortly before the usual wake
+    time so "صباح الخير" only has to format the report.
     """
     
+    # Per-source timeout (seconds)
+    SOURCE_TIMEOUTS = {
+        "tasks": 1.0,
+        "calendar": 4.0,
+        "memory": 2.0,
+        "gmail": 4.0,
+        "system": 0.5,
+        "stale": 1.0,
+    }
+    SOURCE_DEFAULTS = {
+        "tasks": {"count": 0, "high_priority": []},
+        "calendar": [],
+        "memory": [],
+        "gmail": {"count": 0, "messages": []},
+        "system": {"battery": 100},
+        "stale": [],
+    }
+    PREPARE_LEAD = 20 * 60          # Pre-compute this many seconds before the usual wake time
+    PREPARED_MAX_AGE = 3 * 3600     # A pre-computed briefing older than this is rebuilt
+    WAKE_HISTORY = 14               # Recent briefing requests used to learn the wake time
+    
     def __init__(self):
         self.system_tools = SystemTools()
         self.memory = get_memory_manager()
+        self._snapshots: Dict[str, Tuple[float, Any]] = {}
+        self._prepared: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._wake_log = Config.CACHE_DIR / "briefing_times.json"
         
     async def get_morning_briefing(self) -> Dict[str, Any]:
         """
@@ -32,6 +67,7 @@ class Secretary:
         now = datetime.datetime.now()
         date_str = now.strftime("%A, %d %B %Y")
         time_str = now.strftime("%H:%M")
+        await asyncio.to_thread(self._record_request, now)
         
         # 2. Weather (Mock for now, or integrate real API later)
         # In a real app, we'd call a weather API here.
@@ -41,24 +77,17 @@ class Secretary:
             "desc": "Perfect weather for productivity."
         }
         
-        # 3. Tasks & Memory Context
-        tasks = task_manager.list_tasks(status="open")
-        high_priority = [t for t in tasks if "urgent" in t.title.lower() or "important" in t.title.lower()]
-        
-        # Retrieve recent context from memory
-        recent_memories = await self.memory.search("important context for today", limit=3)
-        memory_context = "\n".join([f"- {m.content}" for m in recent_memories]) if recent_memories else "No recent important notes."
-        
-        # 4. System Status
-        battery = psutil.sensors_battery()
-        battery_percent = battery.percent if battery else 100
+        # 3. Sources: pre-computed this morning, or gathered concurrently now
+        data = self._prepared_data(now)
+        if data is None:
+            data = await self._collect()
         
-        # 5. Calendar (Mock)
-        # Future: Integrate with Google Calendar via Gmail API or local Calendar
-        events = [
-            {"time": "10:00 AM", "title": "Team Standup"},
-            {"time": "02:00 PM", "title": "Project Review"}
-        ]
+        tasks = data["tasks"]
+        high_priority = tasks["high_priority"]
+        memory_context = "\n".join([f"- {m}" for m in data["memory"]]) if data["memory"] else "No recent important notes."
+        battery_percent = data["system"]["battery"]
+        events = data["calendar"]
+        gmail = data["gmail"]
         
         # --- Smart Feedback Agent (v1.1) ---
         feedback_question = ""
@@ -69,8 +98,8 @@ class Secretary:
         is_weekend = now.weekday() >= 5 # 5=Sat, 6=Sun
         
         if not is_busy_day and not is_weekend:
-            # 2. Fetch Candidates
-            stale_projects = await self.memory.sqlite_store.get_stale_items(days=3)
+            # 2. Fetch Candidates (from the snapshot)
+            stale_projects = data["stale"]
             
             if stale_projects:
                 # Pick top 1
@@ -84,9 +113,9 @@ class Secretary:
                 else:
                     feedback_question = f"\n🤔 **Strategy:** *{project.project}* seems stuck. Should we move it to 'On Hold' to clear your mind?"
                 
-                # 4. Update State
+                # 4. Update State (in the background; the answer does not wait on the write)
                 project.nag_count += 1
-                await self.memory.sqlite_store.save_memory(project)
+                asyncio.create_task(self._save_memory(project))
 
         # Format Report
         report = f"""
@@ -98,12 +127,12 @@ class Secretary:
 _{weather['desc']}_
 
 📝 **Tasks**
-You have {len(tasks)} pending tasks.
+You have {tasks['count']} pending tasks.
 """
         if high_priority:
             report += f"⚠️ **{len(high_priority)} High Priority:**\n"
-            for t in high_priority:
-                report += f"- {t.title}\n"
+            for title in high_priority:
+                report += f"- {title}\n"
         
         report += f"""
 🧠 **Memory Context**
@@ -113,8 +142,17 @@ You have {len(tasks)} pending tasks.
         report += f"""
 📅 **Schedule**
 """
+        if not events:
+            report += "No events today.\n"
         for evt in events:
             report += f"- **{evt['time']}**: {evt['title']}\n"
+        
+        report += f"""
+📧 **Email**
+{gmail['count']} unread in Primary.
+"""
+        for msg in gmail["messages"]:
+            report += f"- {msg['subject']} ({msg['from']})\n"
             
         report += f"""
 🔋 **System**
@@ -128,13 +166,166 @@ Battery: {battery_percent}%
             "text": report,
             "data": {
                 "weather": weather,
-                "tasks_count": len(tasks),
+                "tasks_count": tasks["count"],
                 "events_count": len(events),
+                "unread_count": gmail["count"],
                 "battery": battery_percent,
-                "feedback_question": feedback_question
+                "feedback_question": feedback_question,
+                "collected_at": data["collected_at"]
             }
         }
 
+    # ==================== Briefing Sources ====================
+    
+    async def _collect(self, refresh: bool = False) -> Dict[str, Any]:
+        """Gather every briefing source concurrently"""
+        loaders: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "tasks": self._load_tasks,
+            "calendar": self._load_calendar,
+            "memory": self._load_memory,
+            "gmail": self._load_gmail,
+            "system": self._load_system,
+            "stale": self._load_stale,
+        }
+        values = await asyncio.gather(*(self._fetch(name, loader, refresh) for name, loader in loaders.items()))
+        data = dict(zip(loaders, values))
+        data["collected_at"] = time.time()
+        return data
+    
+    async def _fetch(self, name: str, loader: Callable[[], Awaitable[Any]], refresh: bool = False) -> Any:
+        """
+        One source with its own timeout
+        
+        A fresh snapshot is returned without calling the source; on timeout
+        or error the last snapshot (however old) or an empty default is used.
+        """
+        cached = self._snapshots.get(name)
+        if cached and not refresh and time.time() - cached[0] < Config.BRIEFING_SNAPSHOT_TTL:
+            return cached[1]
+        try:
+            value = await asyncio.wait_for(loader(), self.SOURCE_TIMEOUTS[name])
+        except Exception as e:
+            logger.warning(f"Briefing source '{name}' unavailable ({type(e).__name__}: {e}); using snapshot")
+            return cached[1] if cached else self.SOURCE_DEFAULTS[name]
+        self._snapshots[name] = (time.time(), value)
+        return value
+    
+    async def _load_tasks(self) -> Dict[str, Any]:
+        tasks = await asyncio.to_thread(task_manager.list_tasks, status="open")
+        high_priority = [t.title for t in tasks if "urgent" in t.title.lower() or "important" in t.title.lower()]
+        return {"count": len(tasks), "high_priority": high_priority}
+    
+    async def _load_calendar(self) -> List[Dict[str, str]]:
+        from haitham_voice_agent.dispatcher import get_dispatcher
+        calendar = get_dispatcher().tools.get("calendar")
+        if calendar is None:
+            return []
+        result = await calendar.list_events("today")
+        if result.get("error"):
+            raise RuntimeError(result.get("message"))
+        events = []
+        for event in result.get("events", []):
+            start = event.get("start") or ""
+            # Date-only starts are all-day events (fromisoformat reads them as midnight)
+            try:
+                label = datetime.datetime.fromisoformat(start).strftime("%I:%M %p") if "T" in start else "All day"
+            except ValueError:
+                label = "All day"
+            events.append({"time": label, "title": event.get("summary", "No Title")})
+        return events
+    
+    async def _load_memory(self) -> List[str]:
+        query = "important context for today"
+        store = getattr(self.memory, "vector_store", None)
+        if store is not None:
+            # Blocking vector query; run it off the event loop so the other sources proceed
+            results = await asyncio.to_thread(store.search, query, n_results=3)
+            return [r["content"] for r in results]
+        return [m.content for m in await self.memory.search(query, limit=3)]
+    
+    async def _load_gmail(self) -> Dict[str, Any]:
+        from haitham_voice_agent.dispatcher import get_dispatcher
+        gmail = get_dispatcher().tools.get("gmail")
+        if gmail is None:
+            return {"count": 0, "messages": []}
+        result = await gmail.search_emails(query="is:unread category:primary", limit=20)
+        if result.get("error"):
+            raise RuntimeError(result.get("message"))
+        messages = [{"subject": m.get("subject", ""), "from": m.get("from", "")} for m in result.get("emails", [])[:3]]
+        return {"count": result.get("count", len(messages)), "messages": messages}
+    
+    async def _load_system(self) -> Dict[str, Any]:
+        battery = await asyncio.to_thread(psutil.sensors_battery)
+        return {"battery": battery.percent if battery else 100}
+    
+    async def _load_stale(self) -> List[Any]:
+        return await self.memory.sqlite_store.get_stale_items(days=3)
+    
+    async def _save_memory(self, memory):
+        try:
+            await self.memory.sqlite_store.save_memory(memory)
+        except Exception as e:
+            logger.error(f"Failed to update {memory.project} nag count: {e}")
+
+    # ==================== Pre-computation ====================
+    
+    def _prepared_data(self, now: datetime.datetime) -> Optional[Dict[str, Any]]:
+        if not self._prepared:
+            return None
+        prepared_at, data = self._prepared
+        if (datetime.datetime.fromtimestamp(prepared_at).date() != now.date()
+                or now.timestamp() - prepared_at > self.PREPARED_MAX_AGE):
+            return None
+        return data
+    
+    async def prepare_briefing(self) -> Dict[str, Any]:
+        """Refresh every source and keep the result for the next briefing request"""
+        data = await self._collect(refresh=True)
+        self._prepared = (data["collected_at"], data)
+        logger.info("Morning briefing pre-computed")
+        return data
+    
+    def _record_request(self, now: datetime.datetime):
+        """Remember morning briefing request times to learn the usual wake time"""
+        if now.hour >= 12:
+            return
+        try:
+            history = json.loads(self._wake_log.read_text()) if self._wake_log.exists() else []
+            history = (history + [now.hour * 60 + now.minute])[-self.WAKE_HISTORY:]
+            self._wake_log.parent.mkdir(parents=True, exist_ok=True)
+            self._wake_log.write_text(json.dumps(history))
+        except Exception as e:
+            logger.debug(f"Could not record briefing time: {e}")
+    
+    def usual_wake_time(self) -> datetime.time:
+        """Median of recent morning requests, or Config.BRIEFING_WAKE_TIME"""
+        try:
+            history = json.loads(self._wake_log.read_text()) if self._wake_log.exists() else []
+        except Exception:
+            history = []
+        if len(history) >= 3:
+            minutes = int(statistics.median(history))
+            return datetime.time(minutes // 60, minutes % 60)
+        hour, minute = Config.BRIEFING_WAKE_TIME.split(":")
+        return datetime.time(int(hour), int(minute))
+    
+    def next_prepare_time(self, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+        now = now or datetime.datetime.now()
+        at = datetime.datetime.combine(now.date(), self.usual_wake_time()) - datetime.timedelta(seconds=self.PREPARE_LEAD)
+        if at <= now:
+            at += datetime.timedelta(days=1)
+        return at
+    
+    async def run_briefing_scheduler(self):
+        """Background job: pre-compute the briefing before the usual wake time every day"""
+        while True:
+            at = self.next_prepare_time()
+            await asyncio.sleep(max(0.0, (at - datetime.datetime.now()).total_seconds()))
+            try:
+                await self.prepare_briefing()
+            except Exception as e:
+                logger.error(f"Briefing pre-computation failed: {e}")
+
     async def set_work_mode(self, mode: str) -> str:
         """
         Set the active work mode (context).
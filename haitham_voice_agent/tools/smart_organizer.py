@@ -80,7 +80,7 @@ class SmartOrganizer:
         """Process a single file: Extract -> Categorize -> Move"""
         try:
             # 1. Extract Content
-            text = content_extractor.extract_text(str(item))
+            text = await content_extractor.extract_text_async(str(item))
             category = "Unsorted"
             
             # 2. Determine Category
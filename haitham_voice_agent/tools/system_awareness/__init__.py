@@ -7,6 +7,7 @@ from .system_profiler import SystemProfiler
 from .quick_indexer import QuickIndexer
 from .deep_search import DeepSearch
 from .file_watcher import FileWatcher
+from .sync_worker import MemorySyncWorker
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +19,18 @@ class SystemAwareness:
     
     def __init__(self):
         self.profiler = SystemProfiler()
-        self.indexer = QuickIndexer()
-        self.searcher = DeepSearch()
+        from haitham_voice_agent.tools.deep_organizer import DeepOrganizer
+        folders = ["~/Desktop", "~/Downloads", "~/Documents"]
         
-        # Watcher for Desktop and Downloads
+        self.searcher = DeepSearch(roots=folders, ignore_dirs=DeepOrganizer.IGNORE_DIRS)
+        self.indexer = QuickIndexer(recent_provider=self.searcher.recent_files)
+        self.sync_worker = MemorySyncWorker()
+        
+        # Watcher for Desktop, Downloads and Documents (recursive, batched)
         self.watcher = FileWatcher(
-            folders=["~/Desktop", "~/Downloads", "~/Documents"],
-            callback=self._on_file_change
+            folders=folders,
+            callback=self._on_file_change,
+            ignore_dirs=DeepOrganizer.IGNORE_DIRS
         )
         
         self._initialized = False
@@ -45,73 +51,36 @@ class SystemAwareness:
         if not self.indexer.index.get("last_updated"):
             threading.Thread(target=self.indexer.update_index, daemon=True).start()
             
-        # Start Watcher
+        # Catch the Deep Search index up with anything changed while we were off
+        threading.Thread(target=self.searcher.crawl, daemon=True).start()
+            
+        # Start Smart Sync worker, then the watcher that feeds it
+        self.sync_worker.start()
         self.watcher.start()
         
         self._initialized = True
         
-    def _on_file_change(self, file_path: str):
-        """Callback when files change"""
-        logger.info(f"File change detected: {file_path}")
-        
-        # Run updates in background
-        threading.Thread(target=self._process_file_change, args=(file_path,), daemon=True).start()
+    def _on_file_change(self, changes: Dict[str, str]):
+        """
+        Callback for a coalesced batch of file changes ({path: event_kind}).
+        Runs on the watcher's flush thread.
+        """
+        logger.info(f"File changes detected: {len(changes)} path(s)")
         
-    def _process_file_change(self, file_path: str):
-        """Process the file change: Update Quick Index & Deep Memory"""
         try:
-            # 1. Update Quick Index (Layer 2)
-            self.indexer.update_index()
-            
-            # 2. Update Deep Memory (Layer 3) - Smart Sync
-            import asyncio
-            import hashlib
-            from pathlib import Path
-            
-            path_obj = Path(file_path)
-            if not path_obj.exists() or path_obj.is_dir():
-                return
-                
-            # Calculate Hash
-            hasher = hashlib.md5()
-            with open(path_obj, 'rb') as f:
-                buf = f.read(65536)
-                while len(buf) > 0:
-                    hasher.update(buf)
-                    buf = f.read(65536)
-            file_hash = hasher.hexdigest()
-            
-            # Index in Memory
-            from haitham_voice_agent.tools.memory.voice_tools import VoiceMemoryTools
-            
-            async def update_memory():
-                memory_tools = VoiceMemoryTools()
-                await memory_tools.ensure_initialized()
-                
-                # Determine Project ID (Heuristic)
-                project_id = "documents"
-                parts = path_obj.parts
-                if "Projects" in parts:
-                    try:
-                        idx = parts.index("Projects")
-                        if idx + 1 < len(parts):
-                            project_id = parts[idx+1]
-                    except:
-                        pass
-                
-                await memory_tools.memory_system.index_file(
-                    path=str(path_obj),
-                    project_id=project_id,
-                    description=f"Auto-indexed: {path_obj.name}",
-                    tags=["auto-sync", "watched"],
-                    file_hash=file_hash
-                )
-                logger.info(f"✅ Smart Sync: Updated memory for {path_obj.name}")
-                
-            asyncio.run(update_memory())
+            # 1. Update Quick Index (Layer 2) incrementally
+            self.indexer.apply_changes(changes)
+        except Exception as e:
+            logger.error(f"Failed to update quick index: {e}")
             
+        try:
+            # 2. Update Deep Search index (Layer 3 lookup)
+            self.searcher.apply_changes(changes)
         except Exception as e:
-            logger.error(f"Failed to process file change for {file_path}: {e}")
+            logger.error(f"Failed to update deep search index: {e}")
+        
+        # 3. Update Deep Memory (Layer 3) - Smart Sync, batched on one loop
+        self.sync_worker.submit(changes)
         
     def find_file(self, query: str) -> List[Dict[str, Any]]:
         """
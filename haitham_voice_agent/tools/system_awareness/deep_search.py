@@ -1,58 +1,392 @@
+import os
+import platform
+import shutil
+import sqlite3
 import subprocess
+import threading
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from pathlib import Path
 
+from .name_index import fold_variants, tokenize
+
 logger = logging.getLogger(__name__)
 
+# Files whose text is worth indexing (ContentExtractor handles these)
+CONTENT_EXTS = {'.txt', '.md', '.csv', '.log', '.json', '.html', '.pdf'}
+MAX_CONTENT_BYTES = 10 * 1024 * 1024
+MAX_CONTENT_CHARS = 20000
+
+# (path, name, is_dir, size, mtime)
+FileRecord = Tuple[str, str, int, int, float]
+
+
 class DeepSearch:
     """
     Layer 3: Deep Search
-    Use macOS Spotlight (mdfind) for real-time search.
-    No storage/caching.
+    Built-in local search engine: a parallel filesystem crawl feeds a
+    persistent SQLite FTS5 inverted index over file names and extracted text.
+    The index is kept fresh incrementally from the file watcher, so it works
+    the same on macOS and Linux. Spotlight (mdfind) is only used on macOS
+    while the local index is still empty.
     """
-    
+
+    def __init__(
+        self,
+        db_path: str = "~/HVA_Memory/system/deep_search.db",
+        roots: Optional[List[str]] = None,
+        ignore_dirs: Optional[Iterable[str]] = None,
+        index_content: bool = True,
+        workers: int = 8,
+    ):
+        self.db_path = Path(db_path).expanduser()
+        self.roots = [Path(r).expanduser() for r in (roots or ["~/Desktop", "~/Downloads", "~/Documents"])]
+        if ignore_dirs is None:
+            from haitham_voice_agent.tools.deep_organizer import DeepOrganizer
+            ignore_dirs = DeepOrganizer.IGNORE_DIRS
+        self.ignore_dirs = set(ignore_dirs)
+        self.index_content = index_content
+        self.workers = workers
+        self._lock = threading.RLock()
+        self._conn = None
+
+    # ==================== Storage ====================
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    name TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+                CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+                    name, body, tokenize='unicode61 remove_diacritics 2'
+                );
+            """)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    @staticmethod
+    def _prefix_range(directory: str) -> Tuple[str, str]:
+        """[low, high) range of paths strictly under directory (uses the path index)"""
+        prefix = directory.rstrip(os.sep) + os.sep
+        return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+    # ==================== Crawl ====================
+
+    def _scan_dir(self, directory: str) -> Tuple[List[FileRecord], List[str]]:
+        """List one directory: (entries, subdirectories to descend into)"""
+        records, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if name in self.ignore_dirs:
+                                continue
+                            subdirs.append(entry.path)
+                            st = entry.stat(follow_symlinks=False)
+                            records.append((entry.path, name, 1, 0, st.st_mtime))
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            records.append((entry.path, name, 0, st.st_size, st.st_mtime))
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.debug(f"Deep Search: cannot scan {directory}: {e}")
+        return records, subdirs
+
+    def walk(self, roots: Iterable[Path]) -> Iterator[FileRecord]:
+        """Parallel directory walk: each directory is listed by a pool worker"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self._scan_dir, str(r)) for r in roots if Path(r).is_dir()}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    records, subdirs = future.result()
+                    yield from records
+                    for subdir in subdirs:
+                        pending.add(pool.submit(self._scan_dir, subdir))
+
+    def crawl(self, roots: Optional[List[str]] = None, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        (Re)index everything under roots. Unchanged files (same size + mtime)
+        are skipped and vanished ones are dropped, so re-running is cheap.
+        """
+        roots = [Path(r).expanduser() for r in roots] if roots else self.roots
+        start = time.time()
+        stats = {"scanned": 0, "indexed": 0, "removed": 0}
+
+        for root in roots:
+            known = {}
+            low, high = self._prefix_range(str(root))
+            with self._lock:
+                for path, size, mtime in self._db().execute(
+                    "SELECT path, size, mtime FROM files WHERE path >= ? AND path < ?", (low, high)
+                ):
+                    known[path] = (size, mtime)
+
+            changed: List[FileRecord] = []
+            with ThreadPoolExecutor(max_workers=self.workers) as extract_pool:
+                for record in self.walk([root]):
+                    stats["scanned"] += 1
+                    previous = known.pop(record[0], None)
+                    if previous == (record[3], record[4]):
+                        continue
+                    changed.append(record)
+                    if len(changed) >= batch_size:
+                        stats["indexed"] += self._upsert(changed, extract_pool)
+                        changed = []
+                if changed:
+                    stats["indexed"] += self._upsert(changed, extract_pool)
+
+            # Whatever we did not see any more is gone
+            if known:
+                with self._lock:
+                    conn = self._db()
+                    with conn:
+                        self._delete_paths(conn, list(known))
+                stats["removed"] += len(known)
+
+        logger.info(f"Deep Search crawl: {stats} in {time.time() - start:.1f}s")
+        return stats
+
+    def _extract(self, record: FileRecord) -> str:
+        path, name, is_dir, size, _ = record
+        if not self.index_content or is_dir or not size or size > MAX_CONTENT_BYTES:
+            return ""
+        if Path(name).suffix.lower() not in CONTENT_EXTS:
+            return ""
+        try:
+            from haitham_voice_agent.intelligence.content_extractor import content_extractor
+            return content_extractor.extract_text(path, max_length=MAX_CONTENT_CHARS) or ""
+        except Exception as e:
+            logger.debug(f"Deep Search: extraction failed for {path}: {e}")
+            return ""
+
+    def _upsert(self, records: List[FileRecord], extract_pool: Optional[ThreadPoolExecutor] = None) -> int:
+        """Insert or refresh a batch of records in one transaction"""
+        if extract_pool is not None:
+            bodies = list(extract_pool.map(self._extract, records))
+        else:
+            bodies = [self._extract(r) for r in records]
+
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for (path, name, is_dir, size, mtime), body in zip(records, bodies):
+                    row = conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+                    if row:
+                        conn.execute("UPDATE files SET name=?, is_dir=?, size=?, mtime=? WHERE id=?",
+                                     (name, is_dir, size, mtime, row[0]))
+                        conn.execute("DELETE FROM files_fts WHERE rowid = ?", (row[0],))
+                        file_id = row[0]
+                    else:
+                        file_id = conn.execute(
+                            "INSERT INTO files (path, name, is_dir, size, mtime) VALUES (?, ?, ?, ?, ?)",
+                            (path, name, is_dir, size, mtime)
+                        ).lastrowid
+                    conn.execute("INSERT INTO files_fts (rowid, name, body) VALUES (?, ?, ?)",
+                                 (file_id, " ".join(fold_variants(name)), body))
+        return len(records)
+
+    def _delete_paths(self, conn: sqlite3.Connection, paths: List[str]):
+        for path in paths:
+            low, high = self._prefix_range(path)
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM files WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high)
+            )]
+            for file_id in ids:
+                conn.execute("DELETE FROM files_fts WHERE rowid = ?", (file_id,))
+                conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _is_ignored(self, path: Path) -> bool:
+        """Same rules as the crawl, applied to the part of the path below its root"""
+        for root in self.roots:
+            try:
+                relative = path.relative_to(root)
+            except ValueError:
+                continue
+            return any(part in self.ignore_dirs or part.startswith('.') for part in relative.parts)
+        return path.name.startswith('.')
+
+    def apply_changes(self, changes: Dict[str, str]) -> int:
+        """Incremental update from a file watcher batch ({path: event_kind})"""
+        upserts, deletes = [], []
+        for path_str, kind in changes.items():
+            path = Path(path_str)
+            if kind == "deleted" or not path.exists():
+                deletes.append(path_str)
+                continue
+            if self._is_ignored(path):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            is_dir = 1 if path.is_dir() else 0
+            upserts.append((path_str, path.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+
+        if deletes:
+            with self._lock:
+                conn = self._db()
+                with conn:
+                    self._delete_paths(conn, deletes)
+        if upserts:
+            self._upsert(upserts)
+        return len(upserts) + len(deletes)
+
+    # ==================== Query ====================
+
+    def _match_expression(self, query: str) -> Optional[str]:
+        """All query tokens as prefixes; Arabic queries also try the transliterated form"""
+        alternatives = []
+        for form in fold_variants(query):
+            tokens = [t.replace('"', '') for t in tokenize(form)]
+            tokens = [t for t in tokens if t]
+            if tokens:
+                alternatives.append(" ".join(f'"{t}"*' for t in tokens))
+        if not alternatives:
+            return None
+        return " OR ".join(f"({a})" for a in alternatives)
+
     def search(self, query: str, limit: int = 20, only_in: str = None) -> List[Dict[str, Any]]:
         """
-        Execute Spotlight search
-        
+        Execute a ranked local search (name matches weigh more than content)
+
         Args:
             query: Search term
             limit: Max results
             only_in: Limit search to specific directory
-            
+
         Returns:
             List of found files with details
         """
         logger.info(f"Deep Search (Layer 3) for: '{query}'")
-        
+
+        if platform.system() == "Darwin" and self.count() == 0 and shutil.which("mdfind"):
+            return self._spotlight_search(query, limit, only_in)
+
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+
+        sql = """
+            SELECT f.path, f.name, f.is_dir, f.size, bm25(files_fts, 10.0, 1.0) AS rank
+            FROM files_fts JOIN files f ON f.id = files_fts.rowid
+            WHERE files_fts MATCH ?
+        """
+        params: List[Any] = [expression]
+        if only_in:
+            low, high = self._prefix_range(str(Path(only_in).expanduser()))
+            sql += " AND f.path >= ? AND f.path < ?"
+            params.extend([low, high])
+        sql += " ORDER BY rank LIMIT ?"
+        # Over-fetch so stale rows can be skipped and name hits re-ranked
+        params.append(limit * 3)
+
+        try:
+            with self._lock:
+                rows = self._db().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Deep search failed: {e}")
+            return []
+
+        # bm25 degenerates on small or skewed corpora; make name hits win explicitly
+        query_forms = [tokenize(form) for form in fold_variants(query)]
+        ranked = []
+        for path, name, is_dir, size, rank in rows:
+            ranked.append((-rank + self._name_bonus(name, query_forms), path, name, is_dir, size))
+        ranked.sort(key=lambda r: r[0], reverse=True)
+
+        results = []
+        for score, path, name, is_dir, size in ranked:
+            if not os.path.exists(path):
+                continue
+            results.append({
+                "name": name,
+                "path": path,
+                "type": "folder" if is_dir else "file",
+                "size": "-" if is_dir else self._format_size(size),
+                "score": round(score, 4)
+            })
+            if len(results) >= limit:
+                break
+
+        return results
+
+    @staticmethod
+    def _name_bonus(name: str, query_forms: List[List[str]]) -> float:
+        """+1 when every query token prefixes a name token, +1 more for an exact stem"""
+        bonus = 0.0
+        for name_form in fold_variants(name):
+            name_tokens = tokenize(name_form)
+            stem = tokenize(name_form.rsplit(".", 1)[0])
+            for tokens in query_forms:
+                if tokens and all(any(n.startswith(t) for n in name_tokens) for t in tokens):
+                    bonus = max(bonus, 2.0 if tokens == stem else 1.0)
+        return bonus
+
+    def recent_files(self, limit: int = 20, window_seconds: int = 24 * 3600) -> List[Dict[str, Any]]:
+        """Most recently modified files in the index (mdfind-free 'recent files')"""
+        cutoff = time.time() - window_seconds
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT path FROM files WHERE is_dir = 0 AND mtime >= ? ORDER BY mtime DESC LIMIT ?",
+                (cutoff, limit)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    # ==================== Spotlight (macOS bootstrap) ====================
+
+    def _spotlight_search(self, query: str, limit: int, only_in: str = None) -> List[Dict[str, Any]]:
+        """Execute Spotlight search"""
         results = []
         try:
             cmd = ["mdfind"]
-            
+
             if only_in:
                 cmd.extend(["-onlyin", only_in])
-                
-            # Construct query
-            # We search for name match OR content match
-            # "kMDItemDisplayName == '*query*'c" is case-insensitive name match
-            # But mdfind default is broad. Let's stick to default for now, or refine if needed.
-            # Default mdfind searches everything.
+
             cmd.append(query)
-            
+
             process = subprocess.run(cmd, capture_output=True, text=True)
             paths = process.stdout.strip().split('\n')
-            
+
             count = 0
             for p_str in paths:
                 if not p_str: continue
-                
+
                 p = Path(p_str)
-                
+
                 # Filter out system/hidden files
                 if "Library" in p.parts or p.name.startswith('.'):
                     continue
-                    
+
                 if p.exists():
                     results.append({
                         "name": p.name,
@@ -63,21 +397,23 @@ class DeepSearch:
                     count += 1
                     if count >= limit:
                         break
-                        
+
         except Exception as e:
             logger.error(f"Deep search failed: {e}")
-            
+
         return results
 
+    def _format_size(self, size: float) -> str:
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size < 1024:
+                return f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} TB"
+
     def _get_size(self, path: Path) -> str:
         try:
             if path.is_file():
-                size = path.stat().st_size
-                for unit in ['B', 'KB', 'MB', 'GB']:
-                    if size < 1024:
-                        return f"{size:.1f} {unit}"
-                    size /= 1024
-                return f"{size:.1f} TB"
+                return self._format_size(path.stat().st_size)
         except:
             pass
         return "-"
@@ -1,99 +1,266 @@
+import os
 import time
 import threading
 import logging
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Event kinds delivered to the batch callback
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+# Editor / browser temp files that should never trigger a sync
+TEMP_SUFFIXES = (".swp", ".swx", ".tmp", ".crdownload", ".part", ".download")
+TEMP_PREFIXES = ("~$", ".#")
+
+
+def merge_event(previous: Optional[str], current: str) -> Optional[str]:
+    """
+    Collapse two consecutive events on the same path into one.
+    Returns None when the pair cancels out (created then deleted).
+    """
+    if previous is None:
+        return current
+    if previous == CREATED:
+        if current == DELETED:
+            return None
+        return CREATED
+    if previous == DELETED:
+        if current == DELETED:
+            return DELETED
+        # Deleted then re-created (atomic save) -> content changed
+        return MODIFIED
+    # previous == MODIFIED
+    return DELETED if current == DELETED else MODIFIED
+
+
 class FileWatcher:
     """
-    Monitors key folders for changes and triggers callbacks.
+    Monitors key folders (recursively) for changes and triggers callbacks.
     Uses 'watchdog' if available, otherwise falls back to polling.
+
+    Events are debounced per path and coalesced into batches: the callback
+    receives a single dict of {path: "created" | "modified" | "deleted"}
+    once a burst has been quiet for `debounce` seconds, so saving 200 files
+    from a git checkout produces one callback instead of 200.
     """
-    
-    def __init__(self, folders: list[str], callback: Callable):
+
+    def __init__(
+        self,
+        folders: list[str],
+        callback: Callable[[Dict[str, str]], None],
+        debounce: float = 2.0,
+        max_batch_delay: float = 10.0,
+        poll_interval: float = 10.0,
+        ignore_dirs: Optional[Iterable[str]] = None,
+    ):
         self.folders = [Path(f).expanduser() for f in folders]
         self.callback = callback
+        self.debounce = debounce
+        self.max_batch_delay = max_batch_delay
+        self.poll_interval = poll_interval
+        self.ignore_dirs = set(ignore_dirs or ())
         self.running = False
         self.thread = None
+        self.observer = None
         self.use_polling = False
-        
+
+        # path -> (event_kind, first_seen, last_seen)
+        self._pending: Dict[str, Tuple[str, float, float]] = {}
+        self._cond = threading.Condition()
+        self._flusher = None
+
         try:
             import watchdog
             self.use_polling = False
         except ImportError:
             logger.warning("Watchdog library not found. Using polling for file watcher.")
             self.use_polling = True
-            
+
     def start(self):
         """Start the watcher"""
         if self.running: return
         self.running = True
-        
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="FileWatcherFlush", daemon=True)
+        self._flusher.start()
+
         if self.use_polling:
-            self.thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self.thread = threading.Thread(target=self._poll_loop, name="FileWatcherPoll", daemon=True)
             self.thread.start()
         else:
             self._start_watchdog()
-            
+
     def stop(self):
         """Stop the watcher"""
         self.running = False
+        with self._cond:
+            self._cond.notify_all()
         if self.observer:
             self.observer.stop()
             self.observer.join()
-            
+
+    # ==================== Filtering ====================
+
+    def should_ignore(self, path: str) -> bool:
+        """Skip hidden files, temp files and anything under an ignored directory"""
+        p = Path(path)
+        name = p.name
+        if not name or name.startswith('.') or name.startswith(TEMP_PREFIXES):
+            return True
+        if name.endswith(TEMP_SUFFIXES):
+            return True
+        # Only look at the part of the path below the watched root
+        for root in self.folders:
+            try:
+                relative = p.relative_to(root)
+            except ValueError:
+                continue
+            return any(part in self.ignore_dirs or part.startswith('.') for part in relative.parts[:-1])
+        return False
+
+    # ==================== Debounce / Coalesce ====================
+
+    def record_event(self, path: str, kind: str):
+        """Register a raw filesystem event (thread-safe)"""
+        if self.should_ignore(path):
+            return
+        now = time.monotonic()
+        with self._cond:
+            previous = self._pending.get(path)
+            merged = merge_event(previous[0] if previous else None, kind)
+            if merged is None:
+                self._pending.pop(path, None)
+            else:
+                first_seen = previous[1] if previous else now
+                self._pending[path] = (merged, first_seen, now)
+            self._cond.notify()
+
+    def _take_ready(self, now: float) -> Dict[str, str]:
+        """Pop every path whose own debounce window has elapsed (caller holds lock)"""
+        if not self._pending:
+            return {}
+        oldest = min(first for _, first, _ in self._pending.values())
+        force = now - oldest >= self.max_batch_delay
+
+        ready = {}
+        for path, (kind, _, last) in list(self._pending.items()):
+            if force or now - last >= self.debounce:
+                ready[path] = kind
+                del self._pending[path]
+        return ready
+
+    def _flush_loop(self):
+        """Deliver coalesced batches to the callback"""
+        while self.running:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                batch = self._take_ready(time.monotonic())
+                if not batch:
+                    self._cond.wait(timeout=self.debounce / 2)
+                    continue
+
+            logger.info(f"File watcher: delivering batch of {len(batch)} change(s)")
+            try:
+                self.callback(batch)
+            except Exception as e:
+                logger.error(f"Watcher callback failed: {e}")
+
+    def flush(self) -> Dict[str, str]:
+        """Deliver everything pending immediately (used on shutdown and in tests)"""
+        with self._cond:
+            batch = {path: kind for path, (kind, _, _) in self._pending.items()}
+            self._pending.clear()
+        if batch:
+            self.callback(batch)
+        return batch
+
+    # ==================== Polling Fallback ====================
+
     def _poll_loop(self):
-        """Simple polling loop (fallback)"""
+        """Recursive polling loop (fallback)"""
         snapshots = {f: self._get_snapshot(f) for f in self.folders}
-        
+
         while self.running:
-            time.sleep(10) # Poll every 10 seconds
-            
+            time.sleep(self.poll_interval)
+
             for folder in self.folders:
                 current = self._get_snapshot(folder)
-                if current != snapshots[folder]:
-                    logger.info(f"Change detected in {folder}")
-                    snapshots[folder] = current
-                    try:
-                        # Polling doesn't give exact file, so we pass folder
-                        self.callback(str(folder))
-                    except Exception as e:
-                        logger.error(f"Watcher callback failed: {e}")
-                        
-    def _get_snapshot(self, folder: Path) -> float:
-        """Get modification time of folder"""
-        try:
-            return folder.stat().st_mtime
-        except:
-            return 0.0
+                previous = snapshots[folder]
+                if current == previous:
+                    continue
+                snapshots[folder] = current
+
+                for path, mtime in current.items():
+                    old = previous.get(path)
+                    if old is None:
+                        self.record_event(path, CREATED)
+                    elif old != mtime:
+                        self.record_event(path, MODIFIED)
+                for path in previous.keys() - current.keys():
+                    self.record_event(path, DELETED)
+
+    def _get_snapshot(self, folder: Path) -> Dict[str, Tuple[float, int]]:
+        """Map every file under folder to (mtime, size) using a single scandir walk"""
+        snapshot = {}
+        stack = [str(folder)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.name.startswith('.'):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in self.ignore_dirs:
+                                    stack.append(entry.path)
+                            else:
+                                st = entry.stat(follow_symlinks=False)
+                                snapshot[entry.path] = (st.st_mtime, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return snapshot
+
+    # ==================== Watchdog ====================
 
     def _start_watchdog(self):
         """Start watchdog observer"""
         from watchdog.observers import Observer
         from watchdog.events import FileSystemEventHandler
-        
+
+        watcher = self
+
         class Handler(FileSystemEventHandler):
-            def __init__(self, callback):
-                self.callback = callback
-                self.last_trigger = 0
-                
-            def on_any_event(self, event):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher.record_event(event.src_path, CREATED)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher.record_event(event.src_path, MODIFIED)
+
+            def on_deleted(self, event):
+                if not event.is_directory:
+                    watcher.record_event(event.src_path, DELETED)
+
+            def on_moved(self, event):
                 if event.is_directory: return
-                
-                # Debounce (max 1 update per 2 seconds per file)
-                now = time.time()
-                if now - self.last_trigger > 2:
-                    self.last_trigger = now
-                    logger.info(f"Watchdog event: {event.src_path}")
-                    self.callback(event.src_path)
-                    
+                watcher.record_event(event.src_path, DELETED)
+                watcher.record_event(event.dest_path, CREATED)
+
         self.observer = Observer()
-        handler = Handler(self.callback)
-        
+        handler = Handler()
+
         for folder in self.folders:
             if folder.exists():
-                self.observer.schedule(handler, str(folder), recursive=False)
-                
+                self.observer.schedule(handler, str(folder), recursive=True)
+
         self.observer.start()
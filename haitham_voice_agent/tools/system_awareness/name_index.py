@@ -0,0 +1,234 @@
+import re
+import unicodedata
+from typing import Dict, Any, List, Optional, Set, Iterable
+
+# Arabic -> Latin transliteration (shared with MemorySystem.search_files)
+# e.g. "كرافت" -> "kraft" to match "CRAFTS"
+ARABIC_TO_LATIN = {
+    'ا': 'a', 'أ': 'a', 'إ': 'e', 'آ': 'a',
+    'ب': 'b', 'ت': 't', 'ث': 'th',
+    'ج': 'j', 'ح': 'h', 'خ': 'kh',
+    'د': 'd', 'ذ': 'th', 'ر': 'r', 'ز': 'z',
+    'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd',
+    'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh',
+    'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l',
+    'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'w',
+    'ي': 'y', 'ى': 'a', 'ة': 'a', 'ء': '',
+}
+
+_TOKEN_SPLIT = re.compile(r"[^\w]+|_", re.UNICODE)
+# Harakat + tatweel
+_ARABIC_MARKS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u0640]")
+
+
+def transliterate(text: str) -> str:
+    """Map Arabic letters to their Latin approximation, leave the rest untouched"""
+    return ''.join(ARABIC_TO_LATIN.get(c, c) for c in text)
+
+
+def fold_variants(text: str) -> List[str]:
+    """
+    Normalized search forms of a name: lowercase (NFKC, diacritics stripped)
+    and, when it contains Arabic, its Latin transliteration.
+    """
+    base = unicodedata.normalize("NFKC", text).lower()
+    base = _ARABIC_MARKS.sub("", base)
+    variants = [base]
+    latin = transliterate(base)
+    if latin != base:
+        variants.append(latin)
+    return variants
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_SPLIT.split(text) if t]
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def edit_distance(a: str, b: str, max_dist: int) -> int:
+    """Optimal string alignment distance, bailing out once it exceeds max_dist"""
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_dist:
+            return max_dist + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Every entry with a token that has this node's prefix
+        self.ids: Set[int] = set()
+
+
+class NameIndex:
+    """
+    In-memory filename index for Layer 2 lookups.
+    Prefix trie over name tokens plus a trigram index for substring and
+    typo-tolerant matches. Names are indexed in lowercase and in Arabic->Latin
+    transliteration so "كرافت" finds "CRAFTS".
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._grams: Dict[str, Set[int]] = {}
+        self._ids: Dict[str, int] = {}
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._forms: Dict[int, List[str]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._ids
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        entry_id = self._ids.get(path)
+        return self._entries.get(entry_id) if entry_id is not None else None
+
+    def entries(self) -> Iterable[Dict[str, Any]]:
+        return self._entries.values()
+
+    def add(self, entry: Dict[str, Any]):
+        """Insert or replace an entry (must have 'name' and 'path')"""
+        path = entry["path"]
+        if path in self._ids:
+            self.remove(path)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._ids[path] = entry_id
+        self._entries[entry_id] = entry
+
+        forms = [" ".join(tokenize(form)) for form in fold_variants(entry["name"])]
+        self._forms[entry_id] = forms
+        for form in forms:
+            for token in form.split():
+                self._trie_insert(token, entry_id)
+            for gram in trigrams(form):
+                self._grams.setdefault(gram, set()).add(entry_id)
+
+    def remove(self, path: str) -> bool:
+        entry_id = self._ids.pop(path, None)
+        if entry_id is None:
+            return False
+        self._entries.pop(entry_id, None)
+        for form in self._forms.pop(entry_id, []):
+            for token in form.split():
+                self._trie_remove(token, entry_id)
+            for gram in trigrams(form):
+                bucket = self._grams.get(gram)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._grams[gram]
+        return True
+
+    def clear(self):
+        self.__init__()
+
+    def _trie_insert(self, token: str, entry_id: int):
+        node = self._root
+        for ch in token:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ids.add(entry_id)
+
+    def _trie_remove(self, token: str, entry_id: int):
+        node = self._root
+        path = []
+        for ch in token:
+            child = node.children.get(ch)
+            if child is None:
+                return
+            child.ids.discard(entry_id)
+            path.append((node, ch, child))
+            node = child
+        # Prune empty branches bottom-up
+        for parent, ch, child in reversed(path):
+            if child.ids or child.children:
+                break
+            del parent.children[ch]
+
+    def _prefix_ids(self, token: str) -> Set[int]:
+        node = self._root
+        for ch in token:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Ranked lookup: exact name > every query token is a token prefix >
+        substring > typo-tolerant match. Returns entries with a 'score'.
+        """
+        scores: Dict[int, float] = {}
+
+        for form in fold_variants(query.strip()):
+            tokens = tokenize(form)
+            if not tokens:
+                continue
+            compact = " ".join(tokens)
+
+            # 1. Prefix matches (every query token must prefix some name token)
+            postings = sorted((self._prefix_ids(token) for token in tokens), key=len)
+            hits = (entry_id for entry_id in postings[0] if all(entry_id in p for p in postings[1:]))
+            for entry_id in hits:
+                exact = any(compact == f or compact == f.rsplit(" ", 1)[0]
+                            for f in self._forms[entry_id])
+                scores[entry_id] = max(scores.get(entry_id, 0.0), 1.0 if exact else 0.8)
+
+            if len(scores) >= limit:
+                continue
+
+            # 2. Substring / typo-tolerant via trigram candidates
+            query_grams = trigrams(compact)
+            if not query_grams:
+                continue
+            counts: Dict[int, int] = {}
+            for gram in query_grams:
+                for entry_id in self._grams.get(gram, ()):
+                    counts[entry_id] = counts.get(entry_id, 0) + 1
+
+            min_shared = max(1, len(query_grams) // 4)
+            max_dist = 1 if len(compact) <= 4 else 2
+            for entry_id, shared in counts.items():
+                if shared < min_shared or scores.get(entry_id, 0.0) >= 0.8:
+                    continue
+                best = 0.0
+                for f in self._forms[entry_id]:
+                    if compact in f:
+                        best = max(best, 0.6)
+                        continue
+                    for name_token in f.split():
+                        d = edit_distance(compact, name_token, max_dist)
+                        if d <= max_dist:
+                            best = max(best, 0.5 - 0.1 * d)
+                if best:
+                    scores[entry_id] = max(scores.get(entry_id, 0.0), best)
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], -self._entries[kv[0]].get("mtime", 0)))
+        results = []
+        for entry_id, score in ranked[:limit]:
+            item = dict(self._entries[entry_id])
+            item["score"] = score
+            results.append(item)
+        return results
@@ -1,21 +1,45 @@
 import subprocess
+import heapq
+import shutil
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import logging
 from datetime import datetime
 
+from .name_index import NameIndex
+
 logger = logging.getLogger(__name__)
 
 class QuickIndexer:
     """
     Layer 2: Quick Access Index
     Cache contents of key folders and recent files.
+
+    Entries live in an in-memory NameIndex (prefix trie + trigrams) so lookups
+    stay sub-millisecond as the index grows. File events are applied
+    incrementally and persisted as an append-only JSONL log of put/delete
+    records, compacted once it grows past twice the live entry count.
     """
-    
-    def __init__(self, storage_path: str = "~/HVA_Memory/system/quick_index.json"):
+
+    # Folder name under home -> index view key
+    KEY_FOLDERS = {"Desktop": "desktop", "Downloads": "downloads", "Documents": "documents"}
+    RECENT_WINDOW_SECONDS = 24 * 3600
+
+    def __init__(
+        self,
+        storage_path: str = "~/HVA_Memory/system/quick_index.jsonl",
+        home: Optional[str] = None,
+        recent_provider: Optional[Callable[[int], List[str]]] = None
+    ):
         self.storage_path = Path(storage_path).expanduser()
+        self.home = Path(home).expanduser() if home else Path.home()
+        # Used instead of mdfind where Spotlight is unavailable (Linux)
+        self.recent_provider = recent_provider
+        self.names = NameIndex()
         self.index = {
             "desktop": [],
             "downloads": [],
@@ -25,53 +49,133 @@ class QuickIndexer:
             "last_updated": None
         }
         self.max_items_per_folder = 50
-        
+        self.max_recent_files = 20
+        self._lock = threading.RLock()
+        self._log_records = 0
+
     def update_index(self) -> Dict[str, Any]:
-        """Update the quick index"""
+        """Rebuild the quick index from scratch"""
         logger.info("Updating Quick Index (Layer 2)...")
-        
-        home = Path.home()
-        
-        self.index["desktop"] = self._index_folder(home / "Desktop")
-        self.index["downloads"] = self._index_folder(home / "Downloads")
-        self.index["documents"] = self._index_folder(home / "Documents")
-        self.index["recent_files"] = self._get_recent_files()
-        self.index["last_updated"] = datetime.now().isoformat()
-        
-        self._save_index()
+
+        fresh = NameIndex()
+        for folder in self.KEY_FOLDERS:
+            for entry in self._index_folder(self.home / folder):
+                fresh.add(entry)
+        for entry in self._get_recent_files():
+            if entry["path"] not in fresh:
+                fresh.add(entry)
+
+        with self._lock:
+            self.names = fresh
+            self.index["last_updated"] = datetime.now().isoformat()
+            self._refresh_views()
+            self._compact()
         return self.index
-        
+
+    def apply_changes(self, changes: Dict[str, str]) -> int:
+        """
+        Apply a batch of file events ({path: created|modified|deleted})
+        without re-listing the key folders. Returns number of entries touched.
+        """
+        records = []
+        with self._lock:
+            for path_str, kind in changes.items():
+                path = Path(path_str)
+                entry = None
+                if kind != "deleted":
+                    source = self._source_for(path)
+                    if source and not self._is_noise(path.name):
+                        entry = self._stat_entry(path, source)
+
+                if entry is None:
+                    if self.names.remove(path_str):
+                        records.append(["-", path_str])
+                    continue
+
+                self.names.add(entry)
+                records.append(self._put_record(entry))
+
+            touched = len(records)
+            if records:
+                records.extend(self._refresh_views())
+                self.index["last_updated"] = datetime.now().isoformat()
+                records.append(["@", self.index["last_updated"]])
+                self._append_log(records)
+        return touched
+
+    def _source_for(self, path: Path) -> Optional[str]:
+        """Top-level entries belong to their key folder; nested files count as recent"""
+        parent = path.parent
+        if parent.parent == self.home and parent.name in self.KEY_FOLDERS:
+            return parent.name
+        if path.is_file():
+            return "Recent"
+        return None
+
+    def _is_noise(self, name: str) -> bool:
+        """Strict Noise Filtering"""
+        if name.startswith('.'): return True
+        if name in [".DS_Store", "__pycache__", "Icon\r"]: return True
+        if Path(name).suffix in [".app", ".localized"]: return True # Skip apps in docs/downloads usually
+        return False
+
+    def _stat_entry(self, path: Path, source: str) -> Optional[Dict[str, Any]]:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        is_dir = path.is_dir()
+        return {
+            "name": path.name,
+            "path": str(path),
+            "type": "folder" if is_dir else "file",
+            "size": st.st_size if not is_dir else None,
+            "mtime": st.st_mtime,
+            "source": source
+        }
+
     def _index_folder(self, path: Path) -> List[Dict[str, Any]]:
-        """List files in a folder (non-recursive, top-level only)"""
+        """List entries in a folder (non-recursive, top-level only), one stat per entry"""
         items = []
         if not path.exists():
             return items
-            
+
         try:
-            # Sort by modification time (newest first)
-            entries = sorted(path.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True)
-            
-            for entry in entries[:self.max_items_per_folder]:
-                # Strict Noise Filtering
-                if entry.name.startswith('.'): continue
-                if entry.name in [".DS_Store", "__pycache__", "Icon\r"]: continue
-                if entry.suffix in [".app", ".localized"]: continue # Skip apps in docs/downloads usually
-                
-                items.append({
-                    "name": entry.name,
-                    "path": str(entry),
-                    "type": "folder" if entry.is_dir() else "file",
-                    "size": self._format_size(entry.stat().st_size) if entry.is_file() else "-",
-                    "modified": datetime.fromtimestamp(entry.stat().st_mtime).strftime("%Y-%m-%d")
-                })
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self._is_noise(entry.name): continue
+                    try:
+                        is_dir = entry.is_dir()
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    items.append({
+                        "name": entry.name,
+                        "path": entry.path,
+                        "type": "folder" if is_dir else "file",
+                        "size": st.st_size if not is_dir else None,
+                        "mtime": st.st_mtime,
+                        "source": path.name
+                    })
         except Exception as e:
             logger.warning(f"Error indexing {path}: {e}")
-            
+
         return items
-        
+
     def _get_recent_files(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """Get recently modified files using mdfind"""
+        """Get recently modified files using mdfind (or the recent_provider without Spotlight)"""
         items = []
+        if not shutil.which("mdfind"):
+            if self.recent_provider:
+                try:
+                    for p_str in self.recent_provider(limit):
+                        entry = self._stat_entry(Path(p_str), "Recent")
+                        if entry:
+                            items.append(entry)
+                except Exception as e:
+                    logger.warning(f"Error getting recent files: {e}")
+            return items
+            
         try:
             # Find files modified in the last 24 hours, excluding Library and hidden files
             cmd = [
@@ -80,32 +184,65 @@ class QuickIndexer:
             ]
             result = subprocess.run(cmd, capture_output=True, text=True)
             paths = result.stdout.strip().split('\n')
-            
+
             # Filter and process
             count = 0
             for p_str in paths:
                 if not p_str: continue
-                
+
                 p = Path(p_str)
                 # Exclude system files
                 if "Library" in p.parts or p.name.startswith('.'):
                     continue
-                    
-                if p.exists():
-                    items.append({
-                        "name": p.name,
-                        "path": str(p),
-                        "modified": datetime.fromtimestamp(p.stat().st_mtime).strftime("%H:%M")
-                    })
+
+                entry = self._stat_entry(p, "Recent")
+                if entry:
+                    items.append(entry)
                     count += 1
                     if count >= limit:
                         break
-                        
+
         except Exception as e:
             logger.warning(f"Error getting recent files: {e}")
-            
+
         return items
-        
+
+    def _refresh_views(self) -> List[list]:
+        """
+        Rebuild the per-folder/recent views (top-k by mtime) and expire stale
+        'Recent' entries. Returns the delete records for expired entries.
+        """
+        cutoff = time.time() - self.RECENT_WINDOW_SECONDS
+        expired = [e["path"] for e in self.names.entries() if e["source"] == "Recent" and e["mtime"] < cutoff]
+        for path in expired:
+            self.names.remove(path)
+
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.names.entries():
+            by_source.setdefault(entry["source"], []).append(entry)
+
+        for folder, key in self.KEY_FOLDERS.items():
+            newest = heapq.nlargest(self.max_items_per_folder, by_source.get(folder, []), key=lambda e: e["mtime"])
+            self.index[key] = [self._present(e) for e in newest]
+
+        recent = (e for e in self.names.entries() if e["type"] == "file" and e["mtime"] >= cutoff)
+        newest = heapq.nlargest(self.max_recent_files, recent, key=lambda e: e["mtime"])
+        self.index["recent_files"] = [self._present(e, time_only=True) for e in newest]
+
+        return [["-", path] for path in expired]
+
+    def _present(self, entry: Dict[str, Any], time_only: bool = False) -> Dict[str, Any]:
+        """Public item shape (formatted size/date)"""
+        modified = datetime.fromtimestamp(entry["mtime"])
+        return {
+            "name": entry["name"],
+            "path": entry["path"],
+            "type": entry["type"],
+            "size": self._format_size(entry["size"]) if entry["size"] is not None else "-",
+            "modified": modified.strftime("%H:%M" if time_only else "%Y-%m-%d"),
+            "source": entry["source"]
+        }
+
     def _format_size(self, size_bytes: int) -> str:
         for unit in ['B', 'KB', 'MB', 'GB']:
             if size_bytes < 1024:
@@ -113,39 +250,81 @@ class QuickIndexer:
             size_bytes /= 1024
         return f"{size_bytes:.1f} TB"
 
-    def _save_index(self):
-        """Save index to disk"""
+    # ==================== Persistence (append-only log) ====================
+
+    def _put_record(self, entry: Dict[str, Any]) -> list:
+        return ["+", entry["path"], entry["name"], entry["type"], entry["size"], entry["mtime"], entry["source"]]
+
+    def _append_log(self, records: List[list]):
+        """Append records; compact when the log is mostly dead entries"""
+        try:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.storage_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+            self._log_records += len(records)
+        except Exception as e:
+            logger.error(f"Failed to save quick index: {e}")
+            return
+
+        if self._log_records > 2 * len(self.names) + 100:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log with one record per live entry"""
         try:
             self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(self.index, f, indent=2, ensure_ascii=False)
+            tmp_path = self.storage_path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(["@", self.index["last_updated"]]) + "\n")
+                for entry in self.names.entries():
+                    f.write(json.dumps(self._put_record(entry), ensure_ascii=False, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, self.storage_path)
+            self._log_records = len(self.names) + 1
         except Exception as e:
             logger.error(f"Failed to save quick index: {e}")
 
     def load_index(self):
-        """Load index from disk"""
-        if self.storage_path.exists():
-            try:
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    self.index = json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load quick index: {e}")
-
-    def find_in_index(self, query: str) -> List[Dict[str, Any]]:
-        """Search in the quick index"""
+        """Load index from disk by replaying the log"""
+        if not self.storage_path.exists():
+            return
+
+        names = NameIndex()
+        last_updated = None
+        count = 0
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue # Torn write from a crash; skip it
+                    count += 1
+                    op = record[0]
+                    if op == "+":
+                        _, path, name, kind, size, mtime, source = record
+                        names.add({"name": name, "path": path, "type": kind, "size": size, "mtime": mtime, "source": source})
+                    elif op == "-":
+                        names.remove(record[1])
+                    elif op == "@":
+                        last_updated = record[1]
+        except Exception as e:
+            logger.error(f"Failed to load quick index: {e}")
+            return
+
+        with self._lock:
+            self.names = names
+            self._log_records = count
+            self.index["last_updated"] = last_updated
+            self._refresh_views()
+
+    def find_in_index(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Search in the quick index (prefix, substring, transliterated and typo-tolerant)"""
+        with self._lock:
+            matches = self.names.search(query, limit=limit)
         results = []
-        query = query.lower()
-        
-        # Helper to search a list
-        def search_list(lst, source):
-            for item in lst:
-                if query in item["name"].lower():
-                    item["source"] = source
-                    results.append(item)
-                    
-        search_list(self.index.get("desktop", []), "Desktop")
-        search_list(self.index.get("downloads", []), "Downloads")
-        search_list(self.index.get("documents", []), "Documents")
-        search_list(self.index.get("recent_files", []), "Recent")
-        
+        for entry in matches:
+            item = self._present(entry, time_only=entry["source"] == "Recent")
+            item["score"] = entry["score"]
+            results.append(item)
         return results
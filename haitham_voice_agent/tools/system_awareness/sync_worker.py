@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_watcher import DELETED
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path: Path) -> str:
+    """MD5 of file contents, read in 64KB chunks"""
+    hasher = hashlib.md5()
+    with open(path, 'rb') as f:
+        buf = f.read(65536)
+        while len(buf) > 0:
+            hasher.update(buf)
+            buf = f.read(65536)
+    return hasher.hexdigest()
+
+
+def guess_project_id(path: Path) -> str:
+    """Heuristic: the entry right under 'Projects', else 'documents'"""
+    parts = path.parts
+    if "Projects" in parts:
+        idx = parts.index("Projects")
+        if idx + 1 < len(parts):
+            return parts[idx + 1]
+    return "documents"
+
+
+class MemorySyncWorker:
+    """
+    Layer 3 Smart Sync worker.
+    One long-lived event loop (on its own daemon thread) receives batches of
+    file changes and indexes them into Deep Memory. Batches that arrive while
+    a previous one is still running are merged, and files whose content hash
+    did not change since the last sync are skipped.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = concurrency
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._memory_tools = None
+        self._known_hashes: Dict[str, str] = {}
+
+    def start(self):
+        """Start the background loop (idempotent)"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._run, name="MemorySyncWorker", daemon=True)
+        self.thread.start()
+        self._ready.wait(timeout=5)
+
+    def stop(self):
+        """Stop the background loop"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def submit(self, changes: Dict[str, str]):
+        """Queue a batch of {path: event_kind} (thread-safe)"""
+        if not changes:
+            return
+        if not self.thread or not self.thread.is_alive():
+            self.start()
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, dict(changes))
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        try:
+            self.loop.run_until_complete(self._consume())
+        finally:
+            self.loop.close()
+
+    async def _consume(self):
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return
+
+            # Coalesce any batches that queued up while we were busy
+            stop = False
+            while not self._queue.empty():
+                extra = self._queue.get_nowait()
+                if extra is None:
+                    stop = True
+                    break
+                batch.update(extra)
+
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                logger.error(f"Smart Sync batch failed: {e}")
+
+            if stop:
+                return
+
+    async def process_batch(self, changes: Dict[str, str]) -> int:
+        """Index every changed file in one pass. Returns number of files indexed."""
+        loop = asyncio.get_running_loop()
+        candidates = []
+        for path_str, kind in changes.items():
+            if kind == DELETED:
+                self._known_hashes.pop(path_str, None)
+                continue
+            path_obj = Path(path_str)
+            if path_obj.is_file():
+                candidates.append(path_obj)
+
+        if not candidates:
+            return 0
+
+        # Hash off the loop thread; skip files whose content is unchanged
+        hashes = await asyncio.gather(
+            *(loop.run_in_executor(None, hash_file, p) for p in candidates),
+            return_exceptions=True
+        )
+        to_index = []
+        for path_obj, file_hash in zip(candidates, hashes):
+            if isinstance(file_hash, Exception):
+                logger.warning(f"Smart Sync: could not hash {path_obj}: {file_hash}")
+                continue
+            if self._known_hashes.get(str(path_obj)) == file_hash:
+                continue
+            to_index.append((path_obj, file_hash))
+
+        if not to_index:
+            return 0
+
+        memory_system = await self._get_memory_system()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def index_one(path_obj: Path, file_hash: str) -> bool:
+            async with semaphore:
+                ok = await memory_system.index_file(
+                    path=str(path_obj),
+                    project_id=guess_project_id(path_obj),
+                    description=f"Auto-indexed: {path_obj.name}",
+                    tags=["auto-sync", "watched"],
+                    file_hash=file_hash
+                )
+                if ok:
+                    self._known_hashes[str(path_obj)] = file_hash
+                return ok
+
+        results = await asyncio.gather(*(index_one(p, h) for p, h in to_index), return_exceptions=True)
+        indexed = sum(1 for r in results if r is True)
+        logger.info(f"✅ Smart Sync: Updated memory for {indexed}/{len(to_index)} file(s)")
+        return indexed
+
+    async def _get_memory_system(self):
+        """Initialize memory tools once for the lifetime of the worker"""
+        if self._memory_tools is None:
+            from haitham_voice_agent.tools.memory.voice_tools import VoiceMemoryTools
+            self._memory_tools = VoiceMemoryTools()
+            await self._memory_tools.ensure_initialized()
+        return self._memory_tools.memory_system
@@ -1,59 +1,55 @@
-import json
 import uuid
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Optional, Any, Callable
 import logging
-from pathlib import Path
 
 from haitham_voice_agent.domain.models import Task, TaskStatus
 from haitham_voice_agent.tools.workspace_manager import workspace_manager
+from haitham_voice_agent.tools.tasks.task_store import TaskStore
 
 logger = logging.getLogger(__name__)
 
 class TaskManager:
     """
-    Manages tasks using local JSON files in the workspace.
+    Manages tasks in the memory DB (indexed SQLite table).
+    Legacy per-project tasks.json files are imported on first use.
     """
-    
-    def __init__(self, user_id: str = "haitham-local"):
+
+    def __init__(self, user_id: str = "haitham-local", store: Optional[TaskStore] = None):
         self.user_id = user_id
-        
-    def _load_tasks(self, project_id: str) -> List[Task]:
-        """Load tasks from a project's tasks.json"""
-        file_path = workspace_manager.project_tasks_file(project_id)
-        if not file_path.exists():
-            return []
-            
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return [Task.from_dict(t) for t in data]
-        except Exception as e:
-            logger.error(f"Failed to load tasks for {project_id}: {e}")
-            raise e
-            
-    def _save_tasks(self, project_id: str, tasks: List[Task]):
-        """Save tasks to a project's tasks.json"""
-        file_path = workspace_manager.project_tasks_file(project_id)
-        
-        # Ensure directory exists
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
+        self.store = store or TaskStore()
+        self._imported = False
+        # Called as listener(task_id, task) after each mutation; task is None when deleted
+        self.change_listeners: List[Callable[[str, Optional[Task]], None]] = []
+
+    def _notify_change(self, task_id: str, task: Optional[Task]):
+        for listener in list(self.change_listeners):
+            try:
+                listener(task_id, task)
+            except Exception as e:
+                logger.warning(f"Task change listener failed: {e}")
+
+    def _ensure_imported(self):
+        """Import legacy tasks.json files once per process"""
+        if self._imported:
+            return
+        self._imported = True
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump([t.to_dict() for t in tasks], f, ensure_ascii=False, indent=2)
+            files = [workspace_manager.inbox_root / "tasks" / "tasks.json"]
+            files += sorted(workspace_manager.projects_root.glob("*/tasks/tasks.json"))
+            self.store.import_json_files([f for f in files if f.exists()], user_id=self.user_id)
         except Exception as e:
-            logger.error(f"Failed to save tasks for {project_id}: {e}")
-            raise e
+            logger.error(f"Legacy task import failed: {e}")
 
-    def create_task(self, title: str, 
+    def create_task(self, title: str,
                     project_id: str = "inbox",
                     description: str = "",
                     due_date: Any = None,
                     language: str = "ar") -> Task:
         """Create a new task"""
+        self._ensure_imported()
         now = datetime.now().isoformat()
-        
+
         # Safe strict due_date handling
         final_due_date = None
         if due_date:
@@ -61,7 +57,7 @@ class TaskManager:
                 final_due_date = due_date.isoformat()
             elif isinstance(due_date, str):
                 final_due_date = due_date # Assume ISO or handle parsing if needed later
-        
+
         task = Task(
             id=str(uuid.uuid4()),
             user_id=self.user_id,
@@ -74,82 +70,60 @@ class TaskManager:
             language=language,
             due_date=final_due_date
         )
-        
-        tasks = self._load_tasks(project_id)
-        tasks.append(task)
-        self._save_tasks(project_id, tasks)
-        
+
+        self.store.insert(task)
+        self._notify_change(task.id, task)
+
         logger.info(f"Created task: {title} in {project_id}")
         return task
 
-    def delete_task(self, task_id: str, project_id: str = "inbox") -> bool:
-        """Delete a task by ID"""
-        tasks = self._load_tasks(project_id)
-        original_count = len(tasks)
-        
-        tasks = [t for t in tasks if t.id != task_id]
-        
-        if len(tasks) < original_count:
-            self._save_tasks(project_id, tasks)
-            logger.info(f"Deleted task {task_id} from {project_id}")
-            return True
-            
-        # If not found in primary project, try searching others?
-        # For now, strict project scoping
-        return False
-
-    def list_tasks(self, project_id: Optional[str] = None, 
+    def list_tasks(self, project_id: Optional[str] = None,
                    status: Optional[TaskStatus] = None) -> List[Task]:
         """List tasks, optionally filtered by project and status"""
-        all_tasks = []
-        
-        if project_id:
-            all_tasks = self._load_tasks(project_id)
-        else:
-            # Scan all projects (simplified: just check inbox and known projects)
-            # For now, let's just check inbox and iterate over projects dir
-            projects_dir = workspace_manager.projects_root
-            project_ids = ["inbox"] + [d.name for d in projects_dir.iterdir() if d.is_dir()]
-            
-            for pid in project_ids:
-                all_tasks.extend(self._load_tasks(pid))
-                
-        if status:
-            all_tasks = [t for t in all_tasks if t.status == status]
-            
-        return all_tasks
-
-    def update_task(self, task_id: str, project_id: str, **updates) -> Optional[Task]:
-        """Update a task"""
-        tasks = self._load_tasks(project_id)
-        for i, task in enumerate(tasks):
-            if task.id == task_id:
-                # Apply updates
-                task_dict = task.to_dict()
-                task_dict.update(updates)
-                task_dict["updated_at"] = datetime.now().isoformat()
-                
-                updated_task = Task.from_dict(task_dict)
-                tasks[i] = updated_task
-                self._save_tasks(project_id, tasks)
-                return updated_task
-                
-        return None
-
-    def complete_task(self, task_id: str, project_id: str) -> Optional[Task]:
+        self._ensure_imported()
+        return self.store.query(project_id=project_id, status=status)
+
+    def tasks_due_between(self, start: datetime, end: datetime,
+                          status: Optional[TaskStatus] = "open") -> List[Task]:
+        """Tasks with a due date in [start, end), soonest first (index range scan)"""
+        self._ensure_imported()
+        return self.store.query(status=status, due_after=start, due_before=end)
+
+    def tasks_due_within(self, minutes: int, status: Optional[TaskStatus] = "open") -> List[Task]:
+        """e.g. open tasks due in the next 30 minutes"""
+        now = datetime.now().astimezone()
+        return self.tasks_due_between(now, now + timedelta(minutes=minutes), status=status)
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        self._ensure_imported()
+        return self.store.get(task_id)
+
+    def update_task(self, task_id: str, project_id: Optional[str] = None, **updates) -> Optional[Task]:
+        """
+        Update a task
+
+        Task ids are unique across projects, so the lookup is by id;
+        project_id is accepted for compatibility with existing callers.
+        """
+        self._ensure_imported()
+        updates["updated_at"] = datetime.now().isoformat()
+        task = self.store.update(task_id, updates)
+        if task:
+            self._notify_change(task_id, task)
+        return task
+
+    def complete_task(self, task_id: str, project_id: Optional[str] = None) -> Optional[Task]:
         """Mark a task as completed"""
         return self.update_task(task_id, project_id, status="completed")
 
-    def delete_task(self, task_id: str, project_id: str) -> bool:
-        """Delete a task"""
-        tasks = self._load_tasks(project_id)
-        initial_len = len(tasks)
-        tasks = [t for t in tasks if t.id != task_id]
-        
-        if len(tasks) < initial_len:
-            self._save_tasks(project_id, tasks)
-            return True
-        return False
+    def delete_task(self, task_id: str, project_id: Optional[str] = None) -> bool:
+        """Delete a task by ID"""
+        self._ensure_imported()
+        deleted = self.store.delete(task_id)
+        if deleted:
+            logger.info(f"Deleted task {task_id}")
+            self._notify_change(task_id, None)
+        return deleted
 
     # Aliases
     add_task = create_task
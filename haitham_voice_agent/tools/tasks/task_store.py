@@ -0,0 +1,247 @@
+"""
+Task Store
+
+SQLite-backed task storage in the memory DB. Each mutation is a single-row
+write; listing and due-date range queries go through indexes on
+(status, due_ts) and (project_id, status). Legacy per-project tasks.json
+files are imported once (re-imported only if the file changes).
+All methods are blocking; async callers go through asyncio.to_thread.
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterable
+
+from haitham_voice_agent.config import Config
+from haitham_voice_agent.domain.models import Task
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("id", "user_id", "project_id", "title", "description", "status",
+            "created_at", "updated_at", "language", "due_date", "notes", "tags")
+
+
+def due_timestamp(due_date: Optional[str]) -> Optional[float]:
+    """Epoch seconds for an ISO due date (naive values are local time)"""
+    if not due_date:
+        return None
+    try:
+        return datetime.fromisoformat(str(due_date).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class TaskStore:
+    """
+    Indexed task table
+
+    Features:
+    - Single-row insert/update/delete
+    - Filtered listing by project/status
+    - Due-date range queries ("open tasks due in the next 30 minutes")
+    - One-time import of legacy tasks.json files
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or Config.MEMORY_DB_PATH).expanduser()
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    project_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    language TEXT NOT NULL DEFAULT 'ar',
+                    due_date TEXT,
+                    due_ts REAL,
+                    notes TEXT NOT NULL DEFAULT '',
+                    tags TEXT NOT NULL DEFAULT '[]' -- JSON list
+                );
+                CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks(status, due_ts);
+                CREATE INDEX IF NOT EXISTS idx_tasks_project_status ON tasks(project_id, status);
+                CREATE TABLE IF NOT EXISTS task_imports (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL
+                );
+            """)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _row_values(task: Task) -> Dict[str, Any]:
+        values = task.to_dict()
+        values["project_id"] = values.get("project_id") or "inbox"
+        values["tags"] = json.dumps(values.get("tags") or [], ensure_ascii=False)
+        values["due_ts"] = due_timestamp(values.get("due_date"))
+        return values
+
+    @staticmethod
+    def _to_task(row: sqlite3.Row) -> Task:
+        data = {col: row[col] for col in _COLUMNS}
+        data["tags"] = json.loads(data["tags"] or "[]")
+        return Task.from_dict(data)
+
+    # ==================== Writes ====================
+
+    def insert(self, task: Task, replace: bool = True) -> bool:
+        values = self._row_values(task)
+        columns = _COLUMNS + ("due_ts",)
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            conn = self._db()
+            with conn:
+                cursor = conn.execute(
+                    f"{verb} INTO tasks ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    [values.get(c) for c in columns]
+                )
+        return cursor.rowcount > 0
+
+    def update(self, task_id: str, fields: Dict[str, Any], project_id: Optional[str] = None) -> Optional[Task]:
+        """Update the given columns of one task; returns the updated task"""
+        fields = {k: v for k, v in fields.items() if k in _COLUMNS and k != "id"}
+        if "tags" in fields:
+            fields["tags"] = json.dumps(fields["tags"] or [], ensure_ascii=False)
+        if "due_date" in fields:
+            fields["due_ts"] = due_timestamp(fields["due_date"])
+        sql = "UPDATE tasks SET " + ", ".join(f"{k} = ?" for k in fields) + " WHERE id = ?"
+        params = list(fields.values()) + [task_id]
+        if project_id:
+            sql += " AND project_id = ?"
+            params.append(project_id)
+        with self._lock:
+            conn = self._db()
+            with conn:
+                if fields and conn.execute(sql, params).rowcount == 0:
+                    return None
+            return self.get(task_id)
+
+    def delete(self, task_id: str, project_id: Optional[str] = None) -> bool:
+        sql, params = "DELETE FROM tasks WHERE id = ?", [task_id]
+        if project_id:
+            sql += " AND project_id = ?"
+            params.append(project_id)
+        with self._lock:
+            conn = self._db()
+            with conn:
+                return conn.execute(sql, params).rowcount > 0
+
+    # ==================== Reads ====================
+
+    def get(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._to_task(row) if row else None
+
+    def query(
+        self,
+        project_id: Optional[str] = None,
+        status: Optional[str] = None,
+        due_after: Optional[datetime] = None,
+        due_before: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Task]:
+        """
+        Filtered task list
+
+        With a due range, results are ordered by due date; otherwise by
+        creation time (insertion order of the old JSON files).
+        """
+        where, params = [], []
+        if project_id:
+            where.append("project_id = ?")
+            params.append(project_id)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if due_after is not None:
+            where.append("due_ts >= ?")
+            params.append(due_after.timestamp())
+        if due_before is not None:
+            where.append("due_ts < ?")
+            params.append(due_before.timestamp())
+
+        sql = "SELECT * FROM tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        ranged = due_after is not None or due_before is not None
+        sql += " ORDER BY due_ts, created_at" if ranged else " ORDER BY created_at, rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [self._to_task(row) for row in rows]
+
+    def count(self, status: Optional[str] = None) -> int:
+        sql, params = "SELECT COUNT(*) FROM tasks", []
+        if status:
+            sql += " WHERE status = ?"
+            params.append(status)
+        with self._lock:
+            return self._db().execute(sql, params).fetchone()[0]
+
+    # ==================== Legacy import ====================
+
+    def import_json_files(self, files: Iterable[Path], user_id: str = "haitham-local") -> int:
+        """
+        Import legacy tasks.json files
+
+        Existing rows win (INSERT OR IGNORE), so edits made through the
+        store are never overwritten by a stale file.
+        """
+        imported = 0
+        for path in files:
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            with self._lock:
+                seen = self._db().execute("SELECT mtime FROM task_imports WHERE path = ?", (str(path),)).fetchone()
+            if seen and seen[0] == mtime:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to import tasks from {path}: {e}")
+                continue
+
+            default_project = path.parent.parent.name
+            for item in data if isinstance(data, list) else []:
+                try:
+                    item = dict(item)
+                    item.setdefault("user_id", user_id)
+                    item["project_id"] = item.get("project_id") or default_project
+                    if self.insert(Task.from_dict(item), replace=False):
+                        imported += 1
+                except Exception as e:
+                    logger.warning(f"Skipping malformed task in {path}: {e}")
+            with self._lock:
+                conn = self._db()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO task_imports (path, mtime) VALUES (?, ?)", (str(path), mtime))
+        if imported:
+            logger.info(f"Imported {imported} tasks from legacy tasks.json files")
+        return imported
@@ -9,9 +9,10 @@ import asyncio
 import subprocess
 import logging
 import os
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
 
 from .config import Config
+from .streaming import chunk_sentences
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +94,54 @@ class TTSModule:
             logger.error(f"TTS failed: {e}")
             raise
 
+    async def speak_stream(self, deltas: AsyncIterator[str], language: Optional[str] = None,
+                           speak: Optional[Callable[[str, str], Awaitable]] = None) -> str:
+        """
+        Speak a streaming LLM reply sentence by sentence
+
+        The first sentence is spoken as soon as it is complete while the
+        rest is still being generated; generation is not paused while
+        speaking.
+
+        Args:
+            deltas: Async iterator of text deltas (e.g. LLMRouter.stream_with_gpt)
+            language: Language code ('ar' or 'en'), auto-detect if None
+            speak: Coroutine function (text, language) that speaks one sentence
+                and returns when done (default: self.speak)
+
+        Returns:
+            str: The full reply text
+        """
+        sentences: asyncio.Queue = asyncio.Queue()
+        parts = []
+
+        async def produce():
+            try:
+                async for sentence in chunk_sentences(self._collect(deltas, parts)):
+                    await sentences.put(sentence)
+            finally:
+                await sentences.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (sentence := await sentences.get()) is not None:
+                # Keep one language for the whole reply once detected
+                language = language or self._detect_language(sentence)
+                if speak is None:
+                    await self.speak(sentence, language=language, wait=True)
+                else:
+                    await speak(sentence, language)
+            await producer  # Re-raise generation errors
+        finally:
+            producer.cancel()
+        return "".join(parts)
+
+    @staticmethod
+    async def _collect(deltas: AsyncIterator[str], parts: list) -> AsyncIterator[str]:
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+
     async def play_sound(self, sound_name: str, wait: bool = False):
         """
         Play a system sound effect
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Training Data Audit
+===================
+
+Purpose:
+    Audits the V3 / V4 / V4.2 training splits in one pass:
+    - Leakage patterns (tool traces, "As an AI", OpenAI mentions, citation markers)
+    - Exact and near-duplicate records (MinHash + LSH) within and across splits
+    - Train/eval overlap (splits whose name contains val/eval/test)
+    Writes a JSON audit.
+
+Usage:
+    python scripts/audit_training_data.py [--split name=path ...] [--workers 8] [--threshold 0.8]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from finetune.dataset_audit import audit_splits
+
+DEFAULT_SPLITS = [
+    "Data training V3/*.jsonl",
+    "Data training V4/final/v4_mask_pii/*.jsonl",
+    "Data training V4/splits/*.jsonl",
+    "Data training V4.2_patch_*/release_chat_patch/*.jsonl",
+]
+DEFAULT_OUTPUT = "Data training V4/audit/dataset_audit.json"
+
+
+def discover_splits():
+    splits = {}
+    for pattern in DEFAULT_SPLITS:
+        for path in sorted(glob.glob(pattern)):
+            splits[path] = path
+    return splits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit training splits for leakage and duplicates")
+    parser.add_argument("--split", action="append", default=[], help="name=path (repeatable); default: V3/V4/V4.2 splits")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON audit output")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Near-duplicate similarity threshold")
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 = inline)")
+    args = parser.parse_args()
+
+    splits = dict(s.split("=", 1) for s in args.split) if args.split else discover_splits()
+    if not splits:
+        print("Error: no splits found.")
+        return
+
+    start = time.time()
+    audit = audit_splits(splits, threshold=args.threshold, num_perm=args.num_perm, bands=args.bands, workers=args.workers)
+    audit["seconds"] = round(time.time() - start, 2)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(audit, f, ensure_ascii=False, indent=2)
+
+    print(f"\n--- Dataset Audit ({audit['seconds']}s) ---")
+    for name, stats in audit["splits"].items():
+        print(f"{name}: {stats['records']} records, leakage {sum(stats['leakage'].values())}, "
+              f"exact dups {stats['exact_duplicates']}, near dups {stats['near_duplicates']}")
+    for name, entry in audit["train_eval_leakage"].items():
+        print(f"⚠️ {name}: {entry['records']} eval records near-duplicate train records ({entry['ratio']:.1%})")
+    print(f"Status: {'✅ CLEAN' if audit['clean'] else '❌ ISSUES FOUND'}")
+    print(f"Audit saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Deep Search Benchmark
+=====================
+Purpose:
+    Measure the Layer 3 local search engine (DeepSearch) on a synthetic tree:
+    cold crawl, no-op re-crawl, incremental watcher batch and query latency.
+
+Usage:
+    python scripts/benchmark_deep_search.py                  # 200k files
+    python scripts/benchmark_deep_search.py --files 20000 --content-every 50
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from haitham_voice_agent.tools.system_awareness.deep_search import DeepSearch
+
+WORDS = [
+    "invoice", "report", "contract", "roadmap", "budget", "meeting", "notes", "draft",
+    "final", "proposal", "summary", "design", "client", "project", "plan", "review",
+    "فاتورة", "تقرير", "عقد", "ميزانية", "اجتماع",
+]
+EXTS = [".txt", ".md", ".pdf", ".docx", ".xlsx", ".png", ".csv"]
+
+
+def build_tree(root: Path, files: int, fanout: int, content_every: int, seed: int = 42) -> None:
+    """Create `files` files spread over nested folders; every Nth text file gets content"""
+    rng = random.Random(seed)
+    per_dir = max(1, files // fanout)
+    created = 0
+    d = 0
+    while created < files:
+        folder = root / f"area_{d % 20}" / f"dept_{d % 97}" / f"batch_{d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        for _ in range(min(per_dir, files - created)):
+            name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{created}{rng.choice(EXTS)}"
+            path = folder / name
+            if content_every and created % content_every == 0 and path.suffix in (".txt", ".md", ".csv"):
+                path.write_text(" ".join(rng.choice(WORDS) for _ in range(60)), encoding="utf-8")
+            else:
+                path.touch()
+            created += 1
+        d += 1
+    # Noise the crawler must skip
+    (root / "node_modules" / "pkg").mkdir(parents=True, exist_ok=True)
+    (root / "node_modules" / "pkg" / "invoice.txt").write_text("ignored")
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DeepSearch local engine")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--fanout", type=int, default=2000, help="Number of leaf folders")
+    parser.add_argument("--content-every", type=int, default=20, help="Write text content into every Nth file")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tree")
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="hva_deep_search_bench_"))
+    root = work / "tree"
+    try:
+        print(f"Building synthetic tree with {args.files:,} files in {root} ...")
+        _, t_build = timed(build_tree, root, args.files, args.fanout, args.content_every)
+        print(f"  built in {t_build:.1f}s")
+
+        engine = DeepSearch(db_path=str(work / "deep_search.db"), roots=[str(root)], workers=args.workers)
+
+        stats, t_cold = timed(engine.crawl)
+        print(f"Cold crawl:      {t_cold:7.2f}s  {stats}  ({stats['scanned'] / t_cold:,.0f} entries/s)")
+
+        stats, t_warm = timed(engine.crawl)
+        print(f"No-op re-crawl:  {t_warm:7.2f}s  {stats}")
+
+        # Simulate a git checkout touching 200 files
+        touched = {}
+        candidates = [p for p in sorted(root.glob("area_1/*/*/*")) if p.suffix in (".txt", ".md", ".csv")]
+        for i, path in enumerate(candidates[:200]):
+            path.write_text(f"checkout change {i} roadmap", encoding="utf-8")
+            touched[str(path)] = "modified"
+        n, t_inc = timed(engine.apply_changes, touched)
+        print(f"Watcher batch:   {t_inc * 1000:7.1f}ms for {n} changes")
+
+        rng = random.Random(7)
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.sample(WORDS, k=rng.choice([1, 2])))
+            _, t_q = timed(engine.search, query, 20)
+            latencies.append(t_q * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"Queries:         median {statistics.median(latencies):.2f}ms  p95 {p95:.2f}ms  (n={len(latencies)})")
+
+        _, t_scoped = timed(engine.search, "invoice", 20, str(root / "area_3"))
+        print(f"Scoped query:    {t_scoped * 1000:.2f}ms (only_in=area_3)")
+        engine.close()
+    finally:
+        if args.keep:
+            print(f"Tree kept at {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Style Model Generation Benchmark
+================================
+Purpose:
+    Throughput (generated tokens/s) versus concurrent users on CPU for the
+    old behaviour (one request at a time behind a lock, max_batch_size=1)
+    and the batching GenerationScheduler used by infer_haithm_style_core.
+
+    By default a small randomly initialised Qwen2 model is used, so the run
+    needs only the tokenizer download and finishes in minutes on a laptop;
+    pass --model to benchmark real weights.
+
+Usage:
+    python scripts/benchmark_generation_batching.py
+    python scripts/benchmark_generation_batching.py --users 1 2 4 8 --tokens 64
+    python scripts/benchmark_generation_batching.py --model Qwen/Qwen2.5-0.5B-Instruct
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+from finetune.haithm_style.generation_scheduler import GenerationScheduler
+from finetune.haithm_style.infer_haithm_style_core import BASE_MODEL_NAME, make_batch_runner
+
+PROMPTS = [
+    "اكتب رسالة قصيرة لفريق العمل عن موعد الاجتماع",
+    "Summarize the plan for next week in two sentences",
+    "رد على العميل بخصوص تأخير الشحنة",
+    "Draft a friendly reminder about the invoice",
+]
+
+
+def load(args):
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer, trust_remote_code=True)
+    if args.model:
+        model = AutoModelForCausalLM.from_pretrained(args.model, torch_dtype=torch.float32, trust_remote_code=True)
+    else:
+        config = AutoConfig.from_pretrained(args.tokenizer, trust_remote_code=True)
+        config.hidden_size = 256
+        config.intermediate_size = 704
+        config.num_hidden_layers = 4
+        config.num_attention_heads = 8
+        config.num_key_value_heads = 2
+        torch.manual_seed(0)
+        model = AutoModelForCausalLM.from_config(config)
+    model.eval()
+    # Random weights rarely emit EOS: every request generates exactly --tokens
+    model.generation_config.eos_token_id = tokenizer.eos_token_id
+    return model, tokenizer
+
+
+def run_level(scheduler, tokenizer, users: int, rounds: int, tokens: int):
+    latencies, generated = [], []
+    lock = threading.Lock()
+
+    def user(index):
+        for r in range(rounds):
+            messages = [{"role": "user", "content": PROMPTS[(index + r) % len(PROMPTS)]}]
+            prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            request = scheduler.submit(prompt, mode="base", max_new_tokens=tokens)
+            request.future.result()
+            with lock:
+                latencies.append(request.duration)
+                generated.append(request.new_tokens)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sum(generated) / elapsed, statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="pretrained model id/path (default: tiny random Qwen2)")
+    parser.add_argument("--tokenizer", default=BASE_MODEL_NAME)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=2, help="requests per user")
+    parser.add_argument("--tokens", type=int, default=48, help="max_new_tokens per request")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model, tokenizer = load(args)
+    run_batch = make_batch_runner(model, tokenizer, device="cpu")
+    print(f"Model: {args.model or 'tiny random Qwen2'}  torch threads: {torch.get_num_threads()}  "
+          f"max_new_tokens: {args.tokens}  rounds/user: {args.rounds}\n")
+
+    # Warm up kernels and the tokenizer
+    warmup = GenerationScheduler(run_batch, max_batch_size=1)
+    warmup.submit("warm up", mode="base", max_new_tokens=4).future.result()
+
+    print(f"{'users':>5}  {'serial tok/s':>12}  {'batched tok/s':>13}  {'speedup':>7}  "
+          f"{'serial lat':>10}  {'batched lat':>11}")
+    for users in args.users:
+        serial = GenerationScheduler(run_batch, max_batch_size=1, max_wait=0)
+        batched = GenerationScheduler(run_batch, max_batch_size=max(args.users), max_wait=0.02)
+        serial_tps, serial_lat = run_level(serial, tokenizer, users, args.rounds, args.tokens)
+        batched_tps, batched_lat = run_level(batched, tokenizer, users, args.rounds, args.tokens)
+        print(f"{users:>5}  {serial_tps:>12.1f}  {batched_tps:>13.1f}  x{batched_tps / serial_tps:>6.2f}  "
+              f"{serial_lat:>9.2f}s  {batched_lat:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+IMAP Fetch Benchmark
+====================
+Purpose:
+    Compare the old IMAP listing (SEARCH ALL + one FETCH (RFC822) per message)
+    with IMAPHandler's pipelined header-only FETCH against the local IMAP test
+    server, with a simulated network round trip per command.
+
+Usage:
+    python scripts/benchmark_imap_fetch.py                     # 2000 msgs, 20ms RTT
+    python scripts/benchmark_imap_fetch.py --messages 10000 --latency 0.05 --limit 50
+"""
+
+import argparse
+import asyncio
+import imaplib
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "haitham_voice_agent" / "tests"))
+
+from haitham_voice_agent.tools.gmail import imap_handler
+from haitham_voice_agent.tools.gmail.imap_handler import IMAPHandler
+from imap_test_server import LocalIMAPServer, make_message
+
+
+def connect(port: int) -> imaplib.IMAP4:
+    conn = imaplib.IMAP4("127.0.0.1", port)
+    conn.login("me@example.com", "secret")
+    return conn
+
+
+def legacy_latest(conn: imaplib.IMAP4, limit: int) -> int:
+    """The previous fetch_latest_email loop"""
+    conn.select("INBOX")
+    _, data = conn.search(None, "ALL")
+    ids = data[0].split()
+    ids.reverse()
+    count = 0
+    for msg_id in ids[:limit]:
+        _, msg_data = conn.fetch(msg_id, "(RFC822)")
+        if msg_data and isinstance(msg_data[0], tuple):
+            count += 1
+    return count
+
+
+def make_handler(port: int) -> IMAPHandler:
+    imap_handler.get_credential_store = lambda: None
+    handler = IMAPHandler()
+    handler.connection = connect(port)
+    handler.last_connection_time = time.time()
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--body-size", type=int, default=20000, help="bytes of body text per message")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per command round trip")
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args()
+
+    with LocalIMAPServer() as server:
+        for i in range(1, args.messages + 1):
+            subject = f"Invoice {i}" if i % 10 == 0 else None
+            server.mailbox.append(make_message(i, subject=subject, body_size=args.body_size))
+        server.latency = args.latency
+        print(f"Mailbox: {args.messages} messages, ~{args.body_size // 1000} KB bodies, "
+              f"{args.latency * 1000:.0f} ms per round trip, limit={args.limit}\n")
+
+        conn = connect(server.port)
+        server.commands.clear()
+        start = time.perf_counter()
+        count = legacy_latest(conn, args.limit)
+        legacy = time.perf_counter() - start
+        print(f"legacy  SEARCH ALL + per-message RFC822: {legacy * 1000:8.1f} ms  "
+              f"({len(server.commands)} commands, {count} messages)")
+        conn.logout()
+
+        handler = make_handler(server.port)
+
+        async def run():
+            server.commands.clear()
+            start = time.perf_counter()
+            latest = await handler.fetch_latest_email(limit=args.limit)
+            latest_time = time.perf_counter() - start
+            latest_commands = len(server.commands)
+
+            server.commands.clear()
+            start = time.perf_counter()
+            found = await handler.search_emails("invoice", limit=args.limit)
+            search_time = time.perf_counter() - start
+            search_commands = len(server.commands)
+
+            server.commands.clear()
+            start = time.perf_counter()
+            await handler.get_email_by_id(latest["emails"][0]["id"])
+            body_time = time.perf_counter() - start
+
+            print(f"handler fetch_latest_email (headers):  {latest_time * 1000:8.1f} ms  "
+                  f"({latest_commands} commands, {latest['count']} messages)  "
+                  f"x{legacy / latest_time:.1f}")
+            print(f"handler search_emails (UID SEARCH):    {search_time * 1000:8.1f} ms  "
+                  f"({search_commands} commands, {found['count']} messages)")
+            print(f"handler get_email_by_id (body):        {body_time * 1000:8.1f} ms  "
+                  f"({len(server.commands)} commands)")
+
+        asyncio.run(run())
+        handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Ingestion Benchmark
+============================
+Purpose:
+    Lines/s on a synthetic WhatsApp export (default 1M lines split across
+    several chat ZIPs) for:
+    - legacy: the old per-line approach (two regexes per line, every ZIP
+      read serially, messages collected in a list and written at the end;
+      continuation lines, AM/PM and Arabic-digit headers are missed)
+    - streaming, 1 worker: one compiled matcher + multi-line merge
+    - streaming, N workers: ZIPs processed in parallel
+
+    The synthetic export mixes iOS and Android headers, Arabic-Indic
+    digits, AM/PM times, system events and multi-line messages.
+
+Usage:
+    python scripts/benchmark_whatsapp_ingest.py
+    python scripts/benchmark_whatsapp_ingest.py --lines 200000 --chats 4 --workers 4
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from ingest_whatsapp_haithm_only import ingest_zips, is_haithm, is_system_message
+
+SENDERS = ["Haitham Hamadneh", "Tohami", "مروان الترك", "~ Salma"]
+TEXTS = [
+    "هلا حبيب", "تمام، نلتقي بكرا الساعة ٥", "Sure, sending the file now", "وصلتك",
+    "Let's review the plan tomorrow", "ابعث الصورة طيب", "\u200eimage omitted",
+]
+TO_ARABIC = str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩")
+
+
+def synthetic_lines(count, rng):
+    written = 0
+    while written < count:
+        day, month, hour, minute = rng.randint(1, 28), rng.randint(1, 12), rng.randint(0, 23), rng.randint(0, 59)
+        kind = rng.random()
+        if kind < 0.45:
+            header = f"[{day:02d}/{month:02d}/2024, {hour:02d}:{minute:02d}:{rng.randint(0, 59):02d}] "
+        elif kind < 0.8:
+            header = f"{day}/{month}/24, {hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'} - "
+        else:
+            header = f"{day:02d}/{month:02d}/2024, {hour:02d}:{minute:02d} - ".translate(TO_ARABIC)
+        if rng.random() < 0.03:
+            yield header + "Messages and calls are end-to-end encrypted."
+            written += 1
+            continue
+        yield f"{header}{rng.choice(SENDERS)}: {rng.choice(TEXTS)}"
+        written += 1
+        for _ in range(rng.choice([0, 0, 0, 0, 1, 2])):  # Multi-line messages
+            yield rng.choice(TEXTS)
+            written += 1
+
+
+def build_exports(directory, lines, chats, seed=7):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(chats):
+        path = directory / f"WhatsApp Chat - Synthetic {i}.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("_chat.txt", "\n".join(synthetic_lines(lines // chats, rng)) + "\n")
+        paths.append(path)
+    return paths
+
+
+# --- Old behaviour (for comparison) ---
+LEGACY_ANDROID = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2})\s-\s([^:]+): (.*)$')
+LEGACY_IOS = re.compile(r'^\[(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2}:?\d{0,2})\]\s([^:]+): (.*)$')
+
+
+def legacy_ingest(zip_files, out_path):
+    messages, lines = [], 0
+    for zip_path in zip_files:
+        with zipfile.ZipFile(zip_path) as z, z.open("_chat.txt") as f:
+            for line_bytes in f:
+                lines += 1
+                line = line_bytes.decode("utf-8").strip().replace("\u200e", "").replace("\u200f", "")
+                match = LEGACY_ANDROID.match(line) or LEGACY_IOS.match(line)
+                if match and is_haithm(match.group(2)) and not is_system_message(match.group(3)):
+                    timestamp, _, text = match.groups()
+                    messages.append({"id": str(uuid.uuid4()), "source_path": zip_path.name,
+                                     "source_type": "whatsapp_chat", "role": "user", "sender": "haithm",
+                                     "chat_name": zip_path.stem, "timestamp": timestamp, "text": text})
+    with open(out_path, "w", encoding="utf-8") as out:
+        for message in messages:
+            out.write(json.dumps(message, ensure_ascii=False) + "\n")
+    return lines, len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WhatsApp export ingestion")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--chats", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print(f"🔹 Building {args.chats} synthetic exports, {args.lines:,} lines...")
+        zips = build_exports(tmp, args.lines, args.chats)
+
+        start = time.time()
+        lines, found = legacy_ingest(zips, tmp / "legacy.jsonl")
+        legacy = time.time() - start
+        print(f"legacy            : {legacy:6.2f}s  {lines / legacy:>10,.0f} lines/s  {found:,} Haithm messages")
+
+        for workers in sorted({1, args.workers}):
+            start = time.time()
+            stats = ingest_zips(zips, tmp / f"out_{workers}.jsonl", workers)
+            elapsed = time.time() - start
+            lines = sum(s["lines"] for s in stats)
+            found = sum(s["haithm_messages"] for s in stats)
+            print(f"streaming, {workers:>2} wkr : {elapsed:6.2f}s  {lines / elapsed:>10,.0f} lines/s  "
+                  f"{found:,} Haithm messages  ({legacy / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,9 +23,14 @@ import argparse
 import re
 import collections
 import statistics
+import os
+import sys
 import shutil
 from pathlib import Path
 
+sys.path.append(os.getcwd())
+from finetune.dataset_audit import PatternSet
+
 # --- Configuration & Heuristics ---
 NATURAL_INSTRUCTION = "You are Haithm. Write in Haithm's natural style: concise, realistic, truth-first, no flattery, focus on practical value, mixing Arabic/English when natural."
 PROMPT_INSTRUCTION = "You are Haithm writing system-level instructions and prompt-engineering guidelines. Use precise, strict rules, numbered lists, and clear constraints."
@@ -43,6 +48,7 @@ PROMPT_PATTERNS = [
     r"(?i)do not reveal",
     r"(?i)you must always"
 ]
+PROMPT_RE = PatternSet(PROMPT_PATTERNS)
 
 # Patterns that suggest junk/trivial content
 JUNK_PATTERNS = [
@@ -85,11 +91,7 @@ def classify_record(text, min_natural=200, max_natural=4000, min_prompt=150):
         return "SKIP"
         
     # 2. Check for Prompt Patterns
-    is_prompt_style = False
-    for pat in PROMPT_PATTERNS:
-        if re.search(pat, text):
-            is_prompt_style = True
-            break
+    is_prompt_style = PROMPT_RE.search(text)
             
     # Heuristic: numbered lists near start (e.g. "1. ", "2. ") often imply instructions
     if re.search(r"(?m)^\s*\d+\.\s+", text[:500]): 
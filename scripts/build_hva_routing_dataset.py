@@ -7,23 +7,45 @@ Purpose:
     Extracts (User Request -> JSON Classification) pairs from HVA logs
     to build a fine-tuning dataset for Qwen 2.5.
 
+    Mining is incremental: a state DB next to the output keeps a byte
+    cursor per log file (keyed by inode, so rotated/renamed logs resume
+    where they stopped and truncated logs restart), the inputs still waiting
+    for their output, and the hashes of every pair already written. A run
+    only reads lines appended since the last run and appends new pairs.
+    Each cursor also records a hash of the file's first line, so a new
+    file that reuses a deleted log's inode is read from the start; cursors
+    of logs that no longer exist are dropped.
+
 Usage:
-    python scripts/build_hva_routing_dataset.py [--force] [--output <path>]
+    python scripts/build_hva_routing_dataset.py               # incremental refresh
+    python scripts/build_hva_routing_dataset.py --force       # rebuild from scratch
+    python scripts/build_hva_routing_dataset.py --dry-run     # scan only, write nothing
+    python scripts/build_hva_routing_dataset.py --logs ~/.hva/logs/hva.log* --output <path>
 
 Note:
-    This script parses two logging patterns:
+    This script parses three logging patterns:
     1. Legacy: "Command (Raw):" ... "DEBUG: classification =" (Requires debug/verbose logs)
-    2. Standard: "ROUTING INPUT:" ... "ROUTING OUTPUT:" (Always enabled via Config.LOG_ROUTING_CLASSIFICATIONS)
+    2. Standard: "ROUTING INPUT:" ... "ROUTING OUTPUT:" (paired by adjacency)
+    3. Correlated: "ROUTING INPUT [id]:" ... "ROUTING OUTPUT [id]:" (paired by request id,
+       so interleaved concurrent requests are matched correctly)
+
+Limitation:
+    Adjacency pairing (patterns 1 and 2) is per file (inode). An untagged
+    input at the end of hva.log.1 cannot pair with an output at the start of
+    the new hva.log after a rotation; that pair is lost. Tagged pairs (3)
+    match across rotations.
 """
 
+import os
 import re
+import ast
 import json
+import hashlib
+import sqlite3
 import argparse
 import logging
-import ast
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 # Setup logging
 logging.basicConfig(
@@ -35,199 +57,370 @@ logger = logging.getLogger("DatasetBuilder")
 # Constants
 DEFAULT_LOG_PATH = Path.home() / ".hva" / "logs" / "hva.log"
 DEFAULT_OUTPUT_PATH = Path("data/dataset_hva_qwen_routing.jsonl")
+MAX_PENDING = 1000  # Unanswered inputs kept between runs
 
 SYSTEM_INSTRUCTION = (
     "You are the HVA Local Classifier. Given the user input, "
     "return ONLY a JSON object that matches the routing schema."
 )
 
+# Log format: 2025-12-01 11:01:52,223 - logger - LEVEL - Message
+LOG_LINE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - \S+ - [A-Z]+ - (.*)$")
+ROUTING_RE = re.compile(r"^ROUTING (INPUT|OUTPUT)(?: \[(\w+)\])?: (.*)")
+LEGACY_COMMAND_RE = re.compile(r"Command \(Raw\): (.*)")
+LEGACY_CLASSIFICATION_RE = re.compile(r"DEBUG: classification = (\{.*\})")
+
+
+def pair_hash(input_text: str, classification_json: str) -> str:
+    return hashlib.sha256(f"{input_text}\n{classification_json}".encode("utf-8")).hexdigest()
+
+
+def normalize_classification(output_text_or_dict) -> str:
+    """Normalize a logged classification (JSON or Python dict repr) to a JSON string"""
+    if isinstance(output_text_or_dict, dict):
+        return json.dumps(output_text_or_dict, ensure_ascii=False)
+    try:
+        data = json.loads(output_text_or_dict)
+    except json.JSONDecodeError:
+        # Python dict strings in legacy logs
+        data = ast.literal_eval(output_text_or_dict)
+    return json.dumps(data, ensure_ascii=False)
+
+
+class MinerState:
+    """
+    Persistent mining state (SQLite)
+
+    - cursors: (device, inode) -> byte offset of the next unread line, plus
+      a hash of the file's first line (detects a reused inode)
+    - pending: inputs whose output has not been seen yet (keyed by request
+      id, or per file for adjacency-paired formats)
+    - seen: hashes of pairs already written (persistent dedup)
+    - meta: output size at the last commit (a crash between writing rows and
+      committing the cursors is undone by truncating to it)
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cursors (
+                    file_id TEXT PRIMARY KEY,   -- device:inode
+                    path TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    head TEXT                   -- sha256 of the first line
+                );
+                CREATE TABLE IF NOT EXISTS pending (
+                    key TEXT PRIMARY KEY,
+                    input TEXT NOT NULL,
+                    ts TEXT,
+                    legacy INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS seen (
+                    hash TEXT PRIMARY KEY
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cursors)")}
+            if "head" not in columns:  # State DBs from before head hashes
+                conn.execute("ALTER TABLE cursors ADD COLUMN head TEXT")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def reset(self):
+        db = self._db()
+        for table in ("cursors", "pending", "seen", "meta"):
+            db.execute(f"DELETE FROM {table}")
+
+    def cursor(self, file_id: str) -> Tuple[int, Optional[str]]:
+        """(offset, first-line hash) for a file, (0, None) if never read"""
+        row = self._db().execute("SELECT offset, head FROM cursors WHERE file_id = ?", (file_id,)).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def set_cursor(self, file_id: str, path: str, offset: int, head: Optional[str]):
+        self._db().execute(
+            "INSERT INTO cursors (file_id, path, offset, head) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(file_id) DO UPDATE SET path = excluded.path, offset = excluded.offset, head = excluded.head",
+            (file_id, path, offset, head)
+        )
+
+    def prune_cursors(self) -> List[str]:
+        """Drop cursors whose log no longer exists; returns their file ids"""
+        db = self._db()
+        gone = [file_id for file_id, path in db.execute("SELECT file_id, path FROM cursors")
+                if not os.path.exists(path)]
+        db.executemany("DELETE FROM cursors WHERE file_id = ?", [(file_id,) for file_id in gone])
+        return gone
+
+    def load_pending(self) -> Dict[str, Tuple[str, Optional[str], bool]]:
+        rows = self._db().execute("SELECT key, input, ts, legacy FROM pending ORDER BY rowid")
+        return {key: (text, ts, bool(legacy)) for key, text, ts, legacy in rows}
+
+    def save_pending(self, pending: Dict[str, Tuple[str, Optional[str], bool]]):
+        db = self._db()
+        db.execute("DELETE FROM pending")
+        db.executemany(
+            "INSERT INTO pending (key, input, ts, legacy) VALUES (?, ?, ?, ?)",
+            [(key, text, ts, int(legacy)) for key, (text, ts, legacy) in list(pending.items())[-MAX_PENDING:]]
+        )
+
+    def mark_seen(self, digest: str) -> bool:
+        """True if the hash is new"""
+        return self._db().execute("INSERT OR IGNORE INTO seen (hash) VALUES (?)", (digest,)).rowcount == 1
+
+    def output_size(self) -> Optional[int]:
+        row = self._db().execute("SELECT value FROM meta WHERE key = 'output_size'").fetchone()
+        return int(row[0]) if row else None
+
+    def set_output_size(self, size: int):
+        self._db().execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('output_size', ?)", (str(size),))
+
+    def commit(self):
+        self._db().commit()
+
+    def rollback(self):
+        self._db().rollback()
+
+
 class DatasetBuilder:
-    def __init__(self, log_path: Path, output_path: Path, force: bool):
-        self.log_path = log_path
-        self.output_path = output_path
+    def __init__(self, log_paths: List[Path], output_path: Path, force: bool = False,
+                 dry_run: bool = False, state_path: Optional[Path] = None):
+        self.log_paths = [Path(p) for p in ([log_paths] if isinstance(log_paths, (str, Path)) else log_paths)]
+        self.output_path = Path(output_path)
         self.force = force
-        self.pairs = []
+        self.dry_run = dry_run
+        self.state = MinerState(state_path or self.output_path.with_suffix(".state.db"))
+        self.pairs = []  # Pairs added in this run
+        self.pending = {}
         self.stats = {
+            "files": 0,
+            "bytes_read": 0,
             "lines_scanned": 0,
             "legacy_pairs": 0,
             "new_pairs": 0,
+            "duplicates": 0,
+            "pending": 0,
             "errors": 0
         }
 
     def parse_log_line(self, line: str) -> tuple:
         """Extract timestamp and content from log line."""
-        # Log format: 2025-12-01 11:01:52,223 - logger - LEVEL - Message
-        match = re.match(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - .* - (.*)$", line)
+        match = LOG_LINE_RE.match(line)
         if match:
             return match.group(1), match.group(2)
         return None, line
 
-    def add_pair(self, input_text: str, output_text_or_dict: str, ts_str: str, is_legacy: bool):
-        """Add a valid pair/row to the dataset."""
+    def add_pair(self, input_text: str, output_text_or_dict, ts_str: str, is_legacy: bool, source: str):
+        """Add a valid pair/row to the dataset (skipped if any earlier run already wrote it)."""
         try:
-            # Normalize output to valid JSON string
-            if isinstance(output_text_or_dict, dict):
-                classification_json = json.dumps(output_text_or_dict, ensure_ascii=False)
-            else:
-                # If it's a string, try JSON parse first
-                try:
-                    # Try pure JSON first
-                    data = json.loads(output_text_or_dict)
-                    classification_json = json.dumps(data, ensure_ascii=False)
-                except json.JSONDecodeError:
-                    # If failed, try ast.literal_eval (for python dict strings in logs)
-                    data = ast.literal_eval(output_text_or_dict)
-                    classification_json = json.dumps(data, ensure_ascii=False)
-            
-            # Simple deduplication check based on input+output
-            # This is O(N) but fine for usually small log datasets.
-            for p in self.pairs:
-                if p["input"] == input_text and p["output"] == classification_json:
-                    return # Duplicate
-
-            self.pairs.append({
-                "instruction": SYSTEM_INSTRUCTION,
-                "input": input_text,
-                "output": classification_json,
-                "metadata": {
-                    "timestamp": ts_str,
-                    "source": self.log_path.name,
-                    "format_version": "v1_legacy" if is_legacy else "v2_structured"
-                }
-            })
-            
-            if is_legacy:
-                self.stats["legacy_pairs"] += 1
-            else:
-                self.stats["new_pairs"] += 1
-                
+            classification_json = normalize_classification(output_text_or_dict)
         except Exception as e:
             logger.warning(f"Failed to parse pair at {ts_str}: {e}")
             self.stats["errors"] += 1
+            return
 
-    def scan_logs(self):
-        """Scan logs and extract pairs."""
-        if not self.log_path.exists():
-            logger.error(f"Log file not found: {self.log_path}")
+        if not self.state.mark_seen(pair_hash(input_text, classification_json)):
+            self.stats["duplicates"] += 1
+            return
+
+        self.pairs.append({
+            "instruction": SYSTEM_INSTRUCTION,
+            "input": input_text,
+            "output": classification_json,
+            "metadata": {
+                "timestamp": ts_str,
+                "source": source,
+                "format_version": "v1_legacy" if is_legacy else "v2_structured"
+            }
+        })
+
+        if is_legacy:
+            self.stats["legacy_pairs"] += 1
+        else:
+            self.stats["new_pairs"] += 1
+
+    def handle_content(self, content: str, ts_str: Optional[str], file_id: str, source: str):
+        """Pair one log message with the pending inputs."""
+        routing = ROUTING_RE.match(content)
+        if routing:
+            kind, request_id, value = routing.groups()
+            # Without an id the output pairs with the last input in the same file
+            key = f"id:{request_id}" if request_id else f"adjacent:{file_id}"
+            if kind == "INPUT":
+                self.pending[key] = (value.strip(), ts_str, False)
+            elif key in self.pending:
+                input_text, _, _ = self.pending.pop(key)
+                self.add_pair(input_text, value.strip(), ts_str, is_legacy=False, source=source)
             return
 
-        logger.info(f"Scanning {self.log_path}...")
-        
-        # State tracking for multi-line extraction
-        last_legacy_command = None
-        
-        last_routing_input = None
-        
-        with open(self.log_path, "r", encoding="utf-8", errors="replace") as f:
-            for line in f:
+        # Legacy debug logging: Command (Raw): <text> ... DEBUG: classification = <dict>
+        command = LEGACY_COMMAND_RE.search(content)
+        if command:
+            self.pending[f"legacy:{file_id}"] = (command.group(1).strip(), ts_str, True)
+            self.pending.pop(f"adjacent:{file_id}", None)  # Safety reset if mixed
+            return
+
+        classification = LEGACY_CLASSIFICATION_RE.search(content)
+        if classification and f"legacy:{file_id}" in self.pending:
+            input_text, _, _ = self.pending.pop(f"legacy:{file_id}")
+            self.add_pair(input_text, classification.group(1), ts_str, is_legacy=True, source=source)
+
+    @staticmethod
+    def head_hash(f) -> Optional[str]:
+        """sha256 of the file's first complete line (None while there is none)"""
+        f.seek(0)
+        first = f.readline()
+        return hashlib.sha256(first).hexdigest() if first.endswith(b"\n") else None
+
+    def forget_file(self, file_id: str):
+        """Drop adjacency-paired inputs that belonged to a file that is gone"""
+        for key in (f"adjacent:{file_id}", f"legacy:{file_id}"):
+            self.pending.pop(key, None)
+
+    def scan_file(self, path: Path):
+        """Stream the lines appended to one log file since its cursor."""
+        st = path.stat()
+        file_id = f"{st.st_dev}:{st.st_ino}"
+        offset, head = self.state.cursor(file_id)
+
+        with open(path, "rb") as f:
+            current_head = self.head_hash(f)
+            if offset and head is not None and head != current_head:
+                logger.info(f"{path} reuses the inode of a deleted log, scanning from the start")
+                self.forget_file(file_id)
+                offset = 0
+            elif offset > st.st_size:
+                logger.info(f"{path} was truncated, rescanning from the start")
+                offset = 0
+            if offset == st.st_size:
+                self.state.set_cursor(file_id, str(path), offset, current_head)
+                return
+
+            self.stats["files"] += 1
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Partial line still being written; picked up next run
+                offset += len(raw)
+                self.stats["bytes_read"] += len(raw)
                 self.stats["lines_scanned"] += 1
-                ts_str, content = self.parse_log_line(line.strip())
-                if not content: continue
-
-                # --- PATTERN 1: NEW STRUCTURED LOGGING ---
-                # ROUTING INPUT: <text>
-                # ROUTING OUTPUT: <json>
-                
-                # Check Input
-                input_match = re.search(r"^ROUTING INPUT: (.*)", content)
-                if input_match:
-                    last_routing_input = input_match.group(1).strip()
-                    continue
-                
-                # Check Output (must follow Input immediately or closely)
-                output_match = re.search(r"^ROUTING OUTPUT: (.*)", content)
-                if output_match and last_routing_input:
-                    json_str = output_match.group(1).strip()
-                    self.add_pair(last_routing_input, json_str, ts_str, is_legacy=False)
-                    last_routing_input = None # Reset
-                    continue
-
-                # --- PATTERN 2: LEGACY DEBUG LOGGING ---
-                # Command (Raw): <text>
-                # ...
-                # DEBUG: classification = <dict>
-                
-                cmd_match = re.search(r"Command \(Raw\): (.*)", content)
-                if cmd_match:
-                    last_legacy_command = cmd_match.group(1).strip()
-                    last_routing_input = None # Safety reset if mixed
-                    continue
-                
-                cls_match = re.search(r"DEBUG: classification = (\{.*\})", content)
-                if cls_match and last_legacy_command:
-                    dict_str = cls_match.group(1)
-                    self.add_pair(last_legacy_command, dict_str, ts_str, is_legacy=True)
-                    last_legacy_command = None
-                    continue
+                ts_str, content = self.parse_log_line(raw.decode("utf-8", errors="replace").strip())
+                if content:
+                    self.handle_content(content, ts_str, file_id, path.name)
+        self.state.set_cursor(file_id, str(path), offset, current_head)
+
+    def scan_logs(self):
+        """Scan new log lines and extract pairs."""
+        paths = [p for p in self.log_paths if p.exists()]
+        if not paths:
+            logger.error(f"Log file not found: {', '.join(map(str, self.log_paths))}")
+            return
+
+        if not self.force and not self.output_path.exists() and self.state.output_size() is not None:
+            logger.warning(f"{self.output_path} is missing, rebuilding from scratch")
+            self.force = True
+        if self.force:
+            self.state.reset()
+        self.pending = self.state.load_pending()
+        for file_id in self.state.prune_cursors():
+            self.forget_file(file_id)
+
+        # Oldest first, so rotated files are read before the live log
+        for path in sorted(paths, key=lambda p: p.stat().st_mtime):
+            logger.info(f"Scanning {path}...")
+            self.scan_file(path)
+
+        self.stats["pending"] = len(self.pending)
+        self.state.save_pending(self.pending)
 
     def preview_data(self):
         """Show sample data."""
         if not self.pairs:
-            logger.warning("No pairs extracted.")
+            logger.warning("No new pairs extracted.")
             return
-            
+
         logger.info("\n--- Sample Pair ---")
-        sample = self.pairs[-1] # Show latest
+        sample = self.pairs[-1]  # Show latest
         logger.info(f"Input:  {sample['input']}")
         logger.info(f"Output: {sample['output']}")
         logger.info(f"Meta:   {sample['metadata']}")
         logger.info("-------------------\n")
 
     def save_dataset(self):
-        """Write to JSONL."""
-        if not self.pairs:
-            return
-
-        # Check for existing file
-        if self.output_path.exists() and not self.force:
-            logger.warning(f"Output file exists: {self.output_path}")
-            logger.warning("Use --force to overwrite. Skipping save.")
-            return
-
-        logger.info(f"Writing {len(self.pairs)} rows to {self.output_path}...")
-        
-        # Create parent dir
+        """Append the new pairs to the JSONL output, then commit the cursors."""
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(self.output_path, "w", encoding="utf-8") as f:
+        committed = self.state.output_size()
+        if not self.force and committed is not None and self.output_path.stat().st_size > committed:
+            # Drop rows written by a run that died before committing its state
+            logger.warning(f"Discarding uncommitted rows at the end of {self.output_path}")
+            os.truncate(self.output_path, committed)
+
+        with open(self.output_path, "w" if self.force else "a", encoding="utf-8") as f:
             for pair in self.pairs:
                 f.write(json.dumps(pair, ensure_ascii=False) + "\n")
-        
-        logger.info("✅ Dataset saved successfully.")
+            f.flush()
+            os.fsync(f.fileno())
+        self.state.set_output_size(self.output_path.stat().st_size)
+        self.state.commit()
+
+        if self.pairs:
+            logger.info(f"✅ Appended {len(self.pairs)} rows to {self.output_path}")
 
     def run(self):
-        self.scan_logs()
-        
-        logger.info("\n=== Analysis Report ===")
-        logger.info(f"Lines Scanned:    {self.stats['lines_scanned']}")
-        logger.info(f"Legacy Pairs:     {self.stats['legacy_pairs']}")
-        logger.info(f"New Pairs:        {self.stats['new_pairs']}")
-        logger.info(f"Total Valid:      {len(self.pairs)}")
-        logger.info(f"Parse Errors:     {self.stats['errors']}")
-        logger.info("=======================\n")
-        
-        self.preview_data()
-        
-        # Only save if we found data
-        if len(self.pairs) > 0:
-            if self.force:
-                self.save_dataset()
+        try:
+            self.scan_logs()
+
+            logger.info("\n=== Analysis Report ===")
+            logger.info(f"Files Read:       {self.stats['files']}")
+            logger.info(f"Bytes Read:       {self.stats['bytes_read']}")
+            logger.info(f"Lines Scanned:    {self.stats['lines_scanned']}")
+            logger.info(f"Legacy Pairs:     {self.stats['legacy_pairs']}")
+            logger.info(f"New Pairs:        {self.stats['new_pairs']}")
+            logger.info(f"Duplicates:       {self.stats['duplicates']}")
+            logger.info(f"Awaiting Output:  {self.stats['pending']}")
+            logger.info(f"Parse Errors:     {self.stats['errors']}")
+            logger.info("=======================\n")
+
+            self.preview_data()
+
+            if self.dry_run:
+                self.state.rollback()
+                logger.info("Dry run complete. Nothing written.")
             else:
-                logger.info("Dry run complete. Use --force to save data.")
-        else:
-             logger.info("Not enough data to build dataset.")
+                self.save_dataset()
+        finally:
+            self.state.close()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Build HVA Routing Dataset")
-    parser.add_argument("--force", action="store_true", help="Overwrite existing dataset")
+    parser.add_argument("--force", action="store_true", help="Rebuild from scratch (reset state, overwrite dataset)")
+    parser.add_argument("--dry-run", action="store_true", help="Scan and report without writing output or state")
     parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_PATH, help="Output JSONL path")
-    parser.add_argument("--logs", type=Path, default=DEFAULT_LOG_PATH, help="Input log file path")
-    
+    parser.add_argument("--logs", type=Path, nargs="+", default=None,
+                        help="Input log file path(s) (default: hva.log and its rotations)")
+    parser.add_argument("--state", type=Path, default=None, help="State DB (default: <output>.state.db)")
+
     args = parser.parse_args()
-    
-    if not args.logs.exists():
-        print(f"Error: Log file not found at {args.logs}")
+
+    logs = args.logs or sorted(DEFAULT_LOG_PATH.parent.glob(DEFAULT_LOG_PATH.name + "*"))
+    if not any(p.exists() for p in logs):
+        print(f"Error: Log file not found at {DEFAULT_LOG_PATH if not args.logs else ', '.join(map(str, logs))}")
         exit(1)
-        
-    builder = DatasetBuilder(args.logs, args.output, args.force)
+
+    builder = DatasetBuilder(logs, args.output, args.force, args.dry_run, args.state)
     builder.run()
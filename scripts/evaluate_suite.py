@@ -0,0 +1,55 @@
+"""
+Run every evaluation suite against one model load
+
+Each scripts/evaluate_*.py suite contributes its cases; results are cached
+by (model hash, prompt, sampling) so re-runs only generate new prompts.
+Reports go to docs/eval_suite/<backend>/.
+"""
+
+import os
+import sys
+import importlib.util
+from pathlib import Path
+
+sys.path.append(os.getcwd())
+from finetune.eval_harness import parse_args, make_runner, run_suite
+
+SCRIPTS_DIR = Path(__file__).parent
+SUITES = [
+    "evaluate_v3_heavy_duty",
+    "evaluate_v2_5_deep",
+    "evaluate_v2_5_full",
+    "evaluate_qwen_finetuned",
+    "evaluate_qwen_base",
+]
+
+
+def load_suite(name):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    args = parse_args("Run all evaluation suites")
+    runner = make_runner(args)
+    out_dir = Path("docs/eval_suite") / args.backend
+
+    summary = []
+    for name in SUITES:
+        suite = load_suite(name)
+        results = run_suite(
+            runner, suite.TITLE, suite.build_cases(), out_dir / Path(suite.REPORT_FILE).name, args.backend,
+            getattr(suite, "FULL_RESPONSES", False)
+        )
+        summary.append((name, sum(r["passed"] for r in results), len(results), sum(r["cached"] for r in results)))
+
+    print("\n📊 SUMMARY")
+    for name, passed, total, cached in summary:
+        print(f"   {name}: {passed}/{total} passed ({cached} cached)")
+    print(f"   Throughput: {runner.tokens_per_sec:.1f} tok/s over {runner.generated_tokens} generated tokens")
+
+
+if __name__ == "__main__":
+    main()
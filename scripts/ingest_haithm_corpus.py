@@ -14,8 +14,15 @@ Supported Formats:
     - Audio: .m4a, .mp3, .wav (via OpenAI Whisper)
     - Images: .png, .jpg, .jpeg, .webp (via Tesseract OCR)
 
+Files are processed in parallel (separate capped pools for Whisper and
+OCR) and records are appended to the output as each file finishes. A
+checkpoint manifest (`<output stem>.manifest.jsonl`) keyed by content hash
+lets an interrupted run resume where it stopped; identical files are
+ingested once. A file whose handler raises (or whose worker process dies)
+is not checkpointed and is retried on the next run.
+
 Usage:
-    python scripts/ingest_haithm_corpus.py [--force] [--root <path>]
+    python scripts/ingest_haithm_corpus.py [--force] [--root <path>] [--workers N]
 """
 
 import os
@@ -25,8 +32,10 @@ import hashlib
 import logging
 import uuid
 import warnings
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # --- Library Imports & Graceful Fallbacks ---
 
@@ -70,102 +79,261 @@ logger = logging.getLogger("Ingestor")
 # Suppress some noisy warnings from libs
 warnings.filterwarnings("ignore", category=UserWarning) 
 
+# Extension -> worker pool. Whisper and Tesseract are CPU/RAM heavy and get their own capped pools.
+HANDLER_POOLS = {
+    ".txt": "docs", ".md": "docs", ".pdf": "docs", ".docx": "docs",
+    ".json": "docs", ".html": "docs", ".htm": "docs",
+    ".m4a": "audio", ".mp3": "audio", ".wav": "audio",
+    ".png": "ocr", ".jpg": "ocr", ".jpeg": "ocr", ".webp": "ocr",
+}
+
+
+def missing_dependency(ext: str) -> Optional[str]:
+    """Warning message if the handler for this extension cannot run here."""
+    if ext == ".pdf" and not PyPDF2:
+        return "Skipping PDF: PyPDF2 not installed"
+    if ext == ".docx" and not docx:
+        return "Skipping DOCX: python-docx not installed"
+    if ext in [".html", ".htm"] and not BeautifulSoup:
+        return "Skipping HTML: beautifulsoup4 not installed"
+    if HANDLER_POOLS.get(ext) == "audio" and not whisper:
+        return "Skipping Audio: openai-whisper not installed"
+    if HANDLER_POOLS.get(ext) == "ocr" and (not pytesseract or not Image):
+        return "Skipping Image: pytesseract/Pillow not installed"
+    return None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Worker process side ---
+# Each worker keeps one ingestor (and so one Whisper model) for its lifetime.
+
+_worker_ingestor = None
+
+
+def _init_worker(root_dir: str, max_chars: int):
+    global _worker_ingestor
+    _worker_ingestor = CorpusIngestor(root_dir, output_file=None, max_chars=max_chars, force=False)
+
+
+def _process_in_worker(path: str) -> List[Dict]:
+    return _worker_ingestor.process_file(Path(path))
+
+
 class CorpusIngestor:
-    def __init__(self, root_dir: str, output_file: str, max_chars: int, force: bool):
+    def __init__(self, root_dir: str, output_file: Optional[str], max_chars: int, force: bool,
+                 workers: Optional[int] = None, audio_workers: int = 1, ocr_workers: int = 2):
         self.root_dir = Path(root_dir)
-        self.output_file = Path(output_file)
+        self.output_file = Path(output_file) if output_file else None
         self.max_chars = max_chars
         self.force = force
+        # workers=0 processes files inline (no pools)
+        self.pool_sizes = {
+            "docs": (os.cpu_count() or 1) if workers is None else workers,
+            "audio": audio_workers,
+            "ocr": ocr_workers
+        }
         self.stats = {
             "scanned": 0,
             "ingested": 0,
             "skipped": 0,
+            "resumed": 0,
+            "duplicates": 0,
             "records": 0,
             "by_type": {},
             "by_role": {}
         }
         self.whisper_model = None  # Lazy load
 
+    @property
+    def manifest_file(self) -> Path:
+        return self.output_file.with_name(self.output_file.stem + ".manifest.jsonl")
+
     def run(self):
         # Checks
         if not self.root_dir.exists():
             logger.error(f"Root directory not found: {self.root_dir}")
             return
 
-        if self.output_file.exists() and not self.force:
-            logger.error(f"Output file exists: {self.output_file}")
-            logger.info("Use --force to overwrite. Exiting.")
+        done = self._prepare_output()
+        if done is None:
             return
 
         logger.info(f"Starting ingestion from: {self.root_dir}")
-        all_records = []
+        with open(self.output_file, "ab") as out, open(self.manifest_file, "a", encoding="utf-8") as manifest:
+            for path, digest, records in self.iter_results(done):
+                if records:
+                    self.stats["ingested"] += 1
+                else:
+                    self.stats["skipped"] += 1
+                for record in records:
+                    out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self._count(record)
+                out.flush()
+                # Checkpoint after the records are on disk; offset lets a resumed run drop a torn tail
+                manifest.write(json.dumps({
+                    "sha256": digest,
+                    "path": str(path),
+                    "records": len(records),
+                    "offset": out.tell()
+                }, ensure_ascii=False) + "\n")
+                manifest.flush()
+
+        if self.stats["records"] or self.stats["resumed"]:
+            logger.info(f"Wrote {self.stats['records']} new records to {self.output_file}")
+            self._print_summary()
+        else:
+            logger.warning("No records were generated. Is the directory empty?")
+
+    def _prepare_output(self) -> Optional[Dict[str, Dict]]:
+        """Checkpointed files by content hash ({} for a fresh run), None if the output must not be touched."""
+        if self.force:
+            for path in (self.output_file, self.manifest_file):
+                if path.exists():
+                    path.unlink()
+        elif self.manifest_file.exists() and self.output_file.exists():
+            done = {}
+            offset = 0
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn checkpoint line
+                    done[entry["sha256"]] = entry
+                    offset = entry["offset"]
+            # Drop records written after the last checkpoint (crash mid-file)
+            with open(self.output_file, "r+b") as f:
+                f.truncate(offset)
+            logger.info(f"Resuming: {len(done)} files already processed")
+            return done
+        elif self.output_file.exists():
+            logger.error(f"Output file exists: {self.output_file}")
+            logger.info("Use --force to overwrite. Exiting.")
+            return None
+        elif self.manifest_file.exists():
+            self.manifest_file.unlink()  # Output was removed; start over
+
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        return {}
 
-        # Walk directory
+    def iter_files(self) -> Iterator[Path]:
+        """Walk the tree lazily, skipping hidden files."""
         for root, dirs, files in os.walk(self.root_dir):
             for file in files:
-                file_path = Path(root) / file
-                # Skip hidden files
-                if file.startswith("."): 
+                if file.startswith("."):
                     continue
-                
                 self.stats["scanned"] += 1
-                try:
-                    records = self.process_file(file_path)
-                    if records:
-                        all_records.extend(records)
-                        self.stats["ingested"] += 1
-                    else:
-                        self.stats["skipped"] += 1
-                except Exception as e:
-                    logger.error(f"CRITICAL ERROR processing {file}: {e}")
+                yield Path(root) / file
+
+    def iter_results(self, done: Dict[str, Dict]) -> Iterator[Tuple[Path, str, List[Dict]]]:
+        """Yield (path, content hash, records) as files finish, in completion order."""
+        seen = set(done)
+        pools: Dict[str, ProcessPoolExecutor] = {}
+        pending = {}  # future -> (path, digest, pool name)
+        try:
+            for path in self.iter_files():
+                ext = path.suffix.lower()
+                pool_name = HANDLER_POOLS.get(ext)
+                message = missing_dependency(ext) if pool_name else None
+                if pool_name is None or message:
+                    if message:
+                        logger.warning_once(message)
                     self.stats["skipped"] += 1
+                    continue
 
-        # Write output
-        if all_records:
-            self._write_jsonl(all_records)
-            self._print_summary()
-        else:
-            logger.warning("No records were generated. Is the directory empty?")
+                digest = file_sha256(path)
+                if digest in seen:
+                    self.stats["resumed" if digest in done else "duplicates"] += 1
+                    continue
+                seen.add(digest)
+
+                size = self.pool_sizes[pool_name]
+                if size <= 0:
+                    try:
+                        records = self.process_file(path)
+                    except Exception as e:
+                        self._failed(path, e)
+                        continue
+                    yield path, digest, records
+                    continue
+                if pool_name not in pools:
+                    pools[pool_name] = self._new_pool(size)
+                # Bounded queue per pool: memory stays flat however large the corpus is
+                while sum(1 for _, _, name in pending.values() if name == pool_name) >= size * 2:
+                    yield from self._drain(pending)
+                try:
+                    future = pools[pool_name].submit(_process_in_worker, str(path))
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM in Whisper); its in-flight files fail in _drain
+                    logger.warning(f"{pool_name} worker pool crashed, restarting it")
+                    pools.pop(pool_name).shutdown(wait=False, cancel_futures=True)
+                    pools[pool_name] = self._new_pool(size)
+                    future = pools[pool_name].submit(_process_in_worker, str(path))
+                pending[future] = (path, digest, pool_name)
+
+            while pending:
+                yield from self._drain(pending)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def _new_pool(self, size: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=size, initializer=_init_worker, initargs=(str(self.root_dir), self.max_chars)
+        )
+
+    def _drain(self, pending: Dict) -> Iterator[Tuple[Path, str, List[Dict]]]:
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            path, digest, _ = pending.pop(future)
+            try:
+                records = future.result()
+            except Exception as e:
+                self._failed(path, e)
+                continue
+            yield path, digest, records
+
+    def _failed(self, path: Path, error: Exception):
+        # Not checkpointed: retried on the next run
+        logger.error(f"CRITICAL ERROR processing {path.name}: {error}")
+        self.stats["skipped"] += 1
 
     def process_file(self, path: Path) -> List[Dict]:
-        """Dispatch to appropriate handler based on extension."""
+        """
+        Dispatch to appropriate handler based on extension.
+
+        Handler errors propagate so the caller skips the checkpoint; [] means
+        the file really has no usable text.
+        """
         ext = path.suffix.lower()
+        message = missing_dependency(ext)
+        if message:
+            logger.warning_once(message)
+            return []
         
-        try:
-            if ext in [".txt", ".md"]:
-                return self._handle_text(path)
-            elif ext == ".pdf":
-                if not PyPDF2:
-                    logger.warning_once(f"Skipping PDF: PyPDF2 not installed")
-                    return []
-                return self._handle_pdf(path)
-            elif ext == ".docx":
-                if not docx:
-                    logger.warning_once(f"Skipping DOCX: python-docx not installed")
-                    return []
-                return self._handle_docx(path)
-            elif ext == ".json":
-                return self._handle_json_chat(path)
-            elif ext in [".html", ".htm"]:
-                if not BeautifulSoup:
-                    logger.warning_once(f"Skipping HTML: beautifulsoup4 not installed")
-                    return []
-                return self._handle_html_chat(path)
-            elif ext in [".m4a", ".mp3", ".wav"]:
-                if not whisper:
-                    logger.warning_once(f"Skipping Audio: openai-whisper not installed")
-                    return []
-                return self._handle_audio(path)
-            elif ext in [".png", ".jpg", ".jpeg", ".webp"]:
-                if not pytesseract or not Image:
-                    logger.warning_once(f"Skipping Image: pytesseract/Pillow not installed")
-                    return []
-                return self._handle_image(path)
-            else:
-                # logger.debug(f"Skipping unsupported type: {path.name}")
-                return []
-        except Exception as e:
-            logger.error(f"Error processing {path.name}: {e}")
+        if ext in [".txt", ".md"]:
+            return self._handle_text(path)
+        elif ext == ".pdf":
+            return self._handle_pdf(path)
+        elif ext == ".docx":
+            return self._handle_docx(path)
+        elif ext == ".json":
+            return self._handle_json_chat(path)
+        elif ext in [".html", ".htm"]:
+            return self._handle_html_chat(path)
+        elif ext in [".m4a", ".mp3", ".wav"]:
+            return self._handle_audio(path)
+        elif ext in [".png", ".jpg", ".jpeg", ".webp"]:
+            return self._handle_image(path)
+        else:
+            # logger.debug(f"Skipping unsupported type: {path.name}")
             return []
 
     # --- Handlers ---
@@ -352,43 +520,35 @@ class CorpusIngestor:
         return self._create_chunks(text, path, source_type="chat_html", role="user")
 
     def _handle_audio(self, path: Path) -> List[Dict]:
-        """Audio transcription using Whisper."""
-        try:
-            # Lazy load whisper model
-            if self.whisper_model is None:
-                logger.info("Loading Whisper model (base)...")
-                self.whisper_model = whisper.load_model("base") # Use 'base' for speed/balance
-            
-            logger.info(f"Transcribing audio: {path.name}")
-            result = self.whisper_model.transcribe(str(path))
-            text = result.get("text", "")
-            
-            if not text.strip():
-                return []
-                
-            return self._create_chunks(text, path, source_type="audio", role="user")
-            
-        except Exception as e:
-            logger.warning(f"Audio transcription failed for {path.name}: {e}")
+        """Audio transcription using Whisper (failures propagate and are retried next run)."""
+        # Lazy load whisper model
+        if self.whisper_model is None:
+            logger.info("Loading Whisper model (base)...")
+            self.whisper_model = whisper.load_model("base") # Use 'base' for speed/balance
+        
+        logger.info(f"Transcribing audio: {path.name}")
+        result = self.whisper_model.transcribe(str(path))
+        text = result.get("text", "")
+        
+        if not text.strip():
             return []
+            
+        return self._create_chunks(text, path, source_type="audio", role="user")
 
     def _handle_image(self, path: Path) -> List[Dict]:
-        """OCR using Tesseract."""
+        """OCR using Tesseract (e.g. a missing Tesseract binary propagates and is retried next run)."""
         try:
             image = Image.open(path)
-            text = pytesseract.image_to_string(image)
-            
-            if not text.strip():
-                return []
-                
-            return self._create_chunks(text, path, source_type="image", role="user")
-        except ImportError:
-            logger.warning("OCR skipped. pytesseract or PIL not installed.")
+        except OSError as e:
+            # Corrupt or unsupported image: nothing to retry
+            logger.warning(f"Image read error {path.name}: {e}")
             return []
-        except Exception as e:
-            # e.g. Tesseract binary not found
-            logger.warning(f"OCR failed for {path.name}: {e}")
+        text = pytesseract.image_to_string(image)
+        
+        if not text.strip():
             return []
+            
+        return self._create_chunks(text, path, source_type="image", role="user")
 
     # --- Core Logic ---
 
@@ -436,25 +596,22 @@ class CorpusIngestor:
             }
             chunks.append(record)
             
-            self.stats["records"] += 1
-            self.stats["by_type"][source_type] = self.stats["by_type"].get(source_type, 0) + 1
-            self.stats["by_role"][str(role)] = self.stats["by_role"].get(str(role), 0) + 1
-            
         return chunks
 
-    def _write_jsonl(self, records: List[Dict]):
-        """Write records to output file."""
-        self.output_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            for record in records:
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
-        logger.info(f"Successfully wrote {len(records)} records to {self.output_file}")
+    def _count(self, record: Dict):
+        """Stats are counted in the writing process (handlers may run in workers)."""
+        self.stats["records"] += 1
+        source_type, role = record["source_type"], str(record["role"])
+        self.stats["by_type"][source_type] = self.stats["by_type"].get(source_type, 0) + 1
+        self.stats["by_role"][role] = self.stats["by_role"].get(role, 0) + 1
 
     def _print_summary(self):
         print("\n--- Ingestion Summary ---")
         print(f"Files Scanned:    {self.stats['scanned']}")
         print(f"Files Ingested:   {self.stats['ingested']}")
         print(f"Files Skipped:    {self.stats['skipped']}")
+        print(f"Already Done:     {self.stats['resumed']}")
+        print(f"Duplicates:       {self.stats['duplicates']}")
         print(f"Total Chunks:     {self.stats['records']}")
         print("\nBreakdown by Type:")
         for k, v in self.stats['by_type'].items():
@@ -479,7 +636,10 @@ def main():
     parser.add_argument("--root", default="haithm_corpus", help="Root directory for input files")
     parser.add_argument("--output", default="data/haithm_corpus_raw.jsonl", help="Output JSONL file")
     parser.add_argument("--max-chars", type=int, default=2000, help="Max characters per text chunk")
-    parser.add_argument("--force", action="store_true", help="Overwrite existing output file")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing output file (and checkpoint)")
+    parser.add_argument("--workers", type=int, default=None, help="Document worker processes (default: CPU count, 0 = inline)")
+    parser.add_argument("--audio-workers", type=int, default=1, help="Whisper worker processes (one model each)")
+    parser.add_argument("--ocr-workers", type=int, default=2, help="Tesseract OCR worker processes")
     
     args = parser.parse_args()
     
@@ -487,7 +647,10 @@ def main():
         root_dir=args.root,
         output_file=args.output,
         max_chars=args.max_chars,
-        force=args.force
+        force=args.force,
+        workers=args.workers,
+        audio_workers=args.audio_workers,
+        ocr_workers=args.ocr_workers
     )
     ingestor.run()
 
@@ -9,19 +9,28 @@ and filters for messages sent by Haithm.
 Formats:
 - Android: "12/09/2024, 21:35 - Sender: Message"
 - iOS: "[12/09/2024, 21:35] Sender: Message"
+  (plus AM/PM, dotted dates and Arabic-Indic digits; multi-line messages are merged)
+
+ZIPs are streamed (never extracted) and processed in parallel, one chat per
+worker process; the output JSONL grows as each chat finishes.
 
 Output:
 - JSONL file with fields: id, source_path, role, sender, chat_name, timestamp, text
+- <output stem>.stats.json with per-chat stats
 """
 
+import io
 import os
 import re
 import json
+import time
+import uuid
+import shutil
 import zipfile
 import argparse
-import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from datetime import datetime
 
 # --- Configuration ---
 HAITHM_NAMES = [
@@ -50,35 +59,83 @@ SYSTEM_MESSAGES_SUBSTRINGS = [
     "missed video call"
 ]
 
-# Regex Patterns
-# Android: 12/09/2024, 21:35 - Haithm: message
-ANDROID_PATTERN = re.compile(r'^(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2})\s-\s([^:]+): (.*)$')
+# One compiled matcher for every message header variant:
+#   Android: 12/09/2024, 21:35 - Haithm: message   (also "12.09.24 21:35 - ", AM/PM, ص/م)
+#   iOS:     [12/09/2024, 21:35:10] Haithm: message
+# \d also matches Arabic-Indic digits (٠-٩, ۰-۹). A header without "sender:" is a
+# system event; any line without a header continues the previous message.
+_DATE = r"\d{1,4}[/.\-]\d{1,2}[/.\-]\d{1,4}"
+_TIME = r"\d{1,2}[:.]\d{2}(?:[:.]\d{2})?(?:[\s ]?(?:[AaPp]\.?[Mm]\.?|[صم]))?"
+_TIMESTAMP = rf"{_DATE}[,،]?\s{_TIME}"
+MESSAGE_START = re.compile(
+    rf"^(?:\[(?P<ios>{_TIMESTAMP})\]\s?|(?P<android>{_TIMESTAMP})\s[-–]\s)"
+    rf"(?:(?P<sender>[^:]+?):(?:\s(?P<text>.*))?|(?P<event>.*))$"
+)
+
+_ASCII_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
 
-# iOS: [12/09/2024, 21:35] Haithm: message
-# Note: Sometimes iOS uses periods or different brackets, but standard export is []
-IOS_PATTERN = re.compile(r'^\[(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2}:?\d{0,2})\]\s([^:]+): (.*)$')
+def ascii_digits(timestamp):
+    """Arabic-Indic digits -> ASCII (only called for timestamps that are kept)"""
+    return timestamp if timestamp.isascii() else timestamp.translate(_ASCII_DIGITS)
+
+
+def _clean(line):
+    # Remove LTR/RTL marks and BOM (checked first: str.translate on every line is slow)
+    if "\u200e" in line or "\u200f" in line or "\ufeff" in line:
+        line = line.replace("\u200e", "").replace("\u200f", "").replace("\ufeff", "")
+    return line
 
 
 def parse_line(line):
     """
-    Attempts to parse a line using known patterns.
+    Attempts to parse a message header line.
     Returns (timestamp, sender, message) or None.
     """
-    line = line.strip()
-    if not line:
+    match = MESSAGE_START.match(_clean(line.strip()))
+    if not match or match.group("sender") is None:
         return None
-        
-    # Check Android
-    match = ANDROID_PATTERN.match(line)
-    if match:
-        return match.groups()
-        
-    # Check iOS
-    match = IOS_PATTERN.match(line)
-    if match:
-        return match.groups()
-        
-    return None
+    timestamp = match.group("ios") or match.group("android")
+    return ascii_digits(timestamp), match.group("sender").strip(), match.group("text") or ""
+
+
+def iter_messages(lines, stats=None):
+    """
+    Merge raw chat lines into (timestamp, sender, text) messages.
+    Timestamps are yielded as written (see ascii_digits).
+
+    Lines without a header are appended to the current message; system
+    events (a header with no sender) close it.
+    """
+    match_start = MESSAGE_START.match
+    current = None
+    line_count = continuation = events = 0
+    for raw in lines:
+        line_count += 1
+        line = raw.rstrip("\r\n")
+        if "\u200e" in line or "\u200f" in line or "\ufeff" in line:
+            line = _clean(line)
+        match = match_start(line)
+        if match is None:
+            if current is not None:
+                current[2].append(line)
+                continuation += 1
+            continue
+        if current is not None:
+            parts = current[2]
+            yield current[0], current[1], (parts[0] if len(parts) == 1 else "\n".join(parts)).strip()
+            current = None
+        ios, android, sender, text, _ = match.groups()
+        if sender is None:
+            events += 1
+            continue
+        current = (ios or android, sender.strip(), [text or ""])
+    if current is not None:
+        yield current[0], current[1], "\n".join(current[2]).strip()
+    if stats is not None:
+        stats["lines"] += line_count
+        stats["continuation_lines"] += continuation
+        stats["events"] += events
 
 def is_haithm(sender):
     """Checks if sender is Haithm."""
@@ -91,66 +148,136 @@ def is_system_message(text):
             return True
     return False
 
-def process_zip_file(zip_path):
+def _empty_stats(chat_name):
+    return {
+        "chat_name": chat_name,
+        "lines": 0,
+        "messages": 0,
+        "continuation_lines": 0,
+        "events": 0,
+        "haithm_messages": 0,
+        "system_skipped": 0,
+        "senders": {},
+        "first_timestamp": None,
+        "last_timestamp": None
+    }
+
+
+def chat_name_for(zip_path):
+    return Path(zip_path).stem.replace("WhatsApp Chat - ", "")
+
+
+def process_zip_file(zip_path, out_file):
     """
-    Reads a ZIP file in memory, finds the first .txt file, parses it.
-    Returns list of message dicts.
+    Streams the first .txt in a ZIP (no extraction) and writes Haithm's
+    messages to out_file as JSONL.
+    Returns per-chat stats.
     """
-    messages = []
-    
+    chat_name = chat_name_for(zip_path)
+    stats = _empty_stats(chat_name)
+
     try:
-        with zipfile.ZipFile(zip_path, 'r') as z:
+        with zipfile.ZipFile(zip_path, 'r') as z, open(out_file, 'w', encoding='utf-8') as out:
             txt_files = [f for f in z.namelist() if f.endswith('.txt')]
             if not txt_files:
-                return []
+                return stats
                 
             # Usually there's only one _chat.txt or Chat.txt
             target_file = txt_files[0]
-            chat_name = Path(zip_path).stem.replace("WhatsApp Chat - ", "")
             
-            with z.open(target_file) as f:
-                # Read line by line, decoding UTF-8
-                for line_bytes in f:
-                    try:
-                        line_str = line_bytes.decode('utf-8').strip()
-                        # Remove LTR/RTL marks just in case
-                        line_str = line_str.replace('\u200e', '').replace('\u200f', '')
-                        
-                        parsed = parse_line(line_str)
-                        if parsed:
-                            timestamp, sender, text = parsed
-                            
-                            # Filter Identity
-                            if is_haithm(sender):
-                                # Filter System Messages
-                                if not is_system_message(text):
-                                    messages.append({
-                                        "id": str(uuid.uuid4()),
-                                        "source_path": Path(zip_path).name,
-                                        "source_type": "whatsapp_chat",
-                                        "role": "user",
-                                        "sender": "haithm",
-                                        "chat_name": chat_name,
-                                        "timestamp": timestamp,
-                                        "text": text
-                                    })
-                    except UnicodeDecodeError:
-                        continue # Skip bad encoding lines
+            # Fields that are constant for the chat are serialized once
+            static = json.dumps({
+                "source_path": Path(zip_path).name,
+                "source_type": "whatsapp_chat",
+                "role": "user",
+                "sender": "haithm",
+                "chat_name": chat_name
+            }, ensure_ascii=False)[1:-1]
+            senders = Counter()
+            timestamp = None
+            with io.TextIOWrapper(z.open(target_file), encoding='utf-8', errors='replace') as f:
+                for timestamp, sender, text in iter_messages(f, stats):
+                    senders[sender] += 1
+                    if stats["first_timestamp"] is None:
+                        stats["first_timestamp"] = ascii_digits(timestamp)
+                    
+                    # Filter Identity
+                    if not is_haithm(sender):
+                        continue
+                    # Filter System Messages
+                    if not text or is_system_message(text):
+                        stats["system_skipped"] += 1
+                        continue
+                    stats["haithm_messages"] += 1
+                    out.write(
+                        f'{{"id": "{uuid.uuid4()}", {static}, "timestamp": "{ascii_digits(timestamp)}", '
+                        f'"text": {json.dumps(text, ensure_ascii=False)}}}\n'
+                    )
+            stats["messages"] = sum(senders.values())
+            stats["senders"] = dict(senders)
+            stats["last_timestamp"] = timestamp and ascii_digits(timestamp)
                         
     except zipfile.BadZipFile:
         print(f"Warning: Bad ZIP file {zip_path}")
-        return []
+        stats["error"] = "bad_zip"
     except Exception as e:
         print(f"Error processing {zip_path}: {e}")
-        return []
+        stats["error"] = str(e)
+
+    return stats
+
+
+def ingest_zips(zip_files, out_path, workers=None):
+    """
+    Process ZIPs in parallel; each worker writes a part file that is appended
+    to out_path as soon as its chat finishes. Returns per-chat stats.
+
+    A chat whose worker failed (e.g. killed for memory, which also breaks
+    the pool for the chats still queued) gets stats["error"] and its partial
+    part file is discarded; the other chats are kept.
+    """
+    parts_dir = out_path.with_name(out_path.name + ".parts")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    all_stats = []
+    
+    with open(out_path, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        # Largest chats first so one big export does not finish last on its own
+        ordered = sorted(zip_files, key=lambda p: p.stat().st_size, reverse=True)
+        futures = {
+            pool.submit(process_zip_file, str(z), str(parts_dir / f"{i}.jsonl")): (z, parts_dir / f"{i}.jsonl")
+            for i, z in enumerate(ordered)
+        }
+        for future in as_completed(futures):
+            zip_file, part = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"Error processing {zip_file}: {e!r}")
+                stats = _empty_stats(chat_name_for(zip_file))
+                stats["error"] = repr(e)
+                part.unlink(missing_ok=True)
+                all_stats.append(stats)
+                continue
+            if part.exists():
+                with open(part, 'r', encoding='utf-8') as f:
+                    shutil.copyfileobj(f, out)
+                out.flush()
+                part.unlink()
+            all_stats.append(stats)
+            print(f"Processed {zip_file.name}: {stats['lines']} lines, "
+                  f"{stats['messages']} messages, {stats['haithm_messages']} Haithm messages")
+    
+    parts_dir.rmdir()
+    return all_stats
 
-    return messages
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest WhatsApp Haithm-Only Corpus")
     parser.add_argument("--root", default="/Users/haitham/development/Haitham Voice Agent (HVA)/WhatsApp", help="Root folder containing ZIPs")
     parser.add_argument("--output", default="data/haithm_corpus_whatsapp_haithm_only.jsonl", help="Output JSONL path")
     parser.add_argument("--force", action="store_true", help="Overwrite existing output")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel ZIP workers (default: CPU count)")
     
     args = parser.parse_args()
     
@@ -167,34 +294,26 @@ def main():
         
     print(f"Scanning {root_path} for ZIP files...")
     zip_files = list(root_path.glob("*.zip"))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
     
-    total_zips = 0
-    total_parsed = 0 # Approximate
-    total_haithm = 0
-    total_skipped = 0 # Approximate (based on line count logic might be hard without counting every line, let's track non-haithm parsed)
-    
-    all_messages = []
+    start = time.time()
+    all_stats = ingest_zips(zip_files, out_path, args.workers)
+    elapsed = time.time() - start
     
-    for zip_file in zip_files:
-        chat_msgs = process_zip_file(zip_file)
-        if chat_msgs:
-            total_zips += 1
-            total_haithm += len(chat_msgs)
-            all_messages.extend(chat_msgs)
-        
-        # Simple progress
-        print(f"Processed {zip_file.name}: Found {len(chat_msgs)} Haithm messages")
-
-    # Write output
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, 'w', encoding='utf-8') as f:
-        for msg in all_messages:
-            f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+    totals = {
+        key: sum(s[key] for s in all_stats)
+        for key in ("lines", "messages", "continuation_lines", "events", "haithm_messages", "system_skipped")
+    }
+    stats_path = out_path.with_name(out_path.stem + ".stats.json")
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump({"totals": totals, "seconds": round(elapsed, 2), "chats": all_stats}, f, ensure_ascii=False, indent=2)
             
     print("\n=== Ingestion Summary ===")
-    print(f"ZIP Files Processed: {total_zips}")
-    print(f"Total Haithm Messages: {total_haithm}")
+    print(f"ZIP Files Processed: {sum(1 for s in all_stats if s['haithm_messages'])}/{len(all_stats)}")
+    print(f"Lines Parsed: {totals['lines']} ({totals['lines'] / elapsed:,.0f} lines/s)")
+    print(f"Total Haithm Messages: {totals['haithm_messages']}")
     print(f"Output: {out_path}")
+    print(f"Per-chat stats: {stats_path}")
     print("=========================")
 
 if __name__ == "__main__":
@@ -33,8 +33,9 @@ async def test_token_tracker():
         context={"test": "direct_log_2"}
     )
     
-    # 3. Verify DB
+    # 3. Verify DB (events are buffered; write them now)
     print("\nVerifying Database...")
+    await tracker.flush()
     stats = await memory_system.sqlite_store.get_token_usage_stats(days=1)
     print("Stats:", json.dumps(stats, indent=2))
     